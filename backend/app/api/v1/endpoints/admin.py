@@ -2,13 +2,21 @@
 Admin endpoints (minimal RBAC): require username to start with 'admin_'.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+from neo4j import AsyncSession as Neo4jSession
+from pydantic import BaseModel, Field
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.v1.endpoints.auth import get_current_user
-from app.db import get_postgresql_session
+from app.db import get_neo4j_session, get_postgresql_session
 from app.models.database_models import User
+from app.services.lesson_batch_compile_service import lesson_batch_compiler
+from app.utils.neo4j_instrumentation import SORT_KEYS, neo4j_query_stats
+from app.utils.request_profiler import request_profiler
+from app.utils.sql_instrumentation import SORT_KEYS as SQL_SORT_KEYS, sql_stats
 
 
 router = APIRouter()
@@ -19,8 +27,26 @@ class AdminHealth(BaseModel):
     user: str
 
 
+class BatchCompileRequest(BaseModel):
+    can_do_ids: List[str] = Field(default_factory=list, description="Explicit CanDo ids")
+    levels: List[str] = Field(default_factory=list, description="CEFR level filter, e.g. ['A1', 'A2', 'B1']")
+    limit: Optional[int] = Field(default=None, ge=1)
+    metalanguage: str = "en"
+    model: str = "gpt-4.1"
+    fast_model: Optional[str] = None
+    concurrency: Optional[int] = Field(default=None, ge=1, le=32)
+    llm_concurrency: Optional[int] = Field(default=None, ge=1, le=128)
+    max_attempts: Optional[int] = Field(default=None, ge=1, le=5)
+    bypass_card_cache: bool = False
+    checkpoint: Optional[str] = Field(default=None, description="Checkpoint file name to resume from")
+
+
+def is_admin_username(username: Optional[str]) -> bool:
+    return bool(username) and username.lower().startswith("admin_")
+
+
 def require_admin(current_user: User) -> None:
-    if not current_user.username.lower().startswith("admin_"):
+    if not is_admin_username(current_user.username):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin privileges required",
@@ -36,3 +62,158 @@ async def admin_health(
     return AdminHealth(status="ok", user=current_user.username)
 
 
+@router.post("/lessons/batch-compile")
+async def start_batch_compile(
+    request: BatchCompileRequest,
+    neo: Neo4jSession = Depends(get_neo4j_session),
+    current_user: User = Depends(get_current_user),
+) -> Dict[str, Any]:
+    """Start an in-process batch compile of CanDo lessons by id and/or level."""
+    require_admin(current_user)
+    ids = await lesson_batch_compiler.resolve_can_do_ids(
+        neo, can_do_ids=request.can_do_ids, levels=request.levels, limit=request.limit
+    )
+    if not ids:
+        raise HTTPException(status_code=400, detail="No CanDo descriptors matched")
+    checkpoint = None
+    if request.checkpoint:
+        # Reason: only plain file names, always inside the checkpoint directory.
+        name = request.checkpoint.replace("\\", "/").rsplit("/", 1)[-1]
+        if name in ("", ".", ".."):
+            raise HTTPException(status_code=400, detail="Invalid checkpoint name")
+        checkpoint = str(lesson_batch_compiler.checkpoint_dir() / name)
+    job = lesson_batch_compiler.create_job(
+        ids,
+        metalanguage=request.metalanguage,
+        model=request.model,
+        fast_model=request.fast_model,
+        concurrency=request.concurrency,
+        llm_concurrency=request.llm_concurrency,
+        max_attempts=request.max_attempts,
+        bypass_card_cache=request.bypass_card_cache,
+        checkpoint_path=checkpoint,
+    )
+    lesson_batch_compiler.start(job)
+    return job.report()
+
+
+@router.get("/lessons/batch-compile")
+async def list_batch_compiles(
+    current_user: User = Depends(get_current_user),
+) -> List[Dict[str, Any]]:
+    """List batch compile jobs started by this worker."""
+    require_admin(current_user)
+    jobs = sorted(lesson_batch_compiler.jobs.values(), key=lambda j: j.created_at, reverse=True)
+    return [job.report() for job in jobs]
+
+
+@router.get("/lessons/batch-compile/{job_id}")
+async def get_batch_compile(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+) -> Dict[str, Any]:
+    """Progress and throughput/latency report for one batch compile job."""
+    require_admin(current_user)
+    job = lesson_batch_compiler.jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.report()
+
+
+@router.post("/lessons/batch-compile/{job_id}/cancel")
+async def cancel_batch_compile(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+) -> Dict[str, Any]:
+    """Stop starting new lessons; lessons already compiling finish."""
+    require_admin(current_user)
+    if not lesson_batch_compiler.cancel(job_id):
+        raise HTTPException(status_code=400, detail="Job not found or already finished")
+    return {"job_id": job_id, "status": "cancelling"}
+
+
+@router.get("/neo4j/queries")
+async def top_neo4j_queries(
+    limit: int = Query(20, ge=1, le=500),
+    order_by: str = Query("total_ms", description=f"One of: {', '.join(SORT_KEYS)}"),
+    current_user: User = Depends(get_current_user),
+) -> Dict[str, Any]:
+    """Neo4j queries of this worker ranked by total time (or another aggregate)."""
+    require_admin(current_user)
+    if order_by not in SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"order_by must be one of {', '.join(SORT_KEYS)}")
+    return neo4j_query_stats.top(limit=limit, order_by=order_by)
+
+
+@router.post("/neo4j/queries/reset")
+async def reset_neo4j_queries(
+    current_user: User = Depends(get_current_user),
+) -> Dict[str, str]:
+    """Clear the Neo4j query aggregates of this worker."""
+    require_admin(current_user)
+    neo4j_query_stats.reset()
+    return {"status": "reset"}
+
+
+@router.get("/sql/endpoints")
+async def top_sql_endpoints(
+    limit: int = Query(20, ge=1, le=500),
+    order_by: str = Query("db_ms", description=f"One of: {', '.join(SQL_SORT_KEYS)}"),
+    current_user: User = Depends(get_current_user),
+) -> Dict[str, Any]:
+    """Postgres statement counts and DB time per endpoint of this worker."""
+    require_admin(current_user)
+    if order_by not in SQL_SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"order_by must be one of {', '.join(SQL_SORT_KEYS)}")
+    return sql_stats.top(limit=limit, order_by=order_by)
+
+
+@router.post("/sql/endpoints/reset")
+async def reset_sql_endpoints(
+    current_user: User = Depends(get_current_user),
+) -> Dict[str, str]:
+    """Clear the per-endpoint Postgres aggregates of this worker."""
+    require_admin(current_user)
+    sql_stats.reset()
+    return {"status": "reset"}
+
+
+@router.get("/profiles")
+async def list_request_profiles(
+    limit: int = Query(50, ge=1, le=500),
+    current_user: User = Depends(get_current_user),
+) -> Dict[str, Any]:
+    """Profiled requests of this worker, newest first (send `X-Profile: 1` to profile one)."""
+    require_admin(current_user)
+    return {"profiles": request_profiler.list(limit=limit)}
+
+
+@router.get("/profiles/{profile_id}")
+async def get_request_profile(
+    profile_id: str,
+    format: str = Query("json", description="json (span breakdown) or folded (flame graph)"),
+    limit: int = Query(20, ge=1, le=500),
+    current_user: User = Depends(get_current_user),
+) -> Any:
+    """One request profile: wall-time breakdown, top spans and frames, or a folded-stack flame graph."""
+    require_admin(current_user)
+    if format not in ("json", "folded"):
+        raise HTTPException(status_code=400, detail="format must be one of json, folded")
+    profile = request_profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "folded":
+        return PlainTextResponse(profile.folded())
+    return profile.report(limit=limit)
+
+
+@router.delete("/profiles")
+async def clear_request_profiles(
+    current_user: User = Depends(get_current_user),
+) -> Dict[str, str]:
+    """Drop the stored request profiles of this worker."""
+    require_admin(current_user)
+    request_profiler.clear()
+    return {"status": "cleared"}
+
+
@@ -1,5 +1,8 @@
 """
 Conversation analytics endpoints (MVP): summary stats per user.
+
+All endpoints read the per-user daily rollups in `user_daily_activity`
+(see `analytics_rollup_service`) rather than the raw message history.
 """
 
 from datetime import datetime
@@ -7,12 +10,12 @@ from typing import Optional, List, Dict, Any
 
 from fastapi import APIRouter, Depends
 from pydantic import BaseModel
-from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.v1.endpoints.auth import get_current_user
 from app.db import get_postgresql_session
-from app.models.database_models import ConversationMessage, ConversationSession, User
+from app.models.database_models import User
+from app.services.analytics_rollup_service import analytics_rollup_service
 
 
 router = APIRouter()
@@ -30,35 +33,16 @@ async def get_conversation_summary(
     db: AsyncSession = Depends(get_postgresql_session),
     current_user: User = Depends(get_current_user),
 ) -> ConversationSummary:
-    # Total sessions for user
-    total_sessions_q = select(func.count()).select_from(ConversationSession).where(
-        ConversationSession.user_id == current_user.id
-    )
-    total_sessions = (await db.execute(total_sessions_q)).scalar_one() or 0
-
-    # Total messages for user's sessions
-    total_messages_q = (
-        select(func.count())
-        .select_from(ConversationMessage)
-        .join(ConversationSession, ConversationMessage.session_id == ConversationSession.id)
-        .where(ConversationSession.user_id == current_user.id)
-    )
-    total_messages = (await db.execute(total_messages_q)).scalar_one() or 0
-
-    # Last message timestamp
-    last_message_q = (
-        select(func.max(ConversationMessage.created_at))
-        .join(ConversationSession, ConversationMessage.session_id == ConversationSession.id)
-        .where(ConversationSession.user_id == current_user.id)
-    )
-    last_message_at = (await db.execute(last_message_q)).scalar_one()
+    summary = await analytics_rollup_service.get_summary(db, current_user.id)
+    total_sessions = summary["total_sessions"]
+    total_messages = summary["total_messages"]
 
     avg = float(total_messages) / float(total_sessions) if total_sessions else 0.0
     return ConversationSummary(
-        total_sessions=int(total_sessions),
-        total_messages=int(total_messages),
+        total_sessions=total_sessions,
+        total_messages=total_messages,
         avg_messages_per_session=round(avg, 2),
-        last_message_at=last_message_at,
+        last_message_at=summary["last_message_at"],
     )
 
 
@@ -69,19 +53,7 @@ async def messages_per_day(
     current_user: User = Depends(get_current_user),
 ) -> List[Dict[str, Any]]:
     """Return message counts per day for the past N days (UTC)."""
-    day_bucket = func.date_trunc("day", ConversationMessage.created_at).label("day")
-    q = (
-        select(day_bucket, func.count())
-        .select_from(ConversationMessage)
-        .join(ConversationSession, ConversationMessage.session_id == ConversationSession.id)
-        .where(ConversationSession.user_id == current_user.id)
-        .group_by(day_bucket)
-        .order_by(day_bucket.desc())
-        .limit(days)
-    )
-    rows = (await db.execute(q)).all()
-    rows = list(reversed(rows))
-    return [{"date": r[0].date().isoformat(), "count": int(r[1])} for r in rows]
+    return await analytics_rollup_service.messages_per_day(db, current_user.id, days)
 
 
 @router.get("/sessions_per_week")
@@ -91,16 +63,4 @@ async def sessions_per_week(
     current_user: User = Depends(get_current_user),
 ) -> List[Dict[str, Any]]:
     """Return session counts per week for the past N weeks (UTC)."""
-    week_bucket = func.date_trunc("week", ConversationSession.created_at).label("week")
-    q = (
-        select(week_bucket, func.count())
-        .select_from(ConversationSession)
-        .where(ConversationSession.user_id == current_user.id)
-        .group_by(week_bucket)
-        .order_by(week_bucket.desc())
-        .limit(weeks)
-    )
-    rows = (await db.execute(q)).all()
-    rows = list(reversed(rows))
-    return [{"week": r[0].date().isoformat(), "count": int(r[1])} for r in rows]
-
+    return await analytics_rollup_service.sessions_per_week(db, current_user.id, weeks)
@@ -5,10 +5,10 @@ This router now OWNS CanDo listing/filtering concerns (list/count/levels/topics)
 Lesson-related operations may still leverage services shared with lexical.
 """
 
-from fastapi import APIRouter, Depends, Query, Path, HTTPException, Request
+from fastapi import APIRouter, Depends, Query, Path, HTTPException, Request, Response
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError, OperationalError
 from fastapi.responses import StreamingResponse
-from typing import Any, Dict, List, Optional
+from typing import Any, Deque, Dict, List, Optional
 from pydantic import BaseModel, Field
 import uuid
 from neo4j import AsyncSession
@@ -27,11 +27,14 @@ from app.services.cando_v2_compile_service import compile_lessonroot
 # entity_resolution_service functions moved to cando_lesson_session_service
 from app.db import get_neo4j_session, get_postgresql_session
 from sqlalchemy import text
-from app.services.embedding_service import EmbeddingService
 from app.services.cando_embedding_service import CanDoEmbeddingService
 from app.services.cando_creation_service import CanDoCreationService
 from app.services.lesson_persistence_service import lesson_persistence_service
+from app.services.lesson_card_store import STAGE_CARD_KEYS, CARD_STAGES, lesson_card_store
+from app.services.guided_session_working_set import AFFINITY_HEADER, guided_working_set
+from app.services.lesson_search_service import lesson_search_service
 from app.services.cando_recommendation_service import cando_recommendation_service
+from app.services.analytics_rollup_service import analytics_rollup_service
 from app.schemas.lesson import LessonMaster
 from app.services.ai_chat_service import AIChatService
 from app.services.cando_v2_compile_service import compile_lessonroot
@@ -51,27 +54,14 @@ async def _generate_images_background(
 ) -> None:
     """Background task to generate missing images for a lesson without blocking the API response."""
     try:
-        import json
         images_generated, _ = await asyncio.to_thread(
             ensure_image_paths_for_lesson,
             lesson_plan,
             can_do_id=can_do_id,
         )
         if images_generated > 0:
-            # Update the lesson_plan in database with new image paths
-            await pg.execute(
-                text("""
-                    UPDATE lesson_versions 
-                    SET lesson_plan = :plan 
-                    WHERE lesson_id = :lid AND version = :ver
-                """),
-                {
-                    "plan": json.dumps(lesson_plan, ensure_ascii=False),
-                    "lid": lesson_id,
-                    "ver": lesson_version,
-                }
-            )
-            await pg.commit()
+            # Update the lesson_plan (and stored stage cards) with new image paths
+            await lesson_card_store.save_lesson_plan(pg, lesson_id, lesson_version, lesson_plan)
             logger.info(f"Generated {images_generated} images for lesson {lesson_id} v{lesson_version}")
     except Exception as exc:
         logger.warning(f"Background image generation failed for lesson {lesson_id}: {exc}")
@@ -87,11 +77,12 @@ from app.models.database_models import User
 from sqlalchemy import select, func, and_
 from sqlalchemy.exc import ProgrammingError
 from datetime import date, timedelta
-from collections import Counter
+from collections import Counter, deque
 import asyncio
 import os
 import logging
 from app.utils.agent_debug import agent_debug_log
+from app.utils.sse import guard_sse_stream
 
 router = APIRouter()
 py_logger = logging.getLogger(__name__)
@@ -1132,6 +1123,7 @@ async def compile_lesson_v2(
     model: str = Query("gpt-4.1"),
     user_id: Optional[uuid.UUID] = Query(None, description="Optional user ID to fetch pre-lesson kit and profile context from learning path. If provided, the system will automatically fetch the pre-lesson kit associated with this CanDo from the user's active learning path and integrate it into the compilation."),
     fast_model: Optional[str] = Query(None, description="Optional override for the fast model used for non-critical steps (e.g., 'gpt-5.1-mini')."),
+    bypass_card_cache: bool = Query(False, description="If true, regenerate every card instead of reusing validated cards with identical prompts from the card cache"),
     neo: AsyncSession = Depends(get_neo4j_session),
     pg: PgSession = Depends(get_postgresql_session),
 ) -> Dict[str, Any]:
@@ -1155,6 +1147,7 @@ async def compile_lesson_v2(
             model=model,
             user_id=user_id,
             fast_model_override=fast_model,
+            bypass_card_cache=bypass_card_cache,
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"compile_v2_failed: {str(e)}")
@@ -1198,7 +1191,7 @@ async def _get_cached_lesson(
         version_result = await pg.execute(
             text("""
                 SELECT version, lesson_plan, created_at 
-                FROM lesson_versions 
+                FROM lesson_versions_assembled 
                 WHERE lesson_id = :lid 
                 ORDER BY version DESC 
                 LIMIT 1
@@ -1270,6 +1263,7 @@ async def compile_lesson_v2_stream(
     fast_model: Optional[str] = Query(None, description="Optional override for the fast model used for non-critical steps (e.g., 'gpt-5.1-mini')."),
     incremental: bool = Query(False, description="If true, generate Content stage first and return immediately, then generate remaining stages in background"),
     force_recompile: bool = Query(False, description="If true, ignore cached lessons and force a fresh compilation"),
+    bypass_card_cache: bool = Query(False, description="If true, regenerate every card instead of reusing validated cards with identical prompts from the card cache"),
     neo: AsyncSession = Depends(get_neo4j_session),
     pg: PgSession = Depends(get_postgresql_session),
 ) -> StreamingResponse:
@@ -1297,7 +1291,21 @@ async def compile_lesson_v2_stream(
         "prelesson_kit_available": true
       }
       ```
-    - `keepalive`: Sent every 10 seconds while compilation is running
+    - `keepalive`: Sent every 5 seconds while compilation is running
+    - `card`: A validated card, sent as soon as it is generated (SSE `id` is `seq`)
+      ```json
+      {
+        "event": "card",
+        "seq": 3,
+        "card_key": "grammar_patterns",
+        "stage": "content",
+        "card_type": "GrammarPatternsCard",
+        "card": {...}
+      }
+      ```
+    - `card_partial`: Best-effort parse of a dialogue or reading card that is
+      still generating (`"partial": {...}` instead of `"card"`); superseded by
+      the `card` event with the same `card_key`
     - `result`: Final event with compiled lesson
       ```json
       {
@@ -1407,6 +1415,19 @@ async def compile_lesson_v2_stream(
         def progress_callback(update: Dict[str, Any]) -> None:
             """Callback to capture progress updates from compilation."""
             progress_state["latest"] = update
+
+        # Card events arrive on the loop thread in seq order; flushed between keepalives.
+        card_events: Deque[Dict[str, Any]] = deque()
+        card_ready = _asyncio.Event()
+
+        def card_callback(event: Dict[str, Any]) -> None:
+            card_events.append(event)
+            card_ready.set()
+
+        def drain_card_events():
+            while card_events:
+                event = card_events.popleft()
+                yield f"id: {event['seq']}\nevent: {event['event']}\ndata: {_json.dumps(event, ensure_ascii=False)}\n\n"
         
         task = _asyncio.create_task(
             compile_lessonroot(
@@ -1420,6 +1441,8 @@ async def compile_lesson_v2_stream(
                 fast_model_override=fast_model,
                 progress_callback=progress_callback,
                 incremental=incremental,
+                bypass_card_cache=bypass_card_cache,
+                card_callback=card_callback,
             )
         )
 
@@ -1444,26 +1467,6 @@ async def compile_lesson_v2_stream(
             while not task.done():
                 elapsed = _time.time() - start_time
 
-                # Hypothesis A: client disconnect cancels SSE; task keeps running and loses sessions.
-                try:
-                    if await request.is_disconnected():
-                        # #region agent log
-                        agent_debug_log(
-                            hypothesisId="A",
-                            location="cando.py:compile_v2_stream:event_stream",
-                            message="client_disconnected",
-                            data={
-                                "can_do_id": can_do_id,
-                                "elapsed_seconds": round(elapsed, 2),
-                                "keepalive_count": keepalive_count,
-                            },
-                        )
-                        # #endregion
-                        task.cancel()
-                        return
-                except Exception:
-                    pass
-
                 if elapsed > timeout_seconds:
                     task.cancel()
                     err = {"status": "error", "detail": f"Compilation timeout after {timeout_seconds}s", "can_do_id": can_do_id}
@@ -1529,10 +1532,20 @@ async def compile_lesson_v2_stream(
                     yield f"event: status\ndata: {_json.dumps(progress, ensure_ascii=False)}\n\n"
                     last_progress_time = _time.time()
                 
-                await _asyncio.sleep(5)  # Reduced from 10 to 5 seconds
+                # Wake early when a card is ready so it reaches the client immediately.
+                try:
+                    await _asyncio.wait_for(card_ready.wait(), timeout=5)
+                except _asyncio.TimeoutError:
+                    pass
+                card_ready.clear()
+                for frame in drain_card_events():
+                    yield frame
         finally:
-            # Avoid "Task exception was never retrieved" when the stream ends early.
-            if task.done():
+            # Client disconnects close this generator (see guard_sse_stream); stop compiling too.
+            if not task.done():
+                task.cancel()
+            else:
+                # Avoid "Task exception was never retrieved" when the stream ends early.
                 try:
                     _ = task.exception()
                 except Exception:
@@ -1541,6 +1554,8 @@ async def compile_lesson_v2_stream(
         try:
             result = await task
             compile_result = result  # Store for use in progress callbacks
+            for frame in drain_card_events():
+                yield frame
             if result is None:
                 err = {"status": "error", "detail": "Compilation returned None", "can_do_id": can_do_id}
                 yield f"event: error\ndata: {_json.dumps(err, ensure_ascii=False)}\n\n"
@@ -1611,7 +1626,10 @@ async def compile_lesson_v2_stream(
             yield f"event: error\ndata: {_json.dumps(err, ensure_ascii=False)}\n\n"
             return
 
-    return StreamingResponse(event_stream(), media_type="text/event-stream")
+    return StreamingResponse(
+        guard_sse_stream(request, event_stream(), name="compile_v2_stream"),
+        media_type="text/event-stream",
+    )
 
 
 @router.get("/lessons/generation-status")
@@ -1645,52 +1663,12 @@ async def get_lesson_generation_status(
     from fastapi import Response
     
     try:
-        # Optimized: Extract only the status metadata using JSONB operators
-        # This is much faster than loading the entire lesson_plan
-        if version:
-            query = text("""
-                SELECT 
-                    lesson_plan->'lesson'->'meta'->'generation_status' as generation_status,
-                    lesson_plan->'lesson'->'meta'->'errors' as errors,
-                    version 
-                FROM lesson_versions 
-                WHERE lesson_id = :lid AND version = :ver
-            """)
-            params = {"lid": lesson_id, "ver": version}
-        else:
-            query = text("""
-                SELECT 
-                    lesson_plan->'lesson'->'meta'->'generation_status' as generation_status,
-                    lesson_plan->'lesson'->'meta'->'errors' as errors,
-                    version 
-                FROM lesson_versions 
-                WHERE lesson_id = :lid 
-                ORDER BY version DESC 
-                LIMIT 1
-            """)
-            params = {"lid": lesson_id}
-        
-        result = await pg.execute(query, params)
-        row = result.first()
-        
-        if not row:
+        # Optimized: only the status metadata and stage status rows are read,
+        # never the entire lesson_plan
+        found = await lesson_card_store.get_generation_status(pg, lesson_id, version or None)
+        if not found:
             raise HTTPException(status_code=404, detail=f"Lesson {lesson_id} not found")
-        
-        # Extract status directly from JSONB (already parsed by PostgreSQL)
-        generation_status_json = row[0]
-        errors_json = row[1]
-        version_num = row[2]
-        
-        # Parse JSONB results (PostgreSQL returns as dict or str)
-        if isinstance(generation_status_json, str):
-            generation_status = json.loads(generation_status_json) if generation_status_json else {}
-        else:
-            generation_status = generation_status_json or {}
-            
-        if isinstance(errors_json, str):
-            errors = json.loads(errors_json) if errors_json else {}
-        else:
-            errors = errors_json or {}
+        version_num, generation_status, errors = found
         
         # Normalize generation status with defaults
         normalized_status = {
@@ -1747,6 +1725,7 @@ async def regenerate_lesson_stage(
     version: int = Query(..., description="Lesson version"),
     stage: str = Query(..., description="Stage to regenerate: comprehension, production, or interaction"),
     user_id: Optional[str] = Query(None, description="Optional user ID for profile context"),
+    bypass_card_cache: bool = Query(False, description="If true, regenerate every card instead of reusing validated cards with identical prompts from the card cache"),
     neo: AsyncSession = Depends(get_neo4j_session),
     pg: PgSession = Depends(get_postgresql_session),
 ) -> Dict[str, Any]:
@@ -1783,6 +1762,7 @@ async def regenerate_lesson_stage(
             version=version,
             stage=stage,
             user_id=parsed_user_id,
+            bypass_card_cache=bypass_card_cache,
         )
         
         return {
@@ -1827,7 +1807,7 @@ async def list_lessons(
                             lv.version, lv.created_at as version_created_at,
                             lv.lesson_plan
                         FROM lessons l
-                        JOIN lesson_versions lv ON l.id = lv.lesson_id
+                        JOIN lesson_versions_assembled lv ON l.id = lv.lesson_id
                         WHERE l.can_do_id = :can_do_id
                         ORDER BY l.id, lv.version DESC
                     """),
@@ -1855,7 +1835,7 @@ async def list_lessons(
                             lv.version, lv.created_at as version_created_at,
                             lv.lesson_plan
                         FROM lessons l
-                        JOIN lesson_versions lv ON l.id = lv.lesson_id
+                        JOIN lesson_versions_assembled lv ON l.id = lv.lesson_id
                         ORDER BY l.id, lv.version DESC
                         LIMIT 100
                     """)
@@ -1931,7 +1911,7 @@ async def fetch_lesson(
             result = await pg.execute(
                 text("""
                     SELECT lv.lesson_plan, lv.version
-                    FROM lesson_versions lv
+                    FROM lesson_versions_assembled lv
                     WHERE lv.lesson_id = :lesson_id AND lv.version = :version
                     LIMIT 1
                 """),
@@ -1941,7 +1921,7 @@ async def fetch_lesson(
             result = await pg.execute(
                 text("""
                     SELECT lv.lesson_plan, lv.version
-                    FROM lesson_versions lv
+                    FROM lesson_versions_assembled lv
                     WHERE lv.lesson_id = :lesson_id
                     ORDER BY lv.version DESC
                     LIMIT 1
@@ -2001,6 +1981,59 @@ async def fetch_lesson(
         raise HTTPException(status_code=500, detail=f"fetch_lesson_failed: {str(e)}")
 
 
+@router.get("/lessons/fetch/{lesson_id}/stage/{stage}")
+async def fetch_lesson_stage(
+    lesson_id: int,
+    stage: str,
+    version: Optional[int] = Query(None, description="Lesson version (default: latest)"),
+    pg: PgSession = Depends(get_postgresql_session),
+) -> Dict[str, Any]:
+    """Fetch the cards, status and error of one lesson stage without the full lesson_plan.
+
+    Stages: content, comprehension, production, interaction.
+    """
+    if stage not in STAGE_CARD_KEYS:
+        raise HTTPException(status_code=400, detail=f"Unknown stage: {stage}. Must be one of: {', '.join(STAGE_CARD_KEYS)}")
+    try:
+        version = version or await lesson_card_store.latest_version(pg, lesson_id)
+        found = await lesson_card_store.get_stage(pg, lesson_id, version, stage) if version else None
+        if not found:
+            raise HTTPException(status_code=404, detail="Lesson not found")
+        return {"lesson_id": lesson_id, "version": version, **found}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"fetch_lesson_stage_failed: {str(e)}")
+
+
+@router.get("/lessons/fetch/{lesson_id}/card/{card_key}")
+async def fetch_lesson_card(
+    lesson_id: int,
+    card_key: str,
+    version: Optional[int] = Query(None, description="Lesson version (default: latest)"),
+    pg: PgSession = Depends(get_postgresql_session),
+) -> Dict[str, Any]:
+    """Fetch a single lesson card (e.g. `reading_comprehension`) without the full lesson_plan."""
+    if card_key not in CARD_STAGES:
+        raise HTTPException(status_code=400, detail=f"Unknown card: {card_key}")
+    try:
+        version = version or await lesson_card_store.latest_version(pg, lesson_id)
+        cards = await lesson_card_store.get_cards(pg, lesson_id, version, [card_key]) if version else None
+        if not cards or cards.get(card_key) is None:
+            raise HTTPException(status_code=404, detail="Card not found")
+        return {
+            "lesson_id": lesson_id,
+            "version": version,
+            "stage": CARD_STAGES[card_key],
+            "card_key": card_key,
+            "card": cards[card_key],
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"fetch_lesson_card_failed: {str(e)}")
+
+
 @router.post("/lessons/guided/flush")
 async def flush_guided_state(
     session_id: str = Query(..., description="Lesson session id"),
@@ -2015,6 +2048,7 @@ async def flush_guided_state(
             {"id": session_id},
         )
         await pg.commit()
+        guided_working_set.invalidate(session_id)
         return {"status": "ok", "session_id": session_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"guided_flush_failed: {str(e)}")
@@ -2038,8 +2072,9 @@ async def get_latest_lesson(
         # Get latest version row
         res2 = await pg.execute(
             text(
-                "SELECT version, master, entities, timings, lesson_plan, created_at "
-                "FROM lesson_versions WHERE lesson_id = :lid ORDER BY version DESC LIMIT 1"
+                "SELECT lv.version, lv.master, lv.entities, lv.timings, a.lesson_plan, lv.created_at "
+                "FROM lesson_versions lv JOIN lesson_versions_assembled a USING (lesson_id, version) "
+                "WHERE lv.lesson_id = :lid ORDER BY lv.version DESC LIMIT 1"
             ),
             {"lid": int(lesson_id)},
         )
@@ -2064,20 +2099,8 @@ async def get_latest_lesson(
                         can_do_id=can_do_id,
                     )
                     if images_generated > 0:
-                        # Update the lesson_plan in database with new image paths
-                        await pg.execute(
-                            text("""
-                                UPDATE lesson_versions 
-                                SET lesson_plan = :plan 
-                                WHERE lesson_id = :lid AND version = :ver
-                            """),
-                            {
-                                "plan": json.dumps(lesson_plan, ensure_ascii=False),
-                                "lid": int(lesson_id),
-                                "ver": int(row.version),
-                            }
-                        )
-                        await pg.commit()
+                        # Update the lesson_plan (and stored stage cards) with new image paths
+                        await lesson_card_store.save_lesson_plan(pg, int(lesson_id), int(row.version), lesson_plan)
             except Exception as exc:
                 # Log but don't fail the request if image generation fails
                 import logging
@@ -2131,7 +2154,7 @@ async def generate_lesson_images(
         # Get latest version row
         res2 = await pg.execute(
             text(
-                "SELECT version, lesson_plan FROM lesson_versions "
+                "SELECT version, lesson_plan FROM lesson_versions_assembled "
                 "WHERE lesson_id = :lid ORDER BY version DESC LIMIT 1"
             ),
             {"lid": int(lesson_id)},
@@ -2202,20 +2225,8 @@ async def generate_lesson_images(
         )
         
         if images_generated > 0:
-            # Update the lesson_plan in database with new image paths
-            await pg.execute(
-                text("""
-                    UPDATE lesson_versions 
-                    SET lesson_plan = :plan 
-                    WHERE lesson_id = :lid AND version = :ver
-                """),
-                {
-                    "plan": json.dumps(lesson_plan, ensure_ascii=False),
-                    "lid": int(lesson_id),
-                    "ver": int(row.version),
-                }
-            )
-            await pg.commit()
+            # Update the lesson_plan (and stored stage cards) with new image paths
+            await lesson_card_store.save_lesson_plan(pg, int(lesson_id), int(row.version), lesson_plan)
         
         return {
             "status": "success",
@@ -2235,6 +2246,9 @@ class SearchRequest(BaseModel):
     k: int = 10
     can_do_id: Optional[str] = None
     lang: Optional[str] = None  # 'jp' | 'en'
+    mode: Optional[str] = None  # 'vector' | 'lexical' | 'hybrid' (default from settings)
+    pool: Optional[int] = None  # candidates per retriever before fusion
+    ef_search: Optional[int] = None  # HNSW search breadth
 
 
 @router.post("/lessons/search")
@@ -2242,41 +2256,20 @@ async def search_lessons(
     payload: SearchRequest,
     pg: PgSession = Depends(get_postgresql_session),
 ) -> Dict[str, Any]:
-    """Vector search across lesson_chunks using pgvector (text-embedding-3-small)."""
+    """Search lesson_chunks by vector, trigram text match, or both fused (see lesson_search_service)."""
     try:
-        embedder = EmbeddingService()
-        emb = await embedder.generate_content_embedding(payload.q, provider="openai")
-        where = ["1=1"]
-        params: Dict[str, Any] = {"emb": emb, "k": int(min(max(payload.k, 1), 50))}
-        if payload.can_do_id:
-            where.append("can_do_id = :can")
-            params["can"] = payload.can_do_id
-        if payload.lang:
-            where.append("lang = :lang")
-            params["lang"] = payload.lang
-        where_sql = " AND ".join(where)
-        sql = (
-            "SELECT lesson_id, version, can_do_id, section, card_id, lang, text, "
-            "       1 - (embedding <=> :emb) AS similarity "
-            "FROM lesson_chunks WHERE " + where_sql + " AND embedding IS NOT NULL "
-            "ORDER BY embedding <=> :emb LIMIT :k"
+        return await lesson_search_service.search(
+            pg,
+            payload.q,
+            k=payload.k,
+            can_do_id=payload.can_do_id,
+            lang=payload.lang,
+            mode=payload.mode,
+            pool=payload.pool,
+            ef_search=payload.ef_search,
         )
-        res = await pg.execute(text(sql), params)
-        rows = res.fetchall()
-        items = [
-            {
-                "lesson_id": int(r.lesson_id),
-                "version": int(r.version),
-                "can_do_id": r.can_do_id,
-                "section": r.section,
-                "card_id": r.card_id,
-                "lang": r.lang,
-                "text": r.text,
-                "similarity": float(r.similarity),
-            }
-            for r in rows
-        ]
-        return {"items": items}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -2519,6 +2512,7 @@ async def flush_guided_state(
                 status_code=404, 
                 detail=f"Session {session_id} not found"
             )
+        guided_working_set.invalidate(session_id)
         
         return {
             "status": "ok",
@@ -2588,8 +2582,10 @@ async def create_lesson_session(
         logger.warning("postgres_session_lookup_failed", error=str(pg_err), can_do_id=request.can_do_id)
         # Check in-memory fallback for existing sessions
         try:
-            for session_id_check, session_data in cando_lesson_sessions._mem_sessions.items():
-                if (session_data.get("can_do_id") == request.can_do_id and 
+            for session_id_check in cando_lesson_sessions._mem_sessions.keys():
+                session_data = cando_lesson_sessions._mem_sessions.get(session_id_check, record=False)
+                if (session_data and
+                    session_data.get("can_do_id") == request.can_do_id and 
                     session_data.get("expires_at") and 
                     session_data["expires_at"] > datetime.utcnow()):
                     logger.info("session_found_in_memory", can_do_id=request.can_do_id, session_id=session_id_check)
@@ -2621,7 +2617,7 @@ async def create_lesson_session(
         # Step 4: Fallback to in-memory storage
         logger.warning("store_session_failed_using_memory", can_do_id=request.can_do_id, error=str(store_err))
         try:
-            cando_lesson_sessions._mem_sessions[session_id] = {
+            cando_lesson_sessions._mem_sessions.set(session_id, {
                 "id": session_id,
                 "can_do_id": request.can_do_id,
                 "phase": "lexicon_and_patterns",
@@ -2631,7 +2627,7 @@ async def create_lesson_session(
                 "variant": {},
                 "package": {},
                 "expires_at": expires_at,
-            }
+            })
             logger.info("session_created_in_memory", can_do_id=request.can_do_id, session_id=session_id)
             return {"session_id": session_id}
         except Exception as fallback_err:
@@ -2641,7 +2637,7 @@ async def create_lesson_session(
         try:
             session_id = str(uuid.uuid4())
             expires_at = datetime.utcnow() + timedelta(hours=24)
-            cando_lesson_sessions._mem_sessions[session_id] = {
+            cando_lesson_sessions._mem_sessions.set(session_id, {
                 "id": session_id,
                 "can_do_id": request.can_do_id,
                 "phase": "lexicon_and_patterns",
@@ -2651,7 +2647,7 @@ async def create_lesson_session(
                 "variant": {},
                 "package": {},
                 "expires_at": expires_at,
-            }
+            })
             logger.warning("session_created_in_memory_fallback", can_do_id=request.can_do_id, session_id=session_id, error=str(e))
             return {"session_id": session_id}
         except Exception as fallback_err:
@@ -2662,6 +2658,7 @@ async def create_lesson_session(
 @router.post("/lessons/guided/initial-message")
 async def get_guided_initial_message(
     request: GuidedInitialMessageRequest,
+    response: Response,
     pg: PgSession = Depends(get_postgresql_session),
     neo: AsyncSession = Depends(get_neo4j_session),
 ) -> Dict[str, Any]:
@@ -2683,46 +2680,12 @@ async def get_guided_initial_message(
         from app.services.ai_chat_service import AIChatService
         import json
         
-        # 1. Retrieve session and lesson
-        session_result = await pg.execute(
-            text("""
-                SELECT id, can_do_id, guided_stage_idx, package_json
-                FROM lesson_sessions
-                WHERE id = :session_id
-            """),
-            {"session_id": request.session_id}
-        )
-        session_row = session_result.fetchone()
-        if not session_row:
+        # 1. Retrieve session and lesson (cached per session, see guided_session_working_set)
+        working_set = await guided_working_set.load(pg, request.session_id)
+        if working_set is None:
             raise HTTPException(status_code=404, detail="Session not found")
-        
-        session_id, can_do_id, current_stage_idx, package_json_raw = session_row
-        
-        # 2. Get the lesson with GuidedDialogueCard
-        lesson_data = None
-        if package_json_raw:
-            package = json.loads(package_json_raw) if isinstance(package_json_raw, str) else package_json_raw
-            lesson_data = package.get("lesson")
-        
-        if not lesson_data:
-            # Fetch from lessons table
-            lesson_result = await pg.execute(
-                text("""
-                    SELECT lv.lesson_plan
-                    FROM lessons l
-                    JOIN lesson_versions lv ON l.id = lv.lesson_id
-                    WHERE l.can_do_id = :can_do_id
-                    ORDER BY lv.version DESC
-                    LIMIT 1
-                """),
-                {"can_do_id": can_do_id}
-            )
-            lesson_row = lesson_result.fetchone()
-            if lesson_row:
-                lesson_plan = lesson_row[0]
-                if isinstance(lesson_plan, str):
-                    lesson_plan = json.loads(lesson_plan)
-                lesson_data = lesson_plan.get("lesson", lesson_plan)
+        response.headers[AFFINITY_HEADER] = guided_working_set.affinity_id
+        lesson_data = working_set.lesson
         
         if not lesson_data:
             raise HTTPException(status_code=404, detail="Lesson not found for this session")
@@ -2858,6 +2821,7 @@ Provide natural, encouraging guidance. Always provide CONVERSATIONAL_RESPONSE, T
 @router.post("/lessons/guided/turn")
 async def guided_dialogue_turn(
     request: GuidedTurnRequest,
+    response: Response,
     pg: PgSession = Depends(get_postgresql_session),
     neo: AsyncSession = Depends(get_neo4j_session),
 ) -> Dict[str, Any]:
@@ -2881,56 +2845,14 @@ async def guided_dialogue_turn(
         from app.services.ai_chat_service import AIChatService
         import json
         
-        # 1. Retrieve session and lesson
-        session_result = await pg.execute(
-            text("""
-                SELECT id, can_do_id, guided_stage_idx, guided_state, package_json
-                FROM lesson_sessions
-                WHERE id = :session_id
-            """),
-            {"session_id": request.session_id}
-        )
-        session_row = session_result.fetchone()
-        if not session_row:
+        # 1. Retrieve session and lesson from the per-session working set; the
+        # lesson package is immutable for the session, so only the first turn
+        # on this worker reads and parses it.
+        working_set = await guided_working_set.load(pg, request.session_id)
+        if working_set is None:
             raise HTTPException(status_code=404, detail="Session not found")
-        
-        session_id, can_do_id, current_stage_idx, guided_state_raw, package_json_raw = session_row
-        # Handle guided_state - it might be a dict (JSONB) or a string
-        if guided_state_raw is None:
-            guided_state = {}
-        elif isinstance(guided_state_raw, dict):
-            guided_state = guided_state_raw
-        elif isinstance(guided_state_raw, str):
-            guided_state = json.loads(guided_state_raw)
-        else:
-            guided_state = {}
-        
-        # 2. Get the lesson with GuidedDialogueCard
-        # Try to get from package_json first, then fetch from lessons table
-        lesson_data = None
-        if package_json_raw:
-            package = json.loads(package_json_raw) if isinstance(package_json_raw, str) else package_json_raw
-            lesson_data = package.get("lesson")
-        
-        if not lesson_data:
-            # Fetch from lessons table
-            lesson_result = await pg.execute(
-                text("""
-                    SELECT lv.lesson_plan
-                    FROM lessons l
-                    JOIN lesson_versions lv ON l.id = lv.lesson_id
-                    WHERE l.can_do_id = :can_do_id
-                    ORDER BY lv.version DESC
-                    LIMIT 1
-                """),
-                {"can_do_id": can_do_id}
-            )
-            lesson_row = lesson_result.fetchone()
-            if lesson_row:
-                lesson_plan = lesson_row[0]
-                if isinstance(lesson_plan, str):
-                    lesson_plan = json.loads(lesson_plan)
-                lesson_data = lesson_plan.get("lesson", lesson_plan)
+        response.headers[AFFINITY_HEADER] = guided_working_set.affinity_id
+        lesson_data = working_set.lesson
         
         if not lesson_data:
             raise HTTPException(status_code=404, detail="Lesson not found for this session")
@@ -3041,10 +2963,7 @@ Evaluate their response and provide feedback. If they met the goal, congratulate
         # Determine if stage goals are met (simple heuristic)
         goals_met = pattern_matched and word_count_ok
         
-        # 7. Update guided state
-        if 'history' not in guided_state:
-            guided_state['history'] = []
-        
+        # 7. Record the turn
         turn_record = {
             "stage_idx": request.stage_idx,
             "timestamp": datetime.utcnow().isoformat(),
@@ -3054,29 +2973,14 @@ Evaluate their response and provide feedback. If they met the goal, congratulate
             "word_count": word_count,
             "goals_met": goals_met
         }
-        guided_state['history'].append(turn_record)
         
         # Advance stage if goals met
         new_stage_idx = request.stage_idx
         if goals_met:
             new_stage_idx = min(request.stage_idx + 1, len(stages))
         
-        # 8. Persist updated state
-        await pg.execute(
-            text("""
-                UPDATE lesson_sessions
-                SET guided_stage_idx = :new_stage_idx,
-                    guided_state = :guided_state,
-                    updated_at = CURRENT_TIMESTAMP
-                WHERE id = :session_id
-            """),
-            {
-                "session_id": request.session_id,
-                "new_stage_idx": new_stage_idx,
-                "guided_state": json.dumps(guided_state)
-            }
-        )
-        await pg.commit()
+        # 8. Persist the turn: appends it to guided_state history (write-behind)
+        await guided_working_set.record_turn(pg, working_set, turn_record, new_stage_idx)
         
         # 9. Return response
         return {
@@ -3179,7 +3083,7 @@ async def comprehension_tutor_turn(
                 text("""
                     SELECT lv.lesson_plan
                     FROM lessons l
-                    JOIN lesson_versions lv ON l.id = lv.lesson_id
+                    JOIN lesson_versions_assembled lv ON l.id = lv.lesson_id
                     WHERE l.can_do_id = :can_do_id
                     ORDER BY lv.version DESC
                     LIMIT 1
@@ -3347,7 +3251,7 @@ async def production_evaluator_evaluate(
                 text("""
                     SELECT lv.lesson_plan
                     FROM lessons l
-                    JOIN lesson_versions lv ON l.id = lv.lesson_id
+                    JOIN lesson_versions_assembled lv ON l.id = lv.lesson_id
                     WHERE l.can_do_id = :can_do_id
                     ORDER BY lv.version DESC
                     LIMIT 1
@@ -3521,7 +3425,7 @@ async def interactive_dialogue_turn(
                 text("""
                     SELECT lv.lesson_plan
                     FROM lessons l
-                    JOIN lesson_versions lv ON l.id = lv.lesson_id
+                    JOIN lesson_versions_assembled lv ON l.id = lv.lesson_id
                     WHERE l.can_do_id = :can_do_id
                     ORDER BY lv.version DESC
                     LIMIT 1
@@ -3679,7 +3583,7 @@ async def scenario_manager_turn(
                 text("""
                     SELECT lv.lesson_plan
                     FROM lessons l
-                    JOIN lesson_versions lv ON l.id = lv.lesson_id
+                    JOIN lesson_versions_assembled lv ON l.id = lv.lesson_id
                     WHERE l.can_do_id = :can_do_id
                     ORDER BY lv.version DESC
                     LIMIT 1
@@ -3934,6 +3838,7 @@ async def record_cando_evidence(
             )
             pg.add(session)
             await pg.flush()
+            await analytics_rollup_service.record_session(pg, current_user.id, session.created_at)
         
         # Always create a ConversationMessage so ConversationInteraction.message_id
         # references a real message row (message_id is NOT NULL in schema).
@@ -3953,6 +3858,7 @@ async def record_cando_evidence(
         )
         pg.add(message)
         await pg.flush()
+        await analytics_rollup_service.record_message(pg, current_user.id, message.role, message.created_at)
         
         # Build metadata JSONB
         metadata = {
@@ -4020,6 +3926,17 @@ async def record_cando_evidence(
         pg.add(interaction)
         # Ensure PK is available for the response payload before commit (useful for tests/mocks too).
         await pg.flush()
+        # Keep the per-user/CanDo aggregate in the same transaction as the evidence row.
+        await cando_recommendation_service.record_evidence(
+            pg,
+            user_id=current_user.id,
+            can_do_id=can_do_id,
+            stage=evidence.stage,
+            is_correct=evidence.is_correct,
+            mastery_level=new_mastery,
+            error_tags=evidence.error_tags,
+            attempted_at=interaction.created_at,
+        )
         await pg.commit()
         
         return CanDoEvidenceRecordResponse(
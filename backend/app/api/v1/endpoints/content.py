@@ -1,22 +1,32 @@
 """
-Content analysis endpoint (Phase 2 minimal version).
+Content analysis endpoints.
 
-Provides a simple text-based analysis stub that returns a structured
-response. This keeps the API contract stable while we iterate on
-the underlying analysis pipeline.
+Uploads, URL bodies and submitted text are streamed through
+`content_ingestion_service`: chunked reads, fugashi/UniDic tokenization,
+frequency counting, and batched UNWIND persistence of terms and sources in
+Neo4j (linked to existing Word nodes).
 """
 
 from datetime import datetime
 from typing import List, Optional
 
-import httpx
+import structlog
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form, BackgroundTasks, Query
 from pydantic import BaseModel, Field, HttpUrl
-from app.db import neo4j_driver
+from app import db
+from app.services.content_ingestion_service import (
+    ContentTooLargeError,
+    IngestionResult,
+    content_ingestion_service,
+)
 
 
+logger = structlog.get_logger()
+
 router = APIRouter()
 
+DEFAULT_MAX_ITEMS = 20
+
 
 class SourceMetadata(BaseModel):
     """Minimal source metadata for attribution."""
@@ -40,6 +50,22 @@ class ExtractedItem(BaseModel):
     kind: str  # e.g., "vocabulary", "grammar_point"
     value: str
     confidence: float = Field(ge=0.0, le=1.0)
+    count: int = 1
+    pos: Optional[str] = None
+
+
+class IngestionStats(BaseModel):
+    """Size and throughput of one ingestion run."""
+
+    tokenizer: str
+    bytes_read: int
+    segments: int
+    tokens: int
+    unique_terms: int
+    truncated: bool = False
+    elapsed_ms: float
+    chars_per_second: float
+    tokens_per_second: float
 
 
 class AnalysisResponse(BaseModel):
@@ -52,62 +78,99 @@ class AnalysisResponse(BaseModel):
     analyzed_at: datetime
     persisted: Optional[bool] = None
     persisted_count: int = 0
+    linked_count: int = 0
+    stats: Optional[IngestionStats] = None
+
+
+def _to_response(result: IngestionResult, source: SourceMetadata, max_items: int) -> AnalysisResponse:
+    if not result.processed_chars:
+        raise HTTPException(status_code=400, detail="Text must not be empty")
+    items = [
+        ExtractedItem(kind="vocabulary", value=t["value"], confidence=t["confidence"], count=t["count"], pos=t["pos"])
+        for t in result.terms[:max_items]
+    ]
+    return AnalysisResponse(
+        status="ok",
+        processed_chars=result.processed_chars,
+        items=items,
+        source=source,
+        analyzed_at=datetime.utcnow(),
+        stats=IngestionStats(**result.stats()),
+    )
+
+
+async def _persist(
+    response: AnalysisResponse,
+    result: IngestionResult,
+    min_confidence: float,
+) -> AnalysisResponse:
+    """Persist all counted terms at or above `min_confidence` in bulk."""
+    persisted_count = 0
+    linked_count = 0
+    try:
+        terms = [t for t in result.terms if t["confidence"] >= min_confidence]
+        # Reason: the driver is created at startup, so read it at call time.
+        if db.neo4j_driver is not None and terms:
+            async with db.neo4j_driver.session() as session:
+                stats = await content_ingestion_service.persist_terms(
+                    session, response.source.model_dump(), terms
+                )
+            persisted_count = stats["persisted"]
+            linked_count = stats["linked"]
+    except Exception as e:
+        logger.warning(
+            "content_persist_failed",
+            source=response.source.title,
+            error=str(e),
+        )
+        persisted_count = 0
+        linked_count = 0
+    response.persisted = persisted_count > 0
+    response.persisted_count = persisted_count
+    response.linked_count = linked_count
+    return response
 
 
 @router.post("/analyze", response_model=AnalysisResponse)
-async def analyze_content(request: ContentSubmission) -> AnalysisResponse:
+async def analyze_content(
+    request: ContentSubmission,
+    max_items: int = Query(DEFAULT_MAX_ITEMS, ge=1, le=500),
+) -> AnalysisResponse:
     """
-    Analyze submitted text and return a minimal structured result.
+    Analyze submitted text and return its most frequent vocabulary.
 
-    This is a simple, deterministic implementation to unblock
-    Phase 2 integration and testing. It does not call external AI
-    providers yet.
+    Terms are dictionary forms from fugashi/UniDic (regex tokens when UniDic
+    is not installed), ordered by frequency.
     """
 
     text = request.text.strip()
     if not text:
         raise HTTPException(status_code=400, detail="Text must not be empty")
 
-    # Minimal heuristic: extract the first token-like unit as a demo item
-    items = _extract_items(text, max_items=5)
-    return AnalysisResponse(
-        status="ok",
-        processed_chars=len(text),
-        items=items,
-        source=request.source,
-        analyzed_at=datetime.utcnow(),
-    )
+    result = await content_ingestion_service.ingest_text(text)
+    return _to_response(result, request.source, max_items)
 
 
 class UrlSubmission(BaseModel):
     url: HttpUrl
     source: SourceMetadata
-
-
-def _analyze_text(text: str, source: SourceMetadata) -> AnalysisResponse:
-    text = text.strip()
-    if not text:
-        raise HTTPException(status_code=400, detail="Text must not be empty")
-    items = _extract_items(text, max_items=5)
-    return AnalysisResponse(
-        status="ok",
-        processed_chars=len(text),
-        items=items,
-        source=source,
-        analyzed_at=datetime.utcnow(),
-    )
+    persist: bool = False
+    max_items: int = Field(default=DEFAULT_MAX_ITEMS, ge=1, le=500)
 
 
 @router.post("/analyze-url", response_model=AnalysisResponse)
 async def analyze_url(payload: UrlSubmission, background_tasks: BackgroundTasks = None) -> AnalysisResponse:
+    """Stream a URL body through the ingestion pipeline (optionally persisting terms)."""
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.get(str(payload.url))
-            resp.raise_for_status()
-            content = resp.text
+        result = await content_ingestion_service.ingest_url(str(payload.url))
+    except ContentTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to fetch URL: {e}")
-    return _analyze_text(content, payload.source)
+    response = _to_response(result, payload.source, payload.max_items)
+    if payload.persist:
+        response = await _persist(response, result, min_confidence=0.7)
+    return response
 
 
 @router.post("/analyze-upload", response_model=AnalysisResponse)
@@ -117,68 +180,46 @@ async def analyze_upload(
     language: str = Form("ja"),
     author: Optional[str] = Form(None),
     url: Optional[str] = Form(None),
+    persist: bool = Form(False),
+    max_items: int = Form(DEFAULT_MAX_ITEMS),
     background_tasks: BackgroundTasks = None,
 ) -> AnalysisResponse:
+    """Stream an uploaded text file through the ingestion pipeline in chunks."""
     try:
-        raw = await file.read()
-        text = raw.decode("utf-8", errors="ignore")
+        result = await content_ingestion_service.ingest_upload(file)
+    except ContentTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to read upload: {e}")
     source = SourceMetadata(title=title, author=author, url=url, language=language)
-    return _analyze_text(text, source)
+    response = _to_response(result, source, max(1, min(max_items, 500)))
+    if persist:
+        response = await _persist(response, result, min_confidence=0.7)
+    return response
 
 
 @router.post("/analyze-persist", response_model=AnalysisResponse)
 async def analyze_and_persist(
     request: ContentSubmission,
     min_confidence: float = Query(0.7, ge=0.0, le=1.0),
+    max_items: int = Query(DEFAULT_MAX_ITEMS, ge=1, le=500),
 ) -> AnalysisResponse:
-    """Analyze text then persist a minimal node and source in Neo4j if available."""
-    result = await analyze_content(request)
-    persisted_flag = False
-    persisted_count = 0
-    try:
-        if neo4j_driver is not None and result.items:
-            async with neo4j_driver.session() as session:
-                source = request.source
-                cypher = (
-                    "MERGE (s:Source {title: $title}) "
-                    "SET s.author = $author, s.url = $url, s.language = $language "
-                    "WITH s, $value as value "
-                    "MERGE (t:ExtractedTerm {value: value}) "
-                    "MERGE (t)-[:SOURCED_FROM]->(s) "
-                    "RETURN t.value AS value"
-                )
-                for item in result.items:
-                    if item.confidence < min_confidence:
-                        continue
-                    rec = await (await session.run(
-                        cypher,
-                        {
-                            "title": source.title,
-                            "author": source.author,
-                            "url": source.url,
-                            "language": source.language,
-                            "value": item.value,
-                        },
-                    )).single()
-                    if rec is not None:
-                        persisted_count += 1
-                persisted_flag = persisted_count > 0
-    except Exception:
-        persisted_flag = False
-    result.persisted = persisted_flag
-    result.persisted_count = persisted_count
-    return result
+    """Analyze text then persist its terms and source in Neo4j with batched writes."""
+    text = request.text.strip()
+    if not text:
+        raise HTTPException(status_code=400, detail="Text must not be empty")
+    result = await content_ingestion_service.ingest_text(text)
+    response = _to_response(result, request.source, max_items)
+    return await _persist(response, result, min_confidence)
 
 
 @router.get("/term")
 async def get_term(value: str, title: Optional[str] = None) -> dict:
     """Verify if a persisted term (and optionally its source) exists in Neo4j."""
-    if neo4j_driver is None:
+    if db.neo4j_driver is None:
         return {"found": False, "reason": "neo4j_unavailable"}
     try:
-        async with neo4j_driver.session() as session:
+        async with db.neo4j_driver.session() as session:
             if title:
                 cypher = (
                     "MATCH (t:ExtractedTerm {value: $value})-[:SOURCED_FROM]->(s:Source {title: $title})"
@@ -191,36 +232,3 @@ async def get_term(value: str, title: Optional[str] = None) -> dict:
             return {"found": rec is not None}
     except Exception as e:
         return {"found": False, "error": str(e)}
-
-
-def _extract_items(text: str, max_items: int = 5) -> List[ExtractedItem]:
-    """Very simple token extraction with naive confidence."""
-    import re
-
-    # Split on whitespace, keep tokens with letters/numbers or CJK
-    raw_tokens = re.findall(r"[\w\u3040-\u30ff\u4e00-\u9fff]+", text)
-    seen: set[str] = set()
-    items: List[ExtractedItem] = []
-    for tok in raw_tokens:
-        token = tok.strip()
-        if not token:
-            continue
-        if token in seen:
-            continue
-        seen.add(token)
-        # Confidence heuristic
-        is_cjk = re.search(r"[\u3040-\u30ff\u4e00-\u9fff]", token) is not None
-        if len(token) >= 3 or is_cjk:
-            conf = 0.9
-        else:
-            conf = 0.5
-        items.append(ExtractedItem(kind="vocabulary", value=token, confidence=conf))
-        if len(items) >= max_items:
-            break
-    if not items:
-        # Fallback to first word
-        first = text.split()[0]
-        items.append(ExtractedItem(kind="vocabulary", value=first, confidence=0.5))
-    return items
-
-
@@ -14,8 +14,10 @@ from app.services.knowledge_search_service import KnowledgeSearchService, Search
 from app.api.v1.endpoints.auth import get_current_user
 from app.models.database_models import User
 from app.services.conversation_service import ConversationService
+from app.services.analytics_rollup_service import analytics_rollup_service
 from app.services.ai_chat_service import AIChatService
 from app.services.embedding_service import EmbeddingService
+from app.utils.sse import guard_sse_stream
 
 router = APIRouter()
 
@@ -325,8 +327,10 @@ async def delete_session(
     session = await ConversationService.get_session(db, session_id, current_user.id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
+    touched_days = await analytics_rollup_service.session_days(db, session.id)
     # Delete cascades to messages via FK
     await db.execute(delete(ConversationSession).where(ConversationSession.id == session_id))
+    await analytics_rollup_service.refresh_days(db, current_user.id, touched_days)
     await db.commit()
     return {"status": "deleted"}
 
@@ -549,7 +553,11 @@ async def stream_assistant_reply(
     # Always add background task - it will check if content exists
     background_tasks.add_task(persist_message_after_stream)
     
-    response = StreamingResponse(event_generator(), media_type="text/event-stream")
+    # Cancel the provider stream when the client disconnects mid-reply.
+    response = StreamingResponse(
+        guard_sse_stream(request, event_generator(), name="conversation_stream"),
+        media_type="text/event-stream",
+    )
     # Add CORS headers for SSE explicitly (echo allowed origin)
     origin = request.headers.get("origin") if request else None
     if settings.DEBUG:
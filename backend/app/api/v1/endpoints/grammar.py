@@ -23,6 +23,7 @@ from app.models.database_models import User, ConversationSession, ConversationMe
 from app.api.v1.endpoints.auth import get_current_user
 from app.services.ai_conversation_practice import AIConversationPractice, ConversationScenario, DialogueTurn, ConversationContext
 from app.services.grammar_ai_content_service import GrammarAIContentService
+from app.services.analytics_rollup_service import analytics_rollup_service
 
 router = APIRouter(tags=["grammar"])
 
@@ -304,13 +305,14 @@ async def get_jfs_categories(
 
 @router.get("/stats", response_model=Dict[str, Any])
 async def get_grammar_stats(
+    fresh: bool = Query(False, description="Recompute now instead of serving cached statistics"),
     neo4j_session: AsyncSession = Depends(get_neo4j_session),
     current_user: User = Depends(get_current_user)
 ):
-    """Get comprehensive statistics about the grammar graph"""
+    """Get comprehensive statistics about the grammar graph (cached; see computed_at)"""
     try:
         grammar_service = GrammarService(neo4j_session)
-        stats = await grammar_service.get_graph_statistics()
+        stats = await grammar_service.get_graph_statistics(fresh=fresh)
         return stats
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving statistics: {str(e)}")
@@ -1020,6 +1022,7 @@ Always include a specific response hint that shows exactly how they can use the
                 )
                 db.add(session)
                 await db.flush()
+                await analytics_rollup_service.record_session(db, current_user.id, session.created_at)
             
             # Get next message order
             max_order_query = select(func.max(ConversationMessage.message_order)).where(
@@ -1040,6 +1043,7 @@ Always include a specific response hint that shows exactly how they can use the
             )
             db.add(user_msg)
             await db.flush()
+            await analytics_rollup_service.record_message(db, current_user.id, user_msg.role, user_msg.created_at)
             
             # Save AI response message
             ai_msg = ConversationMessage(
@@ -1056,6 +1060,7 @@ Always include a specific response hint that shows exactly how they can use the
             )
             db.add(ai_msg)
             await db.flush()
+            await analytics_rollup_service.record_message(db, current_user.id, ai_msg.role, ai_msg.created_at)
             
             # Record interaction evidence with rubric
             # Determine if pattern was used correctly
@@ -1237,6 +1242,7 @@ async def record_grammar_evidence(
             )
             db.add(session)
             await db.flush()  # Get session.id
+            await analytics_rollup_service.record_session(db, current_user.id, session.created_at)
         
         # Create a message if user_response provided
         message = None
@@ -1259,6 +1265,7 @@ async def record_grammar_evidence(
             )
             db.add(message)
             await db.flush()  # Get message.id
+            await analytics_rollup_service.record_message(db, current_user.id, message.role, message.created_at)
         
         # Build metadata JSONB
         metadata = {
@@ -17,6 +17,7 @@ from app.services.conversation_service import ConversationService
 from app.services.ai_chat_service import AIChatService
 from app.services.profile_building_service import profile_building_service
 from app.services.learning_path_service import learning_path_service
+from app.utils.sse import guard_sse_stream
 
 
 def _looks_like_missing_table_error(exc: Exception, table_name: str) -> bool:
@@ -1212,7 +1213,12 @@ Acknowledge these achievements and guide them to next steps.
         
         # Create streaming response with CORS headers
         from app.core.config import settings
-        response = StreamingResponse(event_generator(), media_type="text/event-stream")
+        # Stop the provider stream as soon as the client goes away; the reply is
+        # only persisted when it was fully delivered (full_text_container is set).
+        response = StreamingResponse(
+            guard_sse_stream(request, event_generator(), name="home_chat_stream"),
+            media_type="text/event-stream",
+        )
         origin = request.headers.get("origin") if request else None
         if settings.DEBUG:
             response.headers["Access-Control-Allow-Origin"] = origin or "*"
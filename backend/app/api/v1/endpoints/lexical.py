@@ -24,6 +24,8 @@ from app.api.v1.endpoints.auth import get_current_user
 from app.models.database_models import ConversationSession, ConversationMessage, User
 from app.services.lesson_persistence_service import lesson_persistence_service
 from app.services.pragmatics_service import pragmatics_service
+from app.services.lexical_graph_snapshot import lexical_graph_snapshot
+from app.services.analytics_rollup_service import analytics_rollup_service
 from sqlalchemy import text
 
 
@@ -161,10 +163,13 @@ async def get_lesson_version(
         if not row:
             raise HTTPException(status_code=404, detail="Lesson not found")
         lesson_id = int(row[0])
-        # Get version
+        # Get version; stage cards and statuses are overlaid from lesson_cards / lesson_stage_status
         res2 = await db.execute(
             text(
-                "SELECT lesson_plan, exercises, manifest, dialogs FROM lesson_versions WHERE lesson_id = :lid AND version = :ver LIMIT 1"
+                "SELECT a.lesson_plan, lv.exercises, lv.manifest, lv.dialogs "
+                "FROM lesson_versions lv "
+                "JOIN lesson_versions_assembled a ON a.lesson_id = lv.lesson_id AND a.version = lv.version "
+                "WHERE lv.lesson_id = :lid AND lv.version = :ver LIMIT 1"
             ),
             {"lid": lesson_id, "ver": version},
         )
@@ -354,18 +359,18 @@ async def import_pragmatics(
 async def _fetch_center(session: AsyncSession, center: str, search_field: str = "kanji") -> Optional[Dict[str, Any]]:
     # Build query based on search field
     if search_field == "translation":
-        where_clause = "toLower(t.translation) CONTAINS toLower($center)"
+        match_clause = "MATCH (t:Word)\n    WHERE toLower(t.translation) CONTAINS toLower($center)"
     elif search_field == "hiragana":
-        where_clause = "coalesce(t.reading_hiragana, t.hiragana) = $center"
-    elif search_field == "kanji":
-        where_clause = "coalesce(t.standard_orthography, t.kanji) = $center"
+        match_clause = "MATCH (t:Word)\n    WHERE coalesce(t.reading_hiragana, t.hiragana) = $center"
     else:
-        # Default to kanji search
-        where_clause = "coalesce(t.standard_orthography, t.kanji) = $center"
+        # Kanji (default): index seek on the canonical word key
+        cached = lexical_graph_snapshot.center(center)
+        if cached is not None:
+            return cached
+        match_clause = "MATCH (t:Word {word_key: $center})"
     
     query = f"""
-    MATCH (t:Word)
-    WHERE {where_clause}
+    {match_clause}
     OPTIONAL MATCH (t)-[:BELONGS_TO_DOMAIN]->(d:SemanticDomain)
     OPTIONAL MATCH (t)-[:HAS_POS]->(p:POSTag)
     RETURN coalesce(t.standard_orthography, t.kanji) AS kanji,
@@ -424,8 +429,7 @@ async def _fetch_center_by_translation(session: AsyncSession, translation: str)
 async def _fetch_neighbors(session: AsyncSession, kanji: str, limit: int) -> Dict[str, Any]:
     # Depth-1 neighbors and edges around center word
     query = """
-    MATCH (t:Word)
-    WHERE coalesce(t.standard_orthography, t.kanji) = $kanji
+    MATCH (t:Word {word_key: $kanji})
     OPTIONAL MATCH (t)-[r:SYNONYM_OF]-(n:Word)
     OPTIONAL MATCH (n)-[:BELONGS_TO_DOMAIN]->(d:SemanticDomain)
     OPTIONAL MATCH (n)-[:HAS_POS]->(p:POSTag)
@@ -475,10 +479,16 @@ async def _fetch_ego_graph(
     Depth 2:
       - Nodes: neighbors of neighbors (excluding center and duplicates)
       - Edges: all SYNONYM_OF edges among {center ∪ depth1 ∪ depth2}
+
+    Served from the in-memory lexical graph snapshot when it is enabled and
+    loaded (which also supports depth > 2); otherwise queried from Neo4j.
     """
+    cached = lexical_graph_snapshot.ego_graph(kanji, depth=depth, limit1=limit1, limit2=limit2)
+    if cached is not None:
+        return cached
+
     query = """
-    MATCH (t:Word)
-    WHERE coalesce(t.standard_orthography, t.kanji) = $kanji
+    MATCH (t:Word {word_key: $kanji})
     // Depth 1 neighbors
     OPTIONAL MATCH (t)-[:SYNONYM_OF]-(n1:Word)
     WITH t, [n IN collect(DISTINCT n1) WHERE n IS NOT NULL][0..$limit1] AS n1s
@@ -499,7 +509,6 @@ async def _fetch_ego_graph(
     WITH t, n1s, n2s
     WITH t, n1s, n2s, [t] + n1s + n2s AS egoNodes
     WITH egoNodes,
-         [n IN egoNodes | coalesce(n.standard_orthography, n.kanji)] AS egoIds,
          [n IN egoNodes |
             {
               id: coalesce(n.standard_orthography, n.kanji),
@@ -511,9 +520,10 @@ async def _fetch_ego_graph(
               pos: head([(n)-[:HAS_POS]->(p:POSTag) | p.primary_pos])
             }
          ] AS nodeMaps
-    MATCH (a:Word)-[r:SYNONYM_OF]-(b:Word)
-    WHERE coalesce(a.standard_orthography, a.kanji) IN egoIds
-      AND coalesce(b.standard_orthography, b.kanji) IN egoIds
+    // Expand from the ego nodes only instead of scanning every SYNONYM_OF edge
+    UNWIND egoNodes AS a
+    MATCH (a)-[r:SYNONYM_OF]-(b:Word)
+    WHERE b IN egoNodes
       AND a <> b
     WITH nodeMaps AS nodes,
          collect(DISTINCT {
@@ -609,16 +619,16 @@ async def get_node_details(
         # Reason: OPTIONAL MATCH can produce a single row with n=NULL; we must
         # ensure we don't return a neighbor object full of nulls.
         query = """
-        MATCH (t:Word)
-        WHERE coalesce(t.standard_orthography, t.kanji) = $kanji
+        MATCH (t:Word {word_key: $kanji})
+        WITH t, size([(t)-[:SYNONYM_OF]-() | 1]) AS connection_count
         OPTIONAL MATCH (t)-[r:SYNONYM_OF]-(n:Word)
         OPTIONAL MATCH (n)-[:BELONGS_TO_DOMAIN]->(d:SemanticDomain)
         OPTIONAL MATCH (n)-[:HAS_POS]->(p:POSTag)
-        WITH t, r, n,
+        WITH t, connection_count, r, n,
              head(collect(d.name)) AS domain,
              head(collect(p.primary_pos)) AS pos
         ORDER BY coalesce(r.synonym_strength, r.weight, 0.0) DESC
-        WITH t,
+        WITH t, connection_count,
              collect(
                CASE
                  WHEN n IS NULL THEN NULL
@@ -641,22 +651,15 @@ async def get_node_details(
                t.difficulty_numeric AS center_level,
                coalesce(t.pos_primary_norm, t.pos1, t.pos_primary) AS center_pos,
                t.etymology AS center_etymology,
-               [x IN raw_neighbors WHERE x IS NOT NULL] AS neighbors
+               [x IN raw_neighbors WHERE x IS NOT NULL] AS neighbors,
+               connection_count
         """
 
-        result = await session.run(query, kanji=center_node["kanji"], timeout=10.0)
-        rec = await result.single()
-
-        # Get connection count
-        count_query = """
-        MATCH (t:Word)
-        WHERE coalesce(t.standard_orthography, t.kanji) = $kanji
-        MATCH (t)-[r:SYNONYM_OF]-()
-        RETURN count(r) AS connection_count
-        """
-        count_result = await session.run(count_query, kanji=center_node["kanji"], timeout=10.0)
-        count_rec = await count_result.single()
-        connection_count = count_rec["connection_count"] if count_rec else 0
+        rec = lexical_graph_snapshot.node_details(center_node["kanji"])
+        if rec is None:
+            result = await session.run(query, kanji=center_node["kanji"], timeout=10.0)
+            rec = await result.single()
+        connection_count = rec["connection_count"] if rec else 0
 
         if not rec:
             return {
@@ -850,6 +853,7 @@ async def record_lexical_lesson_attempt(
         )
         db.add(sess_row)
         await db.flush()
+        await analytics_rollup_service.record_session(db, current_user.id, now)
 
     # Store an attempt as a message
     content = (
@@ -871,4 +875,5 @@ async def record_lexical_lesson_attempt(
     sess_row.user_messages = (sess_row.user_messages or 0) + 1
     sess_row.updated_at = now
     await db.flush()
+    await analytics_rollup_service.record_message(db, current_user.id, msg.role, now)
     return {"status": "ok", "session_id": str(sess_row.id), "message_id": str(msg.id)}
@@ -22,6 +22,7 @@ from app.schemas.lexical_network import (
 from app.services.lexical_network.ai_provider_config import (
     list_available_models as get_available_models,
 )
+from app.services.graph_statistics_service import graph_statistics
 from app.services.lexical_network.job_manager_service import job_manager
 from app.services.lexical_network.relation_builder_service import (
     RelationBuilderService,
@@ -37,33 +38,27 @@ relation_builder = RelationBuilderService()
 
 @router.get("/stats", response_model=NetworkStats)
 async def get_network_stats(
+    fresh: bool = Query(False, description="Recompute now instead of serving cached statistics"),
     session: AsyncSession = Depends(get_neo4j_session),
 ) -> NetworkStats:
-    """Get overall lexical network statistics."""
+    """
+    Get overall lexical network statistics.
+
+    Counts come from Neo4j's count store; distributions and degree metrics are
+    computed in the background and may be up to GRAPH_STATS_TTL_SECONDS old
+    (see ``computed_at`` / ``stale``).
+    """
     
     # Categorize relationship types
     LEXICAL_TYPES = {"LEXICAL_RELATION", "SYNONYM_OF", "SIMILAR_TO"}
     LEARNING_TYPES = {"PREREQUISITE_FOR", "SAME_LEVEL", "SAME_SKILLDOMAIN"}
     SEMANTIC_TYPES = {"SAME_TYPE", "SAME_TOPIC", "SEMANTICALLY_SIMILAR"}
     
-    # Total words
-    result = await session.run("MATCH (w:Word) RETURN count(w) AS count")
-    total_words = (await result.single())["count"]
+    counts = await graph_statistics.get("counts", session, fresh=fresh)
+    network = await graph_statistics.get("lexical_network", session, fresh=fresh)
     
-    # ========== ALL Relationship Types ==========
-    result = await session.run(
-        """
-        MATCH ()-[r]->()
-        RETURN type(r) AS rel_type, count(r) AS count
-        ORDER BY count DESC
-        """
-    )
-    all_relations_by_type: Dict[str, int] = {}
-    for record in await result.data():
-        rel_type = record["rel_type"]
-        count = record["count"]
-        if rel_type:
-            all_relations_by_type[rel_type] = count
+    total_words = counts["data"]["labels"].get("Word", 0)
+    all_relations_by_type: Dict[str, int] = dict(counts["data"]["relationship_types"])
     
     # Categorize relationships
     relations_by_category: Dict[str, int] = {
@@ -88,93 +83,20 @@ async def get_network_stats(
     }
     total_relations = sum(lexical_relations.values())
     
-    # ========== POS Distribution (use canonical if available, fallback to pos_primary) ==========
-    result = await session.run(
-        """
-        MATCH (w:Word)
-        WHERE coalesce(w.pos_primary_norm, w.pos_primary) IS NOT NULL
-        RETURN coalesce(w.pos_primary_norm, w.pos_primary) AS pos, count(*) AS count
-        ORDER BY count DESC
-        """
-    )
-    pos_distribution = {r["pos"]: r["count"] for r in await result.data() if r["pos"]}
-    
-    # ========== Difficulty Distribution ==========
-    result = await session.run(
-        """
-        MATCH (w:Word)
-        WHERE w.difficulty IS NOT NULL OR w.difficulty_numeric IS NOT NULL
-        RETURN coalesce(w.difficulty, 'Unknown') AS difficulty, count(*) AS count
-        ORDER BY count DESC
-        """
-    )
-    difficulty_distribution = {r["difficulty"]: r["count"] for r in await result.data()}
-    
-    # ========== Lexical Relations by POS (use canonical) ==========
-    result = await session.run(
-        """
-        MATCH (w:Word)-[r:LEXICAL_RELATION|SYNONYM_OF|SIMILAR_TO]-()
-        WHERE coalesce(w.pos_primary_norm, w.pos_primary) IS NOT NULL
-        RETURN coalesce(w.pos_primary_norm, w.pos_primary) AS pos, type(r) AS rel_type, count(r) AS count
-        ORDER BY count DESC
-        """
-    )
-    relations_by_pos: Dict[str, Dict[str, int]] = {}
-    for record in await result.data():
-        pos = record["pos"]
-        rel_type = record["rel_type"]
-        count = record["count"]
-        if pos not in relations_by_pos:
-            relations_by_pos[pos] = {}
-        relations_by_pos[pos][rel_type] = count
-    
-    # ========== Words without lexical relations ==========
-    result = await session.run(
-        """
-        MATCH (w:Word)
-        WHERE NOT (w)-[:LEXICAL_RELATION|SYNONYM_OF|SIMILAR_TO]-()
-        RETURN count(w) AS count
-        """
-    )
-    words_without_relations = (await result.single())["count"]
-    
-    # ========== Most Connected Words (lexical) ==========
-    result = await session.run(
-        """
-        MATCH (w:Word)-[r:LEXICAL_RELATION|SYNONYM_OF|SIMILAR_TO]-()
-        WITH w, count(r) AS rel_count
-        RETURN coalesce(w.standard_orthography, w.kanji) AS word,
-               w.translation AS translation,
-               coalesce(w.pos_primary_norm, w.pos_primary) AS pos,
-               rel_count
-        ORDER BY rel_count DESC
-        LIMIT 10
-        """
-    )
-    most_connected_words = [dict(r) for r in await result.data()]
-    
-    # Legacy: relations_by_type (for backwards compatibility)
-    result = await session.run(
-        """
-        MATCH ()-[r:LEXICAL_RELATION]->()
-        RETURN r.relation_type AS type, count(*) AS count
-        """
-    )
-    relations_by_type = {r["type"]: r["count"] for r in await result.data() if r["type"]}
+    # Report the older of the two parts as the freshness of the response
+    oldest = max((counts, network), key=lambda r: r["age_seconds"])
     
     return NetworkStats(
         total_words=total_words,
         total_relations=total_relations,
         lexical_relations=lexical_relations,
-        relations_by_pos=relations_by_pos,
         all_relations_by_type=all_relations_by_type,
         relations_by_category=relations_by_category,
-        pos_distribution=pos_distribution,
-        difficulty_distribution=difficulty_distribution,
         avg_relations_per_word=total_relations / max(total_words, 1),
-        words_without_relations=words_without_relations,
-        most_connected_words=most_connected_words,
-        relations_by_type=relations_by_type,
+        **network["data"],
+        computed_at=oldest["computed_at"],
+        age_seconds=oldest["age_seconds"],
+        stale=counts["stale"] or network["stale"],
     )
 
 
@@ -522,6 +444,25 @@ async def enrich_unidic(
     return stats
 
 
+# ============ Canonical Word Keys ============
+
+
+@router.post("/word-keys/backfill")
+async def backfill_word_keys_endpoint(
+    batch_size: int = Query(5000, ge=100, le=50000, description="Distinct keys per batch"),
+    session: AsyncSession = Depends(get_neo4j_session),
+    current_user=Depends(get_current_user),
+) -> Dict[str, Any]:
+    """Create the word_key constraint and assign keys to Word nodes missing one."""
+    from app.services.lexical_network.word_keys import (
+        backfill_word_keys,
+        ensure_word_key_schema,
+    )
+
+    await ensure_word_key_schema(session)
+    return await backfill_word_keys(session, batch_size=batch_size)
+
+
 # ============ AI Gap-Fill ============
 
 
@@ -27,6 +27,7 @@ from app.schemas.script import (
     ScriptItemProgressResponse,
 )
 from app.services.script_service import get_script_service
+from app.services.analytics_rollup_service import analytics_rollup_service
 
 router = APIRouter(tags=["script"])
 
@@ -229,6 +230,7 @@ async def check_script_practice(
             )
             db.add(session)
             await db.flush()
+            await analytics_rollup_service.record_session(db, current_user.id, session.created_at)
         
         # Get existing interaction count for this item
         existing_query = select(func.count(ConversationInteraction.id)).where(
@@ -262,6 +264,7 @@ async def check_script_practice(
         )
         db.add(user_msg)
         await db.flush()  # Get message.id
+        await analytics_rollup_service.record_message(db, current_user.id, user_msg.role, user_msg.created_at)
         
         # Record interaction
         interaction = ConversationInteraction(
@@ -52,10 +52,80 @@ class Settings(BaseSettings):
         default=50, description="Maximum Neo4j connection pool size"
     )
     
+    # Neo4j Query Instrumentation (see app/utils/neo4j_instrumentation.py)
+    NEO4J_QUERY_INSTRUMENTATION: bool = Field(
+        default=True,
+        description="Record per-query latency, rows and DB hits for Neo4j sessions (default: True)"
+    )
+    NEO4J_SLOW_QUERY_MS: float = Field(
+        default=500.0,
+        description="Neo4j queries slower than this are logged with their plan (default: 500)"
+    )
+    NEO4J_SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS: float = Field(
+        default=600.0,
+        description="Minimum interval between background EXPLAINs of the same slow query (default: 600)"
+    )
+    NEO4J_QUERY_PROFILE_SAMPLE_RATE: float = Field(
+        default=0.0,
+        description="Fraction of Neo4j queries run with PROFILE to collect DB hits; 0 disables (default: 0.0)"
+    )
+    NEO4J_QUERY_STATS_MAX_NAMES: int = Field(
+        default=500,
+        description="Distinct query names tracked before the rest are folded into one entry (default: 500)"
+    )
+    
+    # Postgres Statement Instrumentation (see app/utils/sql_instrumentation.py)
+    SQL_INSTRUMENTATION: bool = Field(
+        default=True,
+        description="Record per-request statement counts and DB time for Postgres (default: True)"
+    )
+    SQL_N_PLUS_ONE_THRESHOLD: int = Field(
+        default=10,
+        description="Warn when one request issues the same statement shape more than this many times (default: 10)"
+    )
+    SQL_STATS_MAX_ENDPOINTS: int = Field(
+        default=500,
+        description="Distinct endpoints tracked before the rest are folded into one entry (default: 500)"
+    )
+    
+    # Per-Request Profiling (see app/utils/request_profiler.py)
+    REQUEST_PROFILING: bool = Field(
+        default=True,
+        description="Profile requests sent by admins with the X-Profile header (default: True)"
+    )
+    REQUEST_PROFILE_SAMPLE_RATE: float = Field(
+        default=0.0,
+        description="Fraction of requests profiled without the header; 0 disables sampling (default: 0.0)"
+    )
+    REQUEST_PROFILE_SAMPLE_PATHS: str = Field(
+        default="",
+        description="Comma-separated path prefixes eligible for sampling; empty allows all (default: \"\")"
+    )
+    REQUEST_PROFILE_INTERVAL_MS: float = Field(
+        default=5.0,
+        description="Stack sampling interval while a profiled request runs (default: 5.0)"
+    )
+    REQUEST_PROFILE_MAX_STORED: int = Field(
+        default=50,
+        description="Finished profiles kept per worker for GET /admin/profiles (default: 50)"
+    )
+    
     # PostgreSQL Database
     DATABASE_URL: str = Field(..., description="PostgreSQL database URL")
     PGVECTOR_ENABLED: bool = Field(default=True, description="Enable pgvector extension")
     EMBEDDING_DIMENSIONS: int = Field(default=1536, description="Vector embedding dimensions")
+    EMBEDDING_STORAGE_TYPE: str = Field(
+        default="vector",
+        description="pgvector column type for embeddings: vector (float32) or halfvec (float16); convert with scripts/vector_storage.py (default: vector)"
+    )
+    EMBEDDING_INDEX_DIMENSIONS: int = Field(
+        default=0,
+        description="Leading embedding dimensions indexed by HNSW (halfvec); 0 indexes all EMBEDDING_DIMENSIONS (default: 0)"
+    )
+    EMBEDDING_RERANK_FACTOR: int = Field(
+        default=4,
+        description="Candidates per result fetched from a reduced-dimension index before exact re-ranking (default: 4)"
+    )
     NEO4J_VECTOR_ENABLED: bool = Field(default=True, description="Enable Neo4j vector indexes")
     
     # OpenAI API Configuration
@@ -89,6 +159,10 @@ class Settings(BaseSettings):
         default=0.0,
         description="Temperature for AI calls (0.0 for reproducibility)"
     )
+    WORD_KEY_BACKFILL_ON_STARTUP: bool = Field(
+        default=True,
+        description="Create the Word.word_key constraint and key unkeyed Word nodes in the background at startup; lexical lookups match on word_key (default: True)"
+    )
     
     # JWT Authentication
     JWT_SECRET_KEY: str = Field(..., description="JWT secret key")
@@ -108,7 +182,12 @@ class Settings(BaseSettings):
         default=True, description="Enable cost optimization"
     )
     AI_ROUTING_CONFIG_PERFORMANCE_MONITORING: bool = Field(
-        default=True, description="Enable performance monitoring"
+        default=True,
+        description="Record request, LLM, DB pool and cache metrics and serve them at GET /metrics (default: True)"
+    )
+    METRICS_AUTH_TOKEN: str | None = Field(
+        default=None,
+        description="Bearer token required by GET /metrics; when unset the endpoint is served only in development (default: None)"
     )
     
     # Content Analysis Settings
@@ -237,7 +316,216 @@ class Settings(BaseSettings):
         default=0.65,
         description="Minimum similarity score for creating SEMANTICALLY_SIMILAR relationships (default: 0.65)"
     )
-    
+    CANDO_NEIGHBOUR_CACHE_TOP_K: int = Field(
+        default=100,
+        description="Neighbours kept per CanDo in the in-memory k-NN cache (default: 100)"
+    )
+    CANDO_NEIGHBOUR_CACHE_TTL_SECONDS: int = Field(
+        default=3600,
+        description="Reload interval for the CanDo neighbour cache; 0 disables expiry (default: 3600)"
+    )
+
+    # Lexical Graph Snapshot Settings
+    LEXICAL_GRAPH_SNAPSHOT_ENABLED: bool = Field(
+        default=False,
+        description="Serve lexical ego graphs from an in-memory CSR snapshot of SYNONYM_OF (default: False)"
+    )
+    LEXICAL_GRAPH_SNAPSHOT_TTL_SECONDS: int = Field(
+        default=900,
+        description="Refresh interval for the lexical graph snapshot (default: 900)"
+    )
+
+    # Graph Statistics Settings (see app/services/graph_statistics_service.py)
+    GRAPH_STATS_TTL_SECONDS: int = Field(
+        default=900,
+        description="Age after which degree/coverage statistics are recomputed in the background (default: 900)"
+    )
+    GRAPH_STATS_COUNTS_TTL_SECONDS: int = Field(
+        default=60,
+        description="Age after which count-store label/relationship counts are refreshed (default: 60)"
+    )
+    GRAPH_STATS_BACKGROUND_REFRESH: bool = Field(
+        default=True,
+        description="Recompute graph statistics on a timer instead of on dashboard reads (default: True)"
+    )
+
+    # In-process Cache Bounds (see app/utils/bounded_cache.py)
+    MASTER_CACHE_TTL: int = Field(
+        default=3600,
+        description="TTL in seconds for cached master lessons (default: 3600)"
+    )
+    MASTER_CACHE_MAX_ENTRIES: int = Field(
+        default=256,
+        description="Maximum master lessons kept in memory (default: 256)"
+    )
+    MASTER_CACHE_MAX_BYTES: int = Field(
+        default=64 * 1024 * 1024,
+        description="Approximate byte budget for cached master lessons; 0 disables (default: 64 MiB)"
+    )
+    STAGE2_CACHE_TTL: int = Field(
+        default=600,
+        description="TTL in seconds for cached Stage 2 structuring results (default: 600)"
+    )
+    STAGE2_CACHE_MAX_ENTRIES: int = Field(
+        default=1024,
+        description="Maximum Stage 2 results kept in memory (default: 1024)"
+    )
+    LESSON_SESSION_MEMORY_MAX_ENTRIES: int = Field(
+        default=1000,
+        description="Maximum lesson sessions kept by the in-memory fallback store (default: 1000)"
+    )
+    PRELESSON_KIT_CACHE_MAX_ENTRIES: int = Field(
+        default=512,
+        description="Maximum pre-lesson kits cached per process (default: 512)"
+    )
+    PRELESSON_KIT_CACHE_TTL_SECONDS: int = Field(
+        default=3600,
+        description="TTL in seconds for cached pre-lesson kits (default: 3600)"
+    )
+
+    # Content Ingestion Settings
+    CONTENT_INGEST_CHUNK_BYTES: int = Field(
+        default=65536,
+        description="Read size for streamed /content uploads and URL bodies (default: 64 KiB)"
+    )
+    CONTENT_INGEST_MAX_BYTES: int = Field(
+        default=52428800,
+        description="Maximum accepted /content upload or URL body size (default: 50 MiB)"
+    )
+    CONTENT_INGEST_MAX_TERMS: int = Field(
+        default=200000,
+        description="Distinct terms tracked per ingestion before rare terms are pruned (default: 200000)"
+    )
+    CONTENT_PERSIST_BATCH_SIZE: int = Field(
+        default=1000,
+        description="Terms per UNWIND batch when persisting extracted terms to Neo4j (default: 1000)"
+    )
+
+    # Password Hashing Settings
+    PASSWORD_HASH_SCHEME: str = Field(
+        default="pbkdf2_sha256",
+        description="Scheme for new password hashes: pbkdf2_sha256 or bcrypt (default: pbkdf2_sha256)"
+    )
+    PASSWORD_HASH_PBKDF2_ROUNDS: int = Field(
+        default=29000,
+        description="PBKDF2-SHA256 iterations; higher is slower to crack and to log in (default: 29000)"
+    )
+    PASSWORD_HASH_BCRYPT_ROUNDS: int = Field(
+        default=12,
+        description="bcrypt log2 cost factor (default: 12)"
+    )
+    PASSWORD_HASH_MAX_WORKERS: int = Field(
+        default=2,
+        description="Threads dedicated to password hashing; extra logins queue (default: 2)"
+    )
+
+    # Authenticated Principal Cache Settings
+    PRINCIPAL_CACHE_TTL_SECONDS: int = Field(
+        default=30,
+        ge=0,
+        description=(
+            "How long get_current_user may serve a user without re-reading Postgres. Changes made by another "
+            "worker (e.g. deactivating a user) take effect there only after this many seconds; "
+            "0 disables the cache (default: 30)"
+        )
+    )
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = Field(
+        default=10000,
+        description="Maximum cached authenticated users per worker (default: 10000)"
+    )
+
+    # LLM Record/Replay Settings
+    LLM_REPLAY_MODE: str = Field(
+        default="off",
+        description="LLM record/replay mode: off, record or replay (default: off)"
+    )
+    LLM_REPLAY_DIR: str = Field(
+        default="tests/fixtures/llm_replay",
+        description="Directory holding recorded LLM fixtures (default: tests/fixtures/llm_replay)"
+    )
+    LLM_REPLAY_LATENCY_MS: int | None = Field(
+        default=None,
+        description="Fixed synthetic latency per replayed call; unset uses the recorded latency (default: None)"
+    )
+    LLM_REPLAY_LATENCY_SCALE: float = Field(
+        default=1.0,
+        description="Multiplier applied to recorded latency when replaying (default: 1.0)"
+    )
+
+    # Lesson Card Cache Settings
+    LESSON_CARD_CACHE_ENABLED: bool = Field(
+        default=True,
+        description="Reuse validated lesson cards from lesson_card_cache when prompts are unchanged (default: True)"
+    )
+    LESSON_CARD_CACHE_TIMEOUT_SECONDS: float = Field(
+        default=5.0,
+        description="Maximum time a pipeline worker waits on a card cache read or write (default: 5.0)"
+    )
+
+    # Batch Lesson Compile Settings
+    BATCH_COMPILE_CONCURRENCY: int = Field(
+        default=4,
+        description="Lessons compiled concurrently by a batch job; each holds one Postgres and one Neo4j session (default: 4)"
+    )
+    BATCH_COMPILE_LLM_CONCURRENCY: int = Field(
+        default=8,
+        description="Maximum in-flight LLM calls across all lessons of a batch job (default: 8)"
+    )
+    BATCH_COMPILE_MAX_ATTEMPTS: int = Field(
+        default=2,
+        description="Attempts per lesson when compilation fails with a retryable error (default: 2)"
+    )
+    BATCH_COMPILE_CHECKPOINT_DIR: str = Field(
+        default="batch_compile_checkpoints",
+        description="Directory for batch compile checkpoint files, relative to backend/ (default: batch_compile_checkpoints)"
+    )
+
+    # Lesson Chunk Indexing Settings
+    LESSON_CHUNK_EMBED_BATCH_SIZE: int = Field(
+        default=128,
+        description="Lesson chunk texts embedded per embedding API request (default: 128)"
+    )
+    LESSON_CHUNKS_IN_BACKGROUND: bool = Field(
+        default=True,
+        description="Embed and store lesson search chunks in a task after the lesson is committed (default: True)"
+    )
+
+    # Lesson Search Settings
+    LESSON_SEARCH_DEFAULT_MODE: str = Field(
+        default="hybrid",
+        description="Default /lessons/search mode: vector, lexical or hybrid (default: hybrid)"
+    )
+    LESSON_SEARCH_POOL_SIZE: int = Field(
+        default=50,
+        description="Candidates taken from each retriever before rank fusion (default: 50)"
+    )
+    LESSON_SEARCH_EF_SEARCH: int = Field(
+        default=64,
+        description="pgvector hnsw.ef_search for lesson search; raised to the pool size when smaller (default: 64)"
+    )
+    LESSON_SEARCH_RRF_K: int = Field(
+        default=60,
+        description="Reciprocal rank fusion constant for hybrid lesson search (default: 60)"
+    )
+
+    # Guided Dialogue Working Set Settings
+    GUIDED_WORKING_SET_TTL: int = Field(
+        default=1800,
+        description="Idle TTL in seconds for a cached guided dialogue session working set (default: 1800)"
+    )
+    GUIDED_WORKING_SET_MAX_ENTRIES: int = Field(
+        default=512,
+        description="Maximum guided dialogue sessions kept in memory per worker (default: 512)"
+    )
+    GUIDED_WORKING_SET_MAX_BYTES: int = Field(
+        default=64 * 1024 * 1024,
+        description="Approximate byte budget for cached guided dialogue sessions; 0 disables (default: 64 MiB)"
+    )
+    GUIDED_STATE_WRITE_BEHIND_SECONDS: float = Field(
+        default=1.0,
+        description="Delay before guided turn deltas are flushed to lesson_sessions; 0 writes them inline (default: 1.0)"
+    )
+
     # User Path Generation Settings
     PATH_MAX_STEPS: int = Field(
         default=20,
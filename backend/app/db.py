@@ -8,11 +8,16 @@ connections for both the relational database (PostgreSQL) and graph database (Ne
 import structlog
 from neo4j import AsyncGraphDatabase, AsyncDriver
 import asyncio
+import time
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.core.config import settings
 from app.migrations.postgres_migrator import apply_postgres_sql_migrations
+from app.utils.metrics import observe_pool_wait
+from app.utils.neo4j_instrumentation import instrument_driver
+from app.utils.sql_instrumentation import sql_stats
 
 
 logger = structlog.get_logger()
@@ -23,6 +28,17 @@ postgresql_engine: AsyncEngine | None = None
 AsyncSessionLocal: sessionmaker | None = None
 
 
+class TimedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool recording checkout wait time (`db_pool_checkout_wait_seconds`)."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            observe_pool_wait("postgres", time.perf_counter() - started)
+
+
 async def init_neo4j() -> AsyncDriver:
     """
     Initialize Neo4j database connection.
@@ -36,7 +52,7 @@ async def init_neo4j() -> AsyncDriver:
     global neo4j_driver
     
     try:
-        neo4j_driver = AsyncGraphDatabase.driver(
+        driver = AsyncGraphDatabase.driver(
             settings.NEO4J_URI,
             auth=(settings.NEO4J_USERNAME, settings.NEO4J_PASSWORD),
             max_connection_pool_size=settings.NEO4J_MAX_CONNECTION_POOL_SIZE,
@@ -48,6 +64,9 @@ async def init_neo4j() -> AsyncDriver:
             # Reason: proactively detect dead connections.
             keep_alive=True,
         )
+        # Reason: sessions from the wrapped driver record per-query timings
+        # (GET /admin/neo4j/queries); everything else passes through.
+        neo4j_driver = instrument_driver(driver) if settings.NEO4J_QUERY_INSTRUMENTATION else driver
         # Verify connectivity (with a short retry to handle first-boot race)
         last_err: Exception | None = None
         for _ in range(3):
@@ -99,10 +118,14 @@ def init_postgresql() -> AsyncEngine:
         postgresql_engine = create_async_engine(
             database_url,
             echo=settings.DEBUG,
+            poolclass=TimedAsyncAdaptedQueuePool,
             pool_size=10,
             max_overflow=20,
             pool_pre_ping=False,  # Disable to avoid greenlet issues in background tasks
         )
+        if settings.SQL_INSTRUMENTATION:
+            # Per-request statement counts / DB time (GET /admin/sql/endpoints)
+            sql_stats.install(postgresql_engine)
         
         AsyncSessionLocal = sessionmaker(
             postgresql_engine,
@@ -5,18 +5,32 @@ This module initializes the FastAPI application with all necessary middleware,
 routers, and configuration for the AI Language Tutor platform.
 """
 
+import asyncio
+import secrets
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator, Dict, Any
 
 import structlog
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 
 from app.api.v1.api import api_router
+from app.api.v1.endpoints.admin import is_admin_username
 from app.core.config import settings
+from app import db
 from app.db import close_db_connections, init_db_connections
 from app.services.lexical_lessons_service import lexical_lessons
+from app.services.graph_statistics_service import graph_statistics
+from app.services.guided_session_working_set import guided_working_set
+from app.services.lexical_graph_snapshot import lexical_graph_snapshot
+from app.services.lexical_network.word_keys import ensure_word_keys
+from app.services.llm_replay import llm_replay
+from app.services.auth_service import AuthService
+from app.services.password_hashing import password_hasher
+from app.utils.metrics import CONTENT_TYPE, MetricsMiddleware, metrics, stats_collector
+from app.utils.request_profiler import RequestProfilingMiddleware
+from app.utils.sql_instrumentation import SqlRequestStatsMiddleware
 
 
 logger = structlog.get_logger()
@@ -41,12 +55,38 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     await init_db_connections()
     logger.info("Database connections initialized")
     
+    if settings.GRAPH_STATS_BACKGROUND_REFRESH:
+        graph_statistics.start()
+    
+    word_key_task = None
+    if settings.WORD_KEY_BACKFILL_ON_STARTUP and db.neo4j_driver is not None:
+        word_key_task = asyncio.create_task(ensure_word_keys(db.neo4j_driver))
+    
     yield
     
     # Shutdown
     logger.info("Shutting down AI Language Tutor Backend API")
+    if word_key_task is not None and not word_key_task.done():
+        word_key_task.cancel()
+    await graph_statistics.stop()
+    flushed = await guided_working_set.flush_all()
+    if flushed:
+        logger.info("Flushed guided dialogue state", sessions=flushed)
     await close_db_connections()
     logger.info("Database connections closed")
+    password_hasher.shutdown()
+
+
+def _profiling_authorized(scope: Dict[str, Any]) -> bool:
+    """Allow `X-Profile` only with a valid admin bearer token (checked without a DB round trip)."""
+    for name, value in scope.get("headers") or ():
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer" or not token:
+                return False
+            token_data = AuthService.verify_token(token.strip())
+            return token_data is not None and is_admin_username(token_data.username)
+    return False
 
 
 def create_application() -> FastAPI:
@@ -85,6 +125,23 @@ def create_application() -> FastAPI:
             allow_headers=["*"],
         )
     
+    if settings.SQL_INSTRUMENTATION:
+        app.add_middleware(SqlRequestStatsMiddleware)
+    if settings.REQUEST_PROFILING or settings.REQUEST_PROFILE_SAMPLE_RATE > 0:
+        app.add_middleware(
+            RequestProfilingMiddleware,
+            authorize=_profiling_authorized if settings.REQUEST_PROFILING else None,
+        )
+    if settings.AI_ROUTING_CONFIG_PERFORMANCE_MONITORING:
+        app.add_middleware(MetricsMiddleware)
+        if not settings.METRICS_AUTH_TOKEN and settings.ENVIRONMENT != "development":
+            logger.warning("METRICS_AUTH_TOKEN is not set - GET /metrics is disabled outside development")
+        stats_collector("password_hasher", password_hasher.stats)
+        stats_collector("guided_working_set", guided_working_set.stats)
+        stats_collector("lexical_graph_snapshot", lexical_graph_snapshot.stats)
+        stats_collector("graph_statistics", graph_statistics.stats)
+        stats_collector("llm_replay", llm_replay.stats)
+    
     # Exception handler to ensure CORS headers on errors
     @app.exception_handler(Exception)
     async def global_exception_handler(request, exc):
@@ -154,6 +211,30 @@ async def health_check() -> JSONResponse:
     )
 
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(request: Request) -> Response:
+    """
+    Prometheus scrape endpoint (per worker process).
+    
+    Requires `Authorization: Bearer <METRICS_AUTH_TOKEN>`. Without a
+    configured token it is only served when ENVIRONMENT is "development".
+    
+    Returns:
+        Response: Metrics in the text exposition format.
+    """
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    token = settings.METRICS_AUTH_TOKEN
+    if not token:
+        if settings.ENVIRONMENT != "development":
+            raise HTTPException(status_code=404, detail="Not Found")
+    else:
+        provided = request.headers.get("authorization", "")
+        if not secrets.compare_digest(provided.encode("utf-8"), f"Bearer {token}".encode("utf-8")):
+            raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE)
+
+
 @app.get("/")
 async def root() -> dict[str, str]:
     """
@@ -181,6 +181,50 @@ class ConversationInteraction(Base):
         return f"<ConversationInteraction(id={self.id}, type={self.interaction_type}, concept={self.concept_id})>"
 
 
+class CanDoEvidenceAggregate(Base):
+    """Per-user, per-CanDo evidence rollup maintained on each cando_lesson evidence write."""
+
+    __tablename__ = "cando_evidence_aggregates"
+    __table_args__ = {'extend_existing': True}
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    can_do_id = Column(Text, primary_key=True)
+
+    total_attempts = Column(Integer, nullable=False, default=0)
+    correct_count = Column(Integer, nullable=False, default=0)
+    mastery_level = Column(Integer, nullable=False, default=1)  # Latest SRS mastery (1-5)
+    stage_counts = Column(JSONB, nullable=False, default=dict)  # {stage: attempts}
+    error_tag_counts = Column(JSONB, nullable=False, default=dict)  # {error_tag: occurrences}
+
+    first_attempted_at = Column(DateTime(timezone=True))
+    last_attempted_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True), server_default='now()')
+
+    def __repr__(self):
+        return f"<CanDoEvidenceAggregate(user_id={self.user_id}, can_do_id={self.can_do_id}, attempts={self.total_attempts})>"
+
+
+class UserDailyActivity(Base):
+    """Per-user, per-day (UTC) conversation activity rollup maintained on each session/message write."""
+
+    __tablename__ = "user_daily_activity"
+    __table_args__ = {'extend_existing': True}
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+
+    sessions_started = Column(Integer, nullable=False, default=0)
+    message_count = Column(Integer, nullable=False, default=0)
+    user_message_count = Column(Integer, nullable=False, default=0)
+    ai_message_count = Column(Integer, nullable=False, default=0)
+
+    last_message_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True), server_default='now()')
+
+    def __repr__(self):
+        return f"<UserDailyActivity(user_id={self.user_id}, day={self.day}, messages={self.message_count})>"
+
+
 class UserProfile(Base):
     """User profile model for detailed profile information."""
     
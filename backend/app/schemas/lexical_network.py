@@ -225,6 +225,11 @@ class NetworkStats(BaseModel):
     
     # Legacy (keep for compatibility)
     relations_by_type: Dict[str, int]
+    
+    # Freshness of the cached statistics (see graph_statistics_service)
+    computed_at: Optional[str] = None  # ISO 8601, UTC
+    age_seconds: Optional[float] = None
+    stale: bool = False
 
 
 class BuildResult(BaseModel):
@@ -6,8 +6,10 @@ Uses real provider APIs configured via environment variables in `app.core.config
 
 from __future__ import annotations
 
-from typing import List, Literal, Dict, Any, AsyncIterator
+from typing import List, Literal, Dict, Any, AsyncIterator, Optional
 import asyncio
+import inspect
+from contextlib import aclosing
 import structlog
 from openai import AsyncOpenAI
 from google import genai
@@ -15,6 +17,9 @@ from google.genai import types
 import time
 
 from app.core.config import settings
+from app.services.lexical_network.ai_provider_config import estimate_cost_usd
+from app.services.llm_replay import llm_replay
+from app.utils.metrics import observe_llm_call
 
 
 logger = structlog.get_logger()
@@ -76,6 +81,35 @@ class AIChatService:
 
     """Generate assistant replies using OpenAI or Google Gemini."""
 
+    @staticmethod
+    def _build_gemini_prompt(system_prompt: str, messages: List[Dict[str, str]]) -> str:
+        """Format the system prompt and prior messages as a simple transcript for Gemini."""
+        transcript = [f"System: {system_prompt}"]
+        for m in messages:
+            transcript.append(f"{m['role'].capitalize()}: {m['content']}")
+        return "\n".join(transcript)
+
+    @staticmethod
+    def _extract_gemini_text(response: Any, model: str) -> str:
+        """Safely extract text from a Gemini response or stream chunk."""
+        content_text = ""
+        try:
+            content_text = response.text if response.text else ""
+        except (AttributeError, ValueError) as e:
+            logger.warning(
+                "gemini_response_text_extraction_failed",
+                model=model,
+                error=str(e),
+                response_type=type(response).__name__)
+            # Try alternate extraction methods
+            if hasattr(response, 'candidates') and response.candidates:
+                candidate = response.candidates[0]
+                if hasattr(candidate, 'content') and hasattr(candidate.content, 'parts'):
+                    for part in candidate.content.parts:
+                        if hasattr(part, 'text') and part.text:
+                            content_text += part.text
+        return content_text
+
     def __init__(self) -> None:
         self._openai = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
         if settings.GEMINI_API_KEY:
@@ -125,17 +159,60 @@ class AIChatService:
             past_conversation_context=past_conversation_context,
         )
 
+        async def complete() -> Dict[str, Any]:
+            return await self._complete(
+                provider=provider,
+                model=model,
+                messages=messages,
+                system_prompt=system_prompt,
+                trace_id=trace_id,
+                force_json=force_json,
+                temperature=temperature,
+                max_output_tokens=max_output_tokens,
+                response_schema=response_schema,
+                response_json_schema=response_json_schema,
+                timeout=timeout,
+            )
+
+        if not llm_replay.enabled:
+            return await complete()
+        payload = {
+            "system_prompt": system_prompt,
+            "messages": messages,
+            "force_json": force_json,
+            "temperature": temperature,
+            "max_output_tokens": max_output_tokens,
+            "response_schema": response_schema if response_schema is not None else response_json_schema,
+        }
+        result = await llm_replay.call_async("ai_chat", f"{provider}:{model}", payload, complete)
+        result.pop("trace_id", None)
+        if trace_id:
+            result["trace_id"] = trace_id
+        return result
+
+    async def _complete(
+        self,
+        *,
+        provider: str,
+        model: str,
+        messages: List[Dict[str, str]],
+        system_prompt: str,
+        trace_id: str | None,
+        force_json: bool,
+        temperature: float | None,
+        max_output_tokens: int | None,
+        response_schema: Any | None,
+        response_json_schema: Dict[str, Any] | None,
+        timeout: int | None,
+    ) -> Dict[str, Any]:
+        """Run one non-streaming completion against the selected provider."""
         start_time = time.perf_counter()
         try:
             if provider == "gemini":
                 if not self._genai_client:
                     raise ValueError("Gemini API key not configured")
                 # Gemini simple chat: concatenate to a prompt
-                # Format prior messages as simple transcript
-                transcript = [f"System: {system_prompt}"]
-                for m in messages:
-                    transcript.append(f"{m['role'].capitalize()}: {m['content']}")
-                prompt = "\n".join(transcript)
+                prompt = self._build_gemini_prompt(system_prompt, messages)
                 # Prefer explicit Content/Part and config for JSON
                 gen_config = None
                 if force_json or temperature is not None or max_output_tokens is not None or response_schema is not None or response_json_schema is not None:
@@ -163,23 +240,13 @@ class AIChatService:
                     raise TimeoutError(f"Gemini API request timed out after {timeout_seconds} seconds")
                 elapsed_ms = int((time.perf_counter() - start_time) * 1000)
                 
-                # Safely extract text content
-                content_text = ""
-                try:
-                    content_text = response.text if response.text else ""
-                except (AttributeError, ValueError) as e:
-                    logger.warning(
-                        "gemini_response_text_extraction_failed",
-                        model=model,
-                        error=str(e),
-                        response_type=type(response).__name__)
-                    # Try alternate extraction methods
-                    if hasattr(response, 'candidates') and response.candidates:
-                        candidate = response.candidates[0]
-                        if hasattr(candidate, 'content') and hasattr(candidate.content, 'parts'):
-                            for part in candidate.content.parts:
-                                if hasattr(part, 'text'):
-                                    content_text += part.text
+                content_text = self._extract_gemini_text(response, model)
+                usage = getattr(response, "usage_metadata", None)
+                tokens_in = getattr(usage, "prompt_token_count", None) or 0
+                tokens_out = getattr(usage, "candidates_token_count", None) or 0
+                observe_llm_call(
+                    "gemini", model, elapsed_ms, tokens_in, tokens_out, estimate_cost_usd(model, tokens_in, tokens_out)
+                )
                 
                 result: Dict[str, Any] = {
                     "content": content_text,
@@ -216,6 +283,11 @@ class AIChatService:
             resp = await client.chat.completions.create(**create_params)  # type: ignore[arg-type]
             choice = resp.choices[0]
             elapsed_ms = int((time.perf_counter() - start_time) * 1000)
+            tokens_in = getattr(resp.usage, "prompt_tokens", None) or 0
+            tokens_out = getattr(resp.usage, "completion_tokens", None) or 0
+            observe_llm_call(
+                "openai", model, elapsed_ms, tokens_in, tokens_out, estimate_cost_usd(model, tokens_in, tokens_out)
+            )
             result = {
                 "content": choice.message.content or "",
                 "provider": "openai",
@@ -230,6 +302,7 @@ class AIChatService:
                 result["trace_id"] = trace_id
             return result
         except Exception as e:  # noqa: BLE001
+            observe_llm_call(provider, model, (time.perf_counter() - start_time) * 1000, outcome="error")
             logger.error("AI reply generation failed", provider=provider, model=model, error=str(e))
             raise
 
@@ -248,7 +321,8 @@ class AIChatService:
     ) -> AsyncIterator[str]:
         """Yield reply chunks for streaming.
 
-        For OpenAI, uses streaming deltas. For Gemini, yields one full chunk.
+        Both providers stream incremental text deltas. Closing the generator
+        (e.g. when the SSE client disconnects) closes the provider stream.
         """
         messages = messages or []
         # Build enriched system prompt without making a completion request
@@ -268,11 +342,48 @@ class AIChatService:
             " 5) Ask at most one simple question at the end."
         )
 
+        deltas = self._stream_provider(
+            provider=provider, model=model, messages=messages, system_prompt=system_prompt
+        )
+        if llm_replay.enabled:
+            deltas = llm_replay.stream(
+                "ai_chat_stream",
+                f"{provider}:{model}",
+                {"system_prompt": system_prompt, "messages": messages},
+                deltas,
+            )
+        async with aclosing(deltas) as stream:
+            async for delta in stream:
+                yield delta
+
+    async def _stream_provider(
+        self,
+        *,
+        provider: str,
+        model: str,
+        messages: List[Dict[str, str]],
+        system_prompt: str,
+    ) -> AsyncIterator[str]:
+        """Yield text deltas straight from the selected provider.
+
+        The call is recorded with `observe_llm_call` once the stream ends,
+        timed from the request to the last chunk, with the token usage the
+        provider reports.
+        """
+        started = time.perf_counter()
+        usage: Dict[str, int] = {}
+        outcome = "aborted"
         try:
             if provider == "gemini":
-                # Fallback: no token streaming, emit full content once
-                result = await self.generate_reply(provider=provider, model=model, messages=messages, system_prompt=system_prompt)
-                yield result.get("content", "")
+                # Reason: aclosing() closes the provider stream as soon as our caller stops.
+                async with aclosing(self._stream_gemini(
+                    model=model,
+                    prompt=self._build_gemini_prompt(system_prompt, messages),
+                    usage=usage,
+                )) as deltas:
+                    async for delta in deltas:
+                        yield delta
+                outcome = "ok"
                 return
 
             # OpenAI streaming
@@ -287,6 +398,8 @@ class AIChatService:
                 "messages": chat_messages,
                 "temperature": temp,
                 "stream": True,
+                # Usage arrives on a final, choice-less chunk.
+                "stream_options": {"include_usage": True},
             }
             if use_new_token_param:
                 stream_params["max_completion_tokens"] = 300
@@ -294,15 +407,82 @@ class AIChatService:
                 stream_params["max_tokens"] = 300
             
             stream = await self._openai.with_options(timeout=settings.AI_REQUEST_TIMEOUT_SECONDS).chat.completions.create(**stream_params)  # type: ignore[arg-type]
-            async for event in stream:  # type: ignore[async-iterator]
-                try:
-                    delta = event.choices[0].delta.content  # type: ignore[attr-defined]
-                except Exception:
-                    delta = None
-                if delta:
-                    yield delta
+            try:
+                async for event in stream:  # type: ignore[async-iterator]
+                    event_usage = getattr(event, "usage", None)
+                    if event_usage is not None:
+                        usage["input"] = getattr(event_usage, "prompt_tokens", None) or 0
+                        usage["output"] = getattr(event_usage, "completion_tokens", None) or 0
+                    try:
+                        delta = event.choices[0].delta.content  # type: ignore[attr-defined]
+                    except Exception:
+                        delta = None
+                    if delta:
+                        yield delta
+            finally:
+                # Reason: release the HTTP stream promptly if the consumer stops early.
+                await stream.close()
+            outcome = "ok"
         except Exception as e:  # noqa: BLE001
+            outcome = "error"
             logger.error("AI streaming failed", provider=provider, model=model, error=str(e))
             # Propagate to caller to decide how to finalize
             raise
+        finally:
+            tokens_in = usage.get("input", 0)
+            tokens_out = usage.get("output", 0)
+            observe_llm_call(
+                provider,
+                model,
+                (time.perf_counter() - started) * 1000,
+                tokens_in,
+                tokens_out,
+                estimate_cost_usd(model, tokens_in, tokens_out),
+                outcome=outcome,
+            )
+
+    async def _stream_gemini(
+        self, *, model: str, prompt: str, usage: Optional[Dict[str, int]] = None
+    ) -> AsyncIterator[str]:
+        """Yield text deltas from Gemini's async streaming API.
+
+        Runs on the event loop (no worker thread). The underlying stream is
+        closed when the consumer stops iterating or is cancelled. Like the
+        OpenAI stream's read timeout, waiting longer than
+        AI_REQUEST_TIMEOUT_SECONDS for the stream or for its next chunk
+        raises TimeoutError. When `usage` is given it is updated with the
+        latest token counts reported on the chunks.
+        """
+        if not self._genai_client:
+            raise ValueError("Gemini API key not configured")
 
+        timeout_seconds = settings.AI_REQUEST_TIMEOUT_SECONDS
+        stream = self._genai_client.aio.models.generate_content_stream(
+            model=model,
+            contents=[types.Content(role="user", parts=[types.Part.from_text(text=prompt)])],
+        )
+        try:
+            # Reason: google-genai returns the iterator from a coroutine in newer releases.
+            if inspect.isawaitable(stream):
+                stream = await asyncio.wait_for(stream, timeout=timeout_seconds)
+            chunks = stream.__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout=timeout_seconds)
+                except StopAsyncIteration:
+                    break
+                chunk_usage = getattr(chunk, "usage_metadata", None)
+                if usage is not None and chunk_usage is not None:
+                    # Reason: counts are cumulative, so the last chunk carries the totals.
+                    usage["input"] = getattr(chunk_usage, "prompt_token_count", None) or 0
+                    usage["output"] = getattr(chunk_usage, "candidates_token_count", None) or 0
+                delta = self._extract_gemini_text(chunk, model)
+                if delta:
+                    yield delta
+        except asyncio.TimeoutError:
+            logger.error("gemini_stream_timeout", model=model, timeout=timeout_seconds)
+            raise TimeoutError(f"Gemini API stream timed out after {timeout_seconds} seconds")
+        finally:
+            aclose = getattr(stream, "aclose", None)
+            if aclose is not None:
+                await aclose()
@@ -68,8 +68,7 @@ class AIContentGenerator:
             Rich context dictionary
         """
         query = """
-        MATCH (w:Word)
-        WHERE coalesce(w.standard_orthography, w.kanji) = $kanji
+        MATCH (w:Word {word_key: $kanji})
         
         // Get basic word information
         OPTIONAL MATCH (w)-[:HAS_DIFFICULTY]->(d:DifficultyLevel)
@@ -180,9 +180,8 @@ Guidelines:
     async def _get_existing_content(self, session, word_kanji: str) -> Optional[Dict]:
         """Check if AI content already exists for the word"""
         query = """
-        MATCH (w:Word)
-        WHERE coalesce(w.standard_orthography, w.kanji) = $kanji
-          AND w.ai_generated_at IS NOT NULL
+        MATCH (w:Word {word_key: $kanji})
+        WHERE w.ai_generated_at IS NOT NULL
         RETURN w.ai_definitions AS ai_definitions,
                w.ai_examples AS ai_examples,
                w.ai_cultural_notes AS ai_cultural_notes,
@@ -261,8 +260,7 @@ Guidelines:
         
         # Get word data - use the same pattern as lexical endpoints
         word_query = """
-        MATCH (w:Word)
-        WHERE coalesce(w.standard_orthography, w.kanji) = $kanji
+        MATCH (w:Word {word_key: $kanji})
         OPTIONAL MATCH (w)-[:BELONGS_TO_DOMAIN]->(d:SemanticDomain)
         OPTIONAL MATCH (w)-[:HAS_POS]->(p:POSTag)
         RETURN coalesce(w.standard_orthography, w.kanji) AS kanji,
@@ -288,8 +286,7 @@ Guidelines:
         
         # Get related neighbors for context
         neighbors_query = """
-        MATCH (w:Word)
-        WHERE coalesce(w.standard_orthography, w.kanji) = $kanji
+        MATCH (w:Word {word_key: $kanji})
         MATCH (w)-[r:SYNONYM_OF]-(n:Word)
         RETURN coalesce(n.standard_orthography, n.kanji) AS kanji,
                n.translation AS translation,
@@ -335,8 +332,7 @@ Guidelines:
     async def _store_content(self, session, word_kanji: str, content: AIWordContent, word_level: str = None):
         """Store AI content in Neo4j database with level-specific information"""
         query = """
-        MATCH (w:Word)
-        WHERE coalesce(w.standard_orthography, w.kanji) = $kanji
+        MATCH (w:Word {word_key: $kanji})
         SET w.ai_definitions = $definitions,
             w.ai_examples = $examples,
             w.ai_cultural_notes = $cultural_notes,
@@ -401,7 +397,7 @@ Guidelines:
             # First check if content exists for the specific level
             if target_level:
                 query = """
-                MATCH (w:Word {kanji: $kanji})
+                MATCH (w:Word {word_key: $kanji})
                 WHERE w.ai_generated_at IS NOT NULL 
                 AND (w.ai_target_level = $target_level OR w.ai_target_level IS NULL)
                 RETURN w.ai_definitions AS ai_definitions,
@@ -438,7 +434,7 @@ Guidelines:
     def _get_existing_content_query(self) -> str:
         """Get the query for existing content"""
         return """
-        MATCH (w:Word {kanji: $kanji})
+        MATCH (w:Word {word_key: $kanji})
         WHERE w.ai_generated_at IS NOT NULL
         RETURN w.ai_definitions AS ai_definitions,
                w.ai_examples AS ai_examples,
@@ -0,0 +1,297 @@
+"""
+Per-user daily conversation activity rollups.
+
+`user_daily_activity` holds one row per user and UTC day with session and
+message counters. Rows are incremented in the caller's transaction whenever a
+conversation session or message is written, so the analytics dashboard reads a
+handful of pre-aggregated rows instead of scanning the user's full history.
+"""
+
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set
+from uuid import UUID
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+import structlog
+
+from app.models.database_models import UserDailyActivity
+
+logger = structlog.get_logger()
+
+_UPSERT_ACTIVITY_SQL = text(
+    """
+    INSERT INTO user_daily_activity AS act (
+        user_id, day, sessions_started, message_count, user_message_count,
+        ai_message_count, last_message_at, updated_at
+    )
+    VALUES (
+        :user_id, :day, :sessions_inc, :messages_inc, :user_inc,
+        :ai_inc, :last_message_at, NOW()
+    )
+    ON CONFLICT (user_id, day) DO UPDATE SET
+        sessions_started = act.sessions_started + EXCLUDED.sessions_started,
+        message_count = act.message_count + EXCLUDED.message_count,
+        user_message_count = act.user_message_count + EXCLUDED.user_message_count,
+        ai_message_count = act.ai_message_count + EXCLUDED.ai_message_count,
+        last_message_at = GREATEST(act.last_message_at, EXCLUDED.last_message_at),
+        updated_at = NOW()
+    """
+)
+
+_DELETE_DAYS_SQL = text(
+    "DELETE FROM user_daily_activity WHERE user_id = :user_id AND day = ANY(:days)"
+)
+
+# Recompute the given days of one user from the source tables (same shape as
+# the backfill in create_user_daily_activity_table.sql).
+_REBUILD_DAYS_SQL = text(
+    """
+    INSERT INTO user_daily_activity (
+        user_id, day, sessions_started, message_count, user_message_count,
+        ai_message_count, last_message_at, updated_at
+    )
+    SELECT
+        CAST(:user_id AS uuid), d.day, SUM(d.sessions_started), SUM(d.message_count),
+        SUM(d.user_message_count), SUM(d.ai_message_count), MAX(d.last_message_at), NOW()
+    FROM (
+        SELECT
+            (m.created_at AT TIME ZONE 'UTC')::date AS day,
+            0 AS sessions_started,
+            COUNT(*) AS message_count,
+            COUNT(*) FILTER (WHERE m.role = 'user') AS user_message_count,
+            COUNT(*) FILTER (WHERE m.role = 'assistant') AS ai_message_count,
+            MAX(m.created_at) AS last_message_at
+        FROM conversation_messages m
+        JOIN conversation_sessions s ON s.id = m.session_id
+        WHERE s.user_id = :user_id
+          AND (m.created_at AT TIME ZONE 'UTC')::date = ANY(:days)
+        GROUP BY 1
+        UNION ALL
+        SELECT
+            (s.created_at AT TIME ZONE 'UTC')::date AS day,
+            COUNT(*), 0, 0, 0, NULL::timestamptz
+        FROM conversation_sessions s
+        WHERE s.user_id = :user_id
+          AND (s.created_at AT TIME ZONE 'UTC')::date = ANY(:days)
+        GROUP BY 1
+    ) d
+    GROUP BY d.day
+    """
+)
+
+_SESSION_DAYS_SQL = text(
+    """
+    SELECT (s.created_at AT TIME ZONE 'UTC')::date AS day
+    FROM conversation_sessions s
+    WHERE s.id = :session_id AND s.created_at IS NOT NULL
+    UNION
+    SELECT DISTINCT (m.created_at AT TIME ZONE 'UTC')::date
+    FROM conversation_messages m
+    WHERE m.session_id = :session_id AND m.created_at IS NOT NULL
+    """
+)
+
+
+def activity_day(ts: Optional[datetime]) -> date:
+    """
+    Return the UTC calendar day a timestamp is rolled up into.
+
+    Naive datetimes are treated as UTC (the app writes `datetime.utcnow()`).
+
+    Args:
+        ts: Event timestamp (defaults to now)
+
+    Returns:
+        date: UTC day
+    """
+    if ts is None:
+        return datetime.utcnow().date()
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc)
+    return ts.date()
+
+
+def _as_uuid(user_id: Any) -> UUID:
+    return UUID(user_id) if isinstance(user_id, str) else user_id
+
+
+class AnalyticsRollupService:
+    """Maintains and reads per-user daily activity rollups."""
+
+    async def _increment(
+        self,
+        db: AsyncSession,
+        user_id: Any,
+        ts: Optional[datetime],
+        sessions: int = 0,
+        messages: int = 0,
+        user_messages: int = 0,
+        ai_messages: int = 0,
+    ) -> None:
+        ts = ts or datetime.utcnow()
+        await db.execute(
+            _UPSERT_ACTIVITY_SQL,
+            {
+                "user_id": _as_uuid(user_id),
+                "day": activity_day(ts),
+                "sessions_inc": sessions,
+                "messages_inc": messages,
+                "user_inc": user_messages,
+                "ai_inc": ai_messages,
+                "last_message_at": ts if messages else None,
+            },
+        )
+
+    async def record_session(
+        self,
+        db: AsyncSession,
+        user_id: Any,
+        created_at: Optional[datetime] = None,
+    ) -> None:
+        """
+        Count a newly created conversation session.
+
+        Runs in the caller's transaction so the rollup commits (or rolls back)
+        together with the ConversationSession row.
+
+        Args:
+            db: Postgres session
+            user_id: Owner of the session (UUID or string)
+            created_at: Session creation time (defaults to now)
+        """
+        await self._increment(db, user_id, created_at, sessions=1)
+
+    async def record_message(
+        self,
+        db: AsyncSession,
+        user_id: Any,
+        role: str,
+        created_at: Optional[datetime] = None,
+    ) -> None:
+        """
+        Count a newly written conversation message.
+
+        Runs in the caller's transaction so the rollup commits (or rolls back)
+        together with the ConversationMessage row.
+
+        Args:
+            db: Postgres session
+            user_id: Owner of the message's session (UUID or string)
+            role: Message role (user, assistant, system)
+            created_at: Message creation time (defaults to now)
+        """
+        await self._increment(
+            db,
+            user_id,
+            created_at,
+            messages=1,
+            user_messages=1 if role == "user" else 0,
+            ai_messages=1 if role == "assistant" else 0,
+        )
+
+    async def session_days(self, db: AsyncSession, session_id: Any) -> Set[date]:
+        """
+        Return the days a session contributes to (creation day and message days).
+
+        Call before deleting a session, then pass the result to `refresh_days`.
+
+        Args:
+            db: Postgres session
+            session_id: Conversation session ID
+
+        Returns:
+            Set[date]: UTC days touched by the session
+        """
+        rows = (await db.execute(_SESSION_DAYS_SQL, {"session_id": _as_uuid(session_id)})).all()
+        return {r[0] for r in rows if r[0] is not None}
+
+    async def refresh_days(self, db: AsyncSession, user_id: Any, days: Iterable[date]) -> None:
+        """
+        Recompute a user's rollup rows for the given days from the source tables.
+
+        Used after deletes, where an incremental update is not possible.
+
+        Args:
+            db: Postgres session
+            user_id: User ID (UUID or string)
+            days: UTC days to rebuild
+        """
+        day_list = sorted(set(days))
+        if not day_list:
+            return
+        params = {"user_id": _as_uuid(user_id), "days": day_list}
+        await db.execute(_DELETE_DAYS_SQL, params)
+        await db.execute(_REBUILD_DAYS_SQL, params)
+        logger.info("user_daily_activity_refreshed", user_id=str(user_id), days=len(day_list))
+
+    async def get_summary(self, db: AsyncSession, user_id: Any) -> Dict[str, Any]:
+        """
+        Return lifetime totals for a user in a single query.
+
+        Args:
+            db: Postgres session
+            user_id: User ID
+
+        Returns:
+            Dict with total_sessions, total_messages and last_message_at
+        """
+        q = select(
+            func.coalesce(func.sum(UserDailyActivity.sessions_started), 0),
+            func.coalesce(func.sum(UserDailyActivity.message_count), 0),
+            func.max(UserDailyActivity.last_message_at),
+        ).where(UserDailyActivity.user_id == user_id)
+        total_sessions, total_messages, last_message_at = (await db.execute(q)).one()
+        return {
+            "total_sessions": int(total_sessions or 0),
+            "total_messages": int(total_messages or 0),
+            "last_message_at": last_message_at,
+        }
+
+    async def messages_per_day(self, db: AsyncSession, user_id: Any, days: int) -> List[Dict[str, Any]]:
+        """
+        Return message counts for the user's most recent N active days, oldest first.
+
+        Args:
+            db: Postgres session
+            user_id: User ID
+            days: Number of active days to return
+
+        Returns:
+            List of {"date", "count"}
+        """
+        q = (
+            select(UserDailyActivity.day, UserDailyActivity.message_count)
+            .where(UserDailyActivity.user_id == user_id, UserDailyActivity.message_count > 0)
+            .order_by(UserDailyActivity.day.desc())
+            .limit(days)
+        )
+        rows = list(reversed((await db.execute(q)).all()))
+        return [{"date": r[0].isoformat(), "count": int(r[1])} for r in rows]
+
+    async def sessions_per_week(self, db: AsyncSession, user_id: Any, weeks: int) -> List[Dict[str, Any]]:
+        """
+        Return session counts for the user's most recent N active weeks, oldest first.
+
+        Args:
+            db: Postgres session
+            user_id: User ID
+            weeks: Number of active weeks to return
+
+        Returns:
+            List of {"week", "count"} where week is the Monday of the ISO week
+        """
+        week_bucket = func.date_trunc("week", UserDailyActivity.day).label("week")
+        q = (
+            select(week_bucket, func.sum(UserDailyActivity.sessions_started))
+            .where(UserDailyActivity.user_id == user_id, UserDailyActivity.sessions_started > 0)
+            .group_by(week_bucket)
+            .order_by(week_bucket.desc())
+            .limit(weeks)
+        )
+        rows = list(reversed((await db.execute(q)).all()))
+        return [{"week": r[0].date().isoformat(), "count": int(r[1])} for r in rows]
+
+
+# Singleton instance
+analytics_rollup_service = AnalyticsRollupService()
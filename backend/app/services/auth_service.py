@@ -4,18 +4,21 @@ Authentication service for JWT-based user authentication.
 
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
+import copy
 import structlog
 import time
 import json
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, inspect as sa_inspect
+from sqlalchemy.orm import make_transient_to_detached
 from fastapi import HTTPException, status
 
 from app.core.config import settings
 from app.models.database_models import User
 from app.schemas.user import UserCreate, TokenData
+from app.services.password_hashing import password_hasher, pwd_context
+from app.utils.bounded_cache import BoundedCache
 
 logger = structlog.get_logger()
 
@@ -28,13 +31,64 @@ logger = structlog.get_logger()
 # Keep logins working everywhere by:
 # - Defaulting new hashes to PBKDF2-SHA256 (doesn't depend on bcrypt bindings).
 # - Still supporting bcrypt *verification* when the bcrypt backend is available.
-pwd_context = CryptContext(schemes=["pbkdf2_sha256", "bcrypt"], deprecated="auto")
+#
+# `pwd_context` is built from PASSWORD_HASH_* settings in password_hashing.py.
+# Async handlers must use the `*_async` helpers, which run on the dedicated
+# hashing thread pool instead of blocking the event loop.
 
 # JWT settings
 ALGORITHM = settings.JWT_ALGORITHM
 SECRET_KEY = settings.JWT_SECRET_KEY
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 
+# Authenticated principals by user id (column snapshots of active users).
+#
+# The JWT is still decoded and validated on every request; only the `users`
+# lookup is skipped on a hit. Entries are dropped explicitly by
+# `invalidate_principal` whenever a user row changes in this process. There is
+# no cross-worker invalidation: a user deactivated or changed through another
+# worker stays authorized here for up to PRINCIPAL_CACHE_TTL_SECONDS. Set it to
+# 0 where that window is not acceptable.
+PRINCIPAL_CACHE_ENABLED = settings.PRINCIPAL_CACHE_TTL_SECONDS > 0
+principal_cache: BoundedCache[Dict[str, Any]] = BoundedCache(
+    name="principals",
+    max_entries=settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+
+def _principal_key(user_id: Any) -> str:
+    return str(user_id)
+
+
+def _principal_snapshot(user: User) -> Dict[str, Any]:
+    """Copy the column values of a loaded user (no session state)."""
+    return copy.deepcopy({attr.key: getattr(user, attr.key) for attr in sa_inspect(User).column_attrs})
+
+
+def invalidate_principal(user_id: Any) -> None:
+    """
+    Drop a user from the principal cache.
+
+    Call after any write to the user's row so the next request re-reads it.
+
+    Args:
+        user_id: User ID (UUID or string)
+    """
+    principal_cache.pop(_principal_key(user_id))
+
+
+async def _attach_principal(db: AsyncSession, snapshot: Dict[str, Any]) -> User:
+    """
+    Rebuild a cached user as a persistent instance of `db` without a SELECT.
+
+    The instance is a fresh copy per request, so handlers can modify and
+    commit it exactly as if it had been loaded from the database.
+    """
+    user = User(**copy.deepcopy(snapshot))
+    make_transient_to_detached(user)
+    return await db.merge(user, load=False)
+
 
 class AuthService:
     """Authentication service for user management."""
@@ -49,6 +103,16 @@ class AuthService:
         """Hash a password."""
         return pwd_context.hash(password)
     
+    @staticmethod
+    async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+        """Verify a password on the hashing thread pool."""
+        return await password_hasher.verify(plain_password, hashed_password)
+    
+    @staticmethod
+    async def get_password_hash_async(password: str) -> str:
+        """Hash a password on the hashing thread pool."""
+        return await password_hasher.hash(password)
+    
     @staticmethod
     def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
         """Create a JWT access token."""
@@ -157,7 +221,8 @@ class AuthService:
             # #region agent log
             verify_start = time.time()
             # #endregion
-            if not AuthService.verify_password(password, user.hashed_password):
+            valid, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+            if not valid:
                 # #region agent log
                 verify_end = time.time()
                 auth_end = time.time()
@@ -184,6 +249,17 @@ class AuthService:
                 logger.info("User account is inactive", username=username)
                 return None
             
+            if new_hash:
+                # Reason: hash parameters changed (PASSWORD_HASH_*); upgrade on successful login.
+                try:
+                    user.hashed_password = new_hash
+                    await db.commit()
+                    invalidate_principal(user.id)
+                    logger.info("Password hash upgraded", user_id=str(user.id))
+                except Exception as e:
+                    await db.rollback()
+                    logger.warning("Password hash upgrade failed", user_id=str(user.id), error=str(e))
+            
             # #region agent log
             auth_end = time.time()
             try:
@@ -225,6 +301,11 @@ class AuthService:
             raise credentials_exception
         
         try:
+            cache_key = _principal_key(token_data.user_id)
+            cached = principal_cache.get(cache_key) if PRINCIPAL_CACHE_ENABLED else None
+            if cached is not None:
+                return await _attach_principal(db, cached)
+            
             result = await db.execute(
                 select(User).where(User.id == token_data.user_id)
             )
@@ -239,6 +320,8 @@ class AuthService:
                     detail="User account is inactive"
                 )
             
+            if PRINCIPAL_CACHE_ENABLED:
+                principal_cache.set(cache_key, _principal_snapshot(user))
             return user
             
         except Exception as e:
@@ -275,7 +358,7 @@ class AuthService:
             # #region agent log
             hash_start = time.time()
             # #endregion
-            hashed_password = AuthService.get_password_hash(user_create.password)
+            hashed_password = await AuthService.get_password_hash_async(user_create.password)
             # #region agent log
             hash_end = time.time()
             try:
@@ -388,6 +471,7 @@ class AuthService:
             user.updated_at = datetime.utcnow()
             
             await db.commit()
+            invalidate_principal(user.id)
             await db.refresh(user)
             
             logger.info("User updated successfully", 
@@ -416,17 +500,18 @@ class AuthService:
         """Change user password."""
         try:
             # Verify current password
-            if not AuthService.verify_password(current_password, user.hashed_password):
+            if not await AuthService.verify_password_async(current_password, user.hashed_password):
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="Current password is incorrect"
                 )
             
             # Hash new password
-            user.hashed_password = AuthService.get_password_hash(new_password)
+            user.hashed_password = await AuthService.get_password_hash_async(new_password)
             user.updated_at = datetime.utcnow()
             
             await db.commit()
+            invalidate_principal(user.id)
             
             logger.info("Password changed successfully", user_id=str(user.id))
             return True
@@ -451,6 +536,7 @@ class AuthService:
             user.updated_at = datetime.utcnow()
             
             await db.commit()
+            invalidate_principal(user.id)
             
             logger.info("User deactivated", user_id=str(user.id))
             return True
@@ -9,6 +9,7 @@ from datetime import datetime
 import structlog
 
 from app.services.embedding_service import EmbeddingService
+from app.services.cando_neighbour_cache import cando_neighbour_cache
 from app.core.config import settings
 
 logger = structlog.get_logger()
@@ -173,6 +174,7 @@ class CanDoEmbeddingService:
                 """,
                 {"uid": can_do_uid, "embedding": embedding}
             )
+            cando_neighbour_cache.invalidate()
             
             logger.info("Updated CanDoDescriptor embedding", uid=can_do_uid)
             return True
@@ -287,6 +289,8 @@ class CanDoEmbeddingService:
             
             skip += batch_size
         
+        if stats['generated']:
+            cando_neighbour_cache.invalidate()
         logger.info("Batch CanDoDescriptor embedding generation completed", **stats)
         return stats
     
@@ -569,6 +573,7 @@ class CanDoEmbeddingService:
             # Process remaining batch
             if batch:
                 await self._create_relationships_batch(neo4j_session, batch, stats)
+            cando_neighbour_cache.invalidate()
             
             logger.info("Similarity relationship creation completed", **stats)
             return stats
@@ -692,6 +697,7 @@ class CanDoEmbeddingService:
             
             if relationships:
                 await self._create_relationships_batch(neo4j_session, relationships, {'created': 0, 'updated': 0, 'errors': 0})
+                cando_neighbour_cache.invalidate()
             
             return len(relationships)
             
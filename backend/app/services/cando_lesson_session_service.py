@@ -44,6 +44,7 @@ from app.models.multilingual import (
     VocabularyEntry,
 )
 from app.utils.json_helpers import extract_balanced_json
+from app.utils.bounded_cache import BoundedCache
 from app.core.config import settings
 from app.services.cando_lesson_quality import (
     QualityMode,
@@ -116,34 +117,37 @@ class CanDoLessonSessionService:
         self._practice = AIConversationPractice()
 
         # In-memory fallback store for environments where Postgres tables are missing
-        # (e.g. lightweight contract tests). Keys are session_id.
-        self._mem_sessions: Dict[str, Dict[str, Any]] = {}
-
-        # Master lesson cache: key="{can_do_id}:{topic}", value=(master,
-        # timestamp)
-        self._master_cache: Dict[str, tuple[Dict[str, Any], float]] = {}
-        # Cache TTL in seconds (default 1 hour; configurable via
-        # MASTER_CACHE_TTL)
+        # (e.g. lightweight contract tests). Keys are session_id; entries expire
+        # with the session (24h) and the store is LRU-bounded.
+        self._mem_sessions: BoundedCache[Dict[str, Any]] = BoundedCache(
+            name="lesson_sessions_memory",
+            max_entries=int(getattr(settings, "LESSON_SESSION_MEMORY_MAX_ENTRIES", 1000)),
+            ttl_seconds=24 * 3600,
+        )
+
+        # Master lesson cache: key="{can_do_id}:{topic}". Masters are large, so
+        # the cache is bounded by an approximate byte budget as well as entries.
+        # TTL defaults to 1 hour (MASTER_CACHE_TTL).
         self._cache_ttl = int(getattr(settings, "MASTER_CACHE_TTL", 3600))
+        self._master_cache: BoundedCache[Dict[str, Any]] = BoundedCache(
+            name="lesson_master",
+            max_entries=int(getattr(settings, "MASTER_CACHE_MAX_ENTRIES", 256)),
+            ttl_seconds=self._cache_ttl,
+            max_bytes=int(getattr(settings, "MASTER_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+        )
         # Stage 2 cache to avoid recomputing enhanced sections for identical inputs
-        self._stage2_cache: Dict[str, tuple[Any, float]] = {}
         self._stage2_cache_ttl = int(getattr(settings, "STAGE2_CACHE_TTL", 600))
+        self._stage2_cache: BoundedCache[Any] = BoundedCache(
+            name="lesson_stage2",
+            max_entries=int(getattr(settings, "STAGE2_CACHE_MAX_ENTRIES", 1024)),
+            ttl_seconds=self._stage2_cache_ttl,
+        )
 
     def _stage2_cache_get(self, key: str) -> Optional[Any]:
-        rec = self._stage2_cache.get(key)
-        if not rec:
-            return None
-        value, ts = rec
-        if (time.time() - ts) > self._stage2_cache_ttl:
-            try:
-                del self._stage2_cache[key]
-            except Exception:
-                pass
-            return None
-        return value
+        return self._stage2_cache.get(key)
 
     def _stage2_cache_set(self, key: str, value: Any) -> None:
-        self._stage2_cache[key] = (value, time.time())
+        self._stage2_cache.set(key, value)
 
     async def _cleanup_expired_sessions(self, pg: PgSession) -> None:
         """Delete expired sessions from Postgres (TTL-based cleanup).
@@ -302,27 +306,11 @@ class CanDoLessonSessionService:
             Cached master lesson dict if valid; None if expired or not found.
         """
         cache_key = f"{can_do_id}:{topic}"
-        if cache_key not in self._master_cache:
-            return None
-
-        master, cached_time = self._master_cache[cache_key]
-        elapsed = time.time() - cached_time
-
-        if elapsed > self._cache_ttl:
-            # Expired; remove from cache
-            del self._master_cache[cache_key]
-            logger.debug(
-                "master_cache_expired",
-                cache_key=cache_key,
-                ttl_sec=self._cache_ttl)
+        master = self._master_cache.get(cache_key)
+        if master is None:
             return None
 
-        logger.debug(
-            "master_cache_hit",
-            cache_key=cache_key,
-            age_sec=round(
-                elapsed,
-                1))
+        logger.debug("master_cache_hit", cache_key=cache_key)
         return master
 
     def _cache_master(self, can_do_id: str, topic: str,
@@ -335,7 +323,7 @@ class CanDoLessonSessionService:
             master: Master lesson dict to cache.
         """
         cache_key = f"{can_do_id}:{topic}"
-        self._master_cache[cache_key] = (master, time.time())
+        self._master_cache.set(cache_key, master)
         logger.debug(
             "master_cached",
             cache_key=cache_key,
@@ -417,12 +405,12 @@ class CanDoLessonSessionService:
                 scen = session_data.get("scenario")
                 if hasattr(scen, "model_dump"):
                     scen = scen.model_dump(mode="python")
-                self._mem_sessions[session_id] = {
+                self._mem_sessions.set(session_id, {
                     **session_data,
                     "scenario": scen,
                     "id": session_id,
                     "expires_at": expires_at,
-                }
+                })
                 logger.warning("session_store_fallback_memory", session_id=session_id)
             except Exception:
                 pass
@@ -1011,8 +999,9 @@ class CanDoLessonSessionService:
             # Get latest version payload
             res2 = await pg.execute(
                 text(
-                    "SELECT version, lesson_plan, exercises, manifest, dialogs "
-                    "FROM lesson_versions WHERE lesson_id = :lid ORDER BY version DESC LIMIT 1"
+                    "SELECT lv.version, a.lesson_plan, lv.exercises, lv.manifest, lv.dialogs "
+                    "FROM lesson_versions lv JOIN lesson_versions_assembled a USING (lesson_id, version) "
+                    "WHERE lv.lesson_id = :lid ORDER BY lv.version DESC LIMIT 1"
                 ),
                 {"lid": lesson_id},
             )
@@ -2591,7 +2580,7 @@ Output JSON:
                     # Load compiled lesson from lesson_versions table (get latest version)
                     lesson_id = lesson_row[0]
                     result2 = await pg.execute(
-                        text("SELECT lesson_plan, version FROM lesson_versions WHERE lesson_id = :lesson_id ORDER BY version DESC LIMIT 1"),
+                        text("SELECT lesson_plan, version FROM lesson_versions_assembled WHERE lesson_id = :lesson_id ORDER BY version DESC LIMIT 1"),
                         {"lesson_id": lesson_id}
                     )
                     version_row = result2.first()
@@ -2722,9 +2711,7 @@ Output JSON:
                     "master_lesson_validation_failed_rejecting_session", 
                     can_do_id=can_do_id)
                 # Clear from cache so next request regenerates
-                cache_key = f"master:{can_do_id}:{topic}"
-                if cache_key in self._master_cache:
-                    del self._master_cache[cache_key]
+                self._master_cache.pop(f"{can_do_id}:{topic}")
                 # Don't save this bad session - force client to retry
                 raise ValueError(
                     f"Generated lesson content for {can_do_id} failed validation. "
@@ -0,0 +1,236 @@
+"""
+CanDo Neighbour Cache
+
+Process-wide k-NN adjacency cache for CanDoDescriptor nodes so that
+semantic path building can traverse neighbours in memory instead of
+issuing one vector search per step.
+"""
+
+import asyncio
+import time
+from array import array
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+# Signature of CanDoEmbeddingService.find_similar_candos (used for lazy fills)
+SimilarFetcher = Callable[..., Awaitable[List[Dict[str, Any]]]]
+
+
+class CanDoNeighbourCache:
+    """
+    Precomputed top-K neighbour lists for CanDoDescriptors.
+
+    The adjacency is bulk-loaded in a single query from the
+    SEMANTICALLY_SIMILAR relationships written by
+    ``CanDoEmbeddingService.create_similarity_relationships``. Descriptors
+    without stored relationships are filled lazily through the vector search
+    and memoized (including empty results).
+
+    Storage is compact: UIDs are interned once and each neighbour list is a
+    pair of typed arrays (neighbour indices, float32 scores) sorted by score.
+    """
+
+    def __init__(
+        self,
+        top_k: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        min_similarity: Optional[float] = None,
+    ):
+        self.top_k = top_k or settings.CANDO_NEIGHBOUR_CACHE_TOP_K
+        self.ttl_seconds = (
+            ttl_seconds
+            if ttl_seconds is not None
+            else settings.CANDO_NEIGHBOUR_CACHE_TTL_SECONDS
+        )
+        # Neighbours below this score are never stored, so queries with a
+        # lower threshold cannot be served from the cache.
+        self.min_similarity = (
+            min_similarity
+            if min_similarity is not None
+            else settings.CANDO_SIMILARITY_THRESHOLD
+        )
+        self._uids: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._adjacency: Dict[int, Tuple[array, array]] = {}
+        self._loaded_at: Optional[float] = None
+        self._generation = 0
+        self._lock = asyncio.Lock()
+
+    def _intern(self, uid: str) -> int:
+        """Return the compact integer id for a UID, assigning one if needed."""
+        idx = self._index.get(uid)
+        if idx is None:
+            idx = len(self._uids)
+            self._uids.append(uid)
+            self._index[uid] = idx
+        return idx
+
+    def _store(self, uid: str, neighbours: List[Tuple[str, float]]) -> None:
+        """Store a neighbour list for ``uid`` (sorted, truncated to top-K)."""
+        neighbours = sorted(neighbours, key=lambda n: n[1], reverse=True)[: self.top_k]
+        ids = array("I", (self._intern(n_uid) for n_uid, _ in neighbours))
+        scores = array("f", (score for _, score in neighbours))
+        self._adjacency[self._intern(uid)] = (ids, scores)
+
+    @property
+    def is_loaded(self) -> bool:
+        """Whether the adjacency is loaded and still within its TTL."""
+        if self._loaded_at is None:
+            return False
+        if self.ttl_seconds and time.monotonic() - self._loaded_at > self.ttl_seconds:
+            return False
+        return True
+
+    def invalidate(self, can_do_uid: Optional[str] = None) -> None:
+        """
+        Invalidate cached neighbours.
+
+        Args:
+            can_do_uid: Drop only this descriptor's list; when omitted the whole
+                adjacency is discarded and reloaded on next use.
+        """
+        if can_do_uid is None:
+            self._uids = []
+            self._index = {}
+            self._adjacency = {}
+            self._loaded_at = None
+            self._generation += 1
+            logger.info("CanDo neighbour cache invalidated")
+            return
+        idx = self._index.get(can_do_uid)
+        if idx is not None:
+            self._adjacency.pop(idx, None)
+
+    async def load(self, neo4j_session) -> int:
+        """
+        Bulk-load the adjacency from SEMANTICALLY_SIMILAR relationships.
+
+        Args:
+            neo4j_session: Neo4j async session
+
+        Returns:
+            Number of descriptors with a stored neighbour list
+        """
+        result = await neo4j_session.run(
+            """
+            MATCH (s:CanDoDescriptor)-[r:SEMANTICALLY_SIMILAR]->(t:CanDoDescriptor)
+            WHERE r.similarity_score >= $min_similarity
+            RETURN s.uid AS source, t.uid AS target, r.similarity_score AS score
+            """,
+            {"min_similarity": self.min_similarity}
+        )
+
+        grouped: Dict[str, List[Tuple[str, float]]] = {}
+        async for record in result:
+            source = record.get("source")
+            target = record.get("target")
+            if not source or not target or source == target:
+                continue
+            grouped.setdefault(source, []).append((target, float(record.get("score") or 0.0)))
+
+        self.invalidate()
+        for source, neighbours in grouped.items():
+            self._store(source, neighbours)
+        self._loaded_at = time.monotonic()
+
+        logger.info("CanDo neighbour cache loaded",
+                   descriptors=len(self._adjacency),
+                   edges=sum(len(ids) for ids, _ in self._adjacency.values()))
+        return len(self._adjacency)
+
+    async def ensure_loaded(self, neo4j_session) -> None:
+        """Load the adjacency once per TTL window (concurrent callers share the load)."""
+        if self.is_loaded:
+            return
+        async with self._lock:
+            if not self.is_loaded:
+                await self.load(neo4j_session)
+
+    async def get_neighbours(
+        self,
+        neo4j_session,
+        can_do_uid: str,
+        limit: int = 10,
+        similarity_threshold: Optional[float] = None,
+        fetch_similar: Optional[SimilarFetcher] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Return the nearest neighbours of a CanDoDescriptor.
+
+        Args:
+            neo4j_session: Neo4j async session
+            can_do_uid: CanDoDescriptor UID
+            limit: Maximum number of neighbours (at most ``top_k``)
+            similarity_threshold: Minimum similarity score
+            fetch_similar: Vector search used to fill descriptors that are not
+                in the bulk-loaded adjacency (``find_similar_candos`` signature)
+
+        Returns:
+            List of ``{"uid", "similarity"}`` dicts ordered by similarity
+        """
+        if similarity_threshold is None:
+            similarity_threshold = self.min_similarity
+        if similarity_threshold < self.min_similarity or limit > self.top_k:
+            raise ValueError("Query is outside the cached neighbourhood bounds")
+
+        await self.ensure_loaded(neo4j_session)
+
+        idx = self._index.get(can_do_uid)
+        entry = self._adjacency.get(idx) if idx is not None else None
+        if entry is None:
+            if fetch_similar is None:
+                return []
+            generation = self._generation
+            similar = await fetch_similar(
+                neo4j_session=neo4j_session,
+                can_do_uid=can_do_uid,
+                limit=self.top_k,
+                similarity_threshold=self.min_similarity
+            )
+            neighbours = [
+                (s["uid"], float(s.get("similarity", 0.0)))
+                for s in similar
+                if s.get("uid") and s.get("uid") != can_do_uid
+            ]
+            # Reason: skip memoizing if the cache was invalidated mid-fetch.
+            if generation == self._generation:
+                self._store(can_do_uid, neighbours)
+                entry = self._adjacency[self._index[can_do_uid]]
+            else:
+                neighbours.sort(key=lambda n: n[1], reverse=True)
+                return [
+                    {"uid": n_uid, "similarity": score}
+                    for n_uid, score in neighbours
+                    if score >= similarity_threshold
+                ][:limit]
+
+        ids, scores = entry
+        out: List[Dict[str, Any]] = []
+        for n_idx, score in zip(ids, scores):
+            # Reason: scores are stored as float32; tolerate rounding at the threshold.
+            if score < similarity_threshold - 1e-6:
+                break
+            out.append({"uid": self._uids[n_idx], "similarity": float(score)})
+            if len(out) >= limit:
+                break
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache size information."""
+        return {
+            "loaded": self.is_loaded,
+            "descriptors": len(self._adjacency),
+            "interned_uids": len(self._uids),
+            "edges": sum(len(ids) for ids, _ in self._adjacency.values()),
+            "top_k": self.top_k,
+            "min_similarity": self.min_similarity,
+        }
+
+
+# Singleton instance
+cando_neighbour_cache = CanDoNeighbourCache()
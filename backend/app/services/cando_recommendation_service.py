@@ -5,21 +5,57 @@ Analyzes user evidence across all CanDo lessons to provide adaptive recommendati
 - Next CanDo to study
 - Review items (vocabulary/grammar patterns)
 - Focus areas (stages needing more practice)
+
+Evidence is read from `cando_evidence_aggregates` (one row per user/CanDo),
+which is updated incrementally by `record_evidence` on every evidence write.
 """
 
+import json
 from typing import Dict, Any, List, Optional
-from datetime import datetime, date
+from datetime import datetime
 from collections import Counter
-from sqlalchemy import select, func, and_, or_
+from uuid import UUID
+from sqlalchemy import select, text
 from sqlalchemy.ext.asyncio import AsyncSession as PgSession
 from neo4j import AsyncSession
 import structlog
 
-from app.models.database_models import ConversationInteraction, User
+from app.models.database_models import CanDoEvidenceAggregate
 from app.services.cando_embedding_service import CanDoEmbeddingService
 
 logger = structlog.get_logger()
 
+LESSON_STAGES = ("content", "comprehension", "production", "interaction")
+
+# Atomic per-(user, CanDo) upsert. Stage and error-tag increments are passed as
+# JSON objects ({key: n}) and merged into the stored counters in one statement.
+_UPSERT_AGGREGATE_SQL = text(
+    """
+    INSERT INTO cando_evidence_aggregates AS agg (
+        user_id, can_do_id, total_attempts, correct_count, mastery_level,
+        stage_counts, error_tag_counts, first_attempted_at, last_attempted_at, updated_at
+    )
+    VALUES (
+        :user_id, :can_do_id, 1, :correct_inc, :mastery_level,
+        CAST(:stage_inc AS jsonb), CAST(:error_inc AS jsonb), :attempted_at, :attempted_at, NOW()
+    )
+    ON CONFLICT (user_id, can_do_id) DO UPDATE SET
+        total_attempts = agg.total_attempts + 1,
+        correct_count = agg.correct_count + :correct_inc,
+        mastery_level = :mastery_level,
+        stage_counts = agg.stage_counts || COALESCE((
+            SELECT jsonb_object_agg(k, COALESCE((agg.stage_counts->>k)::int, 0) + v::int)
+            FROM jsonb_each_text(CAST(:stage_inc AS jsonb)) AS inc(k, v)
+        ), '{}'::jsonb),
+        error_tag_counts = agg.error_tag_counts || COALESCE((
+            SELECT jsonb_object_agg(k, COALESCE((agg.error_tag_counts->>k)::int, 0) + v::int)
+            FROM jsonb_each_text(CAST(:error_inc AS jsonb)) AS inc(k, v)
+        ), '{}'::jsonb),
+        last_attempted_at = GREATEST(agg.last_attempted_at, EXCLUDED.last_attempted_at),
+        updated_at = NOW()
+    """
+)
+
 
 class CanDoRecommendationService:
     """Service for generating adaptive CanDo lesson recommendations."""
@@ -27,6 +63,47 @@ class CanDoRecommendationService:
     def __init__(self):
         self.embedding_service = CanDoEmbeddingService()
     
+    async def record_evidence(
+        self,
+        pg: PgSession,
+        user_id: Any,
+        can_do_id: str,
+        stage: Optional[str],
+        is_correct: Optional[bool],
+        mastery_level: int,
+        error_tags: Optional[List[str]] = None,
+        attempted_at: Optional[datetime] = None,
+    ) -> None:
+        """
+        Fold one evidence record into the user's aggregate row for a CanDo.
+        
+        Runs in the caller's transaction so the aggregate commits (or rolls
+        back) together with the ConversationInteraction row.
+        
+        Args:
+            pg: Postgres session
+            user_id: User ID (UUID or string)
+            can_do_id: CanDo descriptor ID
+            stage: Learning stage of the attempt
+            is_correct: Whether the attempt was correct
+            mastery_level: Mastery level after this attempt
+            error_tags: Error tags recorded for the attempt
+            attempted_at: Attempt timestamp (defaults to now)
+        """
+        user_uuid = UUID(user_id) if isinstance(user_id, str) else user_id
+        await pg.execute(
+            _UPSERT_AGGREGATE_SQL,
+            {
+                "user_id": user_uuid,
+                "can_do_id": can_do_id,
+                "correct_inc": 1 if is_correct is True else 0,
+                "mastery_level": int(mastery_level or 1),
+                "stage_inc": json.dumps({stage: 1} if stage else {}),
+                "error_inc": json.dumps(dict(Counter(error_tags or []))),
+                "attempted_at": attempted_at or datetime.utcnow(),
+            },
+        )
+    
     async def get_recommendations(
         self,
         pg: PgSession,
@@ -47,61 +124,45 @@ class CanDoRecommendationService:
             Dict with next_lesson, review_items, focus_areas
         """
         try:
-            # Get all CanDo evidence for this user
             # user_id might be string or UUID, convert to UUID if needed
-            from uuid import UUID
             user_uuid = UUID(user_id) if isinstance(user_id, str) else user_id
-            interactions_query = select(ConversationInteraction).where(
-                and_(
-                    ConversationInteraction.user_id == user_uuid,
-                    ConversationInteraction.concept_type == 'cando_lesson'
-                )
-            ).order_by(ConversationInteraction.created_at.desc())
+            aggregates_query = select(CanDoEvidenceAggregate).where(
+                CanDoEvidenceAggregate.user_id == user_uuid
+            ).order_by(CanDoEvidenceAggregate.last_attempted_at.desc())
             
-            result = await pg.execute(interactions_query)
-            interactions = result.scalars().all()
+            result = await pg.execute(aggregates_query)
+            aggregates = result.scalars().all()
             
             # Analyze evidence gaps
             can_do_stats = {}
-            stage_stats = {"content": 0, "comprehension": 0, "production": 0, "interaction": 0}
-            error_tags_all = []
+            stage_stats = {stage: 0 for stage in LESSON_STAGES}
+            error_tag_counts: Counter = Counter()
             low_mastery_candos = []
             
-            for interaction in interactions:
-                can_do_id = interaction.concept_id
-                if can_do_id not in can_do_stats:
-                    can_do_stats[can_do_id] = {
-                        "total_attempts": 0,
-                        "correct_count": 0,
-                        "stages": set(),
-                        "mastery_level": interaction.mastery_level or 1,
-                        "last_attempted": interaction.created_at.isoformat() if interaction.created_at else None,
-                    }
-                
-                stats = can_do_stats[can_do_id]
-                stats["total_attempts"] += 1
-                if interaction.is_correct:
-                    stats["correct_count"] += 1
+            for agg in aggregates:
+                stage_counts = agg.stage_counts or {}
+                last_attempted = agg.last_attempted_at.isoformat() if agg.last_attempted_at else None
+                can_do_stats[agg.can_do_id] = {
+                    "total_attempts": agg.total_attempts or 0,
+                    "correct_count": agg.correct_count or 0,
+                    "stages": {stage for stage, count in stage_counts.items() if count},
+                    "mastery_level": agg.mastery_level or 1,
+                    "last_attempted": last_attempted,
+                }
                 
-                # Track stages
-                if interaction.evidence_metadata:
-                    stage = interaction.evidence_metadata.get("stage")
-                    if stage:
-                        stats["stages"].add(stage)
-                        stage_stats[stage] = stage_stats.get(stage, 0) + 1
+                for stage, count in stage_counts.items():
+                    stage_stats[stage] = stage_stats.get(stage, 0) + int(count or 0)
                 
-                # Track errors
-                if interaction.evidence_metadata and interaction.evidence_metadata.get("error_tags"):
-                    error_tags_all.extend(interaction.evidence_metadata["error_tags"])
+                error_tag_counts.update({
+                    tag: int(count or 0) for tag, count in (agg.error_tag_counts or {}).items()
+                })
                 
-                # Track low mastery
-                if interaction.mastery_level and interaction.mastery_level < 3:
-                    if can_do_id not in [c["can_do_id"] for c in low_mastery_candos]:
-                        low_mastery_candos.append({
-                            "can_do_id": can_do_id,
-                            "mastery_level": interaction.mastery_level,
-                            "last_attempted": interaction.created_at.isoformat() if interaction.created_at else None
-                        })
+                if (agg.mastery_level or 1) < 3:
+                    low_mastery_candos.append({
+                        "can_do_id": agg.can_do_id,
+                        "mastery_level": agg.mastery_level or 1,
+                        "last_attempted": last_attempted
+                    })
             
             # Find next lesson (CanDo with no or minimal evidence)
             next_lesson = await self._find_next_lesson(
@@ -121,7 +182,6 @@ class CanDoRecommendationService:
             )[:2]  # Top 2 stages needing practice
             
             # Common error patterns
-            error_tag_counts = Counter(error_tags_all)
             common_errors = [tag for tag, _ in error_tag_counts.most_common(5)]
             
             return {
@@ -161,21 +221,21 @@ class CanDoRecommendationService:
         3. Use similarity search to find related CanDo
         """
         try:
-            # Find CanDo with no evidence
-            studied_ids = set(can_do_stats.keys())
+            studied_ids = list(can_do_stats.keys())
             
-            # Query all CanDo from Neo4j
+            # Rank unstudied candidates over the full catalogue in Neo4j
             query = """
             MATCH (c:CanDoDescriptor)
+            WHERE NOT c.uid IN $studied_ids
             RETURN c.uid AS uid, c.titleEn AS title_en, c.titleJa AS title_ja,
                    c.level AS level, c.primaryTopic AS topic
-            ORDER BY c.level ASC
-            LIMIT 50
+            ORDER BY c.level ASC, c.uid ASC
+            LIMIT $limit
             """
-            result = await neo4j_session.run(query)
-            all_candos = []
+            result = await neo4j_session.run(query, studied_ids=studied_ids, limit=limit)
+            unstudied = []
             async for record in result:
-                all_candos.append({
+                unstudied.append({
                     "uid": record.get("uid"),
                     "title_en": record.get("title_en"),
                     "title_ja": record.get("title_ja"),
@@ -183,9 +243,6 @@ class CanDoRecommendationService:
                     "topic": record.get("topic")
                 })
             
-            # Find unstudied CanDo
-            unstudied = [c for c in all_candos if c["uid"] not in studied_ids]
-            
             if unstudied:
                 # Return first unstudied (could be enhanced with similarity to studied)
                 next_cando = unstudied[0]
@@ -198,42 +255,50 @@ class CanDoRecommendationService:
                 }
             
             # All studied - find one with low mastery or incomplete stages
-            low_mastery = [
-                (cid, stats) for cid, stats in can_do_stats.items()
-                if stats.get("mastery_level", 1) < 3 or len(stats.get("stages", set())) < 4
-            ]
-            
+            low_mastery = sorted(
+                (
+                    (cid, stats) for cid, stats in can_do_stats.items()
+                    if stats.get("mastery_level", 1) < 3 or len(stats.get("stages", set())) < len(LESSON_STAGES)
+                ),
+                key=lambda item: (item[1].get("mastery_level", 1), len(item[1].get("stages", set())))
+            )
+            candidates = []
             if low_mastery:
-                # Get CanDo details
-                cando_id, stats = low_mastery[0]
-                cando_query = """
-                MATCH (c:CanDoDescriptor {uid: $can_do_id})
-                RETURN c.titleEn AS title_en, c.titleJa AS title_ja,
-                       c.level AS level, c.primaryTopic AS topic
-                LIMIT 1
-                """
-                cando_result = await neo4j_session.run(cando_query, can_do_id=cando_id)
-                cando_record = await cando_result.single()
-                if cando_record:
-                    return {
-                        "can_do_id": cando_id,
-                        "title": cando_record.get("title_en") or cando_record.get("title_ja") or cando_id,
-                        "level": cando_record.get("level"),
-                        "topic": cando_record.get("topic"),
-                        "reason": "needs_review",
-                        "mastery_level": stats.get("mastery_level", 1)
-                    }
-            
-            # Fallback: return first CanDo
-            if all_candos:
-                first = all_candos[0]
-                return {
-                    "can_do_id": first["uid"],
-                    "title": first.get("title_en") or first.get("title_ja") or first["uid"],
-                    "level": first.get("level"),
-                    "topic": first.get("topic"),
-                    "reason": "default"
+                candidates.append((low_mastery[0][0], "needs_review"))
+            if can_do_stats:
+                # Fallback: the most practised CanDo for consolidation
+                candidates.append(
+                    (max(can_do_stats, key=lambda cid: can_do_stats[cid].get("total_attempts", 0)), "default")
+                )
+            if not candidates:
+                return None
+            
+            # Get CanDo details for both candidates in one query
+            cando_query = """
+            MATCH (c:CanDoDescriptor)
+            WHERE c.uid IN $can_do_ids
+            RETURN c.uid AS uid, c.titleEn AS title_en, c.titleJa AS title_ja,
+                   c.level AS level, c.primaryTopic AS topic
+            """
+            cando_result = await neo4j_session.run(cando_query, can_do_ids=[cid for cid, _ in candidates])
+            details = {}
+            async for record in cando_result:
+                details[record.get("uid")] = record
+            
+            for cando_id, reason in candidates:
+                cando_record = details.get(cando_id)
+                if cando_record is None and reason == "needs_review":
+                    continue
+                next_lesson = {
+                    "can_do_id": cando_id,
+                    "title": (cando_record and (cando_record.get("title_en") or cando_record.get("title_ja"))) or cando_id,
+                    "level": cando_record.get("level") if cando_record else None,
+                    "topic": cando_record.get("topic") if cando_record else None,
+                    "reason": reason,
                 }
+                if reason == "needs_review":
+                    next_lesson["mastery_level"] = can_do_stats[cando_id].get("mastery_level", 1)
+                return next_lesson
             
             return None
             
@@ -1,12 +1,18 @@
 from __future__ import annotations
 
 import asyncio
+import contextvars
+import functools
 import json
 import os
 import importlib.util
+import itertools
+import threading
+import time
 import uuid
+from contextlib import nullcontext
 from pathlib import Path
-from typing import Any, Dict, Optional, Tuple, List, Callable
+from typing import Any, Dict, Iterator, Optional, Tuple, List, Callable
 import logging
 
 from neo4j import AsyncSession
@@ -15,6 +21,14 @@ from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError, OperationalError
 
 from app.services.cando_image_service import ensure_image_paths_for_lesson
+from app.services.guided_session_working_set import guided_working_set
+from app.services.lesson_card_cache_service import lesson_card_cache
+from app.services.lesson_card_store import STAGE_CARD_KEYS, lesson_card_store
+from app.services.lexical_network.ai_provider_config import estimate_cost_usd
+from app.services.llm_replay import llm_replay
+from app.utils.metrics import observe_llm_call
+from app.utils.json_helpers import parse_partial_json
+from app.utils.sse import raise_if_stream_cancelled
 
 
 def _project_root() -> Path:
@@ -35,23 +49,79 @@ def _load_pipeline_module():
     return module
 
 
-def _make_llm_call_openai(model: str, timeout: int = 120):
-    """Synchronous OpenAI chat completions adapter used inside server threadpool."""
-    from openai import OpenAI
+# Global cap on in-flight LLM calls for the compiles started in this context
+# (set by the batch compiler; None means unlimited).
+llm_call_limiter: contextvars.ContextVar[Optional[threading.BoundedSemaphore]] = contextvars.ContextVar(
+    "llm_call_limiter", default=None
+)
 
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise RuntimeError("OPENAI_API_KEY_missing")
+
+@functools.lru_cache(maxsize=8)
+def _openai_client(api_key: str, timeout: int):
+    """Shared OpenAI client per (key, timeout) so compiles reuse one connection pool."""
+    from openai import OpenAI
     # Initialize client with timeout configuration
     import httpx
     timeout_config = httpx.Timeout(timeout, connect=10.0)
-    client = OpenAI(
+    return OpenAI(
         api_key=api_key,
         timeout=timeout_config,
         max_retries=2,  # Retry transient failures
     )
 
+
+def _make_llm_call_openai(model: str, timeout: int = 120):
+    """Synchronous OpenAI chat completions adapter used inside server threadpool.
+
+    Calls go through `llm_replay`; in replay mode no client is created, so
+    compilation runs offline from recorded fixtures. Calls wait on the
+    `llm_call_limiter` active when the adapter was created, if any.
+
+    The returned function also has a `stream(system, user)` generator of text
+    deltas, used by the pipeline to forward long cards while they generate.
+    """
+    client = None
+    if llm_replay.mode != "replay":
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise RuntimeError("OPENAI_API_KEY_missing")
+        client = _openai_client(api_key, timeout)
+    limiter = llm_call_limiter.get()
+
+    def observe(started: float, usage: Any = None, outcome: str = "ok") -> None:
+        tokens_in = getattr(usage, "prompt_tokens", None) or 0
+        tokens_out = getattr(usage, "completion_tokens", None) or 0
+        observe_llm_call(
+            "openai",
+            model,
+            (time.perf_counter() - started) * 1000,
+            tokens_in,
+            tokens_out,
+            estimate_cost_usd(model, tokens_in, tokens_out),
+            outcome=outcome,
+        )
+
+    def complete(system: str, user: str) -> str:
+        started = time.perf_counter()
+        try:
+            resp = client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": system},
+                    {"role": "user", "content": user},
+                ],
+                temperature=0.0,
+                response_format={"type": "json_object"},  # Force JSON output mode
+            )
+        except Exception:
+            observe(started, outcome="error")
+            raise
+        observe(started, resp.usage)
+        return (resp.choices[0].message.content or "").strip()
+
     def llm_call(system: str, user: str) -> str:
+        # Stop spending tokens once the SSE client that requested this lesson is gone.
+        raise_if_stream_cancelled()
         logger.debug(
             "LLM call START",
             extra={
@@ -61,16 +131,13 @@ def _make_llm_call_openai(model: str, timeout: int = 120):
                 "timeout": timeout,
             },
         )
-        resp = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system},
-                {"role": "user", "content": user},
-            ],
-            temperature=0.0,
-            response_format={"type": "json_object"},  # Force JSON output mode
-        )
-        _result = (resp.choices[0].message.content or "").strip()
+        with limiter if limiter is not None else nullcontext():
+            _result = llm_replay.call_sync(
+                "cando_compile",
+                model,
+                {"system": system, "user": user},
+                lambda: complete(system, user),
+            )
         logger.debug(
             "LLM call END",
             extra={
@@ -80,9 +147,110 @@ def _make_llm_call_openai(model: str, timeout: int = 120):
         )
         return _result
 
+    def stream_call(system: str, user: str) -> Iterator[str]:
+        if llm_replay.enabled:
+            # Fixtures hold whole completions; replay/record them as one delta.
+            yield llm_call(system, user)
+            return
+        raise_if_stream_cancelled()
+        with limiter if limiter is not None else nullcontext():
+            started = time.perf_counter()
+            usage = None
+            outcome = "aborted"
+            try:
+                chunks = client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": system},
+                        {"role": "user", "content": user},
+                    ],
+                    temperature=0.0,
+                    response_format={"type": "json_object"},
+                    stream=True,
+                    stream_options={"include_usage": True},  # usage arrives on a final, choice-less chunk
+                )
+                for chunk in chunks:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+                    elif getattr(chunk, "usage", None) is not None:
+                        usage = chunk.usage
+                outcome = "ok"
+            except Exception:
+                outcome = "error"
+                raise
+            finally:
+                observe(started, usage, outcome)
+
+    llm_call.stream = stream_call  # type: ignore[attr-defined]
     return llm_call
 
 
+# Pipeline card type -> (lesson card key, stage) for streamed card events.
+CARD_EVENT_KEYS: Dict[str, Tuple[str, str]] = {
+    "ObjectiveCard": ("objective", "content"),
+    "WordsCard": ("words", "content"),
+    "GrammarPatternsCard": ("grammar_patterns", "content"),
+    "FormulaicExpressionsCard": ("formulaic_expressions", "content"),
+    "DialogueCard": ("lesson_dialogue", "content"),
+    "CultureCard": ("cultural_explanation", "content"),
+    "ReadingCard": ("reading_comprehension", "comprehension"),
+    "ComprehensionExercisesCard": ("comprehension_exercises", "comprehension"),
+    "AIComprehensionTutorCard": ("ai_comprehension_tutor", "comprehension"),
+    "GuidedDialogueCard": ("guided_dialogue", "production"),
+    "ProductionExercisesCard": ("production_exercises", "production"),
+    "AIProductionEvaluatorCard": ("ai_production_evaluator", "production"),
+    "InteractiveDialogueCard": ("interactive_dialogue", "interaction"),
+    "InteractionActivitiesCard": ("interaction_activities", "interaction"),
+    "AIScenarioManagerCard": ("ai_scenario_manager", "interaction"),
+}
+
+
+class _CardEventSink:
+    """Pipeline card listener that forwards numbered card events to the event loop.
+
+    Called from the worker threads that generate cards; `callback` runs on
+    `loop`. Events are `{"event": "card", "seq", "card_key", "stage",
+    "card_type", "card"}` for validated cards and `{"event": "card_partial",
+    "seq", "card_key", "stage", "card_type", "partial"}` for long cards still
+    being generated. Sequence numbers increase across both kinds.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, callback: Callable[[Dict[str, Any]], None]) -> None:
+        self._loop = loop
+        self._callback = callback
+        self._lock = threading.Lock()
+        self._seq = itertools.count(1)
+        self._last_partial: Dict[str, Dict[str, Any]] = {}
+
+    def on_card(self, card_type: str, card: Any) -> None:
+        keys = CARD_EVENT_KEYS.get(card_type)
+        if keys is None:
+            return
+        with self._lock:
+            self._last_partial.pop(card_type, None)
+        self._emit("card", card_type, keys, card=card.model_dump(mode="json", exclude={"gen"}))
+
+    def on_partial(self, card_type: str, raw_json: str) -> None:
+        keys = CARD_EVENT_KEYS.get(card_type)
+        partial = parse_partial_json(raw_json)
+        if keys is None or not partial:
+            return
+        with self._lock:
+            if self._last_partial.get(card_type) == partial:
+                return
+            self._last_partial[card_type] = partial
+        self._emit("card_partial", card_type, keys, partial=partial)
+
+    def _emit(self, kind: str, card_type: str, keys: Tuple[str, str], **payload: Any) -> None:
+        # Reason: numbering and scheduling under one lock keeps delivery in seq order.
+        with self._lock:
+            event = {"event": kind, "seq": next(self._seq), "card_key": keys[0], "stage": keys[1], "card_type": card_type, **payload}
+            try:
+                self._loop.call_soon_threadsafe(self._callback, event)
+            except RuntimeError:
+                pass  # Loop closed: the stream that wanted these events is gone
+
+
 async def _fetch_cando_meta(neo: AsyncSession, can_do_id: str) -> Dict[str, Any]:
     q = (
         "MATCH (c:CanDoDescriptor {uid: $id})\n"
@@ -1143,11 +1311,14 @@ async def _compile_content_stage_only(
         lesson_json["lesson"]["meta"]["prelesson_kit_usage"] = kit_usage_report
         lesson_json["lesson"]["meta"]["prelesson_kit_available"] = True
     
+    # Version numbers are reused after cleanup; never overlay rows left by a deleted version
+    await lesson_card_store.clear_overlay(pg, lesson_id, next_ver)
     await pg.execute(
         text("INSERT INTO lesson_versions (lesson_id, version, lesson_plan) VALUES (:lid, :ver, :plan)"),
         {"lid": lesson_id, "ver": next_ver, "plan": json.dumps(lesson_json, ensure_ascii=False)},
     )
     await pg.commit()
+    guided_working_set.invalidate_lesson(lesson_id)
     
     logger.info("Content stage saved", extra={"can_do_id": can_do_id, "lesson_id": lesson_id, "version": next_ver})
     
@@ -1341,34 +1512,15 @@ async def _generate_remaining_stages_background(
         
         # Mark as failed in metadata but continue (atomic JSONB update)
         try:
-            import json
-            # Use simpler JSONB update pattern
-            error_update = json.dumps({
-                "error_type": error_type,
-                "message": error_message[:500],
-                "retryable": is_retryable,
-                "timestamp": time.time()
-            }, ensure_ascii=False)
-            
-            # Use jsonb_set with proper path syntax
-            await pg.execute(
-                text("""
-                    UPDATE lesson_versions 
-                    SET lesson_plan = 
-                        jsonb_set(
-                            jsonb_set(
-                                COALESCE(lesson_plan, '{}'::jsonb),
-                                '{lesson,meta,generation_status,comprehension}',
-                                '"failed"'::jsonb
-                            ),
-                            '{lesson,meta,errors,comprehension}',
-                            :errors::jsonb
-                        )
-                    WHERE lesson_id = :lid AND version = :ver
-                """),
-                {"lid": lesson_id, "ver": version, "errors": error_update}
+            await lesson_card_store.set_stage_status(
+                pg, lesson_id, version, "comprehension", "failed",
+                error={
+                    "error_type": error_type,
+                    "message": error_message[:500],
+                    "retryable": is_retryable,
+                    "timestamp": time.time()
+                },
             )
-            await pg.commit()
             print(f"[UPDATE] Successfully marked comprehension as failed for {can_do_id}")
             # Notify via callback
             if progress_callback:
@@ -1391,16 +1543,8 @@ async def _generate_remaining_stages_background(
         # Check dependency: production needs comprehension to be complete
         comprehension_ready = False
         try:
-            result = await pg.execute(
-                text("SELECT lesson_plan FROM lesson_versions WHERE lesson_id = :lid AND version = :ver"),
-                {"lid": lesson_id, "ver": version}
-            )
-            row = result.first()
-            if row:
-                import json
-                current_lesson = json.loads(row[0]) if isinstance(row[0], str) else row[0]
-                status = current_lesson.get("lesson", {}).get("meta", {}).get("generation_status", {})
-                comprehension_ready = status.get("comprehension") == "complete"
+            status = await lesson_card_store.get_stage_statuses(pg, lesson_id, version)
+            comprehension_ready = status.get("comprehension") == "complete"
         except Exception:
             pass
         
@@ -1414,16 +1558,8 @@ async def _generate_remaining_stages_background(
                 await asyncio.sleep(wait_interval)
                 waited += wait_interval
                 try:
-                    result = await pg.execute(
-                        text("SELECT lesson_plan FROM lesson_versions WHERE lesson_id = :lid AND version = :ver"),
-                        {"lid": lesson_id, "ver": version}
-                    )
-                    row = result.first()
-                    if row:
-                        import json
-                        current_lesson = json.loads(row[0]) if isinstance(row[0], str) else row[0]
-                        status = current_lesson.get("lesson", {}).get("meta", {}).get("generation_status", {})
-                        comprehension_ready = status.get("comprehension") == "complete"
+                    status = await lesson_card_store.get_stage_statuses(pg, lesson_id, version)
+                    comprehension_ready = status.get("comprehension") == "complete"
                 except Exception:
                     pass
             
@@ -1437,23 +1573,12 @@ async def _generate_remaining_stages_background(
         production_start = time.time()
         print(f"[COMPILE] {can_do_id}: Starting Production stage generation (background) at {time.strftime('%H:%M:%S')}")
         
-        # Fetch comprehension cards for production stage
+        # Fetch comprehension cards for production stage (stage cards live in lesson_cards)
         comprehension_cards_for_prod = {}
         try:
-            result = await pg.execute(
-                text("SELECT lesson_plan FROM lesson_versions WHERE lesson_id = :lid AND version = :ver"),
-                {"lid": lesson_id, "ver": version}
-            )
-            row = result.first()
-            if row:
-                import json
-                current_lesson = json.loads(row[0]) if isinstance(row[0], str) else row[0]
-                if "cards" in current_lesson:
-                    comprehension_cards_for_prod = {
-                        "reading_comprehension": current_lesson["cards"].get("reading_comprehension"),
-                        "comprehension_exercises": current_lesson["cards"].get("comprehension_exercises"),
-                        "ai_comprehension_tutor": current_lesson["cards"].get("ai_comprehension_tutor"),
-                    }
+            cards = await lesson_card_store.get_cards(pg, lesson_id, version, STAGE_CARD_KEYS["comprehension"])
+            if cards and any(card is not None for card in cards.values()):
+                comprehension_cards_for_prod = cards
         except Exception:
             pass  # Continue without comprehension cards if fetch fails
         
@@ -1522,39 +1647,15 @@ async def _generate_remaining_stages_background(
         
         # Mark as failed but continue
         try:
-            result = await pg.execute(
-                text("SELECT lesson_plan FROM lesson_versions WHERE lesson_id = :lid AND version = :ver"),
-                {"lid": lesson_id, "ver": version}
-            )
-            # Use atomic JSONB update instead of read-modify-write
-            import json
-            status_json = json.dumps({"production": f"failed: {error_message[:200]}"}, ensure_ascii=False)
-            error_json = json.dumps({
-                "production": {
+            await lesson_card_store.set_stage_status(
+                pg, lesson_id, version, "production", f"failed: {error_message[:200]}",
+                error={
                     "error_type": error_type,
                     "message": error_message[:500],
                     "retryable": is_retryable,
                     "timestamp": time.time()
-                }
-            }, ensure_ascii=False)
-            
-            await pg.execute(
-                text("""
-                    UPDATE lesson_versions 
-                    SET lesson_plan = jsonb_set(
-                        jsonb_set(
-                            COALESCE(lesson_plan, '{}'::jsonb),
-                            '{lesson,meta,generation_status}',
-                            COALESCE(lesson_plan->'lesson'->'meta'->'generation_status', '{}'::jsonb) || :status::jsonb
-                        ),
-                        '{lesson,meta,errors}',
-                        COALESCE(lesson_plan->'lesson'->'meta'->'errors', '{}'::jsonb) || :errors::jsonb
-                    )
-                    WHERE lesson_id = :lid AND version = :ver
-                """),
-                {"lid": lesson_id, "ver": version, "status": status_json, "errors": error_json}
+                },
             )
-            await pg.commit()
             if progress_callback:
                 progress_callback({
                     "stage": "production",
@@ -1576,17 +1677,9 @@ async def _generate_remaining_stages_background(
         production_ready = False
         comprehension_ready = False
         try:
-            result = await pg.execute(
-                text("SELECT lesson_plan FROM lesson_versions WHERE lesson_id = :lid AND version = :ver"),
-                {"lid": lesson_id, "ver": version}
-            )
-            row = result.first()
-            if row:
-                import json
-                current_lesson = json.loads(row[0]) if isinstance(row[0], str) else row[0]
-                status = current_lesson.get("lesson", {}).get("meta", {}).get("generation_status", {})
-                production_ready = status.get("production") == "complete"
-                comprehension_ready = status.get("comprehension") == "complete"
+            status = await lesson_card_store.get_stage_statuses(pg, lesson_id, version)
+            production_ready = status.get("production") == "complete"
+            comprehension_ready = status.get("comprehension") == "complete"
         except Exception:
             pass
         
@@ -1599,16 +1692,8 @@ async def _generate_remaining_stages_background(
                 await asyncio.sleep(wait_interval)
                 waited += wait_interval
                 try:
-                    result = await pg.execute(
-                        text("SELECT lesson_plan FROM lesson_versions WHERE lesson_id = :lid AND version = :ver"),
-                        {"lid": lesson_id, "ver": version}
-                    )
-                    row = result.first()
-                    if row:
-                        import json
-                        current_lesson = json.loads(row[0]) if isinstance(row[0], str) else row[0]
-                        status = current_lesson.get("lesson", {}).get("meta", {}).get("generation_status", {})
-                        production_ready = status.get("production") == "complete"
+                    status = await lesson_card_store.get_stage_statuses(pg, lesson_id, version)
+                    production_ready = status.get("production") == "complete"
                 except Exception:
                     pass
             
@@ -1622,29 +1707,18 @@ async def _generate_remaining_stages_background(
         interaction_start = time.time()
         print(f"[COMPILE] {can_do_id}: Starting Interaction stage generation (background) at {time.strftime('%H:%M:%S')}")
         
-        # Fetch previous stages for interaction stage
+        # Fetch previous stages for interaction stage (stage cards live in lesson_cards)
         comprehension_cards_for_inter = {}
         production_cards_for_inter = {}
         try:
-            result = await pg.execute(
-                text("SELECT lesson_plan FROM lesson_versions WHERE lesson_id = :lid AND version = :ver"),
-                {"lid": lesson_id, "ver": version}
+            cards = await lesson_card_store.get_cards(
+                pg, lesson_id, version, STAGE_CARD_KEYS["comprehension"] + STAGE_CARD_KEYS["production"]
             )
-            row = result.first()
-            if row:
-                import json
-                current_lesson = json.loads(row[0]) if isinstance(row[0], str) else row[0]
-                if "cards" in current_lesson:
-                    comprehension_cards_for_inter = {
-                        "reading_comprehension": current_lesson["cards"].get("reading_comprehension"),
-                        "comprehension_exercises": current_lesson["cards"].get("comprehension_exercises"),
-                        "ai_comprehension_tutor": current_lesson["cards"].get("ai_comprehension_tutor"),
-                    }
-                    production_cards_for_inter = {
-                        "guided_dialogue": current_lesson["cards"].get("guided_dialogue"),
-                        "production_exercises": current_lesson["cards"].get("production_exercises"),
-                        "ai_production_evaluator": current_lesson["cards"].get("ai_production_evaluator"),
-                    }
+            if cards:
+                if any(cards.get(key) is not None for key in STAGE_CARD_KEYS["comprehension"]):
+                    comprehension_cards_for_inter = {key: cards.get(key) for key in STAGE_CARD_KEYS["comprehension"]}
+                if any(cards.get(key) is not None for key in STAGE_CARD_KEYS["production"]):
+                    production_cards_for_inter = {key: cards.get(key) for key in STAGE_CARD_KEYS["production"]}
         except Exception:
             pass  # Continue without previous stages if fetch fails
         
@@ -1715,34 +1789,15 @@ async def _generate_remaining_stages_background(
         
         # Mark as failed (atomic JSONB update)
         try:
-            import json
-            status_json = json.dumps({"interaction": f"failed: {error_message[:200]}"}, ensure_ascii=False)
-            error_json = json.dumps({
-                "interaction": {
+            await lesson_card_store.set_stage_status(
+                pg, lesson_id, version, "interaction", f"failed: {error_message[:200]}",
+                error={
                     "error_type": error_type,
                     "message": error_message[:500],
                     "retryable": is_retryable,
                     "timestamp": time.time()
-                }
-            }, ensure_ascii=False)
-            
-            await pg.execute(
-                text("""
-                    UPDATE lesson_versions 
-                    SET lesson_plan = jsonb_set(
-                        jsonb_set(
-                            COALESCE(lesson_plan, '{}'::jsonb),
-                            '{lesson,meta,generation_status}',
-                            COALESCE(lesson_plan->'lesson'->'meta'->'generation_status', '{}'::jsonb) || :status::jsonb
-                        ),
-                        '{lesson,meta,errors}',
-                        COALESCE(lesson_plan->'lesson'->'meta'->'errors', '{}'::jsonb) || :errors::jsonb
-                    )
-                    WHERE lesson_id = :lid AND version = :ver
-                """),
-                {"lid": lesson_id, "ver": version, "status": status_json, "errors": error_json}
+                },
             )
-            await pg.commit()
             if progress_callback:
                 progress_callback({
                     "stage": "interaction",
@@ -1772,6 +1827,7 @@ async def regenerate_lesson_stage(
     timeout: int = 120,
     fast_model_override: Optional[str] = None,
     user_id: Optional[uuid.UUID] = None,
+    bypass_card_cache: bool = False,
 ) -> Dict[str, Any]:
     """
     Regenerate a specific stage of an existing lesson.
@@ -1790,6 +1846,7 @@ async def regenerate_lesson_stage(
         timeout: LLM timeout in seconds (default: 120)
         fast_model_override: Override for fast model
         user_id: Optional user ID for profile context
+        bypass_card_cache: Regenerate every card instead of reusing cached ones
     
     Returns:
         Dict with status and generated stage data
@@ -1807,9 +1864,9 @@ async def regenerate_lesson_stage(
     
     pipeline = _load_pipeline_module()
     
-    # Fetch lesson plan from database
+    # Fetch lesson plan from database (with stored stage cards applied)
     result = await pg.execute(
-        text("SELECT lesson_plan FROM lesson_versions WHERE lesson_id = :lid AND version = :ver"),
+        text("SELECT lesson_plan FROM lesson_versions_assembled WHERE lesson_id = :lid AND version = :ver"),
         {"lid": lesson_id, "ver": version}
     )
     row = result.first()
@@ -1926,19 +1983,33 @@ async def regenerate_lesson_stage(
     _fast_fallback_active = False
     _llm_call_fast_primary = _make_llm_call_openai(model=fast_model, timeout=timeout) if fast_enabled else llm_call_main
     _llm_call_fast_fallback = _make_llm_call_openai(model=fallback_fast_model, timeout=timeout) if fast_enabled else llm_call_main
+    # Model that answered each pipeline thread's last fast call (card cache key).
+    _fast_answered = threading.local()
     
     def llm_call_fast(system: str, user: str) -> str:
         nonlocal _fast_fallback_active
         if not fast_enabled:
             return llm_call_main(system, user)
         if _fast_fallback_active:
+            _fast_answered.model = fallback_fast_model
             return _llm_call_fast_fallback(system, user)
         try:
-            return _llm_call_fast_primary(system, user)
+            output = _llm_call_fast_primary(system, user)
+            _fast_answered.model = fast_model
+            return output
         except Exception:
             _fast_fallback_active = True
+            llm_call_fast.model = fallback_fast_model  # type: ignore[attr-defined]
+            _fast_answered.model = fallback_fast_model
             return _llm_call_fast_fallback(system, user)
     
+    llm_call_fast.produced_by = lambda: getattr(_fast_answered, "model", None)  # type: ignore[attr-defined]
+
+    # Unchanged sibling cards (same prompts) come from the card cache.
+    card_cache = lesson_card_cache(bypass=bypass_card_cache)
+    pipeline.attach_card_cache(llm_call_main, card_cache, model)
+    pipeline.attach_card_cache(llm_call_fast, card_cache, fast_model if fast_enabled else model)
+    
     # Regenerate plan if extraction failed
     if plan is None:
         logger.info("regenerating_plan_for_stage", extra={"lesson_id": lesson_id, "stage": stage})
@@ -2152,34 +2223,15 @@ async def regenerate_lesson_stage(
         
         # Update error status in lesson (atomic JSONB update)
         try:
-            import json
-            status_json = json.dumps({stage: f"failed: {error_message[:200]}"}, ensure_ascii=False)
-            error_json = json.dumps({
-                stage: {
+            await lesson_card_store.set_stage_status(
+                pg, lesson_id, version, stage, f"failed: {error_message[:200]}",
+                error={
                     "type": error_type,
                     "message": error_message[:500],
                     "retryable": _is_retryable_error(e),
                     "timestamp": time.time()
-                }
-            }, ensure_ascii=False)
-            
-            await pg.execute(
-                text("""
-                    UPDATE lesson_versions 
-                    SET lesson_plan = jsonb_set(
-                        jsonb_set(
-                            COALESCE(lesson_plan, '{}'::jsonb),
-                            '{lesson,meta,generation_status}',
-                            COALESCE(lesson_plan->'lesson'->'meta'->'generation_status', '{}'::jsonb) || :status::jsonb
-                        ),
-                        '{lesson,meta,errors}',
-                        COALESCE(lesson_plan->'lesson'->'meta'->'errors', '{}'::jsonb) || :errors::jsonb
-                    )
-                    WHERE lesson_id = :lid AND version = :ver
-                """),
-                {"lid": lesson_id, "ver": version, "status": status_json, "errors": error_json}
+                },
             )
-            await pg.commit()
         except Exception as update_err:
             logger.error("failed_to_update_stage_error_status", extra={"error": str(update_err)})
         
@@ -2199,7 +2251,15 @@ async def compile_lessonroot(
     fast_model_override: Optional[str] = None,
     progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
     incremental: bool = False,
+    bypass_card_cache: bool = False,
+    card_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
 ) -> Dict[str, Any]:
+    """Compile a CanDo lesson and persist it.
+
+    `card_callback`, when given, is called on the event loop with a numbered
+    event for every card as soon as it validates, plus partial events for long
+    cards while they generate (see _CardEventSink).
+    """
     # DEBUG: Immediate print to confirm function is called
     import sys
     import time as _time
@@ -2286,17 +2346,23 @@ async def compile_lessonroot(
     _fast_fallback_active = False
     _llm_call_fast_primary = _make_llm_call_openai(model=fast_model, timeout=timeout) if fast_enabled else llm_call_main
     _llm_call_fast_fallback = _make_llm_call_openai(model=fallback_fast_model, timeout=timeout) if fast_enabled else llm_call_main
+    # Model that answered each pipeline thread's last fast call (card cache key).
+    _fast_answered = threading.local()
 
     def llm_call_fast(system: str, user: str) -> str:
         nonlocal _fast_fallback_active
         if not fast_enabled:
             return llm_call_main(system, user)
         if _fast_fallback_active:
+            _fast_answered.model = fallback_fast_model
             return _llm_call_fast_fallback(system, user)
         try:
-            return _llm_call_fast_primary(system, user)
+            output = _llm_call_fast_primary(system, user)
+            _fast_answered.model = fast_model
+            return output
         except Exception as e:
             _fast_fallback_active = True
+            llm_call_fast.model = fallback_fast_model  # type: ignore[attr-defined]
             logger.warning(
                 "Fast model failed, falling back",
                 extra={
@@ -2307,8 +2373,30 @@ async def compile_lessonroot(
                     "error": str(e)[:300],
                 },
             )
+            _fast_answered.model = fallback_fast_model
             return _llm_call_fast_fallback(system, user)
 
+    def llm_call_fast_stream(system: str, user: str) -> Iterator[str]:
+        if not fast_enabled:
+            return llm_call_main.stream(system, user)
+        if _fast_fallback_active:
+            _fast_answered.model = fallback_fast_model
+            return _llm_call_fast_fallback.stream(system, user)
+        _fast_answered.model = fast_model
+        return _llm_call_fast_primary.stream(system, user)
+
+    llm_call_fast.stream = llm_call_fast_stream  # type: ignore[attr-defined]
+    llm_call_fast.produced_by = lambda: getattr(_fast_answered, "model", None)  # type: ignore[attr-defined]
+
+    # Validated cards are memoized by prompt; bypass_card_cache forces fresh LLM output.
+    card_cache = lesson_card_cache(bypass=bypass_card_cache)
+    pipeline.attach_card_cache(llm_call_main, card_cache, model)
+    pipeline.attach_card_cache(llm_call_fast, card_cache, fast_model if fast_enabled else model)
+    if card_callback is not None:
+        card_sink = _CardEventSink(asyncio.get_running_loop(), card_callback)
+        pipeline.attach_card_listener(llm_call_main, card_sink)
+        pipeline.attach_card_listener(llm_call_fast, card_sink)
+
     logger.debug(
         "Model selection",
         extra={
@@ -2719,11 +2807,14 @@ async def compile_lessonroot(
         lesson_json["lesson"]["meta"]["prelesson_kit_usage"] = kit_usage_report
         lesson_json["lesson"]["meta"]["prelesson_kit_available"] = True
     
+    # Version numbers are reused after cleanup; never overlay rows left by a deleted version
+    await lesson_card_store.clear_overlay(pg, lesson_id, next_ver)
     await pg.execute(
         text("INSERT INTO lesson_versions (lesson_id, version, lesson_plan) VALUES (:lid, :ver, :plan)"),
         {"lid": lesson_id, "ver": next_ver, "plan": json.dumps(lesson_json, ensure_ascii=False)},
     )
     await pg.commit()
+    guided_working_set.invalidate_lesson(lesson_id)
     
     # Progress: Complete
     if progress_callback:
@@ -2739,6 +2830,7 @@ async def compile_lessonroot(
             "total_duration_seconds": round(total_time, 2),
             "lesson_id": lesson_id,
             "version": next_ver,
+            "card_cache": card_cache.stats() if card_cache else None,
         },
     )
 
@@ -2765,30 +2857,8 @@ async def _update_lesson_stage_status_in_db(
         stage_name: Name of the stage (e.g., "comprehension", "production", "interaction")
         status: Status to set (e.g., "generating", "complete", "failed: <message>")
     """
-    import json
-    from sqlalchemy import text
-    
-    # Update status atomically using JSONB operators (no read-modify-write race condition)
-    status_json = json.dumps({stage_name: status}, ensure_ascii=False)
-    
-    result = await pg.execute(
-        text("""
-            UPDATE lesson_versions 
-            SET lesson_plan = jsonb_set(
-                COALESCE(lesson_plan, '{}'::jsonb),
-                '{lesson,meta,generation_status}',
-                COALESCE(lesson_plan->'lesson'->'meta'->'generation_status', '{}'::jsonb) || :status::jsonb
-            )
-            WHERE lesson_id = :lid AND version = :ver
-            RETURNING lesson_plan
-        """),
-        {"lid": lesson_id, "ver": version, "status": status_json}
-    )
-    row = result.first()
-    if not row:
-        raise ValueError(f"Lesson {lesson_id} version {version} not found")
-    
-    await pg.commit()
+    # One lesson_stage_status row per stage; lesson_plan itself is not rewritten.
+    await lesson_card_store.set_stage_status(pg, lesson_id, version, stage_name, status)
 
 
 async def _update_lesson_stage_in_db(
@@ -2799,123 +2869,21 @@ async def _update_lesson_stage_in_db(
     stage_data: Dict[str, Any],
 ) -> None:
     """
-    Update a specific stage in an existing lesson by merging stage data into lesson_plan JSONB.
+    Store a stage's cards as lesson_cards rows and mark the stage complete.
+
+    Only the stage's own cards are upserted (see lesson_card_store); the
+    lesson_plan document is not read or rewritten, and any previous error for
+    the stage is cleared.
     
     Args:
         pg: PostgreSQL session
         lesson_id: Lesson ID
         version: Lesson version
         stage_name: Name of the stage (e.g., "comprehension", "production", "interaction")
-        stage_data: Stage data to merge into lesson
+        stage_data: Stage cards keyed by card key (Pydantic models or dicts)
     """
-    import json
-    from sqlalchemy import text
-    
-    # Fetch current lesson
-    result = await pg.execute(
-        text("SELECT lesson_plan FROM lesson_versions WHERE lesson_id = :lid AND version = :ver"),
-        {"lid": lesson_id, "ver": version}
-    )
-    row = result.first()
-    if not row:
-        raise ValueError(f"Lesson {lesson_id} version {version} not found")
-    
-    current_lesson = json.loads(row[0]) if isinstance(row[0], str) else row[0]
-    
-    # Ensure lesson structure exists (LessonRoot format: {lesson: {meta: {...}, cards: {...}}})
-    if "lesson" not in current_lesson:
-        current_lesson["lesson"] = {}
-    if "cards" not in current_lesson["lesson"]:
-        current_lesson["lesson"]["cards"] = {}
-    if "meta" not in current_lesson["lesson"]:
-        current_lesson["lesson"]["meta"] = {}
-    if "generation_status" not in current_lesson["lesson"]["meta"]:
-        current_lesson["lesson"]["meta"]["generation_status"] = {}
-    
-    # Helper function to convert Pydantic models to dicts
-    def _to_dict(obj):
-        """Convert Pydantic model or dict to dict for JSON serialization."""
-        if obj is None:
-            return None
-        # Check if it's a Pydantic model (has model_dump method)
-        if hasattr(obj, 'model_dump'):
-            return obj.model_dump()
-        # Check if it's a Pydantic v1 model (has dict method)
-        elif hasattr(obj, 'dict'):
-            return obj.dict()
-        # Already a dict or other JSON-serializable type
-        elif isinstance(obj, dict):
-            return {k: _to_dict(v) for k, v in obj.items()}
-        elif isinstance(obj, list):
-            return [_to_dict(item) for item in obj]
-        else:
-            return obj
-    
-    # Map stage names to card keys, converting Pydantic models to dicts
-    stage_to_cards = {
-        "comprehension": {
-            "reading_comprehension": _to_dict(stage_data.get("reading_comprehension")),
-            "comprehension_exercises": _to_dict(stage_data.get("comprehension_exercises")),
-            "ai_comprehension_tutor": _to_dict(stage_data.get("ai_comprehension_tutor")),
-        },
-        "production": {
-            "guided_dialogue": _to_dict(stage_data.get("guided_dialogue")),
-            "production_exercises": _to_dict(stage_data.get("production_exercises")),
-            "ai_production_evaluator": _to_dict(stage_data.get("ai_production_evaluator")),
-        },
-        "interaction": {
-            "interactive_dialogue": _to_dict(stage_data.get("interactive_dialogue")),
-            "interaction_activities": _to_dict(stage_data.get("interaction_activities")),
-            "ai_scenario_manager": _to_dict(stage_data.get("ai_scenario_manager")),
-        },
-    }
-    
-    # Merge stage cards into lesson.cards (not root-level cards)
-    if stage_name in stage_to_cards:
-        for card_key, card_data in stage_to_cards[stage_name].items():
-            if card_data is not None:
-                current_lesson["lesson"]["cards"][card_key] = card_data
-    
-    # Update generation status in metadata
-    current_lesson["lesson"]["meta"]["generation_status"][stage_name] = "complete"
-    
-    # Clear any previous errors for this stage
-    if "errors" in current_lesson["lesson"]["meta"] and stage_name in current_lesson["lesson"]["meta"]["errors"]:
-        del current_lesson["lesson"]["meta"]["errors"][stage_name]
-    
-    # Update in database using JSONB merge for atomic updates
-    # This prevents race conditions when multiple stages update simultaneously
-    # Use PostgreSQL's jsonb_set and || operators for atomic updates
-    # Path must be {lesson,cards} not {cards} to match LessonRoot structure
-    cards_json = json.dumps(stage_to_cards.get(stage_name, {}), ensure_ascii=False)
-    status_json = json.dumps({stage_name: "complete"}, ensure_ascii=False)
-    
-    # Use bindparam to properly handle JSONB casting
-    from sqlalchemy import bindparam
-    
-    await pg.execute(
-        text("""
-            UPDATE lesson_versions 
-            SET lesson_plan = 
-                jsonb_set(
-                    jsonb_set(
-                        COALESCE(lesson_plan, '{}'::jsonb),
-                        '{lesson,cards}',
-                        COALESCE(lesson_plan->'lesson'->'cards', '{}'::jsonb) || CAST(:cards AS jsonb)
-                    ),
-                    '{lesson,meta,generation_status}',
-                    COALESCE(lesson_plan->'lesson'->'meta'->'generation_status', '{}'::jsonb) || CAST(:status AS jsonb)
-                )
-            WHERE lesson_id = :lid AND version = :ver
-        """),
-        {
-            "lid": lesson_id,
-            "ver": version,
-            "cards": cards_json,
-            "status": status_json
-        }
-    )
-    await pg.commit()
+    await lesson_card_store.upsert_stage(pg, lesson_id, version, stage_name, stage_data)
+    guided_working_set.invalidate_lesson(lesson_id)
     
     logger.info(
         "lesson_stage_updated",
@@ -0,0 +1,372 @@
+"""
+Streaming morphological ingestion for /content uploads and URLs.
+
+Text is read in fixed-size byte chunks, decoded incrementally and cut into
+sentence-bounded segments so memory stays bounded regardless of input size.
+Each segment is tokenized with fugashi/UniDic (the stack used by
+`ReadabilityService`) off the event loop, and dictionary forms are counted.
+Terms are persisted to Neo4j with batched `UNWIND` writes and linked to
+existing Word nodes by `word_key`.
+
+Falls back to a regex tokenizer when fugashi is not installed.
+"""
+
+import asyncio
+import codecs
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+# UniDic pos1 values kept as vocabulary terms.
+CONTENT_POS = frozenset({"名詞", "動詞", "形容詞", "形状詞", "副詞", "連体詞", "感動詞"})
+
+_SEGMENT_BREAKS = ("。", "！", "？", "!", "?", "\n")
+_REGEX_TOKEN = re.compile(r"[\w\u3040-\u30ff\u4e00-\u9fff]+")
+_CJK = re.compile(r"[\u3040-\u30ff\u4e00-\u9fff]")
+
+# Segments longer than this without a sentence break are cut anyway.
+MAX_SEGMENT_CHARS = 8192
+
+_PERSIST_TERMS_CYPHER = """
+MERGE (s:Source {title: $title})
+SET s.author = $author, s.url = $url, s.language = $language
+WITH s
+UNWIND $terms AS term
+MERGE (t:ExtractedTerm {value: term.value})
+SET t.pos = coalesce(t.pos, term.pos)
+MERGE (t)-[r:SOURCED_FROM]->(s)
+SET r.frequency = term.count
+WITH t, term
+OPTIONAL MATCH (w:Word {word_key: term.value})
+FOREACH (_ IN CASE WHEN w IS NULL THEN [] ELSE [1] END | MERGE (t)-[:MATCHES_WORD]->(w))
+RETURN count(DISTINCT t) AS persisted, count(DISTINCT w) AS linked
+"""
+
+
+class ContentTooLargeError(ValueError):
+    """Raised when an upload or URL body exceeds CONTENT_INGEST_MAX_BYTES."""
+
+
+@dataclass
+class IngestionResult:
+    """Outcome of ingesting one text stream."""
+
+    terms: List[Dict[str, Any]] = field(default_factory=list)
+    bytes_read: int = 0
+    processed_chars: int = 0
+    segments: int = 0
+    tokens: int = 0
+    truncated: bool = False
+    tokenizer: str = "regex"
+    elapsed_ms: float = 0.0
+
+    @property
+    def unique_terms(self) -> int:
+        return len(self.terms)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size and throughput figures for the API response."""
+        seconds = max(self.elapsed_ms / 1000.0, 1e-6)
+        return {
+            "tokenizer": self.tokenizer,
+            "bytes_read": self.bytes_read,
+            "segments": self.segments,
+            "tokens": self.tokens,
+            "unique_terms": self.unique_terms,
+            "truncated": self.truncated,
+            "elapsed_ms": round(self.elapsed_ms, 1),
+            "chars_per_second": round(self.processed_chars / seconds, 1),
+            "tokens_per_second": round(self.tokens / seconds, 1),
+        }
+
+
+async def iter_text_segments(
+    chunks: AsyncIterator[bytes],
+    encoding: str = "utf-8",
+    max_segment_chars: int = MAX_SEGMENT_CHARS,
+) -> AsyncIterator[str]:
+    """
+    Decode byte chunks incrementally and yield sentence-bounded text segments.
+
+    Multi-byte characters split across chunks are reassembled by the
+    incremental decoder, and text after the last sentence break is carried
+    into the next chunk so words are never cut at chunk boundaries.
+
+    Args:
+        chunks: Async iterator of raw byte chunks
+        encoding: Text encoding of the stream
+        max_segment_chars: Force a cut when no break appears within this many chars
+
+    Yields:
+        str: Text segments ending at a sentence break (except possibly the last)
+    """
+    try:
+        decoder = codecs.getincrementaldecoder(encoding)(errors="ignore")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        while pending:
+            cut = max(pending.rfind(b) for b in _SEGMENT_BREAKS)
+            if cut < 0:
+                if len(pending) < max_segment_chars:
+                    break
+                cut = max_segment_chars - 1
+            yield pending[: cut + 1]
+            pending = pending[cut + 1:]
+            if len(pending) < max_segment_chars:
+                break
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def iter_text_chunks(text: str, chunk_chars: int = MAX_SEGMENT_CHARS) -> AsyncIterator[bytes]:
+    """Yield an in-memory string as UTF-8 byte chunks (for JSON text payloads)."""
+    for start in range(0, len(text), chunk_chars):
+        yield text[start:start + chunk_chars].encode("utf-8")
+
+
+class ContentIngestionService:
+    """Tokenizes, counts and persists vocabulary from streamed text."""
+
+    def __init__(self, use_unidic: bool = True, max_terms: Optional[int] = None) -> None:
+        self._use_unidic = use_unidic
+        self._tagger = None
+        self._tagger_checked = False
+        # Reason: fugashi taggers are not thread-safe; segments are parsed in worker threads.
+        self._tagger_lock = threading.Lock()
+        self.max_terms = max_terms or settings.CONTENT_INGEST_MAX_TERMS
+
+    def _get_tagger(self):
+        if not self._tagger_checked:
+            self._tagger_checked = True
+            if self._use_unidic:
+                try:
+                    from fugashi import Tagger  # type: ignore
+                    self._tagger = Tagger()
+                except Exception as e:
+                    logger.info("content_ingestion_unidic_unavailable", error=str(e))
+                    self._tagger = None
+        return self._tagger
+
+    @property
+    def tokenizer_name(self) -> str:
+        return "unidic" if self._get_tagger() is not None else "regex"
+
+    def tokenize(self, text: str) -> List[Tuple[str, Optional[str], bool]]:
+        """
+        Tokenize a segment into (dictionary form, pos1, is_known) tuples.
+
+        Only content words are returned; particles, auxiliaries, symbols and
+        numerals are dropped.
+
+        Args:
+            text: Text segment
+
+        Returns:
+            List of (term, pos1, is_known) tuples
+        """
+        tagger = self._get_tagger()
+        if tagger is None:
+            return [(tok, None, len(tok) >= 3 or _CJK.search(tok) is not None) for tok in _REGEX_TOKEN.findall(text)]
+
+        out: List[Tuple[str, Optional[str], bool]] = []
+        # Node features reference tagger memory, so read them under the lock too.
+        with self._tagger_lock:
+            for node in tagger(text):
+                feature = node.feature
+                pos1 = getattr(feature, "pos1", None)
+                if pos1 not in CONTENT_POS or getattr(feature, "pos2", None) == "数詞":
+                    continue
+                base = getattr(feature, "orthBase", None)
+                if not base or base == "*":
+                    lemma = getattr(feature, "lemma", None)
+                    # Reason: UniDic lemmas of loanwords carry an "-origin" suffix (e.g. レストラン-restaurant)
+                    base = lemma.split("-", 1)[0] if lemma and lemma != "*" else node.surface
+                base = (base or "").strip()
+                if base:
+                    out.append((base, pos1, not getattr(node, "is_unk", False)))
+        return out
+
+    async def ingest(self, chunks: AsyncIterator[bytes], encoding: str = "utf-8") -> IngestionResult:
+        """
+        Tokenize and count terms from a byte stream with bounded memory.
+
+        Args:
+            chunks: Async iterator of raw byte chunks
+            encoding: Text encoding of the stream
+
+        Returns:
+            IngestionResult: Terms sorted by frequency, with throughput stats
+        """
+        started = time.perf_counter()
+        result = IngestionResult(tokenizer=self.tokenizer_name)
+        counts: Counter = Counter()
+        meta: Dict[str, Tuple[Optional[str], bool]] = {}
+
+        async def counted(source: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+            async for chunk in source:
+                result.bytes_read += len(chunk)
+                yield chunk
+
+        async for segment in iter_text_segments(counted(chunks), encoding=encoding):
+            result.segments += 1
+            result.processed_chars += len(segment)
+            tokens = await asyncio.to_thread(self.tokenize, segment)
+            result.tokens += len(tokens)
+            for term, pos, known in tokens:
+                counts[term] += 1
+                if term not in meta:
+                    meta[term] = (pos, known)
+            if len(counts) > self.max_terms:
+                # Reason: keep memory bounded on huge inputs; drop the rare tail.
+                kept = dict(counts.most_common(self.max_terms // 2))
+                counts = Counter(kept)
+                meta = {k: meta[k] for k in kept}
+                result.truncated = True
+
+        result.terms = [
+            {
+                "value": term,
+                "count": n,
+                "pos": meta[term][0],
+                "confidence": 0.9 if meta[term][1] else (0.6 if result.tokenizer == "unidic" else 0.5),
+            }
+            for term, n in counts.most_common()
+        ]
+        result.elapsed_ms = (time.perf_counter() - started) * 1000.0
+        logger.info("content_ingested", **result.stats())
+        return result
+
+    async def ingest_text(self, text: str) -> IngestionResult:
+        """Ingest an in-memory string."""
+        return await self.ingest(iter_text_chunks(text))
+
+    async def ingest_upload(self, upload: Any, chunk_size: Optional[int] = None, max_bytes: Optional[int] = None) -> IngestionResult:
+        """
+        Ingest an uploaded file by reading it in chunks.
+
+        Args:
+            upload: FastAPI UploadFile (anything with an async `read(n)`)
+            chunk_size: Bytes per read (default: CONTENT_INGEST_CHUNK_BYTES)
+            max_bytes: Size limit (default: CONTENT_INGEST_MAX_BYTES)
+
+        Returns:
+            IngestionResult
+
+        Raises:
+            ContentTooLargeError: If the upload exceeds the size limit
+        """
+        chunk_size = chunk_size or settings.CONTENT_INGEST_CHUNK_BYTES
+        limit = max_bytes or settings.CONTENT_INGEST_MAX_BYTES
+
+        async def chunks() -> AsyncIterator[bytes]:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+        return await self.ingest(_limit_bytes(chunks(), limit))
+
+    async def ingest_url(self, url: str, timeout: float = 10.0, max_bytes: Optional[int] = None) -> IngestionResult:
+        """
+        Stream a URL body and ingest it without buffering the whole response.
+
+        Args:
+            url: URL to fetch
+            timeout: HTTP timeout in seconds
+            max_bytes: Size limit (default: CONTENT_INGEST_MAX_BYTES)
+
+        Returns:
+            IngestionResult
+
+        Raises:
+            httpx.HTTPError: If the request fails
+            ContentTooLargeError: If the body exceeds the size limit
+        """
+        limit = max_bytes or settings.CONTENT_INGEST_MAX_BYTES
+        async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as client:
+            async with client.stream("GET", url) as resp:
+                resp.raise_for_status()
+                declared = resp.headers.get("content-length")
+                if declared and declared.isdigit() and int(declared) > limit:
+                    raise ContentTooLargeError(f"Content length {declared} exceeds limit of {limit} bytes")
+                chunks = resp.aiter_bytes(settings.CONTENT_INGEST_CHUNK_BYTES)
+                return await self.ingest(_limit_bytes(chunks, limit), encoding=resp.charset_encoding or "utf-8")
+
+    async def persist_terms(
+        self,
+        session: Any,
+        source: Dict[str, Any],
+        terms: Iterable[Dict[str, Any]],
+        batch_size: Optional[int] = None,
+    ) -> Dict[str, int]:
+        """
+        Persist terms and their source with batched UNWIND writes.
+
+        Each batch merges the Source once, merges every ExtractedTerm with its
+        SOURCED_FROM frequency, and links terms to Word nodes by `word_key`.
+
+        Args:
+            session: Neo4j async session
+            source: Source metadata (title, author, url, language)
+            terms: Term dicts with value, count and pos
+            batch_size: Terms per UNWIND (default: CONTENT_PERSIST_BATCH_SIZE)
+
+        Returns:
+            Dict with persisted, linked and batches counts
+        """
+        batch_size = batch_size or settings.CONTENT_PERSIST_BATCH_SIZE
+        params = {
+            "title": source.get("title"),
+            "author": source.get("author"),
+            "url": source.get("url"),
+            "language": source.get("language"),
+        }
+        stats = {"persisted": 0, "linked": 0, "batches": 0}
+        batch: List[Dict[str, Any]] = []
+
+        async def flush() -> None:
+            rec = await (await session.run(_PERSIST_TERMS_CYPHER, {**params, "terms": batch})).single()
+            stats["batches"] += 1
+            if rec is not None:
+                stats["persisted"] += int(rec["persisted"] or 0)
+                stats["linked"] += int(rec["linked"] or 0)
+
+        for term in terms:
+            batch.append({"value": term["value"], "count": int(term.get("count", 1)), "pos": term.get("pos")})
+            if len(batch) >= batch_size:
+                await flush()
+                batch = []
+        if batch:
+            await flush()
+
+        logger.info("content_terms_persisted", source=params["title"], **stats)
+        return stats
+
+
+async def _limit_bytes(chunks: AsyncIterator[bytes], max_bytes: int) -> AsyncIterator[bytes]:
+    total = 0
+    async for chunk in chunks:
+        total += len(chunk)
+        if total > max_bytes:
+            raise ContentTooLargeError(f"Content exceeds limit of {max_bytes} bytes")
+        yield chunk
+
+
+# Singleton instance
+content_ingestion_service = ContentIngestionService()
@@ -12,10 +12,17 @@ import uuid
 import asyncio
 
 from app.models.database_models import ConversationSession, ConversationMessage
+from app.services.analytics_rollup_service import analytics_rollup_service
 from app.services.embedding_service import EmbeddingService
+from app.utils.vector_storage import bind_limits, nearest_sql, vector_literal
 
 logger = structlog.get_logger()
 
+_MESSAGE_COLUMNS = (
+    "m.id, m.session_id, m.content, m.role, m.created_at, "
+    "s.title as session_title, s.session_type"
+)
+
 
 class ConversationService:
     """Service for managing conversation sessions and messages."""
@@ -52,6 +59,7 @@ class ConversationService:
             )
 
             db.add(session)
+            await analytics_rollup_service.record_session(db, user_id, session.created_at)
             await db.commit()
             await db.refresh(session)
 
@@ -159,6 +167,7 @@ class ConversationService:
                 elif role == "assistant":
                     session.ai_messages = (session.ai_messages or 0) + 1
                 session.updated_at = datetime.utcnow()
+                await analytics_rollup_service.record_message(db, session.user_id, role, message.created_at)
 
             await db.commit()
             await db.refresh(message)
@@ -230,9 +239,9 @@ class ConversationService:
             ]
             params = {
                 'user_id': user_id,
-                'query_embedding': query_embedding,
-                'limit': limit
+                'query_embedding': vector_literal(query_embedding),
             }
+            bind_limits(params, limit)
             
             if current_session_id:
                 where_clauses.append("m.session_id != :current_session_id")
@@ -248,22 +257,17 @@ class ConversationService:
             
             where_clause = " AND ".join(where_clauses)
             
-            sql = f"""
-            SELECT 
-                m.id,
-                m.session_id,
-                m.content,
-                m.role,
-                m.created_at,
-                s.title as session_title,
-                s.session_type,
-                1 - (m.content_embedding <=> :query_embedding) as similarity
-            FROM conversation_messages m
-            JOIN conversation_sessions s ON m.session_id = s.id
-            WHERE {where_clause}
-            ORDER BY m.content_embedding <=> :query_embedding
-            LIMIT :limit
-            """
+            # Index candidates re-ranked by exact distance (app/utils/vector_storage.py)
+            sql = nearest_sql(
+                select=_MESSAGE_COLUMNS,
+                from_where=f"""
+                FROM conversation_messages m
+                JOIN conversation_sessions s ON m.session_id = s.id
+                WHERE {where_clause}
+                """,
+                column="m.content_embedding",
+                param="query_embedding",
+            )
             
             result = await db.execute(text(sql), params)
             rows = result.fetchall()
@@ -319,9 +323,9 @@ class ConversationService:
             params = {
                 'user_id': user_id,
                 'query_text': query_text,
-                'query_embedding': query_embedding,
-                'limit': limit
+                'query_embedding': vector_literal(query_embedding),
             }
+            bind_limits(params, limit)
             
             if current_session_id:
                 common_filters.append("m.session_id != :current_session_id")
@@ -337,24 +341,25 @@ class ConversationService:
             
             common_where = " AND ".join(common_filters)
             
-            # Hybrid search with reciprocal rank fusion
-            sql = f"""
-            WITH vector_search AS (
-                SELECT 
-                    m.id,
-                    m.session_id,
-                    m.content,
-                    m.role,
-                    m.created_at,
-                    s.title as session_title,
-                    s.session_type,
-                    ROW_NUMBER() OVER (ORDER BY m.content_embedding <=> :query_embedding) as v_rank
+            vector_sql = nearest_sql(
+                select=_MESSAGE_COLUMNS,
+                from_where=f"""
                 FROM conversation_messages m
                 JOIN conversation_sessions s ON m.session_id = s.id
                 WHERE {common_where}
                 AND m.content_embedding IS NOT NULL
-                ORDER BY m.content_embedding <=> :query_embedding
-                LIMIT :limit
+                """,
+                column="m.content_embedding",
+                param="query_embedding",
+            )
+            
+            # Hybrid search with reciprocal rank fusion
+            sql = f"""
+            WITH vector_search AS (
+                SELECT 
+                    vn.*,
+                    ROW_NUMBER() OVER (ORDER BY vn.distance) as v_rank
+                FROM ({vector_sql}) vn
             ),
             text_search AS (
                 SELECT 
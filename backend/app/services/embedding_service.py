@@ -14,6 +14,7 @@ from google import genai
 
 from app.core.config import settings
 from app.db import get_neo4j_session, get_postgresql_session
+from app.utils.vector_storage import bind_limits, current_layout, nearest_sql, vector_literal
 
 logger = structlog.get_logger()
 
@@ -77,6 +78,38 @@ class EmbeddingService:
                         error=str(e))
             raise
     
+    async def generate_content_embeddings(
+        self,
+        texts: List[str],
+        provider: str = "openai"
+    ) -> List[List[float]]:
+        """
+        Generate embeddings for several texts, one API request for OpenAI.
+        
+        Args:
+            texts: Texts to embed (callers keep batches within the API input limit)
+            provider: AI provider ("openai" or "gemini")
+            
+        Returns:
+            Embeddings in the same order as `texts`
+        """
+        if not texts:
+            return []
+        if provider != "openai":
+            return [await self.generate_content_embedding(t, provider) for t in texts]
+        try:
+            response = await self.openai_client.embeddings.create(
+                model="text-embedding-3-small",
+                input=texts
+            )
+            return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+        except Exception as e:
+            logger.error("Failed to generate embeddings",
+                        count=len(texts),
+                        provider=provider,
+                        error=str(e))
+            raise
+    
     async def create_word_embedding_content(
         self, 
         word_data: Dict[str, Any]
@@ -213,22 +246,23 @@ class EmbeddingService:
             if not records:
                 break
             
+            # Words of this batch that already have an embedding (one query per batch)
+            existing_result = await postgresql_session.execute(
+                text("""
+                SELECT neo4j_node_id FROM knowledge_embeddings 
+                WHERE neo4j_node_id = ANY(:node_ids) AND node_type = 'word'
+                """),
+                {'node_ids': [r['kanji'] for r in records if r['kanji'] is not None]}
+            )
+            existing = {row[0] for row in existing_result.fetchall()}
+            
             # Process batch
             for record in records:
                 try:
                     word_data = dict(record)
                     stats['processed'] += 1
                     
-                    # Check if embedding already exists
-                    existing_check = await postgresql_session.execute(
-                        text("""
-                        SELECT id FROM knowledge_embeddings 
-                        WHERE neo4j_node_id = :node_id AND node_type = 'word'
-                        """),
-                        {'node_id': word_data['kanji']}
-                    )
-                    
-                    if existing_check.first():
+                    if word_data['kanji'] in existing:
                         stats['skipped'] += 1
                         continue
                     
@@ -243,18 +277,19 @@ class EmbeddingService:
                         text("""
                         INSERT INTO knowledge_embeddings 
                         (neo4j_node_id, node_type, content, embedding, language_code)
-                        VALUES (:node_id, :node_type, :content, :embedding, :language_code)
+                        VALUES (:node_id, :node_type, :content, """ + current_layout().query_vector("embedding") + """, :language_code)
                         """),
                         {
                             'node_id': word_data['kanji'],
                             'node_type': 'word',
                             'content': content,
-                            'embedding': embedding,
+                            'embedding': vector_literal(embedding),
                             'language_code': 'ja'
                         }
                     )
                     
                     stats['generated'] += 1
+                    existing.add(word_data['kanji'])
                     
                     if stats['generated'] % 50 == 0:
                         await postgresql_session.commit()
@@ -299,31 +334,22 @@ class EmbeddingService:
         query_embedding = await self.generate_content_embedding(query)
         
         # Build SQL query
-        where_clause = "WHERE 1=1"
-        params = {
-            'query_embedding': query_embedding,
-            'similarity_threshold': similarity_threshold,
-            'limit': limit
-        }
+        where_clause = "WHERE embedding IS NOT NULL"
+        params = {'query_embedding': vector_literal(query_embedding)}
+        bind_limits(params, limit)
         
         if node_types:
             where_clause += " AND node_type = ANY(:node_types)"
             params['node_types'] = node_types
         
-        sql = f"""
-        SELECT 
-            neo4j_node_id,
-            node_type,
-            content,
-            language_code,
-            1 - (embedding <=> :query_embedding) as similarity,
-            created_at
-        FROM knowledge_embeddings
-        {where_clause}
-        AND 1 - (embedding <=> :query_embedding) >= :similarity_threshold
-        ORDER BY embedding <=> :query_embedding
-        LIMIT :limit
-        """
+        # Nearest first, so the threshold is applied to the top `limit` rows
+        # instead of in WHERE, where it would prevent an index scan.
+        sql = nearest_sql(
+            select="neo4j_node_id, node_type, content, language_code, created_at",
+            from_where=f"FROM knowledge_embeddings {where_clause}",
+            column="embedding",
+            param="query_embedding",
+        )
         
         result = await postgresql_session.execute(text(sql), params)
         
@@ -336,6 +362,7 @@ class EmbeddingService:
                 'language_code': row.language_code
             }
             for row in result.fetchall()
+            if float(row.similarity) >= similarity_threshold
         ]
     
     async def find_similar_words(
@@ -369,23 +396,23 @@ class EmbeddingService:
             return []
         
         # Find similar words
+        params = {
+            'word_embedding': vector_literal(word_embedding),
+            'word_id': word_id,
+        }
+        bind_limits(params, limit)
         result = await postgresql_session.execute(
-            text("""
-            SELECT 
-                neo4j_node_id,
-                content,
-                1 - (embedding <=> :word_embedding) as similarity
-            FROM knowledge_embeddings
-            WHERE node_type = 'word' 
-            AND neo4j_node_id != :word_id
-            ORDER BY embedding <=> :word_embedding
-            LIMIT :limit
-            """),
-            {
-                'word_embedding': word_embedding,
-                'word_id': word_id,
-                'limit': limit
-            }
+            text(nearest_sql(
+                select="neo4j_node_id, content",
+                from_where="""
+                FROM knowledge_embeddings
+                WHERE node_type = 'word'
+                AND neo4j_node_id != :word_id
+                """,
+                column="embedding",
+                param="word_embedding",
+            )),
+            params
         )
         
         return [
@@ -421,16 +448,16 @@ class EmbeddingService:
             embedding = await self.generate_content_embedding(content, provider)
             
             # Store in conversation_messages table
-            # pgvector accepts list directly - asyncpg handles conversion
+            # Sent as pgvector text input, cast to the configured storage type
             await postgresql_session.execute(
-                text("""
+                text(f"""
                 UPDATE conversation_messages 
-                SET content_embedding = :embedding::vector
-                WHERE id = :message_id::uuid
+                SET content_embedding = {current_layout().query_vector("embedding")}
+                WHERE id = CAST(:message_id AS uuid)
                 """),
                 {
                     'message_id': message_id,
-                    'embedding': embedding  # Pass list directly - asyncpg handles it
+                    'embedding': vector_literal(embedding)
                 }
             )
             
@@ -10,6 +10,7 @@ from typing import List, Optional, Dict, Any
 from neo4j import AsyncSession
 import logging
 
+from app.services.graph_statistics_service import graph_statistics
 from app.utils.romaji import prettify_romaji_template
 
 logger = logging.getLogger(__name__)
@@ -494,62 +495,41 @@ class GrammarService:
             logger.error(f"Error retrieving JFS categories: {e}")
             raise
     
-    async def get_graph_statistics(self) -> Dict[str, Any]:
-        """Get comprehensive statistics about the grammar graph"""
+    async def get_graph_statistics(self, fresh: bool = False) -> Dict[str, Any]:
+        """
+        Get comprehensive statistics about the grammar graph.
+
+        Served from graph_statistics_service: node and relationship counts come
+        from the count store (nodes are keyed by single label), grammar
+        aggregates are cached and refreshed in the background.
+
+        Args:
+            fresh: Recompute instead of serving cached statistics
+        """
         
         try:
-            # Node counts
-            node_query = """
-            MATCH (n)
-            RETURN DISTINCT labels(n) as node_labels, count(n) as count
-            ORDER BY count DESC
-            """
-            
-            node_result = await self.session.run(node_query)
-            node_stats = {}
-            async for record in node_result:
-                labels = ', '.join(record['node_labels'])
-                node_stats[labels] = record['count']
-            
-            # Relationship counts
-            rel_query = """
-            MATCH ()-[r]->()
-            RETURN type(r) as relationship_type, count(r) as count
-            ORDER BY count DESC
-            """
-            
-            rel_result = await self.session.run(rel_query)
-            relationship_stats = {}
-            total_relationships = 0
-            
-            async for record in rel_result:
-                rel_type = record['relationship_type']
-                count = record['count']
-                relationship_stats[rel_type] = count
-                total_relationships += count
-            
-            # Grammar-specific stats
-            grammar_query = """
-            MATCH (g:GrammarPattern)
-            RETURN count(g) as total_patterns,
-                   count(DISTINCT g.textbook) as textbook_levels,
-                   count(DISTINCT g.classification) as classifications,
-                   count(DISTINCT g.jfs_category) as jfs_categories
-            """
+            counts = await graph_statistics.get("counts", self.session, fresh=fresh)
+            grammar = await graph_statistics.get("grammar", self.session, fresh=fresh)
             
-            grammar_result = await self.session.run(grammar_query)
-            grammar_stats = dict(await grammar_result.single())
+            node_stats = counts["data"]["labels"]
+            relationship_stats = counts["data"]["relationship_types"]
+            total_nodes = counts["data"]["total_nodes"]
+            total_relationships = counts["data"]["total_relationships"]
+            oldest = max((counts, grammar), key=lambda r: r["age_seconds"])
             
             return {
                 "nodes": node_stats,
                 "relationships": relationship_stats,
                 "total_relationships": total_relationships,
-                "grammar_specific": grammar_stats,
+                "grammar_specific": grammar["data"],
                 "graph_health": {
-                    "total_nodes": sum(node_stats.values()),
+                    "total_nodes": total_nodes,
                     "total_relationships": total_relationships,
-                    "connectivity_ratio": total_relationships / sum(node_stats.values()) if sum(node_stats.values()) > 0 else 0
-                }
+                    "connectivity_ratio": total_relationships / total_nodes if total_nodes > 0 else 0
+                },
+                "computed_at": oldest["computed_at"],
+                "age_seconds": oldest["age_seconds"],
+                "stale": counts["stale"] or grammar["stale"],
             }
             
         except Exception as e:
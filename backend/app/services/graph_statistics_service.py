@@ -0,0 +1,335 @@
+"""
+Graph Statistics Service
+
+Cached Neo4j statistics for the admin dashboards (`/lexical-network/stats`,
+`/grammar/stats`). Reports come in two kinds:
+
+- ``counts``: node counts per label and relationship counts per type. Each is
+  a single-label ``MATCH (n:Label) RETURN count(n)`` or single-type
+  ``MATCH ()-[r:TYPE]->() RETURN count(r)`` query, which Neo4j answers from
+  its count store without touching the graph.
+- ``lexical_network`` and ``grammar``: property distributions, degree and
+  coverage metrics that scan Word / GrammarPattern nodes.
+
+Every report is served stale-while-revalidate: a report older than its TTL is
+returned as-is (flagged ``stale``) while one background task recomputes it,
+and only the very first request (or an explicit ``fresh=True``) waits for the
+query. Responses carry ``computed_at`` and ``age_seconds`` so dashboards can
+show how current the numbers are. With ``GRAPH_STATS_BACKGROUND_REFRESH`` the
+expensive reports are also recomputed on a timer, so polling dashboards never
+trigger the scans themselves.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+_LEXICAL_NETWORK_QUERIES = {
+    "pos_distribution": """
+        MATCH (w:Word)
+        WHERE coalesce(w.pos_primary_norm, w.pos_primary) IS NOT NULL
+        RETURN coalesce(w.pos_primary_norm, w.pos_primary) AS pos, count(*) AS count
+        ORDER BY count DESC
+    """,
+    "difficulty_distribution": """
+        MATCH (w:Word)
+        WHERE w.difficulty IS NOT NULL OR w.difficulty_numeric IS NOT NULL
+        RETURN coalesce(w.difficulty, 'Unknown') AS difficulty, count(*) AS count
+        ORDER BY count DESC
+    """,
+    "relations_by_pos": """
+        MATCH (w:Word)-[r:LEXICAL_RELATION|SYNONYM_OF|SIMILAR_TO]-()
+        WHERE coalesce(w.pos_primary_norm, w.pos_primary) IS NOT NULL
+        RETURN coalesce(w.pos_primary_norm, w.pos_primary) AS pos, type(r) AS rel_type, count(r) AS count
+        ORDER BY count DESC
+    """,
+    "words_without_relations": """
+        MATCH (w:Word)
+        WHERE NOT (w)-[:LEXICAL_RELATION|SYNONYM_OF|SIMILAR_TO]-()
+        RETURN count(w) AS count
+    """,
+    "most_connected_words": """
+        MATCH (w:Word)-[r:LEXICAL_RELATION|SYNONYM_OF|SIMILAR_TO]-()
+        WITH w, count(r) AS rel_count
+        ORDER BY rel_count DESC
+        LIMIT 10
+        RETURN coalesce(w.standard_orthography, w.kanji) AS word,
+               w.translation AS translation,
+               coalesce(w.pos_primary_norm, w.pos_primary) AS pos,
+               rel_count
+    """,
+    "relations_by_type": """
+        MATCH ()-[r:LEXICAL_RELATION]->()
+        RETURN r.relation_type AS type, count(*) AS count
+    """,
+}
+
+_GRAMMAR_QUERY = """
+MATCH (g:GrammarPattern)
+RETURN count(g) as total_patterns,
+       count(DISTINCT g.textbook) as textbook_levels,
+       count(DISTINCT g.classification) as classifications,
+       count(DISTINCT g.jfs_category) as jfs_categories
+"""
+
+
+def _quote(name: str) -> str:
+    """Backtick-quote a label or relationship type for interpolation into Cypher."""
+    return "`" + name.replace("`", "``") + "`"
+
+
+async def _records(session, query: str) -> List[Dict[str, Any]]:
+    result = await session.run(query)
+    return [dict(r) for r in await result.data()]
+
+
+async def compute_counts(session) -> Dict[str, Any]:
+    """
+    Label and relationship-type counts from the count store.
+
+    Args:
+        session: Neo4j async session
+
+    Returns:
+        ``labels`` and ``relationship_types`` (name -> count, non-zero only),
+        ``total_nodes`` and ``total_relationships``
+    """
+    labels_rows = await _records(session, "CALL db.labels() YIELD label RETURN label")
+    types_rows = await _records(
+        session, "CALL db.relationshipTypes() YIELD relationshipType RETURN relationshipType"
+    )
+
+    labels: Dict[str, int] = {}
+    for row in labels_rows:
+        rows = await _records(session, f"MATCH (n:{_quote(row['label'])}) RETURN count(n) AS count")
+        if rows and rows[0]["count"]:
+            labels[row["label"]] = rows[0]["count"]
+
+    relationship_types: Dict[str, int] = {}
+    for row in types_rows:
+        rel_type = row["relationshipType"]
+        rows = await _records(session, f"MATCH ()-[r:{_quote(rel_type)}]->() RETURN count(r) AS count")
+        if rows and rows[0]["count"]:
+            relationship_types[rel_type] = rows[0]["count"]
+
+    total_nodes = (await _records(session, "MATCH (n) RETURN count(n) AS count"))[0]["count"]
+    total_relationships = (await _records(session, "MATCH ()-[r]->() RETURN count(r) AS count"))[0]["count"]
+    return {
+        "labels": dict(sorted(labels.items(), key=lambda kv: kv[1], reverse=True)),
+        "relationship_types": dict(sorted(relationship_types.items(), key=lambda kv: kv[1], reverse=True)),
+        "total_nodes": total_nodes,
+        "total_relationships": total_relationships,
+    }
+
+
+async def compute_lexical_network(session) -> Dict[str, Any]:
+    """
+    Word distributions, lexical degree and coverage metrics (full scans).
+
+    Args:
+        session: Neo4j async session
+
+    Returns:
+        Fields of ``NetworkStats`` that the count store cannot answer
+    """
+    rows = {name: await _records(session, query) for name, query in _LEXICAL_NETWORK_QUERIES.items()}
+
+    relations_by_pos: Dict[str, Dict[str, int]] = {}
+    for record in rows["relations_by_pos"]:
+        relations_by_pos.setdefault(record["pos"], {})[record["rel_type"]] = record["count"]
+
+    return {
+        "pos_distribution": {r["pos"]: r["count"] for r in rows["pos_distribution"] if r["pos"]},
+        "difficulty_distribution": {r["difficulty"]: r["count"] for r in rows["difficulty_distribution"]},
+        "relations_by_pos": relations_by_pos,
+        "words_without_relations": rows["words_without_relations"][0]["count"],
+        "most_connected_words": rows["most_connected_words"],
+        "relations_by_type": {r["type"]: r["count"] for r in rows["relations_by_type"] if r["type"]},
+    }
+
+
+async def compute_grammar(session) -> Dict[str, Any]:
+    """
+    GrammarPattern aggregates (distinct textbook levels, classifications, categories).
+
+    Args:
+        session: Neo4j async session
+
+    Returns:
+        Grammar-specific statistics
+    """
+    rows = await _records(session, _GRAMMAR_QUERY)
+    return rows[0] if rows else {}
+
+
+@dataclass
+class _Report:
+    """One computed report and when it was produced."""
+
+    data: Dict[str, Any]
+    computed_at: datetime
+    loaded_at: float  # time.monotonic()
+    duration_ms: float
+
+
+class GraphStatisticsService:
+    """Serves graph statistics reports stale-while-revalidate."""
+
+    def __init__(self, ttl_seconds: Optional[float] = None, counts_ttl_seconds: Optional[float] = None):
+        self._computers: Dict[str, Callable[[Any], Awaitable[Dict[str, Any]]]] = {
+            "counts": compute_counts,
+            "lexical_network": compute_lexical_network,
+            "grammar": compute_grammar,
+        }
+        ttl = settings.GRAPH_STATS_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        counts_ttl = settings.GRAPH_STATS_COUNTS_TTL_SECONDS if counts_ttl_seconds is None else counts_ttl_seconds
+        self._ttl: Dict[str, float] = {"counts": counts_ttl, "lexical_network": ttl, "grammar": ttl}
+        self._reports: Dict[str, _Report] = {}
+        self._locks: Dict[str, asyncio.Lock] = {name: asyncio.Lock() for name in self._computers}
+        self._refresh_tasks: Dict[str, asyncio.Task] = {}
+        self._loop_task: Optional[asyncio.Task] = None
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "refresh_failures": 0}
+
+    def _is_stale(self, name: str, report: _Report) -> bool:
+        ttl = self._ttl[name]
+        return bool(ttl) and time.monotonic() - report.loaded_at > ttl
+
+    async def _compute(self, name: str, session=None, force: bool = False) -> _Report:
+        async with self._locks[name]:
+            # Another caller may have finished the same report while we waited.
+            report = self._reports.get(name)
+            if report is not None and not force and not self._is_stale(name, report):
+                return report
+            started = time.perf_counter()
+            if session is not None:
+                data = await self._computers[name](session)
+            else:
+                from app import db
+
+                if db.neo4j_driver is None:
+                    raise RuntimeError("Neo4j driver not initialized")
+                async with db.neo4j_driver.session() as own_session:
+                    data = await self._computers[name](own_session)
+            report = _Report(
+                data=data,
+                computed_at=datetime.now(timezone.utc),
+                loaded_at=time.monotonic(),
+                duration_ms=round((time.perf_counter() - started) * 1000, 1),
+            )
+            self._reports[name] = report
+            self._stats["refreshes"] += 1
+            logger.info("Graph statistics computed", report=name, elapsed_ms=report.duration_ms)
+            return report
+
+    async def _refresh_in_background(self, name: str) -> None:
+        try:
+            await self._compute(name)
+        except Exception as e:
+            self._stats["refresh_failures"] += 1
+            logger.warning("Graph statistics refresh failed", report=name, error=str(e))
+
+    def _schedule_refresh(self, name: str) -> None:
+        task = self._refresh_tasks.get(name)
+        if task is None or task.done():
+            self._refresh_tasks[name] = asyncio.create_task(self._refresh_in_background(name))
+
+    async def get(self, name: str, session=None, fresh: bool = False) -> Dict[str, Any]:
+        """
+        Return a report, recomputing it inline only when missing or forced.
+
+        Args:
+            name: ``counts``, ``lexical_network`` or ``grammar``
+            session: Neo4j session to use for an inline computation (a fresh
+                driver session is opened when omitted)
+            fresh: Recompute now instead of serving the cached report
+
+        Returns:
+            ``data`` plus freshness metadata: ``computed_at`` (ISO 8601, UTC),
+            ``age_seconds``, ``stale`` and ``refreshing``
+
+        Raises:
+            KeyError: If the report name is unknown
+        """
+        if name not in self._computers:
+            raise KeyError(name)
+        report = self._reports.get(name)
+        refreshing = False
+        if report is None or fresh:
+            self._stats["misses"] += 1
+            report = await self._compute(name, session, force=fresh)
+            stale = False
+        else:
+            stale = self._is_stale(name, report)
+            if stale:
+                self._stats["stale_hits"] += 1
+                self._schedule_refresh(name)
+                refreshing = True
+            else:
+                self._stats["hits"] += 1
+        return {
+            "data": report.data,
+            "computed_at": report.computed_at.isoformat(),
+            "age_seconds": round(time.monotonic() - report.loaded_at, 1),
+            "stale": stale,
+            "refreshing": refreshing,
+        }
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """Drop one report (or all); the next request recomputes it inline."""
+        if name is None:
+            self._reports.clear()
+        else:
+            self._reports.pop(name, None)
+
+    async def _refresh_loop(self, interval: float) -> None:
+        while True:
+            for name in ("counts", "lexical_network", "grammar"):
+                await self._refresh_in_background(name)
+            await asyncio.sleep(interval)
+
+    def start(self, interval_seconds: Optional[float] = None) -> None:
+        """Start the periodic background refresher (idempotent)."""
+        if self._loop_task is not None and not self._loop_task.done():
+            return
+        interval = interval_seconds or self._ttl["lexical_network"] or 900
+        self._loop_task = asyncio.create_task(self._refresh_loop(interval))
+
+    async def stop(self) -> None:
+        """Cancel the background refresher and any in-flight refresh."""
+        tasks = [t for t in [self._loop_task, *self._refresh_tasks.values()] if t is not None and not t.done()]
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._loop_task = None
+        self._refresh_tasks.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/refresh counters plus age and compute time per report."""
+        now = time.monotonic()
+        return {
+            **self._stats,
+            "reports": {
+                name: {
+                    "computed_at": report.computed_at.isoformat(),
+                    "age_seconds": round(now - report.loaded_at, 1),
+                    "duration_ms": report.duration_ms,
+                }
+                for name, report in self._reports.items()
+            },
+        }
+
+
+# Singleton instance
+graph_statistics = GraphStatisticsService()
@@ -0,0 +1,369 @@
+"""
+Per-session working set for guided dialogue turns.
+
+A guided dialogue turn needs the session's lesson package (immutable for the
+life of the session) and its `guided_state`. Loading both from
+`lesson_sessions` on every turn means re-reading and parsing a lesson_plan of
+several hundred KB. This module keeps them in a bounded in-process cache keyed
+by session id and persists only the delta of each turn:
+
+- The first turn of a session on a worker loads the row (and the lesson from
+  `lesson_versions_assembled` when `package_json` is empty); later turns are
+  served from memory. A lesson taken from `lesson_versions_assembled` is only
+  cached once it has a guided dialogue card, and is re-checked against the
+  latest lesson version on every turn, so a recompiled lesson is picked up.
+- Turn records are queued on the entry and flushed write-behind, coalesced per
+  session, as one small UPDATE that appends them to
+  `guided_state->'history'` server-side and sets `guided_stage_idx`.
+- Every flush compares the row's previous `updated_at` with the one this
+  worker last saw. A mismatch means another writer touched the session (a
+  flush endpoint, another worker), so the entry is evicted and the next turn
+  reloads authoritative state.
+- `affinity_id` identifies this worker; endpoints return it as a sticky
+  routing hint so a load balancer can keep a session on the worker that holds
+  its working set.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import socket
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import structlog
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import db
+from app.core.config import settings
+from app.utils.bounded_cache import BoundedCache, json_size
+
+logger = structlog.get_logger()
+
+# Response header carrying the sticky routing hint.
+AFFINITY_HEADER = "X-Session-Affinity"
+
+
+@dataclass
+class GuidedWorkingSet:
+    """In-memory view of one lesson session's guided dialogue."""
+
+    session_id: str
+    can_do_id: Optional[str]
+    lesson: Optional[Dict[str, Any]]
+    guided_state: Dict[str, Any]
+    stage_idx: Optional[int]
+    # Lesson id and version of a lesson read from lesson_versions_assembled;
+    # None when the lesson comes from the session's own package_json.
+    lesson_id: Optional[int] = None
+    lesson_version: Optional[int] = None
+    # lesson_sessions.updated_at as last read or written by this worker.
+    synced_at: Optional[datetime] = None
+    pending_turns: List[Dict[str, Any]] = field(default_factory=list)
+    pending_stage_idx: Optional[int] = None
+    size: int = 0
+    flush_lock: asyncio.Lock = field(default_factory=asyncio.Lock, repr=False)
+
+
+class GuidedSessionWorkingSetService:
+    """Caches guided dialogue sessions and writes their state deltas behind."""
+
+    def __init__(self) -> None:
+        self._entries: BoundedCache[GuidedWorkingSet] = BoundedCache(
+            "guided_session_working_set",
+            max_entries=settings.GUIDED_WORKING_SET_MAX_ENTRIES,
+            ttl_seconds=settings.GUIDED_WORKING_SET_TTL,
+            max_bytes=settings.GUIDED_WORKING_SET_MAX_BYTES,
+            sizeof=lambda entry: entry.size,
+        )
+        self._write_behind_seconds = settings.GUIDED_STATE_WRITE_BEHIND_SECONDS
+        self._flush_tasks: Dict[str, asyncio.Task] = {}
+        # Entries with unflushed turns, kept even if the cache evicts them.
+        self._pending: Dict[str, GuidedWorkingSet] = {}
+        self._counters = {"flushes": 0, "flushed_turns": 0, "flush_errors": 0, "conflicts": 0}
+        host = f"{socket.gethostname()}:{os.getpid()}"
+        self.affinity_id = hashlib.sha1(host.encode("utf-8")).hexdigest()[:12]
+
+    async def load(self, pg: AsyncSession, session_id: str) -> Optional[GuidedWorkingSet]:
+        """
+        Return the working set for a session, loading it on a miss.
+
+        Args:
+            pg: Postgres session used on a miss.
+            session_id: Lesson session id.
+
+        Returns:
+            Optional[GuidedWorkingSet]: None when the session does not exist.
+            `lesson` is None when no lesson is available yet; such entries,
+            and lessons without a guided dialogue card, are not cached.
+        """
+        entry = self._entries.get(session_id)
+        if entry is not None:
+            if entry.lesson_version is None or entry.lesson_version == await self._latest_version(pg, entry.can_do_id):
+                return entry
+            # The lesson was recompiled since this entry was loaded.
+            self._entries.pop(session_id)
+
+        pending = self._pending.get(session_id)
+        if pending is not None:
+            # Write unflushed turns first so the reloaded history includes them.
+            await self._flush_entry(pg, pending)
+
+        result = await pg.execute(
+            text("""
+                SELECT can_do_id, guided_stage_idx, guided_state, package_json, updated_at
+                FROM lesson_sessions
+                WHERE id = :session_id
+            """),
+            {"session_id": session_id},
+        )
+        row = result.fetchone()
+        if not row:
+            return None
+        can_do_id, stage_idx, guided_state_raw, package_json_raw, updated_at = row
+
+        lesson = None
+        lesson_id = lesson_version = None
+        if package_json_raw:
+            package = json.loads(package_json_raw) if isinstance(package_json_raw, str) else package_json_raw
+            lesson = package.get("lesson")
+        if not lesson and can_do_id:
+            lesson_result = await pg.execute(
+                text("""
+                    SELECT lv.lesson_plan, lv.lesson_id, lv.version
+                    FROM lessons l
+                    JOIN lesson_versions_assembled lv ON l.id = lv.lesson_id
+                    WHERE l.can_do_id = :can_do_id
+                    ORDER BY lv.version DESC
+                    LIMIT 1
+                """),
+                {"can_do_id": can_do_id},
+            )
+            lesson_row = lesson_result.fetchone()
+            if lesson_row and lesson_row[0]:
+                lesson_plan = lesson_row[0]
+                if isinstance(lesson_plan, str):
+                    lesson_plan = json.loads(lesson_plan)
+                lesson = lesson_plan.get("lesson", lesson_plan)
+                lesson_id, lesson_version = int(lesson_row[1]), int(lesson_row[2])
+
+        entry = GuidedWorkingSet(
+            session_id=session_id,
+            can_do_id=can_do_id,
+            lesson=lesson,
+            guided_state=_parse_state(guided_state_raw),
+            stage_idx=stage_idx,
+            lesson_id=lesson_id,
+            lesson_version=lesson_version,
+            synced_at=updated_at,
+        )
+        # A lesson still being compiled may not have its guided dialogue yet.
+        if lesson and (lesson_version is None or (lesson.get("cards") or {}).get("guided_dialogue")):
+            entry.size = json_size(lesson) + json_size(entry.guided_state)
+            self._entries.set(session_id, entry)
+        return entry
+
+    async def record_turn(
+        self,
+        pg: AsyncSession,
+        entry: GuidedWorkingSet,
+        turn_record: Dict[str, Any],
+        new_stage_idx: int,
+    ) -> None:
+        """
+        Apply a turn to the working set and persist its delta.
+
+        With write-behind enabled the delta is flushed from a background task
+        shortly afterwards (coalescing turns that arrive meanwhile); otherwise,
+        or when the entry is not cached, it is written inline through `pg`.
+
+        Args:
+            pg: Request Postgres session, used for inline writes.
+            entry: Working set returned by `load`.
+            turn_record: Turn appended to `guided_state['history']`.
+            new_stage_idx: Stage index after this turn.
+        """
+        entry.guided_state.setdefault("history", []).append(turn_record)
+        entry.stage_idx = new_stage_idx
+        entry.pending_turns.append(turn_record)
+        entry.pending_stage_idx = new_stage_idx
+
+        cached = self._entries.get(entry.session_id, record=False) is entry
+        if not cached or self._write_behind_seconds <= 0 or db.AsyncSessionLocal is None:
+            await self._flush_entry(pg, entry)
+            return
+        self._pending[entry.session_id] = entry
+        if entry.session_id not in self._flush_tasks:
+            self._flush_tasks[entry.session_id] = asyncio.create_task(self._flush_later(entry))
+
+    def invalidate(self, session_id: str) -> None:
+        """
+        Drop a session's working set and any turns not yet flushed.
+
+        Called when guided state is reset, so pending turns from before the
+        reset are not appended after it.
+        """
+        for entry in (self._entries.pop(session_id), self._pending.pop(session_id, None)):
+            if entry is not None:
+                entry.pending_turns.clear()
+                entry.pending_stage_idx = None
+        task = self._flush_tasks.pop(session_id, None)
+        if task is not None:
+            task.cancel()
+
+    def invalidate_lesson(self, lesson_id: int) -> int:
+        """
+        Drop entries serving a lesson read from lesson_versions_assembled.
+
+        Called when a version of the lesson is compiled or a stage is stored.
+        Unflushed turns are kept and written before the session is reloaded.
+
+        Returns:
+            int: Number of entries dropped.
+        """
+        dropped = 0
+        for session_id in list(self._entries.keys()):
+            entry = self._entries.get(session_id, record=False)
+            if entry is not None and entry.lesson_id == lesson_id:
+                self._entries.pop(session_id)
+                dropped += 1
+        return dropped
+
+    async def flush_all(self) -> int:
+        """
+        Flush every pending delta now (used on shutdown).
+
+        Returns:
+            int: Number of sessions flushed.
+        """
+        tasks = list(self._flush_tasks.values())
+        self._flush_tasks.clear()
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        pending = [entry for entry in self._pending.values() if entry.pending_turns]
+        self._pending.clear()
+        if not pending or db.AsyncSessionLocal is None:
+            return 0
+        flushed = 0
+        async with db.AsyncSessionLocal() as pg:
+            for entry in pending:
+                try:
+                    await self._flush_entry(pg, entry)
+                    flushed += 1
+                except Exception as e:
+                    await pg.rollback()
+                    logger.warning("guided_state_flush_failed", session_id=entry.session_id, error=str(e))
+        return flushed
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache and write-behind counters."""
+        return {
+            **self._entries.stats(),
+            **self._counters,
+            "pending_sessions": len(self._pending),
+            "affinity_id": self.affinity_id,
+        }
+
+    async def _latest_version(self, pg: AsyncSession, can_do_id: Optional[str]) -> Optional[int]:
+        result = await pg.execute(
+            text("""
+                SELECT MAX(lv.version)
+                FROM lessons l
+                JOIN lesson_versions lv ON l.id = lv.lesson_id
+                WHERE l.can_do_id = :can_do_id
+            """),
+            {"can_do_id": can_do_id},
+        )
+        row = result.fetchone()
+        return int(row[0]) if row and row[0] is not None else None
+
+    async def _flush_later(self, entry: GuidedWorkingSet) -> None:
+        try:
+            await asyncio.sleep(self._write_behind_seconds)
+            # Turns recorded from here on schedule a new flush.
+            self._flush_tasks.pop(entry.session_id, None)
+            async with db.AsyncSessionLocal() as pg:
+                await self._flush_entry(pg, entry)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.warning("guided_state_write_behind_failed", session_id=entry.session_id, error=str(e))
+
+    async def _flush_entry(self, pg: AsyncSession, entry: GuidedWorkingSet) -> None:
+        async with entry.flush_lock:
+            if self._pending.get(entry.session_id) is entry:
+                del self._pending[entry.session_id]
+            if not entry.pending_turns:
+                return
+            turns = list(entry.pending_turns)
+            stage_idx = entry.pending_stage_idx
+            del entry.pending_turns[: len(turns)]
+            try:
+                result = await pg.execute(
+                    text("""
+                        WITH prev AS (
+                            SELECT updated_at FROM lesson_sessions WHERE id = :session_id FOR UPDATE
+                        )
+                        UPDATE lesson_sessions AS s
+                        SET guided_stage_idx = :stage_idx,
+                            guided_state = jsonb_set(
+                                COALESCE(s.guided_state, '{}'::jsonb),
+                                '{history}',
+                                COALESCE(s.guided_state->'history', '[]'::jsonb) || CAST(:turns AS jsonb)
+                            ),
+                            updated_at = CURRENT_TIMESTAMP
+                        FROM prev
+                        WHERE s.id = :session_id
+                        RETURNING prev.updated_at, s.updated_at
+                    """),
+                    {
+                        "session_id": entry.session_id,
+                        "stage_idx": stage_idx,
+                        "turns": json.dumps(turns, ensure_ascii=False),
+                    },
+                )
+                row = result.fetchone()
+                await pg.commit()
+            except Exception:
+                # Keep the turns for the next flush of this session.
+                entry.pending_turns[:0] = turns
+                self._pending.setdefault(entry.session_id, entry)
+                self._counters["flush_errors"] += 1
+                raise
+
+            self._counters["flushes"] += 1
+            self._counters["flushed_turns"] += len(turns)
+            if row is None:
+                # Session deleted underneath us.
+                if self._entries.get(entry.session_id, record=False) is entry:
+                    self._entries.pop(entry.session_id)
+                return
+            previous, current = row[0], row[1]
+            if entry.synced_at is not None and previous != entry.synced_at:
+                self._counters["conflicts"] += 1
+                logger.info("guided_working_set_conflict", session_id=entry.session_id)
+                if self._entries.get(entry.session_id, record=False) is entry:
+                    self._entries.pop(entry.session_id)
+            entry.synced_at = current
+
+
+def _parse_state(raw: Any) -> Dict[str, Any]:
+    if isinstance(raw, dict):
+        return raw
+    if isinstance(raw, str) and raw:
+        try:
+            parsed = json.loads(raw)
+            return parsed if isinstance(parsed, dict) else {}
+        except json.JSONDecodeError:
+            return {}
+    return {}
+
+
+# Singleton instance
+guided_working_set = GuidedSessionWorkingSetService()
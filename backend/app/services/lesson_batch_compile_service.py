@@ -0,0 +1,333 @@
+"""
+In-process batch lesson compiler.
+
+Compiles many CanDo lessons with `compile_lessonroot` from a bounded work
+queue instead of one HTTP request per lesson. Concurrency is capped twice:
+`concurrency` workers each hold one Postgres and one Neo4j session, and a
+shared semaphore (`llm_call_limiter`) caps in-flight LLM calls across all
+workers. Compiles share the pooled OpenAI client, the plan cache and the
+lesson card cache. Progress is checkpointed to a JSON file after every
+lesson, so an interrupted run resumes where it stopped, and each job
+produces a throughput/latency report.
+"""
+
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import structlog
+
+from app import db
+from app.core.config import settings
+from app.services import cando_v2_compile_service as compile_service
+
+logger = structlog.get_logger()
+
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+# Item statuses that a resumed job does not compile again.
+DONE_ITEM_STATUSES = ("completed", "skipped")
+# Base of the exponential backoff between attempts of one lesson.
+RETRY_BACKOFF_SECONDS = 2.0
+
+
+@dataclass
+class BatchCompileItem:
+    """Progress of one lesson in a batch."""
+
+    can_do_id: str
+    status: str = "pending"
+    attempts: int = 0
+    lesson_id: Optional[int] = None
+    version: Optional[int] = None
+    duration_s: Optional[float] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class BatchCompileJob:
+    """Internal batch job representation."""
+
+    id: str
+    items: Dict[str, BatchCompileItem]
+    metalanguage: str = "en"
+    model: str = "gpt-4.1"
+    fast_model: Optional[str] = None
+    concurrency: int = 4
+    llm_concurrency: int = 8
+    max_attempts: int = 2
+    bypass_card_cache: bool = False
+    checkpoint_path: Optional[Path] = None
+    status: str = "pending"
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    cancel_requested: bool = False
+
+    def report(self) -> Dict[str, Any]:
+        """Return status counts, throughput and latency percentiles."""
+        items = list(self.items.values())
+        counts: Dict[str, int] = {}
+        for item in items:
+            counts[item.status] = counts.get(item.status, 0) + 1
+        durations = sorted(i.duration_s for i in items if i.status == "completed" and i.duration_s is not None)
+        if self.started_at:
+            elapsed = ((self.completed_at or datetime.utcnow()) - self.started_at).total_seconds()
+        else:
+            elapsed = 0.0
+
+        def pct(p: float) -> Optional[float]:
+            if not durations:
+                return None
+            return round(durations[min(len(durations) - 1, int(p * len(durations)))], 2)
+
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "total": len(items),
+            "counts": counts,
+            "elapsed_s": round(elapsed, 1),
+            "lessons_per_hour": round(len(durations) * 3600.0 / elapsed, 2) if elapsed > 0 else None,
+            "latency_s": {
+                "mean": round(statistics.fmean(durations), 2) if durations else None,
+                "p50": pct(0.5),
+                "p90": pct(0.9),
+                "max": round(durations[-1], 2) if durations else None,
+            },
+            "concurrency": self.concurrency,
+            "llm_concurrency": self.llm_concurrency,
+            "checkpoint": str(self.checkpoint_path) if self.checkpoint_path else None,
+            "failures": [
+                {"can_do_id": i.can_do_id, "attempts": i.attempts, "error": i.error}
+                for i in items if i.status == "failed"
+            ],
+        }
+
+
+class LessonBatchCompiler:
+    """Creates, runs and tracks batch compile jobs."""
+
+    def __init__(self) -> None:
+        self.jobs: Dict[str, BatchCompileJob] = {}
+        self.running_tasks: Dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    def checkpoint_dir() -> Path:
+        """BATCH_COMPILE_CHECKPOINT_DIR, resolved against backend/."""
+        directory = Path(settings.BATCH_COMPILE_CHECKPOINT_DIR)
+        if not directory.is_absolute():
+            directory = Path(__file__).resolve().parents[2] / directory
+        return directory
+
+    async def resolve_can_do_ids(
+        self,
+        neo: Any,
+        can_do_ids: Optional[Sequence[str]] = None,
+        levels: Optional[Sequence[str]] = None,
+        limit: Optional[int] = None,
+    ) -> List[str]:
+        """
+        Expand explicit ids and/or level filters into an ordered id list.
+
+        Args:
+            neo: Neo4j session
+            can_do_ids: Explicit CanDo ids (kept in the given order)
+            levels: CEFR levels such as ["A1", "A2", "B1"]
+            limit: Optional cap on the number of ids
+
+        Returns:
+            De-duplicated CanDo ids
+        """
+        ids: List[str] = list(can_do_ids or [])
+        if levels:
+            result = await neo.run(
+                "MATCH (c:CanDoDescriptor) WHERE toString(c.level) IN $levels "
+                "RETURN c.uid AS uid ORDER BY toString(c.level), c.uid",
+                levels=[lvl.upper() for lvl in levels],
+            )
+            ids.extend([record["uid"] async for record in result])
+        ids = list(dict.fromkeys(i for i in ids if i))
+        return ids[:limit] if limit else ids
+
+    def create_job(
+        self,
+        can_do_ids: Sequence[str],
+        *,
+        metalanguage: str = "en",
+        model: str = "gpt-4.1",
+        fast_model: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        llm_concurrency: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        bypass_card_cache: bool = False,
+        checkpoint_path: Optional[str] = None,
+    ) -> BatchCompileJob:
+        """
+        Create a job; lessons completed in an existing checkpoint are marked skipped.
+
+        Args:
+            can_do_ids: CanDo ids to compile
+            metalanguage: Lesson metalanguage
+            model: Main LLM model
+            fast_model: Optional fast model override
+            concurrency: Concurrent lessons (default: BATCH_COMPILE_CONCURRENCY)
+            llm_concurrency: In-flight LLM calls (default: BATCH_COMPILE_LLM_CONCURRENCY)
+            max_attempts: Attempts per lesson (default: BATCH_COMPILE_MAX_ATTEMPTS)
+            bypass_card_cache: Regenerate every card instead of reusing cached ones
+            checkpoint_path: Checkpoint file to resume from / write to
+
+        Returns:
+            BatchCompileJob
+        """
+        job_id = f"batch_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        path = Path(checkpoint_path) if checkpoint_path else self.checkpoint_dir() / f"{job_id}.json"
+        items = {cid: BatchCompileItem(can_do_id=cid) for cid in can_do_ids}
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as fh:
+                saved = json.load(fh).get("items", {})
+            for cid, data in saved.items():
+                if cid in items and data.get("status") in DONE_ITEM_STATUSES:
+                    items[cid] = BatchCompileItem(**{**data, "status": "skipped"})
+        job = BatchCompileJob(
+            id=job_id,
+            items=items,
+            metalanguage=metalanguage,
+            model=model,
+            fast_model=fast_model,
+            concurrency=max(1, concurrency or settings.BATCH_COMPILE_CONCURRENCY),
+            llm_concurrency=max(1, llm_concurrency or settings.BATCH_COMPILE_LLM_CONCURRENCY),
+            max_attempts=max(1, max_attempts or settings.BATCH_COMPILE_MAX_ATTEMPTS),
+            bypass_card_cache=bypass_card_cache,
+            checkpoint_path=path,
+        )
+        self.jobs[job_id] = job
+        logger.info("batch_compile_job_created", job_id=job_id, lessons=len(items), checkpoint=str(path))
+        return job
+
+    def start(self, job: BatchCompileJob) -> asyncio.Task:
+        """Run a job in the background (admin endpoint)."""
+        task = asyncio.create_task(self.run(job))
+        self.running_tasks[job.id] = task
+        task.add_done_callback(lambda _: self.running_tasks.pop(job.id, None))
+        return task
+
+    def cancel(self, job_id: str) -> bool:
+        """Stop handing out new lessons; in-flight compiles finish normally."""
+        job = self.jobs.get(job_id)
+        if not job or job.status in FINISHED_STATUSES:
+            return False
+        job.cancel_requested = True
+        return True
+
+    async def run(self, job: BatchCompileJob) -> Dict[str, Any]:
+        """
+        Compile every pending lesson of a job and return its report.
+
+        Args:
+            job: Job created by create_job
+
+        Returns:
+            Throughput/latency report
+        """
+        if db.AsyncSessionLocal is None or db.neo4j_driver is None:
+            await db.init_db_connections()
+        job.status = "running"
+        job.started_at = datetime.utcnow()
+        queue: asyncio.Queue = asyncio.Queue()
+        for item in job.items.values():
+            if item.status not in DONE_ITEM_STATUSES:
+                queue.put_nowait(item)
+
+        # Reason: the contextvar is copied into each worker task and from there
+        # into the LLM adapters compile_lessonroot creates.
+        token = compile_service.llm_call_limiter.set(threading.BoundedSemaphore(job.llm_concurrency))
+        try:
+            workers = [asyncio.create_task(self._worker(job, queue)) for _ in range(job.concurrency)]
+        finally:
+            compile_service.llm_call_limiter.reset(token)
+        try:
+            await asyncio.gather(*workers)
+        except asyncio.CancelledError:
+            for worker in workers:
+                worker.cancel()
+            job.status = "cancelled"
+            raise
+        finally:
+            job.completed_at = datetime.utcnow()
+            if job.status == "running":
+                job.status = "cancelled" if job.cancel_requested else "completed"
+            self._checkpoint(job)
+
+        report = job.report()
+        logger.info("batch_compile_job_finished", **{k: report[k] for k in ("job_id", "status", "counts", "elapsed_s", "lessons_per_hour")})
+        return report
+
+    async def _worker(self, job: BatchCompileJob, queue: asyncio.Queue) -> None:
+        while not job.cancel_requested:
+            try:
+                item: BatchCompileItem = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await self._compile_item(job, item)
+            self._checkpoint(job)
+
+    async def _compile_item(self, job: BatchCompileJob, item: BatchCompileItem) -> None:
+        item.status = "running"
+        started = time.perf_counter()
+        while True:
+            item.attempts += 1
+            try:
+                async with db.AsyncSessionLocal() as pg:
+                    async with db.neo4j_driver.session() as neo:
+                        result = await compile_service.compile_lessonroot(
+                            neo=neo,
+                            pg=pg,
+                            can_do_id=item.can_do_id,
+                            metalanguage=job.metalanguage,
+                            model=job.model,
+                            fast_model_override=job.fast_model,
+                            bypass_card_cache=job.bypass_card_cache,
+                        )
+                item.status = "completed"
+                item.lesson_id = result.get("lesson_id")
+                item.version = result.get("version")
+                item.error = None
+                break
+            except Exception as e:
+                item.error = f"{type(e).__name__}: {str(e)[:300]}"
+                if item.attempts >= job.max_attempts or not compile_service._is_retryable_error(e):
+                    item.status = "failed"
+                    logger.warning("batch_compile_lesson_failed", job_id=job.id, can_do_id=item.can_do_id, error=item.error)
+                    break
+                await asyncio.sleep(min(30.0, RETRY_BACKOFF_SECONDS * 2 ** (item.attempts - 1)))
+        item.duration_s = round(time.perf_counter() - started, 2)
+
+    def _checkpoint(self, job: BatchCompileJob) -> None:
+        if job.checkpoint_path is None:
+            return
+        payload = {
+            "job_id": job.id,
+            "updated_at": datetime.utcnow().isoformat(),
+            "report": job.report(),
+            "items": {cid: asdict(item) for cid, item in job.items.items()},
+        }
+        try:
+            job.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=job.checkpoint_path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(payload, fh, ensure_ascii=False, indent=2)
+            os.replace(tmp, job.checkpoint_path)
+        except OSError as e:
+            logger.warning("batch_compile_checkpoint_failed", job_id=job.id, error=str(e))
+
+
+# Singleton instance
+lesson_batch_compiler = LessonBatchCompiler()
@@ -0,0 +1,144 @@
+"""
+Postgres-backed card cache for the CanDo lesson generation pipeline.
+
+`validate_or_repair` (scripts/cando_creation/generators/utils.py) runs on
+worker threads and is synchronous, so `LessonCardCache` bridges each lookup
+and store onto the compile's event loop with its own short-lived session.
+Cache failures (missing table, timeouts) only cost the memoization: the card
+is generated as if the cache were empty.
+"""
+
+import asyncio
+import json
+import threading
+from typing import Any, Coroutine, Dict, Optional
+
+import structlog
+from sqlalchemy import text
+
+from app import db
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+
+class LessonCardCache:
+    """Card cache (`CardCache` protocol) over the lesson_card_cache table."""
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        read: bool = True,
+        timeout_seconds: Optional[float] = None,
+    ) -> None:
+        """
+        Args:
+            loop: Event loop that owns the database engine
+            read: False skips lookups but still stores fresh cards (bypass)
+            timeout_seconds: Per-operation wait (default: LESSON_CARD_CACHE_TIMEOUT_SECONDS)
+        """
+        self._loop = loop
+        self.read = read
+        self._timeout = timeout_seconds or settings.LESSON_CARD_CACHE_TIMEOUT_SECONDS
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {"hits": 0, "misses": 0, "stores": 0, "errors": 0}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    def _run(self, coro: Coroutine[Any, Any, Any]) -> Any:
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            # Reason: blocking the loop on its own future would deadlock.
+            coro.close()
+            raise RuntimeError("card_cache_called_on_event_loop")
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout=self._timeout)
+
+    async def _fetch(self, key: str) -> Optional[str]:
+        if db.AsyncSessionLocal is None:
+            return None
+        async with db.AsyncSessionLocal() as session:
+            result = await session.execute(
+                text("""
+                    UPDATE lesson_card_cache
+                    SET hits = hits + 1, last_used_at = NOW()
+                    WHERE cache_key = :key
+                    RETURNING card_json
+                """),
+                {"key": key},
+            )
+            row = result.first()
+            await session.commit()
+        if row is None:
+            return None
+        return row[0] if isinstance(row[0], str) else json.dumps(row[0], ensure_ascii=False)
+
+    async def _store(self, key: str, card_type: str, template_version: str, model: str, card_json: str) -> None:
+        if db.AsyncSessionLocal is None:
+            return
+        async with db.AsyncSessionLocal() as session:
+            await session.execute(
+                text("""
+                    INSERT INTO lesson_card_cache (cache_key, card_type, template_version, model, card_json)
+                    VALUES (:key, :card_type, :template_version, :model, CAST(:card_json AS JSONB))
+                    ON CONFLICT (cache_key) DO UPDATE SET
+                        card_json = EXCLUDED.card_json,
+                        created_at = NOW(),
+                        last_used_at = NOW()
+                """),
+                {
+                    "key": key,
+                    "card_type": card_type,
+                    "template_version": template_version,
+                    "model": model,
+                    "card_json": card_json,
+                },
+            )
+            await session.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return cached card JSON, or None on miss, bypass or error."""
+        if not self.read:
+            return None
+        try:
+            card_json = self._run(self._fetch(key))
+        except Exception as e:
+            self._count("errors")
+            logger.debug("lesson_card_cache_lookup_failed", error=str(e))
+            return None
+        self._count("hits" if card_json is not None else "misses")
+        return card_json
+
+    def put(self, key: str, card_type: str, template_version: str, model: str, card_json: str) -> None:
+        """Store a validated card; errors are logged and ignored."""
+        try:
+            self._run(self._store(key, card_type, template_version, model, card_json))
+        except Exception as e:
+            self._count("errors")
+            logger.debug("lesson_card_cache_store_failed", card_type=card_type, error=str(e))
+            return
+        self._count("stores")
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss/store/error counters for this compile."""
+        with self._lock:
+            return dict(self._counts)
+
+
+def lesson_card_cache(bypass: bool = False) -> Optional[LessonCardCache]:
+    """
+    Create a card cache for one compile running on the current event loop.
+
+    Args:
+        bypass: Skip lookups so every card is regenerated (fresh cards are still stored)
+
+    Returns:
+        LessonCardCache, or None when LESSON_CARD_CACHE_ENABLED is off
+    """
+    if not settings.LESSON_CARD_CACHE_ENABLED:
+        return None
+    return LessonCardCache(asyncio.get_running_loop(), read=not bypass)
@@ -0,0 +1,402 @@
+"""
+Per-card storage for compiled CanDo lessons.
+
+A compile inserts one `lesson_versions` row holding the Content stage and the
+lesson meta. Every later stage write (background stages, stage regeneration)
+upserts only its own rows in `lesson_cards` (one per card) and
+`lesson_stage_status` (one per stage), so a stage write no longer reads,
+rewrites and re-TOASTs the whole `lesson_plan`, and concurrent stage writers
+touch disjoint rows. The `lesson_versions_assembled` view overlays both tables
+onto `lesson_plan` and returns the legacy LessonRoot document for readers that
+need the whole lesson; `get_stage` and `get_cards` return just one stage or card.
+"""
+
+import json
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import structlog
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = structlog.get_logger()
+
+# Card keys (LessonRoot `lesson.cards`) produced by each compile stage.
+STAGE_CARD_KEYS: Dict[str, Tuple[str, ...]] = {
+    "content": (
+        "objective",
+        "words",
+        "grammar_patterns",
+        "formulaic_expressions",
+        "lesson_dialogue",
+        "cultural_explanation",
+    ),
+    "comprehension": ("reading_comprehension", "comprehension_exercises", "ai_comprehension_tutor"),
+    "production": ("guided_dialogue", "production_exercises", "ai_production_evaluator"),
+    "interaction": ("interactive_dialogue", "interaction_activities", "ai_scenario_manager"),
+}
+
+CARD_STAGES: Dict[str, str] = {key: stage for stage, keys in STAGE_CARD_KEYS.items() for key in keys}
+
+
+def _to_jsonable(obj: Any) -> Any:
+    """Convert Pydantic models (v2 or v1) nested in dicts/lists to plain JSON data."""
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(mode="json")
+    if hasattr(obj, "dict") and not isinstance(obj, dict):
+        return obj.dict()
+    if isinstance(obj, dict):
+        return {k: _to_jsonable(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_to_jsonable(item) for item in obj]
+    return obj
+
+
+def _loads(value: Any) -> Any:
+    return json.loads(value) if isinstance(value, str) else value
+
+
+class LessonCardStore:
+    """Reads and writes lesson cards and stage status rows."""
+
+    async def upsert_stage(
+        self,
+        pg: AsyncSession,
+        lesson_id: int,
+        version: int,
+        stage: str,
+        cards: Dict[str, Any],
+        status: str = "complete",
+    ) -> int:
+        """
+        Store the cards of one stage and mark the stage.
+
+        Only the stage's own cards (STAGE_CARD_KEYS) are written; None values
+        are skipped so a partial result does not erase existing cards.
+
+        Args:
+            pg: PostgreSQL session
+            lesson_id: Lesson ID
+            version: Lesson version
+            stage: Stage name (e.g. "comprehension")
+            cards: Card key -> card (Pydantic model or dict)
+            status: Stage status to record (clears any stage error)
+
+        Returns:
+            Number of cards written
+
+        Raises:
+            ValueError: If the stage is unknown or the lesson version does not exist
+        """
+        if stage not in STAGE_CARD_KEYS:
+            raise ValueError(f"Unknown stage: {stage}")
+        await self._require_version(pg, lesson_id, version)
+        rows = [
+            {
+                "lid": lesson_id,
+                "ver": version,
+                "key": key,
+                "stage": stage,
+                "card": json.dumps(_to_jsonable(cards[key]), ensure_ascii=False),
+            }
+            for key in STAGE_CARD_KEYS[stage]
+            if cards.get(key) is not None
+        ]
+        if rows:
+            await pg.execute(
+                text(
+                    "INSERT INTO lesson_cards (lesson_id, version, card_key, stage, card) "
+                    "VALUES (:lid, :ver, :key, :stage, CAST(:card AS jsonb)) "
+                    "ON CONFLICT (lesson_id, version, card_key) "
+                    "DO UPDATE SET card = EXCLUDED.card, stage = EXCLUDED.stage, updated_at = NOW()"
+                ),
+                rows,
+            )
+        await self._upsert_status(pg, lesson_id, version, stage, status, None)
+        await pg.commit()
+        logger.info("lesson_stage_cards_stored", lesson_id=lesson_id, version=version, stage=stage, cards=len(rows))
+        return len(rows)
+
+    async def set_stage_status(
+        self,
+        pg: AsyncSession,
+        lesson_id: int,
+        version: int,
+        stage: str,
+        status: str,
+        error: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """
+        Record a stage's generation status (and error details, if failed).
+
+        Args:
+            pg: PostgreSQL session
+            lesson_id: Lesson ID
+            version: Lesson version
+            stage: Stage name
+            status: e.g. "generating", "complete", "failed: <message>"
+            error: Optional error details, exposed as `lesson.meta.errors[stage]`
+
+        Raises:
+            ValueError: If the lesson version does not exist
+        """
+        await self._require_version(pg, lesson_id, version)
+        await self._upsert_status(pg, lesson_id, version, stage, status, error)
+        await pg.commit()
+
+    async def get_generation_status(
+        self,
+        pg: AsyncSession,
+        lesson_id: int,
+        version: Optional[int] = None,
+    ) -> Optional[Tuple[int, Dict[str, Any], Dict[str, Any]]]:
+        """
+        Return `lesson.meta.generation_status` and `lesson.meta.errors` without loading the lesson.
+
+        Same result as reading them from lesson_versions_assembled, but only
+        the two meta objects and the stage status rows leave the database.
+
+        Args:
+            pg: PostgreSQL session
+            lesson_id: Lesson ID
+            version: Optional version (default: latest)
+
+        Returns:
+            (version, stage -> status, stage -> error), or None if not found
+        """
+        where = "lesson_id = :lid" if version is None else "lesson_id = :lid AND version = :ver"
+        params: Dict[str, Any] = {"lid": lesson_id} if version is None else {"lid": lesson_id, "ver": version}
+        row = (
+            await pg.execute(
+                text(
+                    "SELECT version, lesson_plan->'lesson'->'meta'->'generation_status', "
+                    "lesson_plan->'lesson'->'meta'->'errors' "
+                    f"FROM lesson_versions WHERE {where} ORDER BY version DESC LIMIT 1"
+                ),
+                params,
+            )
+        ).first()
+        if not row:
+            return None
+        found_version = int(row[0])
+        statuses: Dict[str, Any] = dict(_loads(row[1]) or {})
+        errors: Dict[str, Any] = dict(_loads(row[2]) or {})
+        result = await pg.execute(
+            text("SELECT stage, status, error FROM lesson_stage_status WHERE lesson_id = :lid AND version = :ver"),
+            {"lid": lesson_id, "ver": found_version},
+        )
+        for stage, status, error in result.fetchall():
+            statuses[stage] = status
+            errors.pop(stage, None)
+            if error is not None:
+                errors[stage] = _loads(error)
+        return found_version, statuses, errors
+
+    async def get_stage_statuses(self, pg: AsyncSession, lesson_id: int, version: int) -> Dict[str, Any]:
+        """Stage -> status for one lesson version (empty if it does not exist)."""
+        found = await self.get_generation_status(pg, lesson_id, version)
+        return found[1] if found else {}
+
+    async def save_lesson_plan(
+        self,
+        pg: AsyncSession,
+        lesson_id: int,
+        version: int,
+        lesson_plan: Dict[str, Any],
+    ) -> None:
+        """
+        Write back a whole assembled lesson_plan (e.g. after filling in image paths).
+
+        Stored card rows are refreshed from the document too, so edits to
+        stage cards are not hidden by the older rows the view overlays.
+
+        Args:
+            pg: PostgreSQL session
+            lesson_id: Lesson ID
+            version: Lesson version
+            lesson_plan: Full LessonRoot document
+        """
+        params = {"lid": lesson_id, "ver": version, "plan": json.dumps(lesson_plan, ensure_ascii=False)}
+        await pg.execute(
+            text("UPDATE lesson_versions SET lesson_plan = CAST(:plan AS jsonb) WHERE lesson_id = :lid AND version = :ver"),
+            params,
+        )
+        await pg.execute(
+            text(
+                "UPDATE lesson_cards c "
+                "SET card = CAST(:plan AS jsonb)->'lesson'->'cards'->c.card_key, updated_at = NOW() "
+                "WHERE c.lesson_id = :lid AND c.version = :ver "
+                "AND jsonb_typeof(CAST(:plan AS jsonb)->'lesson'->'cards'->c.card_key) = 'object'"
+            ),
+            params,
+        )
+        await pg.commit()
+
+    async def clear_overlay(self, pg: AsyncSession, lesson_id: int, version: int) -> None:
+        """
+        Drop the stored card and stage-status rows of one lesson version.
+
+        Call this (inside the caller's transaction; nothing is committed here)
+        before a whole lesson_plan is written or a version row is inserted or
+        deleted, so rows left by an earlier version with the same number are
+        not overlaid onto the new document.
+
+        Args:
+            pg: PostgreSQL session
+            lesson_id: Lesson ID
+            version: Lesson version
+        """
+        params = {"lid": lesson_id, "ver": version}
+        await pg.execute(text("DELETE FROM lesson_cards WHERE lesson_id = :lid AND version = :ver"), params)
+        await pg.execute(text("DELETE FROM lesson_stage_status WHERE lesson_id = :lid AND version = :ver"), params)
+
+    async def get_cards(
+        self,
+        pg: AsyncSession,
+        lesson_id: int,
+        version: int,
+        card_keys: Sequence[str],
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Return selected cards; stored card rows win over the compiled document.
+
+        Args:
+            pg: PostgreSQL session
+            lesson_id: Lesson ID
+            version: Lesson version
+            card_keys: Card keys to fetch
+
+        Returns:
+            Card key -> card (None when missing), or None if the version does not exist
+        """
+        result = await pg.execute(
+            text(
+                "SELECT k.card_key, COALESCE(c.card, lv.lesson_plan->'lesson'->'cards'->k.card_key) "
+                "FROM lesson_versions lv "
+                "CROSS JOIN unnest(CAST(:keys AS text[])) AS k(card_key) "
+                "LEFT JOIN lesson_cards c "
+                "ON c.lesson_id = lv.lesson_id AND c.version = lv.version AND c.card_key = k.card_key "
+                "WHERE lv.lesson_id = :lid AND lv.version = :ver"
+            ),
+            {"lid": lesson_id, "ver": version, "keys": list(card_keys)},
+        )
+        rows = result.fetchall()
+        if not rows:
+            return None
+        return {key: _loads(card) for key, card in rows}
+
+    async def get_stage(self, pg: AsyncSession, lesson_id: int, version: int, stage: str) -> Optional[Dict[str, Any]]:
+        """
+        Return one stage's cards, status and error.
+
+        Args:
+            pg: PostgreSQL session
+            lesson_id: Lesson ID
+            version: Lesson version
+            stage: Stage name
+
+        Returns:
+            {"stage", "status", "error", "cards"}, or None if the version does not exist
+
+        Raises:
+            ValueError: If the stage is unknown
+        """
+        if stage not in STAGE_CARD_KEYS:
+            raise ValueError(f"Unknown stage: {stage}")
+        cards = await self.get_cards(pg, lesson_id, version, STAGE_CARD_KEYS[stage])
+        if cards is None:
+            return None
+        row = (
+            await pg.execute(
+                text(
+                    "SELECT status, error FROM lesson_stage_status "
+                    "WHERE lesson_id = :lid AND version = :ver AND stage = :stage"
+                ),
+                {"lid": lesson_id, "ver": version, "stage": stage},
+            )
+        ).first()
+        if row:
+            status, error = row[0], _loads(row[1])
+        else:
+            status = (await self.get_stage_statuses(pg, lesson_id, version)).get(stage)
+            error = None
+        return {"stage": stage, "status": status, "error": error, "cards": cards}
+
+    async def get_lesson_plan(
+        self,
+        pg: AsyncSession,
+        lesson_id: int,
+        version: Optional[int] = None,
+    ) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """
+        Return the assembled legacy lesson_plan (latest version by default).
+
+        Args:
+            pg: PostgreSQL session
+            lesson_id: Lesson ID
+            version: Optional version
+
+        Returns:
+            (version, lesson_plan), or None if not found
+        """
+        if version is None:
+            query = (
+                "SELECT version, lesson_plan FROM lesson_versions_assembled "
+                "WHERE lesson_id = :lid ORDER BY version DESC LIMIT 1"
+            )
+            params: Dict[str, Any] = {"lid": lesson_id}
+        else:
+            query = "SELECT version, lesson_plan FROM lesson_versions_assembled WHERE lesson_id = :lid AND version = :ver"
+            params = {"lid": lesson_id, "ver": version}
+        row = (await pg.execute(text(query), params)).first()
+        if not row:
+            return None
+        return int(row[0]), _loads(row[1])
+
+    async def latest_version(self, pg: AsyncSession, lesson_id: int) -> Optional[int]:
+        """Latest version number of a lesson, or None."""
+        row = (
+            await pg.execute(
+                text("SELECT MAX(version) FROM lesson_versions WHERE lesson_id = :lid"),
+                {"lid": lesson_id},
+            )
+        ).first()
+        return int(row[0]) if row and row[0] is not None else None
+
+    async def _require_version(self, pg: AsyncSession, lesson_id: int, version: int) -> None:
+        row = (
+            await pg.execute(
+                text("SELECT 1 FROM lesson_versions WHERE lesson_id = :lid AND version = :ver"),
+                {"lid": lesson_id, "ver": version},
+            )
+        ).first()
+        if not row:
+            raise ValueError(f"Lesson {lesson_id} version {version} not found")
+
+    async def _upsert_status(
+        self,
+        pg: AsyncSession,
+        lesson_id: int,
+        version: int,
+        stage: str,
+        status: str,
+        error: Optional[Dict[str, Any]],
+    ) -> None:
+        await pg.execute(
+            text(
+                "INSERT INTO lesson_stage_status (lesson_id, version, stage, status, error) "
+                "VALUES (:lid, :ver, :stage, :status, CAST(:error AS jsonb)) "
+                "ON CONFLICT (lesson_id, version, stage) "
+                "DO UPDATE SET status = EXCLUDED.status, error = EXCLUDED.error, updated_at = NOW()"
+            ),
+            {
+                "lid": lesson_id,
+                "ver": version,
+                "stage": stage,
+                "status": status,
+                "error": json.dumps(error, ensure_ascii=False) if error is not None else None,
+            },
+        )
+
+
+# Singleton instance
+lesson_card_store = LessonCardStore()
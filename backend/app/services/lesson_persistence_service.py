@@ -11,7 +11,9 @@ CREATE TABLE IF NOT EXISTS statements before inserts.
 
 from __future__ import annotations
 
-from typing import Any, Dict, Optional, List, Tuple
+from typing import Any, Dict, Optional, List, Set, Tuple
+import asyncio
+import hashlib
 import json
 from pathlib import Path
 
@@ -21,7 +23,11 @@ from sqlalchemy import text, bindparam
 from sqlalchemy.dialects.postgresql import JSONB
 
 from neo4j import AsyncSession as Neo4jSession
+from app import db
+from app.core.config import settings
 from app.services.embedding_service import EmbeddingService
+from app.services.lesson_card_store import lesson_card_store
+from app.utils.vector_storage import current_layout, vector_literal
 
 
 logger = structlog.get_logger()
@@ -30,6 +36,10 @@ logger = structlog.get_logger()
 class LessonPersistenceService:
     def __init__(self) -> None:
         self._embedding = EmbeddingService()
+        # Post-commit chunk indexing tasks, referenced until they finish.
+        self._chunk_tasks: Set["asyncio.Task[None]"] = set()
+        # Set once lesson_chunks.text_hash is known to exist.
+        self._text_hash_ready = False
 
     """
     Service that loads compiled lesson JSON by can_do_id and persists it to Postgres,
@@ -111,6 +121,8 @@ class LessonPersistenceService:
             "manifest": json.dumps(bundle["manifest"]) if bundle["manifest"] is not None else None,
             "dialogs": json.dumps(bundle["dialogs"]) if bundle["dialogs"] is not None else None,
         }
+        # The whole lesson_plan is replaced, so drop any stage card overlay of this version
+        await lesson_card_store.clear_overlay(pg, lesson_id, version)
         if ver_id is None:
             stmt = (
                 text(
@@ -215,6 +227,33 @@ class LessonPersistenceService:
             return "jp"
         return "en"
 
+    async def _ensure_text_hash_column(self, pg: PgSession) -> None:
+        """Add lesson_chunks.text_hash when the table was created after its migration ran.
+
+        add_lesson_chunks_text_hash.sql skips a missing table but is still
+        recorded as applied, so the column is checked here on first use.
+        """
+        if self._text_hash_ready:
+            return
+        res = await pg.execute(
+            text(
+                "SELECT 1 FROM information_schema.columns "
+                "WHERE table_schema = current_schema() AND table_name = 'lesson_chunks' AND column_name = 'text_hash'"
+            )
+        )
+        if res.fetchall():
+            self._text_hash_ready = True
+            return
+        # Committed with the caller's transaction; the next call re-checks.
+        await pg.execute(text("ALTER TABLE lesson_chunks ADD COLUMN IF NOT EXISTS text_hash TEXT"))
+        await pg.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS idx_lesson_chunks_text_hash "
+                "ON lesson_chunks (text_hash) WHERE embedding IS NOT NULL"
+            )
+        )
+        logger.info("lesson_chunks.text_hash column added")
+
     async def _insert_chunks_with_embeddings(
         self,
         *,
@@ -224,39 +263,141 @@ class LessonPersistenceService:
         can_do_id: str,
         master: Dict[str, Any],
     ) -> int:
-        """Chunk master and insert into lesson_chunks with embeddings."""
-        chunks = self._iter_chunks(master)
-        inserted = 0
-        for section, card_id, position, text_val in chunks:
+        """Chunk master and replace this version's lesson_chunks with embeddings.
+
+        Chunk texts are hashed; texts whose hash already has a vector in
+        lesson_chunks (earlier versions, other lessons) reuse it server-side,
+        and the rest are embedded in batches of LESSON_CHUNK_EMBED_BATCH_SIZE
+        per API request. All rows are written with one INSERT ... SELECT.
+        """
+        rows: List[Dict[str, Any]] = []
+        for section, card_id, position, text_val in self._iter_chunks(master):
             if not text_val:
                 continue
-            lang = self._detect_lang(text_val)
+            rows.append({
+                "section": section or "",
+                "card_id": card_id or "",
+                "position": int(position),
+                "lang": self._detect_lang(text_val),
+                "text": text_val,
+                "tokens": len(text_val),
+                "text_hash": _text_hash(text_val),
+                "embedding": None,
+            })
+        if not rows:
+            return 0
+
+        await self._ensure_text_hash_column(pg)
+        hashes = sorted({row["text_hash"] for row in rows})
+        res = await pg.execute(
+            text(
+                "SELECT DISTINCT text_hash FROM lesson_chunks "
+                "WHERE text_hash = ANY(:hashes) AND embedding IS NOT NULL"
+            ),
+            {"hashes": hashes},
+        )
+        known = {r[0] for r in res.fetchall()}
+
+        missing: Dict[str, str] = {}
+        for row in rows:
+            if row["text_hash"] not in known:
+                missing.setdefault(row["text_hash"], row["text"])
+        vectors: Dict[str, str] = {}
+        batch_size = max(1, settings.LESSON_CHUNK_EMBED_BATCH_SIZE)
+        pending = list(missing.items())
+        for i in range(0, len(pending), batch_size):
+            batch = pending[i : i + batch_size]
             try:
-                embedding = await self._embedding.generate_content_embedding(text_val, provider="openai")
-            except Exception:
-                embedding = None
-            await pg.execute(
-                text(
-                    """
-                    INSERT INTO lesson_chunks (lesson_id, version, can_do_id, section, card_id, position, lang, text, tokens, embedding)
-                    VALUES (:lesson_id, :version, :can_do_id, :section, :card_id, :position, :lang, :text, :tokens, :embedding)
-                    """
+                embeddings = await self._embedding.generate_content_embeddings([t for _, t in batch], provider="openai")
+            except Exception as e:  # noqa: BLE001
+                # Chunks stay searchable lexically; a later persist retries them.
+                logger.warning("lesson_chunks embedding batch failed", size=len(batch), error=str(e))
+                continue
+            for (text_hash, _), embedding in zip(batch, embeddings):
+                vectors[text_hash] = vector_literal(embedding)
+        for row in rows:
+            row["embedding"] = vectors.get(row["text_hash"])
+
+        # Data-modifying CTEs share one snapshot: reused vectors are read from
+        # the rows being replaced, and the DELETE does not see the new rows.
+        storage_type = current_layout().storage_type
+        await pg.execute(
+            text(
+                f"""
+                WITH incoming AS (
+                    SELECT r.*
+                    FROM jsonb_to_recordset(CAST(:rows AS jsonb)) AS r(
+                        section TEXT, card_id TEXT, position INTEGER, lang TEXT,
+                        text TEXT, tokens INTEGER, text_hash TEXT, embedding TEXT
+                    )
                 ),
-                {
-                    "lesson_id": int(lesson_id),
-                    "version": int(version),
-                    "can_do_id": can_do_id,
-                    "section": section or "",
-                    "card_id": card_id or "",
-                    "position": int(position),
-                    "lang": lang,
-                    "text": text_val,
-                    "tokens": len(text_val),
-                    "embedding": embedding,
-                },
+                replaced AS (
+                    DELETE FROM lesson_chunks WHERE lesson_id = :lesson_id AND version = :version
+                )
+                INSERT INTO lesson_chunks (lesson_id, version, can_do_id, section, card_id, position, lang, text, tokens, text_hash, embedding)
+                SELECT :lesson_id, :version, :can_do_id, i.section, i.card_id, i.position, i.lang, i.text, i.tokens, i.text_hash,
+                       COALESCE(
+                           CAST(i.embedding AS {storage_type}),
+                           (SELECT c.embedding FROM lesson_chunks c
+                            WHERE c.text_hash = i.text_hash AND c.embedding IS NOT NULL LIMIT 1)
+                       )
+                FROM incoming i
+                """
+            ),
+            {
+                "lesson_id": int(lesson_id),
+                "version": int(version),
+                "can_do_id": can_do_id,
+                "rows": json.dumps(rows, ensure_ascii=False),
+            },
+        )
+        logger.info(
+            "lesson_chunks embedded",
+            chunks=len(rows),
+            reused=len(rows) - sum(1 for row in rows if row["text_hash"] in missing),
+            embedded=len(vectors),
+            api_requests=(len(pending) + batch_size - 1) // batch_size,
+        )
+        return len(rows)
+
+    async def index_chunks(
+        self,
+        *,
+        lesson_id: int,
+        version: int,
+        can_do_id: str,
+        master: Dict[str, Any],
+        pg: Optional[PgSession] = None,
+    ) -> int:
+        """Embed and store lesson chunks, committing the result.
+
+        Runs on `pg` when given, otherwise on a session of its own, which is
+        how the post-commit background stage calls it after the request
+        session has closed.
+        """
+        if pg is None:
+            if db.AsyncSessionLocal is None:
+                raise RuntimeError("PostgreSQL is not initialised")
+            async with db.AsyncSessionLocal() as own:
+                return await self.index_chunks(
+                    lesson_id=lesson_id, version=version, can_do_id=can_do_id, master=master, pg=own
+                )
+        try:
+            cnt = await self._insert_chunks_with_embeddings(
+                pg=pg, lesson_id=lesson_id, version=version, can_do_id=can_do_id, master=master
             )
-            inserted += 1
-        return inserted
+            await pg.commit()
+        except Exception:
+            await pg.rollback()
+            raise
+        logger.info("lesson_chunks inserted", count=cnt, lesson_id=lesson_id, version=version)
+        return cnt
+
+    async def _index_chunks_in_background(self, **kwargs: Any) -> None:
+        try:
+            await self.index_chunks(**kwargs)
+        except Exception as e:  # noqa: BLE001
+            logger.warning("lesson_chunks insertion failed", error=str(e), lesson_id=kwargs.get("lesson_id"))
 
     async def persist_payload(
         self,
@@ -275,10 +416,14 @@ class LessonPersistenceService:
         source: Optional[str] = None,
         context: Optional[Dict[str, Any]] = None,
         parent_version: Optional[int] = None,
+        chunks_in_background: Optional[bool] = None,
     ) -> Dict[str, Any]:
         """Persist an in-memory lesson package payload to Postgres and link Neo4j Lesson node.
 
         Stores the payload as lesson_versions.lesson_plan (JSONB). Optional parts stored when provided.
+        When `master` is given its search chunks are embedded after the commit, as a
+        background task unless `chunks_in_background` (default: LESSON_CHUNKS_IN_BACKGROUND)
+        is False.
         """
         # Upsert lesson row
         res = await pg.execute(text("SELECT id FROM lessons WHERE can_do_id = :can LIMIT 1"), {"can": can_do_id})
@@ -309,6 +454,8 @@ class LessonPersistenceService:
             "context": json.dumps(context) if context is not None else None,
             "parent_version": parent_version,
         }
+        # The whole lesson_plan is replaced, so drop any stage card overlay of this version
+        await lesson_card_store.clear_overlay(pg, int(lesson_id), int(version))
         if ver_id is None:
             stmt = (
                 text(
@@ -369,24 +516,26 @@ class LessonPersistenceService:
         logger.info("Lesson payload persisted", can_do_id=can_do_id, lesson_id=int(lesson_id), version=int(version))
         # Insert chunks if master present
         if master:
-            try:
-                cnt = await self._insert_chunks_with_embeddings(
-                    pg=pg,
-                    lesson_id=int(lesson_id),
-                    version=int(version),
-                    can_do_id=can_do_id,
-                    master=master,
-                )
+            chunk_args = {"lesson_id": int(lesson_id), "version": int(version), "can_do_id": can_do_id, "master": master}
+            if chunks_in_background is None:
+                chunks_in_background = settings.LESSON_CHUNKS_IN_BACKGROUND
+            if chunks_in_background and db.AsyncSessionLocal is not None:
+                task = asyncio.create_task(self._index_chunks_in_background(**chunk_args))
+                self._chunk_tasks.add(task)
+                task.add_done_callback(self._chunk_tasks.discard)
+            else:
                 try:
-                    await pg.commit()
-                except Exception:
-                    pass
-                logger.info("lesson_chunks inserted", count=cnt, lesson_id=int(lesson_id), version=int(version))
-            except Exception as e:  # noqa: BLE001
-                logger.warning("lesson_chunks insertion failed", error=str(e))
+                    await self.index_chunks(pg=pg, **chunk_args)
+                except Exception as e:  # noqa: BLE001
+                    logger.warning("lesson_chunks insertion failed", error=str(e))
         return {"lesson_id": int(lesson_id), "version": int(version), "can_do_id": can_do_id}
 
 
+def _text_hash(text_val: str) -> str:
+    """Hash chunk text for embedding reuse (matches the migration backfill)."""
+    return hashlib.sha256(text_val.encode("utf-8")).hexdigest()
+
+
 lesson_persistence_service = LessonPersistenceService()
 
 
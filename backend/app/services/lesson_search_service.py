@@ -0,0 +1,243 @@
+"""
+Lesson chunk search (vector, lexical and hybrid).
+
+`/lessons/search` originally ran a single pgvector `ORDER BY embedding <=> :emb`
+over `lesson_chunks`, so exact Japanese terms ranked poorly and filtered
+queries either scanned or lost rows after the ANN index. This service adds:
+
+- lexical retrieval with pg_trgm: exact substring matches (`ILIKE`, which
+  catches short Japanese terms) first, then `word_similarity`;
+- hybrid retrieval that fuses the vector and lexical candidate lists with
+  reciprocal rank fusion in one SQL round trip (same scheme as
+  `ConversationService.hybrid_search_conversations`);
+- filtered ANN: `lang` is inlined as a literal so the per-language partial
+  HNSW indexes (migrations/versions/create_lesson_chunks_search_indexes.sql)
+  can serve it, and a `can_do_id` filter scans that lesson's chunks exactly
+  instead of post-filtering the index;
+- recall/latency knobs: candidate pool size per retriever and
+  `hnsw.ef_search`;
+- the compact embedding layout of app/utils/vector_storage.py (halfvec,
+  reduced-dimension index plus exact re-rank).
+
+`scripts/benchmark_lesson_search.py` reports recall and latency per mode.
+"""
+
+import time
+from typing import Any, Dict, List, Optional
+
+import structlog
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.services.embedding_service import EmbeddingService
+from app.utils.vector_storage import current_layout, vector_literal
+
+logger = structlog.get_logger()
+
+SEARCH_MODES = ("vector", "lexical", "hybrid")
+# Chunk languages written by LessonPersistenceService._detect_lang; each has a
+# partial HNSW index.
+SEARCH_LANGS = ("jp", "en")
+MAX_RESULTS = 50
+MAX_POOL = 500
+
+_CHUNK_COLUMNS = "lesson_id, version, can_do_id, section, card_id, position, lang, text"
+_CHUNK_KEY = ("lesson_id", "version", "section", "card_id", "position")
+
+
+class LessonSearchService:
+    """Searches lesson_chunks by embedding, by text, or both fused."""
+
+    def __init__(self) -> None:
+        self._embedding: Optional[EmbeddingService] = None
+
+    async def search(
+        self,
+        pg: AsyncSession,
+        q: str,
+        *,
+        k: int = 10,
+        can_do_id: Optional[str] = None,
+        lang: Optional[str] = None,
+        mode: Optional[str] = None,
+        pool: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        embedding: Optional[List[float]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Search lesson chunks.
+
+        Args:
+            pg: Postgres session.
+            q: Query text.
+            k: Number of results (1-50).
+            can_do_id: Restrict to one CanDo's lessons.
+            lang: Restrict to chunk language ('jp' | 'en').
+            mode: 'vector', 'lexical' or 'hybrid' (default: LESSON_SEARCH_DEFAULT_MODE).
+            pool: Candidates taken from each retriever before fusion
+                (default: LESSON_SEARCH_POOL_SIZE, at least `k`).
+            ef_search: HNSW search breadth (default: LESSON_SEARCH_EF_SEARCH);
+                raised to the index candidate count so the index can return
+                the full pool.
+            embedding: Precomputed query embedding (skips the embedding call).
+
+        Returns:
+            Dict[str, Any]: `items` (best first), `mode` and `timings_ms`.
+
+        Raises:
+            ValueError: If `mode` is unknown.
+        """
+        mode = mode or settings.LESSON_SEARCH_DEFAULT_MODE
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode: {mode}")
+        k = int(min(max(k, 1), MAX_RESULTS))
+        pool = int(min(max(pool or settings.LESSON_SEARCH_POOL_SIZE, k), MAX_POOL))
+        ef_search = max(int(ef_search or settings.LESSON_SEARCH_EF_SEARCH), pool)
+        timings: Dict[str, float] = {}
+
+        if mode != "lexical" and embedding is None:
+            started = time.perf_counter()
+            if self._embedding is None:
+                self._embedding = EmbeddingService()
+            embedding = await self._embedding.generate_content_embedding(q, provider="openai")
+            timings["embed"] = round((time.perf_counter() - started) * 1000, 2)
+
+        started = time.perf_counter()
+        try:
+            rows = await self._run(pg, mode, q, embedding, k, pool, ef_search, can_do_id, lang)
+        except Exception as e:
+            if mode != "hybrid":
+                raise
+            # Lexical retrieval needs pg_trgm; degrade to vector-only rather than fail.
+            logger.warning("lesson_search_hybrid_failed", error=str(e))
+            await pg.rollback()
+            mode = "vector"
+            rows = await self._run(pg, mode, q, embedding, k, pool, ef_search, can_do_id, lang)
+        timings["query"] = round((time.perf_counter() - started) * 1000, 2)
+
+        return {"items": [_item(row) for row in rows], "mode": mode, "timings_ms": timings}
+
+    async def _run(
+        self,
+        pg: AsyncSession,
+        mode: str,
+        q: str,
+        embedding: Optional[List[float]],
+        k: int,
+        pool: int,
+        ef_search: int,
+        can_do_id: Optional[str],
+        lang: Optional[str],
+    ) -> List[Any]:
+        params: Dict[str, Any] = {"k": k, "pool": pool}
+        filters = []
+        if lang in SEARCH_LANGS:
+            # Literal (not a bind parameter) so the planner can match the partial index.
+            filters.append(f"lang = '{lang}'")
+        elif lang:
+            filters.append("lang = :lang")
+            params["lang"] = lang
+        if can_do_id:
+            filters.append("can_do_id = :can")
+            params["can"] = can_do_id
+        where = " AND ".join(filters) if filters else "TRUE"
+
+        ctes = []
+        if can_do_id:
+            # One lesson has a few hundred chunks at most: rank them exactly
+            # instead of letting the ANN index return too few rows post-filter.
+            ctes.append(
+                "scoped AS MATERIALIZED ("
+                f"SELECT {_CHUNK_COLUMNS}, embedding FROM lesson_chunks WHERE {where})"
+            )
+            source, source_where = "scoped", "TRUE"
+        else:
+            source, source_where = "lesson_chunks", where
+
+        if mode != "lexical":
+            # Candidates come through the (possibly compact) index expression and
+            # are re-ranked by exact distance; see app/utils/vector_storage.py.
+            layout = current_layout()
+            params["emb"] = vector_literal(embedding)
+            params["pool_candidates"] = layout.candidates(pool)
+            exact = f"embedding <=> {layout.query_vector('emb')}"
+            candidate_order = exact if can_do_id else (
+                f"{layout.index_expression('embedding')} <=> {layout.index_query('emb')}"
+            )
+            await pg.execute(
+                text("SELECT set_config('hnsw.ef_search', :ef, true)"),
+                {"ef": str(max(ef_search, params["pool_candidates"]))},
+            )
+            ctes.append(
+                "vector_candidates AS ("
+                f"SELECT {_CHUNK_COLUMNS}, {exact} AS distance "
+                f"FROM {source} WHERE {source_where} AND embedding IS NOT NULL "
+                f"ORDER BY {candidate_order} LIMIT :pool_candidates)"
+            )
+            ctes.append(
+                "vector_search AS ("
+                f"SELECT {_CHUNK_COLUMNS}, 1 - distance AS similarity, "
+                "ROW_NUMBER() OVER (ORDER BY distance) AS v_rank "
+                "FROM vector_candidates ORDER BY distance LIMIT :pool)"
+            )
+        if mode != "vector":
+            params["q"] = q
+            params["pattern"] = "%" + _escape_like(q) + "%"
+            ctes.append(
+                "text_search AS ("
+                f"SELECT {_CHUNK_COLUMNS}, word_similarity(:q, text) AS lexical_score, "
+                "ROW_NUMBER() OVER (ORDER BY (text ILIKE :pattern) DESC, word_similarity(:q, text) DESC) AS t_rank "
+                f"FROM {source} WHERE {source_where} AND (text ILIKE :pattern OR :q <% text) "
+                "ORDER BY t_rank LIMIT :pool)"
+            )
+
+        if mode == "vector":
+            select = (
+                f"SELECT {_CHUNK_COLUMNS}, similarity, NULL::float AS lexical_score, "
+                "v_rank, NULL::bigint AS t_rank, similarity AS score FROM vector_search ORDER BY v_rank LIMIT :k"
+            )
+        elif mode == "lexical":
+            select = (
+                f"SELECT {_CHUNK_COLUMNS}, NULL::float AS similarity, lexical_score, "
+                "NULL::bigint AS v_rank, t_rank, lexical_score AS score FROM text_search ORDER BY t_rank LIMIT :k"
+            )
+        else:
+            params["rrf_k"] = settings.LESSON_SEARCH_RRF_K
+            merged = ", ".join(f"COALESCE(v.{col}, t.{col}) AS {col}" for col in _CHUNK_COLUMNS.split(", "))
+            join_on = " AND ".join(f"v.{col} = t.{col}" for col in _CHUNK_KEY)
+            select = (
+                f"SELECT {merged}, v.similarity, t.lexical_score, v.v_rank, t.t_rank, "
+                "COALESCE(1.0 / (:rrf_k + v.v_rank), 0) + COALESCE(1.0 / (:rrf_k + t.t_rank), 0) AS score "
+                f"FROM vector_search v FULL OUTER JOIN text_search t ON {join_on} "
+                "ORDER BY score DESC LIMIT :k"
+            )
+
+        res = await pg.execute(text("WITH " + ", ".join(ctes) + " " + select), params)
+        return res.fetchall()
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _item(row: Any) -> Dict[str, Any]:
+    return {
+        "lesson_id": int(row.lesson_id),
+        "version": int(row.version),
+        "can_do_id": row.can_do_id,
+        "section": row.section,
+        "card_id": row.card_id,
+        "position": int(row.position) if row.position is not None else None,
+        "lang": row.lang,
+        "text": row.text,
+        "similarity": float(row.similarity) if row.similarity is not None else None,
+        "lexical_score": float(row.lexical_score) if row.lexical_score is not None else None,
+        "vector_rank": int(row.v_rank) if row.v_rank is not None else None,
+        "lexical_rank": int(row.t_rank) if row.t_rank is not None else None,
+        "score": float(row.score),
+    }
+
+
+# Singleton instance
+lesson_search_service = LessonSearchService()
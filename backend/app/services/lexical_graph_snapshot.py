@@ -0,0 +1,435 @@
+"""
+Lexical Graph Snapshot
+
+Optional read-side cache of the SYNONYM_OF graph for the lexical graph
+endpoints. Word nodes are numbered 0..N-1 and the adjacency is stored in
+compressed sparse row (CSR) form: ``indptr[i]:indptr[i + 1]`` slices the
+``indices``/``weights`` arrays for node ``i``. Node attributes live in
+parallel arrays, so an ego graph of any depth is a few array walks instead of
+a Cypher expansion with per-node pattern comprehensions.
+
+The snapshot is rebuilt from Neo4j in the background every TTL window while
+the previous one keeps serving; callers fall back to Neo4j whenever it is
+disabled, not yet loaded, or does not know the requested word.
+"""
+
+import asyncio
+import math
+import time
+from array import array
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+_NODES_QUERY = """
+MATCH (w:Word)
+WHERE w.word_key IS NOT NULL
+RETURN w.word_key AS key,
+       coalesce(w.reading_hiragana, w.hiragana) AS hiragana,
+       w.translation AS translation,
+       w.difficulty_numeric AS level,
+       coalesce(w.pos_primary_norm, w.pos1, w.pos_primary) AS pos_norm,
+       w.etymology AS etymology,
+       head([(w)-[:BELONGS_TO_DOMAIN]->(d:SemanticDomain) | d.name]) AS domain,
+       head([(w)-[:HAS_POS]->(p:POSTag) | p.primary_pos]) AS pos
+"""
+
+_EDGES_QUERY = """
+MATCH (a:Word)-[r:SYNONYM_OF]->(b:Word)
+WHERE a.word_key IS NOT NULL AND b.word_key IS NOT NULL AND a <> b
+RETURN a.word_key AS source,
+       b.word_key AS target,
+       coalesce(r.synonym_strength, r.weight) AS weight,
+       r.relation_type AS relation_type,
+       r.mutual_sense AS mutual_sense
+"""
+
+
+class _Interner:
+    """Maps repeated attribute values (domains, POS, relation types) to small ints."""
+
+    def __init__(self) -> None:
+        self.values: List[Any] = []
+        self._ids: Dict[Hashable, int] = {}
+
+    def id_for(self, value: Any) -> int:
+        if value is None:
+            return -1
+        try:
+            key: Hashable = value
+            hash(key)
+        except TypeError:
+            key = repr(value)
+        idx = self._ids.get(key)
+        if idx is None:
+            idx = len(self.values)
+            self.values.append(value)
+            self._ids[key] = idx
+        return idx
+
+    def value(self, idx: int) -> Any:
+        return None if idx < 0 else self.values[idx]
+
+
+@dataclass
+class _Snapshot:
+    """Immutable CSR graph plus node attribute arrays."""
+
+    keys: List[str]
+    index: Dict[str, int]
+    hiragana: List[Optional[str]]
+    translation: List[Optional[str]]
+    level: List[Any]
+    pos_norm: List[Optional[str]]
+    etymology: List[Any]
+    domain: array  # interned ids
+    pos: array  # interned ids
+    indptr: array
+    indices: array
+    weights: array  # NaN where the relationship has no strength/weight
+    relation_type: array  # interned ids
+    mutual_sense: array  # interned ids
+    strings: _Interner = field(default_factory=_Interner)
+    loaded_at: float = 0.0
+
+    def neighbours(self, i: int) -> range:
+        return range(self.indptr[i], self.indptr[i + 1])
+
+
+def build_snapshot(
+    node_rows: Sequence[Dict[str, Any]],
+    edge_rows: Sequence[Dict[str, Any]],
+) -> _Snapshot:
+    """
+    Build a CSR snapshot from node and directed SYNONYM_OF edge rows.
+
+    Edges are stored in both directions (SYNONYM_OF is traversed undirected)
+    and each row is sorted by descending weight.
+
+    Args:
+        node_rows: Rows shaped like ``_NODES_QUERY`` output
+        edge_rows: Rows shaped like ``_EDGES_QUERY`` output
+
+    Returns:
+        Snapshot ready for ego-graph queries
+    """
+    strings = _Interner()
+    keys: List[str] = []
+    index: Dict[str, int] = {}
+    hiragana: List[Optional[str]] = []
+    translation: List[Optional[str]] = []
+    level: List[Any] = []
+    pos_norm: List[Optional[str]] = []
+    etymology: List[Any] = []
+    domain = array("i")
+    pos = array("i")
+
+    for row in node_rows:
+        key = row.get("key")
+        if not key or key in index:
+            continue
+        index[key] = len(keys)
+        keys.append(key)
+        hiragana.append(row.get("hiragana"))
+        translation.append(row.get("translation"))
+        level.append(row.get("level"))
+        pos_norm.append(row.get("pos_norm"))
+        etymology.append(row.get("etymology"))
+        domain.append(strings.id_for(row.get("domain")))
+        pos.append(strings.id_for(row.get("pos")))
+
+    # Per-node edge lists: (weight, neighbour, relation_type id, mutual_sense id)
+    rows: List[List[Tuple[float, int, int, int]]] = [[] for _ in keys]
+    for edge in edge_rows:
+        a = index.get(edge.get("source"))
+        b = index.get(edge.get("target"))
+        if a is None or b is None or a == b:
+            continue
+        w = edge.get("weight")
+        weight = float(w) if w is not None else math.nan
+        rel = strings.id_for(edge.get("relation_type"))
+        sense = strings.id_for(edge.get("mutual_sense"))
+        rows[a].append((weight, b, rel, sense))
+        rows[b].append((weight, a, rel, sense))
+
+    indptr = array("I", [0])
+    indices = array("I")
+    weights = array("d")
+    relation_type = array("i")
+    mutual_sense = array("i")
+    for edges in rows:
+        edges.sort(key=lambda e: 0.0 if math.isnan(e[0]) else e[0], reverse=True)
+        for weight, nbr, rel, sense in edges:
+            indices.append(nbr)
+            weights.append(weight)
+            relation_type.append(rel)
+            mutual_sense.append(sense)
+        indptr.append(len(indices))
+
+    return _Snapshot(
+        keys=keys,
+        index=index,
+        hiragana=hiragana,
+        translation=translation,
+        level=level,
+        pos_norm=pos_norm,
+        etymology=etymology,
+        domain=domain,
+        pos=pos,
+        indptr=indptr,
+        indices=indices,
+        weights=weights,
+        relation_type=relation_type,
+        mutual_sense=mutual_sense,
+        strings=strings,
+        loaded_at=time.monotonic(),
+    )
+
+
+def _weight_or(value: float, default: float) -> float:
+    return default if math.isnan(value) else float(value)
+
+
+class LexicalGraphSnapshotService:
+    """Serves ego graphs and node details from an in-memory CSR snapshot."""
+
+    def __init__(self, enabled: Optional[bool] = None, ttl_seconds: Optional[float] = None):
+        self.enabled = settings.LEXICAL_GRAPH_SNAPSHOT_ENABLED if enabled is None else enabled
+        self.ttl_seconds = (
+            ttl_seconds
+            if ttl_seconds is not None
+            else settings.LEXICAL_GRAPH_SNAPSHOT_TTL_SECONDS
+        )
+        self._snapshot: Optional[_Snapshot] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_stale(self) -> bool:
+        """Whether the snapshot is missing or older than its TTL."""
+        if self._snapshot is None:
+            return True
+        return bool(self.ttl_seconds) and time.monotonic() - self._snapshot.loaded_at > self.ttl_seconds
+
+    async def load(self, neo4j_session) -> Dict[str, int]:
+        """
+        Rebuild the snapshot from Neo4j and swap it in.
+
+        Args:
+            neo4j_session: Neo4j async session
+
+        Returns:
+            Node and edge counts of the new snapshot
+        """
+        async with self._lock:
+            started = time.perf_counter()
+            node_result = await neo4j_session.run(_NODES_QUERY)
+            node_rows = [dict(r) async for r in node_result]
+            edge_result = await neo4j_session.run(_EDGES_QUERY)
+            edge_rows = [dict(r) async for r in edge_result]
+            # Reason: building the arrays is CPU-bound; keep the event loop free.
+            self._snapshot = await asyncio.to_thread(build_snapshot, node_rows, edge_rows)
+
+        counts = {"nodes": len(self._snapshot.keys), "edges": len(self._snapshot.indices) // 2}
+        logger.info("Lexical graph snapshot loaded",
+                   elapsed_ms=int((time.perf_counter() - started) * 1000),
+                   **counts)
+        return counts
+
+    async def _refresh_in_background(self) -> None:
+        from app import db
+
+        try:
+            if db.neo4j_driver is None:
+                return
+            async with db.neo4j_driver.session() as session:
+                await self.load(session)
+        except Exception as e:
+            logger.warning("Lexical graph snapshot refresh failed", error=str(e))
+
+    def _current(self) -> Optional[_Snapshot]:
+        """Return the snapshot to serve, scheduling a refresh when stale."""
+        if not self.enabled:
+            return None
+        if self.is_stale and (self._refresh_task is None or self._refresh_task.done()):
+            self._refresh_task = asyncio.create_task(self._refresh_in_background())
+        # Stale snapshots keep serving until the refresh swaps in a new one.
+        return self._snapshot
+
+    def invalidate(self) -> None:
+        """Drop the snapshot; requests fall back to Neo4j until it reloads."""
+        self._snapshot = None
+
+    def _node_map(self, snap: _Snapshot, i: int) -> Dict[str, Any]:
+        key = snap.keys[i]
+        return {
+            "id": key,
+            "name": key,
+            "hiragana": snap.hiragana[i],
+            "translation": snap.translation[i],
+            "level": snap.level[i],
+            "domain": snap.strings.value(snap.domain[i]),
+            "pos": snap.strings.value(snap.pos[i]),
+        }
+
+    def center(self, kanji: str) -> Optional[Dict[str, Any]]:
+        """
+        Return center-word attributes shaped like ``_fetch_center`` output.
+
+        Args:
+            kanji: Canonical word key
+
+        Returns:
+            Attribute dict, or None when the snapshot cannot answer
+        """
+        snap = self._current()
+        if snap is None:
+            return None
+        i = snap.index.get(kanji)
+        if i is None:
+            return None
+        return {
+            "kanji": snap.keys[i],
+            "hiragana": snap.hiragana[i],
+            "translation": snap.translation[i],
+            "level": snap.level[i],
+            "domain": snap.strings.value(snap.domain[i]),
+            "pos": snap.strings.value(snap.pos[i]),
+        }
+
+    def ego_graph(
+        self,
+        kanji: str,
+        depth: int = 1,
+        limit1: int = 40,
+        limit2: int = 100,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Build an ego graph around a word from the snapshot.
+
+        Layer 1 holds up to ``limit1`` direct neighbours (strongest first);
+        every further layer up to ``depth`` holds up to ``limit2`` new nodes.
+        Edges are all SYNONYM_OF edges among the ego nodes, in both directions.
+
+        Args:
+            kanji: Canonical word key of the center
+            depth: Number of hops
+            limit1: Maximum depth-1 neighbours
+            limit2: Maximum new nodes per deeper layer
+
+        Returns:
+            ``{"nodes", "edges"}`` like ``_fetch_ego_graph``, or None when the
+            snapshot cannot answer (disabled, not loaded, unknown word)
+        """
+        snap = self._current()
+        if snap is None:
+            return None
+        center = snap.index.get(kanji)
+        if center is None:
+            return None
+
+        ego: List[int] = [center]
+        seen = {center}
+        frontier = [center]
+        for layer in range(1, max(1, depth) + 1):
+            limit = limit1 if layer == 1 else limit2
+            nxt: List[int] = []
+            for u in frontier:
+                for e in snap.neighbours(u):
+                    v = snap.indices[e]
+                    if v in seen:
+                        continue
+                    seen.add(v)
+                    nxt.append(v)
+                    if len(nxt) >= limit:
+                        break
+                if len(nxt) >= limit:
+                    break
+            if not nxt:
+                break
+            ego.extend(nxt)
+            frontier = nxt
+
+        edges: List[Dict[str, Any]] = []
+        emitted = set()
+        for u in ego:
+            for e in snap.neighbours(u):
+                v = snap.indices[e]
+                if v not in seen:
+                    continue
+                weight = _weight_or(snap.weights[e], 1.0)
+                # Mirror Cypher collect(DISTINCT {...}): drop exact duplicates only.
+                marker = (u, v, weight)
+                if marker in emitted:
+                    continue
+                emitted.add(marker)
+                edges.append({"source": snap.keys[u], "target": snap.keys[v], "weight": weight})
+
+        if not edges:
+            return {"nodes": [], "edges": []}
+        return {"nodes": [self._node_map(snap, i) for i in ego], "edges": edges}
+
+    def node_details(self, kanji: str) -> Optional[Dict[str, Any]]:
+        """
+        Return center attributes and strongest-first neighbours for a word.
+
+        Args:
+            kanji: Canonical word key
+
+        Returns:
+            Dict shaped like the ``get_node_details`` query record, or None when
+            the snapshot cannot answer
+        """
+        snap = self._current()
+        if snap is None:
+            return None
+        i = snap.index.get(kanji)
+        if i is None:
+            return None
+
+        neighbours = []
+        for e in snap.neighbours(i):
+            v = snap.indices[e]
+            neighbours.append({
+                "kanji": snap.keys[v],
+                "hiragana": snap.hiragana[v],
+                "translation": snap.translation[v],
+                "level": snap.level[v],
+                "pos": snap.strings.value(snap.pos[v]),
+                "domain": snap.strings.value(snap.domain[v]),
+                "synonym_strength": _weight_or(snap.weights[e], 1.0),
+                "relation_type": snap.strings.value(snap.relation_type[e]) or "synonym",
+                "mutual_sense": snap.strings.value(snap.mutual_sense[e]),
+            })
+
+        return {
+            "center_kanji": snap.keys[i],
+            "center_hiragana": snap.hiragana[i],
+            "center_translation": snap.translation[i],
+            "center_level": snap.level[i],
+            "center_pos": snap.pos_norm[i],
+            "center_etymology": snap.etymology[i],
+            "neighbors": neighbours,
+            "connection_count": len(neighbours),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Return snapshot size and freshness."""
+        snap = self._snapshot
+        return {
+            "enabled": self.enabled,
+            "loaded": snap is not None,
+            "stale": self.is_stale,
+            "nodes": len(snap.keys) if snap else 0,
+            "edges": len(snap.indices) // 2 if snap else 0,
+            "age_seconds": round(time.monotonic() - snap.loaded_at, 1) if snap else None,
+        }
+
+
+# Singleton instance
+lexical_graph_snapshot = LexicalGraphSnapshotService()
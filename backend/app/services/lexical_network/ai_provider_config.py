@@ -5,7 +5,7 @@ Defines available AI models with their configurations, costs, and capabilities.
 """
 
 from dataclasses import dataclass
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 
 @dataclass
@@ -102,6 +102,14 @@ def get_model_config(model_key: str) -> AIModelConfig:
     return AVAILABLE_MODELS[model_key]
 
 
+def estimate_cost_usd(model_key: str, tokens_input: int, tokens_output: int) -> Optional[float]:
+    """Estimate the cost of a call from the pricing table (None for unlisted models)."""
+    config = AVAILABLE_MODELS.get(model_key)
+    if config is None:
+        return None
+    return (tokens_input / 1000.0) * config.input_cost_per_1k + (tokens_output / 1000.0) * config.output_cost_per_1k
+
+
 def list_available_models() -> List[AIModelConfig]:
     """List all available models."""
     return list(AVAILABLE_MODELS.values())
@@ -9,8 +9,8 @@ import asyncio
 import time
 import uuid
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
-from typing import Dict, List, Optional
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional
 
 import structlog
 
@@ -36,6 +36,8 @@ from app.services.lexical_network.ai_provider_config import (
     AVAILABLE_MODELS,
     get_model_config,
 )
+from app.services.llm_replay import llm_replay
+from app.utils.metrics import observe_llm_call
 
 logger = structlog.get_logger()
 
@@ -103,6 +105,27 @@ class LexicalAIProvider(ABC):
         output_cost = (tokens_output / 1000.0) * config.output_cost_per_1k
         return input_cost + output_cost
 
+    def _observed(self, result: AIGenerationResult) -> AIGenerationResult:
+        """Record latency, tokens and cost of a live call in the metrics registry."""
+        observe_llm_call(
+            result.provider,
+            result.model,
+            result.latency_ms,
+            result.tokens_input,
+            result.tokens_output,
+            result.cost_usd,
+        )
+        return result
+
+    def _observe_failure(self, start_time: float) -> None:
+        config = self.get_model_config()
+        observe_llm_call(
+            config.provider,
+            config.model_id,
+            (time.time() - start_time) * 1000,
+            outcome="error",
+        )
+
 
 class OpenAIProvider(LexicalAIProvider):
     """OpenAI implementation with temperature=0."""
@@ -143,7 +166,7 @@ class OpenAIProvider(LexicalAIProvider):
             tokens_input = response.usage.prompt_tokens
             tokens_output = response.usage.completion_tokens
             
-            return AIGenerationResult(
+            return self._observed(AIGenerationResult(
                 content=response.choices[0].message.content,
                 provider="openai",
                 model=self.model,
@@ -155,8 +178,9 @@ class OpenAIProvider(LexicalAIProvider):
                 latency_ms=latency_ms,
                 request_id=request_id,
                 raw_response=response.model_dump() if hasattr(response, "model_dump") else None,
-            )
+            ))
         except Exception as e:
+            self._observe_failure(start_time)
             logger.error(
                 "OpenAI generation failed",
                 model=self.model,
@@ -235,7 +259,7 @@ class GeminiProvider(LexicalAIProvider):
             estimated_input_tokens = len(full_prompt) // 4
             estimated_output_tokens = len(text_content) // 4
             
-            return AIGenerationResult(
+            return self._observed(AIGenerationResult(
                 content=text_content,
                 provider="gemini",
                 model=self.model,
@@ -249,8 +273,9 @@ class GeminiProvider(LexicalAIProvider):
                 latency_ms=latency_ms,
                 request_id=request_id,
                 raw_response=None,
-            )
+            ))
         except Exception as e:
+            self._observe_failure(start_time)
             logger.error(
                 "Gemini generation failed",
                 model=self.model,
@@ -308,7 +333,7 @@ class DeepSeekProvider(LexicalAIProvider):
             tokens_input = response.usage.prompt_tokens
             tokens_output = response.usage.completion_tokens
             
-            return AIGenerationResult(
+            return self._observed(AIGenerationResult(
                 content=response.choices[0].message.content,
                 provider="deepseek",
                 model=self.model,
@@ -320,8 +345,9 @@ class DeepSeekProvider(LexicalAIProvider):
                 latency_ms=latency_ms,
                 request_id=request_id,
                 raw_response=response.model_dump() if hasattr(response, "model_dump") else None,
-            )
+            ))
         except Exception as e:
+            self._observe_failure(start_time)
             logger.error(
                 "DeepSeek generation failed",
                 model=self.model,
@@ -335,6 +361,42 @@ class DeepSeekProvider(LexicalAIProvider):
         return self.config
 
 
+class ReplayingProvider(LexicalAIProvider):
+    """Routes another provider's calls through the LLM record/replay store.
+
+    The live provider is only constructed when a call actually goes to the
+    network, so replay works without API keys or provider SDKs.
+    """
+
+    def __init__(self, model_key: str, factory: Callable[[], LexicalAIProvider]):
+        self.model_key = model_key
+        self.config = get_model_config(model_key)
+        self._factory = factory
+        self._live: Optional[LexicalAIProvider] = None
+
+    async def generate_relations(
+        self,
+        prompt: str,
+        system_prompt: str,
+        max_tokens: int = 4096,
+    ) -> AIGenerationResult:
+        async def live() -> Dict:
+            if self._live is None:
+                self._live = self._factory()
+            result = await self._live.generate_relations(prompt, system_prompt, max_tokens)
+            return asdict(result)
+
+        payload = {"prompt": prompt, "system_prompt": system_prompt, "max_tokens": max_tokens}
+        data = await llm_replay.call_async(
+            "lexical_relations", f"{self.config.provider}:{self.model_key}", payload, live
+        )
+        return AIGenerationResult(**data)
+
+    def get_model_config(self) -> AIModelConfig:
+        """Return model configuration."""
+        return self.config
+
+
 class AIProviderManager:
     """Manager for AI provider selection and fallback."""
     
@@ -360,13 +422,18 @@ class AIProviderManager:
                 raise ValueError(f"Unknown model: {model_key}")
             
             if config.provider == "openai":
-                self.providers[model_key] = OpenAIProvider(model_key)
+                provider_cls = OpenAIProvider
             elif config.provider == "gemini":
-                self.providers[model_key] = GeminiProvider(model_key)
+                provider_cls = GeminiProvider
             elif config.provider == "deepseek":
-                self.providers[model_key] = DeepSeekProvider(model_key)
+                provider_cls = DeepSeekProvider
             else:
                 raise ValueError(f"Unknown provider: {config.provider}")
+
+            if llm_replay.enabled:
+                self.providers[model_key] = ReplayingProvider(model_key, lambda: provider_cls(model_key))
+            else:
+                self.providers[model_key] = provider_cls(model_key)
         
         return self.providers[model_key]
     
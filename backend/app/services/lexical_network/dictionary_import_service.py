@@ -23,6 +23,7 @@ from app.services.lexical_network.pos_mapper import (
     map_matsushita_pos_to_unidic,
     should_update_canonical_pos,
 )
+from app.services.lexical_network.word_keys import ASSIGN_WORD_KEY_CYPHER
 
 logger = structlog.get_logger()
 
@@ -152,6 +153,7 @@ class DictionaryImportService:
                             ELSE w.sources
                         END,
                         w.updated_at = datetime()
+                    """ + ASSIGN_WORD_KEY_CYPHER + """
                     RETURN 
                         CASE WHEN w.created_at = datetime() THEN 'created' ELSE 'updated' END AS action,
                         w.pos_source AS existing_pos_source
@@ -196,9 +198,6 @@ class DictionaryImportService:
                                 pos_confidence=1.0,  # Dictionary sources have full confidence
                             )
                     
-                    if record:
-                    
-                    record = await result.single()
                     if record:
                         action = record.get("action", "updated")
                         if action == "created":
@@ -307,7 +306,8 @@ class DictionaryImportService:
         WITH w
         MATCH (primary:Word {standard_orthography: w.standard_orthography})
         WHERE primary.source = $primary_source
-        SET primary += w,
+        // Keep the primary's canonical key (word_key is unique)
+        SET primary += w {.*, word_key: primary.word_key, word_key_conflict: primary.word_key_conflict},
             primary.source_merged = [$primary_source, $secondary_source],
             primary.updated_at = datetime()
         RETURN count(*) AS merged
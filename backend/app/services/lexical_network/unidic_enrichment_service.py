@@ -12,6 +12,7 @@ from app.services.lexical_network.pos_mapper import (
     should_update_canonical_pos,
     get_pos_priority,
 )
+from app.services.lexical_network.word_keys import ASSIGN_WORD_KEY_CYPHER
 
 logger = structlog.get_logger()
 
@@ -115,7 +116,7 @@ class UnidicEnrichmentService:
         
         Args:
             neo4j_session: Neo4j async session
-            word: Word to enrich (standard_orthography)
+            word: Word to enrich (canonical word_key)
             
         Returns:
             Enrichment statistics
@@ -144,10 +145,24 @@ class UnidicEnrichmentService:
             "pos_primary_norm": unidic_data.get("unidic_pos1"),  # Primary is pos1
         }
         
-        # First, update UniDic fields and get existing POS source
+        # First, update UniDic fields and get existing POS source. Nodes not
+        # keyed yet are found by headword and receive their word_key here.
         query = """
-        MATCH (w:Word)
-        WHERE coalesce(w.standard_orthography, w.kanji) = $word
+        CALL {
+            MATCH (w:Word {word_key: $word})
+            RETURN w
+            UNION
+            MATCH (w:Word {standard_orthography: $word})
+            WHERE w.word_key IS NULL AND w.word_key_conflict IS NULL
+            RETURN w
+            UNION
+            MATCH (w:Word {kanji: $word})
+            WHERE w.word_key IS NULL AND w.word_key_conflict IS NULL AND w.standard_orthography IS NULL
+            RETURN w
+        }
+        WITH w LIMIT 1
+        """ + ASSIGN_WORD_KEY_CYPHER + """
+        WITH w
         SET w += $props,
             w.last_enriched_at = datetime(),
             w.sources = CASE 
@@ -163,7 +178,7 @@ class UnidicEnrichmentService:
                 ELSE w.source
             END,
             w.updated_at = datetime()
-        RETURN w.standard_orthography AS word, w.pos_source AS existing_pos_source
+        RETURN w.standard_orthography AS word, w.pos_source AS existing_pos_source, elementId(w) AS node_id
         """
         
         result = await neo4j_session.run(query, word=word, props=props)
@@ -175,7 +190,7 @@ class UnidicEnrichmentService:
             if should_update_canonical_pos(existing_pos_source, "unidic"):
                 update_query = """
                 MATCH (w:Word)
-                WHERE coalesce(w.standard_orthography, w.kanji) = $word
+                WHERE elementId(w) = $node_id
                 SET w.pos1 = $pos1,
                     w.pos2 = $pos2,
                     w.pos3 = $pos3,
@@ -187,7 +202,7 @@ class UnidicEnrichmentService:
                 """
                 await neo4j_session.run(
                     update_query,
-                    word=word,
+                    node_id=record.get("node_id"),
                     pos1=canonical_pos.get("pos1"),
                     pos2=canonical_pos.get("pos2"),
                     pos3=canonical_pos.get("pos3"),
@@ -227,8 +242,10 @@ class UnidicEnrichmentService:
         query = """
         MATCH (w:Word)
         WHERE w.unidic_lemma IS NULL
+        AND w.word_key_conflict IS NULL
+        AND coalesce(w.word_key, w.standard_orthography, w.kanji) IS NOT NULL
         AND ($pos_filter IS NULL OR coalesce(w.pos_primary_norm, w.pos_primary) = $pos_filter)
-        RETURN coalesce(w.standard_orthography, w.kanji) AS word
+        RETURN coalesce(w.word_key, w.standard_orthography, w.kanji) AS word
         LIMIT $limit
         """
         
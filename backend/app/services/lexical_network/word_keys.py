@@ -0,0 +1,151 @@
+"""
+Canonical Word Keys
+
+Every :Word node carries a materialized ``word_key`` property equal to
+``coalesce(standard_orthography, kanji)``. Lookups by this key are served by a
+uniqueness constraint (and its backing index) instead of evaluating
+``coalesce()`` over a full :Word label scan.
+
+The key is assigned by the dictionary import and UniDic enrichment, and
+backfilled for existing nodes by ``backfill_word_keys`` (run at startup via
+``ensure_word_keys``). When two legacy nodes share a key, the one
+with a ``standard_orthography`` keeps it and the others are flagged with
+``word_key_conflict`` for manual review.
+"""
+
+from typing import Any, Dict, Optional
+
+import structlog
+
+logger = structlog.get_logger()
+
+WORD_KEY_CONSTRAINT = "word_key_unique"
+
+# Idempotent schema statements (constraint also creates the lookup index).
+WORD_KEY_SCHEMA_STATEMENTS = [
+    f"CREATE CONSTRAINT {WORD_KEY_CONSTRAINT} IF NOT EXISTS FOR (w:Word) REQUIRE w.word_key IS UNIQUE",
+    "CREATE INDEX word_standard_orthography IF NOT EXISTS FOR (w:Word) ON (w.standard_orthography)",
+    "CREATE INDEX word_kanji IF NOT EXISTS FOR (w:Word) ON (w.kanji)",
+    "CREATE INDEX word_reading_hiragana IF NOT EXISTS FOR (w:Word) ON (w.reading_hiragana)",
+    "CREATE INDEX word_reading_katakana IF NOT EXISTS FOR (w:Word) ON (w.reading_katakana)",
+]
+
+# Cypher fragment assigning the key to the bound node ``w``.
+# Must be followed by a WITH/RETURN clause; keeps ``w`` in scope.
+ASSIGN_WORD_KEY_CYPHER = """
+WITH w, coalesce(w.standard_orthography, w.kanji) AS _word_key
+OPTIONAL MATCH (_holder:Word {word_key: _word_key})
+WHERE _holder <> w
+WITH w, _word_key, count(_holder) AS _taken
+SET w.word_key = CASE WHEN _taken = 0 THEN _word_key ELSE w.word_key END,
+    w.word_key_conflict = CASE WHEN _taken = 0 THEN null ELSE _word_key END
+"""
+
+_BACKFILL_BATCH_QUERY = """
+MATCH (w:Word)
+WHERE w.word_key IS NULL
+  AND w.word_key_conflict IS NULL
+  AND coalesce(w.standard_orthography, w.kanji) IS NOT NULL
+WITH coalesce(w.standard_orthography, w.kanji) AS wkey, collect(w) AS nodes
+LIMIT $batch_size
+OPTIONAL MATCH (holder:Word {word_key: wkey})
+WITH wkey,
+     holder,
+     [n IN nodes WHERE n.standard_orthography IS NOT NULL]
+       + [n IN nodes WHERE n.standard_orthography IS NULL] AS ordered
+WITH wkey,
+     CASE WHEN holder IS NULL THEN head(ordered) END AS primary,
+     CASE WHEN holder IS NULL THEN tail(ordered) ELSE ordered END AS duplicates
+FOREACH (p IN CASE WHEN primary IS NULL THEN [] ELSE [primary] END | SET p.word_key = wkey)
+FOREACH (d IN duplicates | SET d.word_key_conflict = wkey)
+RETURN count(primary) AS keyed, sum(size(duplicates)) AS conflicts
+"""
+
+
+def word_key(standard_orthography: Optional[str], kanji: Optional[str] = None) -> Optional[str]:
+    """
+    Compute the canonical key for a word (Python mirror of the Cypher rule).
+
+    Args:
+        standard_orthography: Dictionary headword
+        kanji: Legacy kanji property
+
+    Returns:
+        Canonical key, or None if both are empty
+    """
+    for value in (standard_orthography, kanji):
+        if value is not None and str(value) != "":
+            return str(value)
+    return None
+
+
+async def ensure_word_key_schema(neo4j_session) -> None:
+    """
+    Create the ``word_key`` uniqueness constraint and supporting indexes.
+
+    Args:
+        neo4j_session: Neo4j async session
+    """
+    for statement in WORD_KEY_SCHEMA_STATEMENTS:
+        result = await neo4j_session.run(statement)
+        await result.consume()
+    logger.info("Word key schema ensured", constraint=WORD_KEY_CONSTRAINT)
+
+
+async def backfill_word_keys(
+    neo4j_session,
+    batch_size: int = 5000,
+    max_batches: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Assign ``word_key`` to Word nodes that do not have one yet.
+
+    Runs in batches of distinct keys (one transaction each) until no
+    unkeyed nodes remain. Safe to re-run.
+
+    Args:
+        neo4j_session: Neo4j async session
+        batch_size: Distinct keys processed per batch
+        max_batches: Optional cap on the number of batches
+
+    Returns:
+        Stats with ``keyed``, ``conflicts`` and ``batches`` counts
+    """
+    stats = {"keyed": 0, "conflicts": 0, "batches": 0}
+    while max_batches is None or stats["batches"] < max_batches:
+        result = await neo4j_session.run(_BACKFILL_BATCH_QUERY, batch_size=batch_size)
+        record = await result.single()
+        keyed = int(record["keyed"] or 0) if record else 0
+        conflicts = int(record["conflicts"] or 0) if record else 0
+        if keyed == 0 and conflicts == 0:
+            break
+        stats["keyed"] += keyed
+        stats["conflicts"] += conflicts
+        stats["batches"] += 1
+        logger.info("Word key backfill progress", **stats)
+
+    logger.info("Word key backfill completed", **stats)
+    return stats
+
+
+async def ensure_word_keys(neo4j_driver, batch_size: int = 5000) -> Optional[Dict[str, Any]]:
+    """
+    Ensure the schema and backfill keys using a session of its own.
+
+    Run as a startup task so nodes created before keys existed are reachable
+    by ``word_key`` lookups. Failures are logged, not raised.
+
+    Args:
+        neo4j_driver: Neo4j async driver
+        batch_size: Distinct keys processed per batch
+
+    Returns:
+        Backfill stats, or None if it failed
+    """
+    try:
+        async with neo4j_driver.session() as session:
+            await ensure_word_key_schema(session)
+            return await backfill_word_keys(session, batch_size=batch_size)
+    except Exception as e:
+        logger.warning("Word key startup backfill failed", error=str(e))
+        return None
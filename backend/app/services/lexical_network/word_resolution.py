@@ -257,16 +257,18 @@ async def resolve_target_word(
         return None, "not_found", {"reason": "empty_input"}
     
     # Build Neo4j query to find candidates (property-only to avoid warnings)
+    # Reason: one UNION branch per indexed property so each is an index seek
+    # (an OR across properties forces a :Word label scan).
     query = """
-    MATCH (w:Word)
-    WHERE (
-        ($orth_forms IS NOT NULL AND w.standard_orthography IN $orth_forms)
-        OR ($reading_forms IS NOT NULL AND (
-            w.reading_hiragana IN $reading_forms
-            OR w.reading_katakana IN $reading_forms
-        ))
-    )
-    AND ($expected_pos IS NULL OR coalesce(w.pos_primary_norm, w.pos1, w.pos_primary) IN $expected_pos)
+    CALL {
+        MATCH (w:Word) WHERE w.standard_orthography IN $orth_forms RETURN w
+        UNION
+        MATCH (w:Word) WHERE w.reading_hiragana IN $reading_forms RETURN w
+        UNION
+        MATCH (w:Word) WHERE w.reading_katakana IN $reading_forms RETURN w
+    }
+    WITH w
+    WHERE $expected_pos IS NULL OR coalesce(w.pos_primary_norm, w.pos1, w.pos_primary) IN $expected_pos
     RETURN 
         w.standard_orthography AS word_key,
         w.standard_orthography AS standard_orthography,
@@ -277,8 +279,8 @@ async def resolve_target_word(
     """
     
     # Execute query
-    orth_forms_param = orth_variants if orth_variants else None
-    reading_forms_param = reading_variants if reading_variants else None
+    orth_forms_param = orth_variants or []
+    reading_forms_param = reading_variants or []
     
     result = await session.run(
         query,
@@ -0,0 +1,280 @@
+"""
+Record/replay backend for LLM calls.
+
+In ``record`` mode every wrapped provider call is executed live and its
+response is written to a JSON fixture keyed on (namespace, model, request
+payload). In ``replay`` mode the fixture is returned instead of calling the
+provider, after an optional synthetic delay, so lesson compilation and chat
+flows can be exercised and benchmarked offline. Configured via LLM_REPLAY_*
+settings; ``off`` (the default) leaves every call path untouched.
+
+Fixtures live at ``<LLM_REPLAY_DIR>/<namespace>/<key>.json``.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional
+
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+REPLAY_MODES = ("off", "record", "replay")
+
+
+class LLMReplayMissError(RuntimeError):
+    """Raised in replay mode when no fixture exists for a request."""
+
+
+def _backend_root() -> Path:
+    return Path(__file__).resolve().parents[2]
+
+
+def _canonical(value: Any) -> str:
+    # Reason: schemas and other non-JSON values only need a stable repr for keying.
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+
+
+class LLMReplayStore:
+    """Fixture-backed record/replay wrapper around provider calls."""
+
+    def __init__(
+        self,
+        mode: str = "off",
+        directory: str = "tests/fixtures/llm_replay",
+        latency_ms: Optional[int] = None,
+        latency_scale: float = 1.0,
+    ) -> None:
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {}
+        self.latency_ms: Optional[int] = None
+        self.configure(mode=mode, directory=directory, latency_ms=latency_ms, latency_scale=latency_scale)
+
+    def configure(
+        self,
+        *,
+        mode: Optional[str] = None,
+        directory: Optional[str] = None,
+        latency_ms: Optional[int] = None,
+        latency_scale: Optional[float] = None,
+    ) -> None:
+        """
+        Update the store configuration in place.
+
+        Args:
+            mode: "off", "record" or "replay"
+            directory: Fixture directory; relative paths resolve against backend/
+            latency_ms: Fixed synthetic delay per replayed call (negative clears it)
+            latency_scale: Multiplier on recorded latency when no fixed delay is set
+        """
+        if mode is not None:
+            if mode not in REPLAY_MODES:
+                raise ValueError(f"Unsupported LLM replay mode: {mode}")
+            self.mode = mode
+        if directory is not None:
+            path = Path(directory)
+            self.directory = path if path.is_absolute() else _backend_root() / path
+        if latency_ms is not None:
+            self.latency_ms = latency_ms if latency_ms >= 0 else None
+        if latency_scale is not None:
+            self.latency_scale = max(0.0, float(latency_scale))
+
+    @contextmanager
+    def override(self, **kwargs: Any) -> Iterator["LLMReplayStore"]:
+        """Temporarily reconfigure the store (benchmarks and tests)."""
+        previous = {
+            "mode": self.mode,
+            "directory": str(self.directory),
+            "latency_ms": self.latency_ms if self.latency_ms is not None else -1,
+            "latency_scale": self.latency_scale,
+        }
+        self.configure(**kwargs)
+        try:
+            yield self
+        finally:
+            self.configure(**previous)
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def key(self, namespace: str, model: str, payload: Dict[str, Any]) -> str:
+        """Return the fixture key for a request."""
+        blob = _canonical({"namespace": namespace, "model": model, "payload": payload})
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:24]
+
+    def fixture_path(self, namespace: str, model: str, payload: Dict[str, Any]) -> Path:
+        return self.directory / namespace / f"{self.key(namespace, model, payload)}.json"
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + 1
+
+    def _load(self, namespace: str, model: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        path = self.fixture_path(namespace, model, payload)
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                fixture = json.load(fh)
+        except FileNotFoundError:
+            self._count("misses")
+            raise LLMReplayMissError(f"No LLM fixture for {namespace}/{model} at {path}") from None
+        self._count("hits")
+        return fixture
+
+    def _delay_seconds(self, fixture: Dict[str, Any]) -> float:
+        if self.latency_ms is not None:
+            return self.latency_ms / 1000.0
+        return float(fixture.get("latency_ms") or 0) * self.latency_scale / 1000.0
+
+    def record(
+        self,
+        namespace: str,
+        model: str,
+        payload: Dict[str, Any],
+        response: Any,
+        latency_ms: float,
+    ) -> Path:
+        """
+        Write a fixture atomically.
+
+        Args:
+            namespace: Call site family (e.g. "cando_compile", "ai_chat")
+            model: Provider/model identifier
+            payload: Request payload the key is derived from
+            response: JSON-serialisable response to replay later
+            latency_ms: Observed live latency
+
+        Returns:
+            Path: Fixture path
+        """
+        path = self.fixture_path(namespace, model, payload)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fixture = {
+            "namespace": namespace,
+            "model": model,
+            "payload": json.loads(_canonical(payload)),
+            "response": response,
+            "latency_ms": round(float(latency_ms), 1),
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+        }
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(fixture, fh, ensure_ascii=False, indent=2, default=str)
+        os.replace(tmp, path)
+        self._count("recorded")
+        logger.debug("llm_fixture_recorded", namespace=namespace, model=model, path=str(path))
+        return path
+
+    def call_sync(
+        self,
+        namespace: str,
+        model: str,
+        payload: Dict[str, Any],
+        live: Callable[[], Any],
+    ) -> Any:
+        """Replay, record or pass through a blocking provider call."""
+        if self.mode == "replay":
+            fixture = self._load(namespace, model, payload)
+            delay = self._delay_seconds(fixture)
+            if delay > 0:
+                time.sleep(delay)
+            return fixture["response"]
+        started = time.perf_counter()
+        response = live()
+        if self.mode == "record":
+            self.record(namespace, model, payload, response, (time.perf_counter() - started) * 1000.0)
+        return response
+
+    async def call_async(
+        self,
+        namespace: str,
+        model: str,
+        payload: Dict[str, Any],
+        live: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Replay, record or pass through an async provider call."""
+        if self.mode == "replay":
+            fixture = self._load(namespace, model, payload)
+            delay = self._delay_seconds(fixture)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            return fixture["response"]
+        started = time.perf_counter()
+        response = await live()
+        if self.mode == "record":
+            self.record(namespace, model, payload, response, (time.perf_counter() - started) * 1000.0)
+        return response
+
+    async def stream(
+        self,
+        namespace: str,
+        model: str,
+        payload: Dict[str, Any],
+        live: AsyncIterator[str],
+    ) -> AsyncIterator[str]:
+        """
+        Replay, record or pass through a streamed text reply.
+
+        Replay yields the recorded deltas with the synthetic delay spread
+        across them. Recording only happens when the live stream completes,
+        so a disconnect never leaves a truncated fixture.
+        """
+        if self.mode == "replay":
+            close = getattr(live, "aclose", None)
+            if close is not None:
+                await close()
+            fixture = self._load(namespace, model, payload)
+            chunks: List[str] = list(fixture["response"].get("chunks") or [])
+            step = self._delay_seconds(fixture) / max(1, len(chunks))
+            for chunk in chunks:
+                if step > 0:
+                    await asyncio.sleep(step)
+                yield chunk
+            return
+        started = time.perf_counter()
+        chunks = []
+        try:
+            async for chunk in live:
+                chunks.append(chunk)
+                yield chunk
+        finally:
+            close = getattr(live, "aclose", None)
+            if close is not None:
+                await close()
+        if self.mode == "record":
+            self.record(namespace, model, payload, {"chunks": chunks}, (time.perf_counter() - started) * 1000.0)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return mode and hit/miss/record counters."""
+        with self._lock:
+            counts = dict(self._counts)
+        return {
+            "mode": self.mode,
+            "directory": str(self.directory),
+            "hits": counts.get("hits", 0),
+            "misses": counts.get("misses", 0),
+            "recorded": counts.get("recorded", 0),
+        }
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+
+# Singleton instance
+llm_replay = LLMReplayStore(
+    mode=settings.LLM_REPLAY_MODE,
+    directory=settings.LLM_REPLAY_DIR,
+    latency_ms=settings.LLM_REPLAY_LATENCY_MS,
+    latency_scale=settings.LLM_REPLAY_LATENCY_SCALE,
+)
@@ -0,0 +1,160 @@
+"""
+Password hashing off the event loop.
+
+PBKDF2/bcrypt hashes are deliberately slow (tens of milliseconds). Running
+them inline in async handlers stalls every other request on the worker, so
+`PasswordHasher` runs them on a small dedicated thread pool and tracks
+queue depth and latency. Hash cost is configured via PASSWORD_HASH_* settings.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import structlog
+from passlib.context import CryptContext
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+
+def build_crypt_context(
+    scheme: Optional[str] = None,
+    pbkdf2_rounds: Optional[int] = None,
+    bcrypt_rounds: Optional[int] = None,
+) -> CryptContext:
+    """
+    Build the passlib context from settings.
+
+    New hashes use `scheme`; both PBKDF2-SHA256 and bcrypt hashes verify, and
+    hashes in the other scheme are reported as needing an update.
+
+    Args:
+        scheme: Scheme for new hashes (default: PASSWORD_HASH_SCHEME)
+        pbkdf2_rounds: PBKDF2-SHA256 iterations (default: PASSWORD_HASH_PBKDF2_ROUNDS)
+        bcrypt_rounds: bcrypt log2 cost (default: PASSWORD_HASH_BCRYPT_ROUNDS)
+
+    Returns:
+        CryptContext: Configured context
+    """
+    scheme = scheme or settings.PASSWORD_HASH_SCHEME
+    schemes = ["pbkdf2_sha256", "bcrypt"]
+    if scheme not in schemes:
+        raise ValueError(f"Unsupported password hash scheme: {scheme}")
+    return CryptContext(
+        schemes=schemes,
+        default=scheme,
+        deprecated="auto",
+        pbkdf2_sha256__rounds=pbkdf2_rounds or settings.PASSWORD_HASH_PBKDF2_ROUNDS,
+        bcrypt__rounds=bcrypt_rounds or settings.PASSWORD_HASH_BCRYPT_ROUNDS,
+    )
+
+
+class PasswordHasher:
+    """Runs passlib hash/verify calls on a bounded thread pool."""
+
+    def __init__(self, context: CryptContext, max_workers: int = 2) -> None:
+        self.context = context
+        self.max_workers = max(1, int(max_workers))
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._peak_queued = 0
+        self._completed = 0
+        self._failed = 0
+        self._wait_ms_total = 0.0
+        self._hash_ms_total = 0.0
+        self._wait_ms_max = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="password-hash"
+                    )
+        return self._executor
+
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        submitted = time.perf_counter()
+        with self._lock:
+            self._queued += 1
+            self._peak_queued = max(self._peak_queued, self._queued)
+
+        def job() -> Any:
+            started = time.perf_counter()
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+                wait_ms = (started - submitted) * 1000.0
+                self._wait_ms_total += wait_ms
+                self._wait_ms_max = max(self._wait_ms_max, wait_ms)
+            ok = False
+            try:
+                result = fn(*args)
+                ok = True
+                return result
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._hash_ms_total += (time.perf_counter() - started) * 1000.0
+                    if ok:
+                        self._completed += 1
+                    else:
+                        self._failed += 1
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), job)
+
+    async def hash(self, password: str) -> str:
+        """Hash a password with the configured default scheme."""
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        """Verify a password against a stored hash."""
+        return await self._run(self.context.verify, password, hashed)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """
+        Verify a password and return a replacement hash if parameters changed.
+
+        Args:
+            password: Plain password
+            hashed: Stored hash
+
+        Returns:
+            Tuple of (valid, new_hash or None)
+        """
+        return await self._run(self.context.verify_and_update, password, hashed)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth and latency counters."""
+        with self._lock:
+            done = self._completed + self._failed
+            return {
+                "max_workers": self.max_workers,
+                "queued": self._queued,
+                "running": self._running,
+                "peak_queued": self._peak_queued,
+                "completed": self._completed,
+                "failed": self._failed,
+                "avg_wait_ms": round(self._wait_ms_total / done, 2) if done else 0.0,
+                "max_wait_ms": round(self._wait_ms_max, 2),
+                "avg_hash_ms": round(self._hash_ms_total / done, 2) if done else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        """Stop the worker threads (used on application shutdown)."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+# Singleton instances
+pwd_context = build_crypt_context()
+password_hasher = PasswordHasher(pwd_context, max_workers=settings.PASSWORD_HASH_MAX_WORKERS)
@@ -9,6 +9,7 @@ from typing import List, Dict, Any, Optional, Set
 import structlog
 
 from app.services.cando_embedding_service import CanDoEmbeddingService
+from app.services.cando_neighbour_cache import CanDoNeighbourCache, cando_neighbour_cache
 from app.services.cando_complexity_service import cando_complexity_service
 from app.core.config import settings
 
@@ -18,8 +19,9 @@ logger = structlog.get_logger()
 class PathBuilder:
     """Service for building semantically connected learning paths."""
     
-    def __init__(self):
+    def __init__(self, neighbour_cache: Optional[CanDoNeighbourCache] = None):
         self.embedding_service = CanDoEmbeddingService()
+        self.neighbour_cache = neighbour_cache or cando_neighbour_cache
         self.complexity_service = cando_complexity_service
         self.max_steps = settings.PATH_MAX_STEPS
         self.complexity_increment = settings.PATH_COMPLEXITY_INCREMENT
@@ -136,6 +138,45 @@ class PathBuilder:
         
         return path
     
+    async def _get_similar_candos(
+        self,
+        neo4j_session,
+        can_do_uid: str,
+        limit: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Get semantic neighbours from the in-memory k-NN cache.
+        
+        Falls back to a direct vector search when the cache cannot serve the
+        query (e.g. the adjacency failed to load).
+        
+        Args:
+            neo4j_session: Neo4j session
+            can_do_uid: CanDo UID to find neighbours for
+            limit: Maximum number of neighbours
+            
+        Returns:
+            List of dicts with uid and similarity, highest similarity first
+        """
+        try:
+            return await self.neighbour_cache.get_neighbours(
+                neo4j_session,
+                can_do_uid,
+                limit=limit,
+                similarity_threshold=self.semantic_threshold,
+                fetch_similar=self.embedding_service.find_similar_candos
+            )
+        except Exception as e:
+            logger.warning("Neighbour cache unavailable, querying vector index",
+                          uid=can_do_uid,
+                          error=str(e))
+            return await self.embedding_service.find_similar_candos(
+                neo4j_session=neo4j_session,
+                can_do_uid=can_do_uid,
+                limit=limit,
+                similarity_threshold=self.semantic_threshold
+            )
+    
     async def find_next_semantic_cando(
         self,
         current_cando: Dict[str, Any],
@@ -165,11 +206,10 @@ class PathBuilder:
         
         # Find semantically similar CanDo descriptors
         try:
-            similar_candos = await self.embedding_service.find_similar_candos(
-                neo4j_session=neo4j_session,
-                can_do_uid=current_uid,
-                limit=50,  # Get more candidates
-                similarity_threshold=self.semantic_threshold
+            similar_candos = await self._get_similar_candos(
+                neo4j_session,
+                current_uid,
+                limit=50  # Get more candidates
             )
         except Exception as e:
             logger.warning("Failed to find similar CanDo descriptors, using fallback",
@@ -286,11 +326,10 @@ class PathBuilder:
             
             # Check if they're semantically similar
             try:
-                similar = await self.embedding_service.find_similar_candos(
-                    neo4j_session=neo4j_session,
-                    can_do_uid=current_uid,
-                    limit=10,
-                    similarity_threshold=self.semantic_threshold
+                similar = await self._get_similar_candos(
+                    neo4j_session,
+                    current_uid,
+                    limit=10
                 )
                 
                 # Check if next is in similar list
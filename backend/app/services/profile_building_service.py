@@ -468,12 +468,14 @@ Return ONLY valid JSON matching this schema:
         if profile_data.current_level:
             from sqlalchemy import update
             from app.models.database_models import User
+            from app.services.auth_service import invalidate_principal
             await db.execute(
                 update(User)
                 .where(User.id == user_id)
                 .values(current_level=profile_data.current_level)
             )
             await db.commit()
+            invalidate_principal(user_id)
         
         if existing_profile:
             # Update existing profile
@@ -23,6 +23,7 @@ from app.services.path_builder import path_builder
 from app.services.cando_complexity_service import cando_complexity_service
 from app.services.prelesson_kit_service import prelesson_kit_service
 from app.core.config import settings
+from app.utils.bounded_cache import BoundedCache
 
 logger = structlog.get_logger()
 
@@ -38,7 +39,11 @@ class UserPathService:
         self.default_provider = "openai"
         self.default_model = "gpt-4o"
         # Cache for pre-lesson kits to avoid regenerating for same CanDo/level
-        self._kit_cache: Dict[str, Any] = {}
+        self._kit_cache: BoundedCache[Any] = BoundedCache(
+            name="prelesson_kits",
+            max_entries=settings.PRELESSON_KIT_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.PRELESSON_KIT_CACHE_TTL_SECONDS,
+        )
     
     def analyze_profile_for_path(
         self,
@@ -587,9 +592,10 @@ class UserPathService:
         """
         cache_key = f"{can_do_id}:{learner_level}"
         
-        if cache_key in self._kit_cache:
+        kit = self._kit_cache.get(cache_key)
+        if kit is not None:
             logger.debug("Using cached kit", can_do_id=can_do_id, level=learner_level)
-            return self._kit_cache[cache_key]
+            return kit
         
         # Generate kit
         kit = await prelesson_kit_service.generate_kit(
@@ -599,7 +605,7 @@ class UserPathService:
         )
         
         # Cache it
-        self._kit_cache[cache_key] = kit
+        self._kit_cache.set(cache_key, kit)
         logger.debug("Cached kit", can_do_id=can_do_id, level=learner_level)
         
         return kit
@@ -0,0 +1,231 @@
+"""
+Bounded in-process cache with TTL, LRU eviction and metrics.
+
+Service-layer caches (lesson masters, Stage 2 results, pre-lesson kits, ...)
+use `BoundedCache` instead of plain dicts so that memory stays flat in
+long-running workers: entries expire after a TTL, the least recently used
+entries are evicted once an entry-count or byte budget is exceeded, and
+hit/miss/eviction counters are available through `stats()` /
+`all_cache_stats()`.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Hashable, Iterator, Optional, Tuple, TypeVar
+
+
+V = TypeVar("V")
+
+_MISSING = object()
+
+# Named caches by name, for diagnostics. Weak so short-lived caches can be collected.
+_registry: "weakref.WeakValueDictionary[str, BoundedCache[Any]]" = weakref.WeakValueDictionary()
+
+
+def json_size(value: Any) -> int:
+    """
+    Approximate the in-memory footprint of a JSON-like value.
+
+    Uses the length of its compact JSON encoding, which is cheap relative to
+    generating the value and tracks payload size closely enough for budgets.
+
+    Args:
+        value: JSON-serialisable value (non-serialisable leaves use `str()`).
+
+    Returns:
+        int: Approximate size in bytes.
+    """
+    try:
+        return len(json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8"))
+    except Exception:
+        return len(str(value))
+
+
+class BoundedCache(Generic[V]):
+    """
+    Thread-safe LRU cache with optional TTL and entry/byte bounds.
+
+    Expired entries are dropped on access and swept whenever a new entry is
+    stored, so stale keys that are never read again do not accumulate.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = 1024,
+        ttl_seconds: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        sizeof: Optional[Callable[[V], int]] = None,
+    ) -> None:
+        """
+        Args:
+            name: Cache name used in logs and `all_cache_stats()`.
+            max_entries: Maximum number of entries (must be positive).
+            ttl_seconds: Entry lifetime; None or 0 disables expiry.
+            max_bytes: Total size budget; None or 0 disables it.
+            sizeof: Per-entry size function; defaults to `json_size` when a
+                byte budget is configured.
+        """
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds or None
+        self.max_bytes = max_bytes or None
+        self._sizeof = sizeof or (json_size if self.max_bytes else None)
+
+        # key -> (value, expires_at or None, size)
+        self._data: "OrderedDict[Hashable, Tuple[V, Optional[float], int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        _registry[name] = self
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING, record=False) is not _MISSING
+
+    def _drop(self, key: Hashable) -> None:
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def _purge_expired_locked(self, now: float) -> None:
+        if self.ttl_seconds is None:
+            return
+        expired = [k for k, (_, exp, _) in self._data.items() if exp is not None and exp <= now]
+        for key in expired:
+            self._drop(key)
+        self.expirations += len(expired)
+
+    def get(self, key: Hashable, default: Any = None, *, record: bool = True) -> Any:
+        """
+        Return the cached value and mark it most recently used.
+
+        Args:
+            key: Cache key.
+            default: Value returned on a miss or expired entry.
+            record: Whether to count the lookup in hit/miss metrics.
+
+        Returns:
+            Cached value or `default`.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                if record:
+                    self.misses += 1
+                return default
+            value, expires_at, _ = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._drop(key)
+                self.expirations += 1
+                if record:
+                    self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            if record:
+                self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: V, ttl_seconds: Optional[float] = None) -> None:
+        """
+        Store a value, evicting expired and least recently used entries as needed.
+
+        Args:
+            key: Cache key.
+            value: Value to cache.
+            ttl_seconds: Per-entry TTL override.
+        """
+        size = self._sizeof(value) if self._sizeof else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            # Reason: a single oversized value would flush the whole cache.
+            self.pop(key)
+            return
+        ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        now = time.monotonic()
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._purge_expired_locked(now)
+            self._data[key] = (value, now + ttl if ttl else None, size)
+            self._bytes += size
+            while len(self._data) > self.max_entries or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                oldest = next(iter(self._data))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove and return an entry (expired entries return `default`)."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            self._drop(key)
+            value, expires_at, _ = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                return default
+            return value
+
+    def clear(self) -> None:
+        """Drop all entries (metrics are kept)."""
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def purge_expired(self) -> int:
+        """
+        Drop every expired entry.
+
+        Returns:
+            int: Number of entries removed.
+        """
+        with self._lock:
+            before = len(self._data)
+            self._purge_expired_locked(time.monotonic())
+            return before - len(self._data)
+
+    def keys(self) -> Iterator[Hashable]:
+        """Snapshot of current keys, least recently used first."""
+        with self._lock:
+            return iter(list(self._data.keys()))
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size and hit/miss/eviction counters."""
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+def all_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Stats for every live named cache.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Cache name -> `BoundedCache.stats()`.
+    """
+    return {name: cache.stats() for name, cache in list(_registry.items())}
@@ -121,3 +121,74 @@ def parse_json_object(content: str) -> Dict[str, Any]:
 
     return parsed
 
+
+
+def parse_partial_json(content: str, max_attempts: int = 8) -> Optional[Dict[str, Any]]:
+    """
+    Parse the longest usable prefix of a JSON object that is still being streamed.
+
+    Open strings, arrays and objects are closed; a trailing incomplete key or
+    value is dropped by cutting back to the last `,`, `{` or `[` outside a string.
+
+    Args:
+        content (str): Raw (possibly truncated) AI response string.
+        max_attempts (int): How many cut points to try, newest first.
+
+    Returns:
+        Optional[Dict[str, Any]]: The parsed partial object, or None if no prefix parses yet.
+    """
+    start = content.find("{")
+    if start == -1:
+        return None
+
+    stack: List[str] = []
+    in_string = False
+    escape_next = False
+    # (cut index, closers needed at that cut), newest last
+    cuts: List[Tuple[int, str]] = []
+
+    for i in range(start, len(content)):
+        char = content[i]
+        if escape_next:
+            escape_next = False
+            continue
+        if char == "\\":
+            escape_next = in_string
+            continue
+        if char == '"':
+            in_string = not in_string
+            continue
+        if in_string:
+            continue
+        if char in "{[":
+            stack.append("}" if char == "{" else "]")
+            cuts.append((i + 1, "".join(reversed(stack))))
+        elif char in "}]":
+            if stack:
+                stack.pop()
+            if not stack:
+                # Already complete; nothing to repair.
+                return _loads_object(content[start : i + 1])
+        elif char == ",":
+            cuts.append((i, "".join(reversed(stack))))
+        if len(cuts) > max_attempts:
+            del cuts[0]
+
+    body = content[start:]
+    if escape_next:
+        body = body[:-1]
+    candidates = [body + ('"' if in_string else "") + "".join(reversed(stack))]
+    candidates += [content[start:cut] + closers for cut, closers in reversed(cuts)]
+    for candidate in candidates[:max_attempts]:
+        parsed = _loads_object(candidate)
+        if parsed is not None:
+            return parsed
+    return None
+
+
+def _loads_object(candidate: str) -> Optional[Dict[str, Any]]:
+    try:
+        parsed = json.loads(candidate)
+    except json.JSONDecodeError:
+        return None
+    return parsed if isinstance(parsed, dict) else None
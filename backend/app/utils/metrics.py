@@ -0,0 +1,455 @@
+"""
+Prometheus-style metrics.
+
+A small in-process registry rendering the Prometheus text exposition format
+(`GET /metrics`), so no client library is needed. Hot-path instruments are
+cheap: an observation is a dict lookup, a bisect and a few additions under a
+lock. Everything that already keeps its own counters (bounded caches, SSE
+outcome counts, `sql_stats`, `neo4j_query_stats`, the Postgres pool, service
+`stats()`) is read by collectors at scrape time instead of being duplicated.
+
+Recorded directly:
+
+- `http_request_duration_seconds{method,route,status}` by `MetricsMiddleware`
+  (route template, not the raw path; unmatched paths share one label)
+- `llm_request_duration_seconds`, `llm_tokens_total`, `llm_cost_usd_total`
+  per provider and model via `observe_llm_call`
+- `db_pool_checkout_wait_seconds{pool}` via `observe_pool_wait`
+
+Enabled by `AI_ROUTING_CONFIG_PERFORMANCE_MONITORING`; values are per worker
+process.
+"""
+
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import structlog
+
+from app.core.config import settings
+from app.utils.request_profiler import record_span
+
+logger = structlog.get_logger()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+LLM_LATENCY_BUCKETS: Tuple[float, ...] = (0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+POOL_WAIT_BUCKETS: Tuple[float, ...] = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0)
+
+UNMATCHED_ROUTE = "(unmatched)"
+
+# (suffix, labels, value) samples of one metric family
+Sample = Tuple[str, Dict[str, str], float]
+Family = Tuple[str, str, str, List[Sample]]  # name, type, help, samples
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class _Metric:
+    """Labelled metric family; subclasses define the per-labelset state."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], Any] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            items = list(self._values.items())
+        return [
+            ("", dict(zip(self.label_names, key)), float(value))
+            for key, value in items
+        ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    """Monotonic counter."""
+
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+
+    type = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram with sum and count."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # per-bucket counts (+Inf last), sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        return histogram_samples(self.label_names, self.buckets, items)
+
+
+def histogram_samples(
+    label_names: Sequence[str],
+    bounds: Sequence[float],
+    items: Iterable[Tuple[Tuple[str, ...], List[int], float]],
+) -> List[Sample]:
+    """
+    Render per-bucket counts as cumulative `_bucket`, `_sum` and `_count` samples.
+
+    Args:
+        label_names: Names matching each key tuple
+        bounds: Upper bucket bounds (the last count is the +Inf bucket)
+        items: (label values, per-bucket counts, sum) per labelset
+
+    Returns:
+        List[Sample]: Samples in exposition order
+    """
+    samples: List[Sample] = []
+    for key, counts, total in items:
+        labels = dict(zip(label_names, key))
+        cumulative = 0
+        for bound, count in zip([*bounds, math.inf], counts):
+            cumulative += count
+            samples.append(("_bucket", {**labels, "le": _format_value(float(bound))}, cumulative))
+        samples.append(("_sum", labels, total))
+        samples.append(("_count", labels, cumulative))
+    return samples
+
+
+class MetricsRegistry:
+    """Registered metrics plus scrape-time collectors."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: Dict[str, Callable[[], Iterable[Family]]] = {}
+        self.enabled = settings.AI_ROUTING_CONFIG_PERFORMANCE_MONITORING
+
+    def _register(self, metric: _Metric) -> Any:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def add_collector(self, name: str, collect: Callable[[], Iterable[Family]]) -> None:
+        """Register (or replace) a callable yielding metric families at scrape time."""
+        self._collectors[name] = collect
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        A failing collector is logged and skipped so one broken component
+        cannot take the whole scrape down.
+
+        Returns:
+            str: Exposition text
+        """
+        families: List[Family] = [
+            (metric.name, metric.type, metric.help, metric.samples()) for metric in self._metrics.values()
+        ]
+        for name, collect in list(self._collectors.items()):
+            try:
+                families.extend(collect())
+            except Exception as e:  # noqa: BLE001
+                logger.warning("metrics_collector_failed", collector=name, error=str(e))
+        # Collectors may contribute to the same family (e.g. `component_stat`).
+        merged: Dict[str, Family] = {}
+        for name, kind, help, samples in families:
+            if name in merged:
+                merged[name][3].extend(samples)
+            else:
+                merged[name] = (name, kind, help, list(samples))
+        lines: List[str] = []
+        for name, kind, help, samples in merged.values():
+            lines.append(f"# HELP {name} {_escape(help)}")
+            lines.append(f"# TYPE {name} {kind}")
+            for suffix, labels, value in samples:
+                lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Singleton instance
+metrics = MetricsRegistry()
+
+http_request_duration = metrics.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency until the last body chunk was sent",
+    ("method", "route", "status"),
+)
+http_requests_in_flight = metrics.gauge("http_requests_in_flight", "HTTP requests currently being served")
+llm_request_duration = metrics.histogram(
+    "llm_request_duration_seconds",
+    "LLM call latency",
+    ("provider", "model", "outcome"),
+    LLM_LATENCY_BUCKETS,
+)
+llm_tokens = metrics.counter("llm_tokens_total", "LLM tokens by direction", ("provider", "model", "direction"))
+llm_cost = metrics.counter("llm_cost_usd_total", "Estimated LLM spend in USD", ("provider", "model"))
+db_pool_checkout_wait = metrics.histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time to obtain a pooled connection (includes connecting when the pool grows)",
+    ("pool",),
+    POOL_WAIT_BUCKETS,
+)
+
+
+def observe_llm_call(
+    provider: str,
+    model: str,
+    latency_ms: float,
+    tokens_input: Optional[int] = None,
+    tokens_output: Optional[int] = None,
+    cost_usd: Optional[float] = None,
+    outcome: str = "ok",
+) -> None:
+    """
+    Record one LLM call.
+
+    Args:
+        provider: Provider name (openai, gemini, deepseek, ...)
+        model: Model name as sent to the provider
+        latency_ms: Wall time of the call
+        tokens_input: Prompt tokens, if reported
+        tokens_output: Completion tokens, if reported
+        cost_usd: Estimated cost, if known
+        outcome: "ok" or "error"
+    """
+    record_span("llm", f"{provider}:{model}", latency_ms)
+    if not metrics.enabled:
+        return
+    llm_request_duration.observe(latency_ms / 1000.0, provider=provider, model=model, outcome=outcome)
+    if tokens_input:
+        llm_tokens.inc(tokens_input, provider=provider, model=model, direction="input")
+    if tokens_output:
+        llm_tokens.inc(tokens_output, provider=provider, model=model, direction="output")
+    if cost_usd:
+        llm_cost.inc(cost_usd, provider=provider, model=model)
+
+
+def observe_pool_wait(pool: str, seconds: float) -> None:
+    """Record how long a connection checkout waited."""
+    if metrics.enabled:
+        db_pool_checkout_wait.observe(seconds, pool=pool)
+
+
+def stats_collector(component: str, stats: Callable[[], Dict[str, Any]]) -> None:
+    """
+    Export the numeric fields of a component's `stats()` as `component_stat` gauges.
+
+    Args:
+        component: Label value identifying the component
+        stats: Callable returning a flat dict; non-numeric values are skipped
+    """
+
+    def collect() -> Iterable[Family]:
+        samples: List[Sample] = [
+            ("", {"component": component, "stat": key}, float(value))
+            for key, value in stats().items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool)
+        ]
+        yield ("component_stat", "gauge", "Numeric counters reported by component stats()", samples)
+
+    metrics.add_collector(f"stats:{component}", collect)
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each HTTP request by method, route template and status.
+
+    The timer stops when the last body chunk has been sent, so streamed
+    responses (SSE) report their full duration.
+    """
+
+    def __init__(self, app: Any, registry: Optional[MetricsRegistry] = None):
+        self.app = app
+        self.registry = registry or metrics
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or not self.registry.enabled:
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = "500"
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec()
+            route = getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+            http_request_duration.observe(
+                time.perf_counter() - started, method=scope.get("method", ""), route=route, status=status
+            )
+
+
+# ---- scrape-time collectors for shared instrumentation ----
+
+
+def _collect_caches() -> Iterable[Family]:
+    from app.utils.bounded_cache import all_cache_stats
+
+    caches = all_cache_stats()
+    yield ("cache_hits_total", "counter", "Bounded cache hits", [("", {"cache": n}, s["hits"]) for n, s in caches.items()])
+    yield ("cache_misses_total", "counter", "Bounded cache misses", [("", {"cache": n}, s["misses"]) for n, s in caches.items()])
+    yield (
+        "cache_hit_ratio",
+        "gauge",
+        "Bounded cache hits / lookups since start",
+        [("", {"cache": n}, s["hit_rate"]) for n, s in caches.items() if s["hit_rate"] is not None],
+    )
+    yield ("cache_entries", "gauge", "Bounded cache entries", [("", {"cache": n}, s["entries"]) for n, s in caches.items()])
+    yield ("cache_bytes", "gauge", "Bounded cache approximate size", [("", {"cache": n}, s["bytes"]) for n, s in caches.items()])
+
+
+def _collect_sse() -> Iterable[Family]:
+    from app.utils.sse import stream_in_flight_counts, stream_outcome_counts
+
+    yield (
+        "sse_streams_in_flight",
+        "gauge",
+        "SSE streams currently open",
+        [("", {"stream": name}, count) for name, count in stream_in_flight_counts().items()],
+    )
+    finished: List[Sample] = []
+    for key, count in stream_outcome_counts().items():
+        name, _, outcome = key.rpartition(":")
+        finished.append(("", {"stream": name, "outcome": outcome}, count))
+    yield ("sse_streams_total", "counter", "Finished SSE streams by outcome", finished)
+
+
+def _collect_postgres() -> Iterable[Family]:
+    from app import db
+    from app.utils.sql_instrumentation import sql_stats
+
+    engine = db.postgresql_engine
+    pool = getattr(engine, "pool", None)
+    if pool is not None and hasattr(pool, "checkedout"):
+        yield (
+            "db_pool_connections",
+            "gauge",
+            "Postgres pool connections by state",
+            [
+                ("", {"pool": "postgres", "state": "checked_out"}, pool.checkedout()),
+                ("", {"pool": "postgres", "state": "idle"}, pool.checkedin()),
+                ("", {"pool": "postgres", "state": "overflow"}, max(pool.overflow(), 0)),
+            ],
+        )
+        yield ("db_pool_size", "gauge", "Configured pool size", [("", {"pool": "postgres"}, pool.size())])
+    report = sql_stats.top(limit=settings.SQL_STATS_MAX_ENDPOINTS)
+    endpoints = report["endpoints"]
+    yield (
+        "db_statements_total",
+        "counter",
+        "Postgres statements per endpoint",
+        [("", {"endpoint": e["endpoint"]}, e["statements"]) for e in endpoints],
+    )
+    yield (
+        "db_statement_seconds_total",
+        "counter",
+        "Postgres statement time per endpoint",
+        [("", {"endpoint": e["endpoint"]}, e["db_ms"] / 1000.0) for e in endpoints],
+    )
+    yield (
+        "db_n_plus_one_requests_total",
+        "counter",
+        "Requests flagged for repeated statement shapes",
+        [("", {"endpoint": e["endpoint"]}, e["n_plus_one_requests"]) for e in endpoints],
+    )
+
+
+def _collect_neo4j() -> Iterable[Family]:
+    from app.utils.neo4j_instrumentation import LATENCY_BUCKETS_MS, neo4j_query_stats
+
+    with neo4j_query_stats._lock:
+        items = [((q.name,), list(q.buckets), q.total_ms / 1000.0) for q in neo4j_query_stats._queries.values()]
+        errors = [("", {"query": q.name}, q.errors) for q in neo4j_query_stats._queries.values()]
+    yield (
+        "neo4j_query_duration_seconds",
+        "histogram",
+        "Neo4j query latency by query name",
+        histogram_samples(("query",), [b / 1000.0 for b in LATENCY_BUCKETS_MS], items),
+    )
+    yield ("neo4j_query_errors_total", "counter", "Failed Neo4j queries by query name", errors)
+
+
+metrics.add_collector("caches", _collect_caches)
+metrics.add_collector("sse", _collect_sse)
+metrics.add_collector("postgres", _collect_postgres)
+metrics.add_collector("neo4j", _collect_neo4j)
@@ -0,0 +1,482 @@
+"""
+Neo4j query instrumentation.
+
+`instrument_driver()` wraps the async driver so every session it hands out
+(including the ones from `get_neo4j_session`) records each Cypher query:
+
+- a stable name: a leading `// name: <name>` comment when present, otherwise
+  the calling module and function plus a short hash of the query text
+  (`endpoints.lexical:get_graph#3fa2c1`);
+- wall time from `run()` until the result is consumed, in a latency
+  histogram, plus server time, row count and errors;
+- DB hits for a sampled fraction of queries (`NEO4J_QUERY_PROFILE_SAMPLE_RATE`),
+  which run with a `PROFILE` prefix;
+- for queries slower than `NEO4J_SLOW_QUERY_MS`, a warning with the query plan
+  (the profile when sampled, otherwise a background `EXPLAIN`, at most once
+  per name per `NEO4J_SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS`).
+
+Aggregates are per worker process and exposed through `neo4j_query_stats.top()`
+(`GET /admin/neo4j/queries`). Sessions and results are thin proxies
+(`__getattr__`), like `StageProfiler`'s counting sessions.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import bisect
+import hashlib
+import random
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import structlog
+
+from app.core.config import settings
+from app.utils.request_profiler import record_span
+
+logger = structlog.get_logger()
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is +Inf.
+LATENCY_BUCKETS_MS: List[float] = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+OTHER_QUERIES = "(other)"
+SORT_KEYS = ("total_ms", "mean_ms", "max_ms", "calls", "rows", "db_hits", "errors")
+
+_NAME_PREFIX = "// name:"
+_NOT_PROFILABLE = ("EXPLAIN", "PROFILE", "CREATE INDEX", "CREATE CONSTRAINT", "DROP", "SHOW", "CALL {", ":")
+_SKIP_MODULES = ("app.utils.neo4j_instrumentation", "neo4j", "asyncio", "contextlib")
+
+
+def _normalize(query: str) -> str:
+    return " ".join(query.split())
+
+
+def query_name(query: str, frame: Any = None) -> str:
+    """
+    Stable name for a query: explicit `// name:` tag or caller plus text hash.
+
+    Args:
+        query: Cypher text
+        frame: Frame to start the caller search from (defaults to the caller)
+
+    Returns:
+        str: Query name
+    """
+    head = query.lstrip()
+    if head.startswith(_NAME_PREFIX):
+        return head[len(_NAME_PREFIX):].split("\n", 1)[0].strip() or OTHER_QUERIES
+    frame = frame or sys._getframe(1)
+    while frame is not None and frame.f_globals.get("__name__", "").startswith(_SKIP_MODULES):
+        frame = frame.f_back
+    caller = "unknown"
+    if frame is not None:
+        module = frame.f_globals.get("__name__", "").split(".")
+        caller = f"{'.'.join(module[-2:])}:{frame.f_code.co_name}"
+    digest = hashlib.blake2b(_normalize(query).encode("utf-8"), digest_size=3).hexdigest()
+    return f"{caller}#{digest}"
+
+
+def _plan_tree(plan: Any, depth: int = 0) -> List[str]:
+    """Render a plan/profile dict as indented operator lines."""
+    if not isinstance(plan, dict):
+        return []
+    args = plan.get("args") or plan.get("arguments") or {}
+    line = "  " * depth + str(plan.get("operatorType") or plan.get("operator_type") or "?")
+    details = args.get("Details") or args.get("details")
+    if details:
+        line += f" {details}"
+    estimated = args.get("EstimatedRows") or args.get("estimated_rows")
+    if estimated is not None:
+        line += f" est={float(estimated):.0f}"
+    if "dbHits" in plan or "db_hits" in plan:
+        line += f" rows={plan.get('rows', 0)} hits={plan.get('dbHits', plan.get('db_hits', 0))}"
+    lines = [line]
+    for child in plan.get("children") or []:
+        lines.extend(_plan_tree(child, depth + 1))
+    return lines
+
+
+def _db_hits(profile: Any) -> int:
+    if not isinstance(profile, dict):
+        return 0
+    own = profile.get("dbHits", profile.get("db_hits", 0)) or 0
+    return int(own) + sum(_db_hits(child) for child in profile.get("children") or [])
+
+
+@dataclass
+class QueryStats:
+    """Aggregates for one named query."""
+
+    name: str
+    query: str
+    calls: int = 0
+    errors: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    server_ms: float = 0.0
+    rows: int = 0
+    profiled: int = 0
+    db_hits: int = 0
+    buckets: List[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS_MS) + 1))
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Upper bound of the histogram bucket holding quantile `q` (None above the last bound)."""
+        target = q * self.calls
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.buckets):
+            seen += count
+            if seen >= target and seen:
+                return bound
+        return None
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "query": self.query,
+            "calls": self.calls,
+            "errors": self.errors,
+            "total_ms": round(self.total_ms, 1),
+            "mean_ms": round(self.total_ms / self.calls, 2) if self.calls else 0.0,
+            "max_ms": round(self.max_ms, 1),
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "server_ms": round(self.server_ms, 1),
+            "rows": self.rows,
+            "profiled": self.profiled,
+            "db_hits": self.db_hits,
+            "db_hits_per_profiled_call": round(self.db_hits / self.profiled, 1) if self.profiled else None,
+            "histogram": dict(zip([*map(str, LATENCY_BUCKETS_MS), "+Inf"], self.buckets)),
+        }
+
+
+class Neo4jQueryStats:
+    """Per-process registry of query aggregates plus slow-query logging."""
+
+    def __init__(self, max_names: Optional[int] = None) -> None:
+        self.max_names = max_names if max_names is not None else settings.NEO4J_QUERY_STATS_MAX_NAMES
+        self._lock = threading.Lock()
+        self._queries: Dict[str, QueryStats] = {}
+        self._explained: Dict[str, float] = {}
+        self._explain_tasks: set = set()
+        self.driver: Any = None  # raw driver used for background EXPLAIN
+        self.started_at = time.time()
+
+    def record(
+        self,
+        name: str,
+        query: str,
+        elapsed_ms: float,
+        *,
+        rows: int = 0,
+        server_ms: float = 0.0,
+        profile: Any = None,
+        error: bool = False,
+    ) -> None:
+        """Add one execution to the aggregates of `name`."""
+        with self._lock:
+            stats = self._queries.get(name)
+            if stats is None:
+                if len(self._queries) >= self.max_names:
+                    name, query = OTHER_QUERIES, ""
+                    stats = self._queries.get(name)
+                if stats is None:
+                    stats = self._queries[name] = QueryStats(name=name, query=_normalize(query)[:300])
+            stats.calls += 1
+            stats.errors += int(error)
+            stats.total_ms += elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            stats.server_ms += server_ms
+            stats.rows += rows
+            stats.buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+            if profile is not None:
+                stats.profiled += 1
+                stats.db_hits += _db_hits(profile)
+
+    def slow(self, name: str, query: str, parameters: Optional[Dict[str, Any]], elapsed_ms: float, rows: int, plan: Any) -> None:
+        """Log a slow query with its plan, explaining it in the background when no plan is at hand."""
+        fields = {
+            "query_name": name,
+            "elapsed_ms": round(elapsed_ms, 1),
+            "rows": rows,
+            "params": sorted(parameters or {}),
+        }
+        if plan is not None:
+            logger.warning("neo4j_slow_query", plan="\n".join(_plan_tree(plan)), **fields)
+            return
+        now = time.monotonic()
+        interval = settings.NEO4J_SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS
+        if self.driver is None or now - self._explained.get(name, -interval) < interval:
+            logger.warning("neo4j_slow_query", **fields)
+            return
+        self._explained[name] = now
+        task = asyncio.create_task(self._explain(query, parameters, fields))
+        self._explain_tasks.add(task)
+        task.add_done_callback(self._explain_tasks.discard)
+
+    async def _explain(self, query: str, parameters: Optional[Dict[str, Any]], fields: Dict[str, Any]) -> None:
+        plan_text = None
+        try:
+            async with self.driver.session() as session:
+                result = await session.run("EXPLAIN " + query, parameters or {})
+                summary = await result.consume()
+                plan_text = "\n".join(_plan_tree(summary.plan))
+        except Exception as e:
+            fields["explain_error"] = str(e)
+        logger.warning("neo4j_slow_query", plan=plan_text, **fields)
+
+    def top(self, limit: int = 20, order_by: str = "total_ms") -> Dict[str, Any]:
+        """
+        Queries ranked by an aggregate.
+
+        Args:
+            limit: Number of queries to return
+            order_by: One of `SORT_KEYS`
+
+        Returns:
+            Dict[str, Any]: Totals and the top `limit` query reports
+        """
+        if order_by not in SORT_KEYS:
+            raise ValueError(f"order_by must be one of {', '.join(SORT_KEYS)}")
+        with self._lock:
+            reports = [stats.report() for stats in self._queries.values()]
+        reports.sort(key=lambda r: r[order_by] or 0, reverse=True)
+        return {
+            "since": self.started_at,
+            "distinct_queries": len(reports),
+            "calls": sum(r["calls"] for r in reports),
+            "total_ms": round(sum(r["total_ms"] for r in reports), 1),
+            "queries": reports[: max(0, limit)],
+        }
+
+    def reset(self) -> None:
+        """Drop all aggregates."""
+        with self._lock:
+            self._queries.clear()
+            self._explained.clear()
+            self.started_at = time.time()
+
+
+class InstrumentedResult:
+    """Result proxy that records the query once it has been consumed."""
+
+    def __init__(self, result: Any, stats: Neo4jQueryStats, pending: Dict[Any, None], name: str, query: str,
+                 parameters: Optional[Dict[str, Any]], started: float, profiled: bool):
+        self._result = result
+        self._stats = stats
+        self._pending = pending
+        self._name = name
+        self._query = query
+        self._parameters = parameters
+        self._started = started
+        self._profiled = profiled
+        self._rows = 0
+        self._iter: Any = None
+        self._finished = False
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._result, name)
+
+    async def _finish(self, error: bool = False) -> Any:
+        if self._finished:
+            return None
+        self._finished = True
+        self._pending.pop(self, None)
+        elapsed_ms = (time.perf_counter() - self._started) * 1000.0
+        summary = None
+        if not error:
+            try:
+                summary = await self._result.consume()
+            except Exception:
+                error = True
+        server_ms = 0.0
+        profile = plan = None
+        if summary is not None:
+            server_ms = float((summary.result_available_after or 0) + (summary.result_consumed_after or 0))
+            profile = summary.profile if self._profiled else None
+            plan = profile or summary.plan
+        self._stats.record(self._name, self._query, elapsed_ms, rows=self._rows, server_ms=server_ms,
+                           profile=profile, error=error)
+        record_span("neo4j", self._name, elapsed_ms)
+        if elapsed_ms >= settings.NEO4J_SLOW_QUERY_MS:
+            self._stats.slow(self._name, self._query, self._parameters, elapsed_ms, self._rows, plan)
+        return summary
+
+    async def _call(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        try:
+            value = await getattr(self._result, method)(*args, **kwargs)
+        except Exception:
+            await self._finish(error=True)
+            raise
+        return value
+
+    async def data(self, *keys: Any) -> Any:
+        rows = await self._call("data", *keys)
+        self._rows += len(rows)
+        await self._finish()
+        return rows
+
+    async def values(self, *keys: Any) -> Any:
+        rows = await self._call("values", *keys)
+        self._rows += len(rows)
+        await self._finish()
+        return rows
+
+    async def value(self, *args: Any, **kwargs: Any) -> Any:
+        rows = await self._call("value", *args, **kwargs)
+        self._rows += len(rows)
+        await self._finish()
+        return rows
+
+    async def single(self, *args: Any, **kwargs: Any) -> Any:
+        record = await self._call("single", *args, **kwargs)
+        self._rows += int(record is not None)
+        await self._finish()
+        return record
+
+    async def fetch(self, n: int) -> Any:
+        records = await self._call("fetch", n)
+        self._rows += len(records)
+        return records
+
+    async def consume(self) -> Any:
+        if self._finished:
+            return await self._result.consume()
+        return await self._finish()
+
+    def __aiter__(self) -> "InstrumentedResult":
+        self._iter = self._result.__aiter__()
+        return self
+
+    async def __anext__(self) -> Any:
+        try:
+            record = await self._iter.__anext__()
+        except StopAsyncIteration:
+            await self._finish()
+            raise
+        except Exception:
+            await self._finish(error=True)
+            raise
+        self._rows += 1
+        return record
+
+
+class _Runner:
+    """Shared `run()` for sessions and transactions."""
+
+    _target: Any
+    _stats: Neo4jQueryStats
+    _pending: Dict[Any, None]  # unconsumed results, in run order
+
+    async def run(self, query: Any, parameters: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Any:
+        text = getattr(query, "text", query)
+        if not isinstance(text, str):
+            return await self._target.run(query, parameters, **kwargs)
+        name = query_name(text, sys._getframe(1))
+        profiled = (
+            isinstance(query, str)
+            and settings.NEO4J_QUERY_PROFILE_SAMPLE_RATE > 0
+            and random.random() < settings.NEO4J_QUERY_PROFILE_SAMPLE_RATE
+            and not query.lstrip().upper().startswith(_NOT_PROFILABLE)
+            and "IN TRANSACTIONS" not in query.upper()
+        )
+        if profiled:
+            query = "PROFILE " + query
+        started = time.perf_counter()
+        try:
+            result = await self._target.run(query, parameters, **kwargs)
+        except Exception:
+            self._stats.record(name, text, (time.perf_counter() - started) * 1000.0, error=True)
+            raise
+        wrapped = InstrumentedResult(result, self._stats, self._pending, name, text,
+                                     {**(parameters or {}), **kwargs}, started, profiled)
+        self._pending[wrapped] = None
+        return wrapped
+
+    async def _finish_pending(self) -> None:
+        for result in list(self._pending):
+            await result._finish()
+
+
+class InstrumentedTransaction(_Runner):
+    """Transaction proxy handed to `execute_read` / `execute_write` work functions."""
+
+    def __init__(self, tx: Any, session: "InstrumentedSession"):
+        self._target = tx
+        self._stats = session._stats
+        self._pending = session._pending
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._target, name)
+
+
+class InstrumentedSession(_Runner):
+    """Session proxy that instruments `run` and transaction functions."""
+
+    def __init__(self, session: Any, stats: Neo4jQueryStats):
+        self._target = session
+        self._stats = stats
+        self._pending: Dict[Any, None] = {}
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._target, name)
+
+    def _wrap_work(self, work: Any) -> Any:
+        async def instrumented_work(tx: Any, *args: Any, **kwargs: Any) -> Any:
+            return await work(InstrumentedTransaction(tx, self), *args, **kwargs)
+
+        return instrumented_work
+
+    async def execute_read(self, work: Any, *args: Any, **kwargs: Any) -> Any:
+        return await self._target.execute_read(self._wrap_work(work), *args, **kwargs)
+
+    async def execute_write(self, work: Any, *args: Any, **kwargs: Any) -> Any:
+        return await self._target.execute_write(self._wrap_work(work), *args, **kwargs)
+
+    async def close(self) -> None:
+        # Results never consumed by the caller are recorded before the session goes away.
+        await self._finish_pending()
+        await self._target.close()
+
+    async def __aenter__(self) -> "InstrumentedSession":
+        await self._target.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc: Any) -> Any:
+        await self._finish_pending()
+        return await self._target.__aexit__(*exc)
+
+
+class InstrumentedDriver:
+    """Driver proxy whose sessions are instrumented."""
+
+    def __init__(self, driver: Any, stats: Neo4jQueryStats):
+        self._driver = driver
+        self._stats = stats
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._driver, name)
+
+    def session(self, *args: Any, **kwargs: Any) -> InstrumentedSession:
+        return InstrumentedSession(self._driver.session(*args, **kwargs), self._stats)
+
+
+def instrument_driver(driver: Any, stats: Optional[Neo4jQueryStats] = None) -> InstrumentedDriver:
+    """
+    Wrap a Neo4j async driver so all of its sessions are instrumented.
+
+    Args:
+        driver: Neo4j async driver
+        stats: Registry to record into (defaults to `neo4j_query_stats`)
+
+    Returns:
+        InstrumentedDriver: Proxy usable wherever the driver is
+    """
+    stats = stats or neo4j_query_stats
+    stats.driver = driver
+    return InstrumentedDriver(driver, stats)
+
+
+# Singleton instance
+neo4j_query_stats = Neo4jQueryStats()
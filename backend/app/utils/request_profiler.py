@@ -0,0 +1,410 @@
+"""
+Per-request profiling.
+
+`RequestProfilingMiddleware` profiles single HTTP requests: requests from an
+admin carrying `X-Profile: 1`, plus a random `REQUEST_PROFILE_SAMPLE_RATE`
+fraction of requests under `REQUEST_PROFILE_SAMPLE_PATHS`. Unprofiled
+requests pay one header scan and one random draw.
+
+A profile splits the request's wall time into:
+
+- await spans reported by the existing instrumentation while the request's
+  context is active: Postgres statements (`sql_stats`), Neo4j queries
+  (`instrument_driver`) and LLM calls (`observe_llm_call`), including calls
+  made from worker threads started with `asyncio.to_thread`;
+- CPU time of the request on the event loop, from a sampling thread that
+  every `REQUEST_PROFILE_INTERVAL_MS` checks which task the loop is running
+  and, when it belongs to a profiled request (the request task or a task
+  created from it), records the task's Python stack;
+- the remainder (`other`): other awaits (HTTP, sleeps, waiting for the loop).
+
+Spans of concurrent awaits overlap, so the parts can add up to more than the
+wall time. Worker threads are not sampled; their time shows up in the spans.
+Finished profiles are kept per worker process (`REQUEST_PROFILE_MAX_STORED`)
+and served by `GET /admin/profiles`; `format=folded` returns a wall-time flame
+graph in folded-stack format (weights in microseconds) for speedscope or
+flamegraph.pl. The response of a profiled request carries `X-Profile-Id`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import random
+import sys
+import threading
+import time
+import uuid
+import weakref
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+SPAN_KINDS = ("db", "neo4j", "llm")
+
+_MAX_SPANS = 2000
+_MAX_STACK_DEPTH = 128
+
+_current_profile: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar(
+    "request_profile", default=None
+)
+
+# Reason: Python 3.11 tasks do not expose their context, so the sampler maps
+# the loop's running task to a profile through tasks registered at creation.
+_current_tasks: Dict[Any, Any] = getattr(asyncio.tasks, "_current_tasks", {})
+
+
+def record_span(kind: str, name: str, elapsed_ms: float) -> None:
+    """
+    Attribute an await (DB statement, query, LLM call) to the profiled request, if any.
+
+    Spans from tasks that outlive the request (they inherit its context) are
+    ignored once the profile is finished.
+
+    Args:
+        kind: One of `SPAN_KINDS`
+        name: Statement shape, query name or provider:model
+        elapsed_ms: Duration of the call, ending now
+    """
+    profile = _current_profile.get()
+    if profile is not None and not profile.finished:
+        profile.record_span(kind, name, elapsed_ms)
+
+
+def _frame_label(code: Any, _labels: Dict[Any, str] = {}) -> str:
+    label = _labels.get(code)
+    if label is None:
+        filename = code.co_filename.replace("\\", "/")
+        for marker, prefix in (("/app/", "app/"), ("/site-packages/", ""), ("/lib/python", "")):
+            if marker in filename:
+                filename = prefix + filename.rsplit(marker, 1)[1]
+                break
+        label = _labels[code] = f"{code.co_name} ({filename}:{code.co_firstlineno})"
+    return label
+
+
+def _task_stack(frame: Any, task: Any) -> Tuple[str, ...]:
+    """Stack from the task's coroutine down to the running frame (root first)."""
+    coro = task.get_coro() if hasattr(task, "get_coro") else None
+    root = getattr(coro, "cr_frame", None)
+    labels: List[str] = []
+    while frame is not None and len(labels) < _MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame.f_code))
+        if frame is root:
+            break
+        frame = frame.f_back
+    labels.reverse()
+    return tuple(labels)
+
+
+class RequestProfile:
+    """Spans and stack samples of one request."""
+
+    def __init__(self, scope: Dict[str, Any], trigger: str, interval_ms: float):
+        self.id = uuid.uuid4().hex[:16]
+        self.scope = scope
+        self.method = scope.get("method", "")
+        self.path = scope.get("path", "")
+        self.trigger = trigger
+        self.interval_ms = interval_ms
+        self.started_at = time.time()
+        self.status: Optional[int] = None
+        self.wall_ms = 0.0
+        self.cpu_ms = 0.0
+        self.samples = 0
+        self.finished = False
+        self.stacks: Counter = Counter()  # stack tuple -> sampled ms
+        self.spans: List[Tuple[str, str, float, float]] = []  # kind, name, start_ms, duration_ms
+        self.dropped_spans = 0
+        self.span_totals: Dict[Tuple[str, str], List[float]] = {}  # (kind, name) -> [calls, ms]
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @property
+    def route(self) -> str:
+        return getattr(self.scope.get("route"), "path", None) or self.path
+
+    def record_span(self, kind: str, name: str, elapsed_ms: float) -> None:
+        start_ms = (time.perf_counter() - self._t0) * 1000.0 - elapsed_ms
+        with self._lock:
+            if len(self.spans) < _MAX_SPANS:
+                self.spans.append((kind, name, start_ms, elapsed_ms))
+            else:
+                self.dropped_spans += 1
+            totals = self.span_totals.get((kind, name))
+            if totals is None:
+                totals = self.span_totals[(kind, name)] = [0, 0.0]
+            totals[0] += 1
+            totals[1] += elapsed_ms
+
+    def add_sample(self, stack: Tuple[str, ...], elapsed_ms: float) -> None:
+        with self._lock:
+            self.samples += 1
+            self.cpu_ms += elapsed_ms
+            self.stacks[stack] += elapsed_ms
+
+    def finish(self, status: Optional[int]) -> None:
+        self.wall_ms = (time.perf_counter() - self._t0) * 1000.0
+        self.status = status
+        self.finished = True
+
+    def breakdown(self) -> Dict[str, float]:
+        """Wall time split into sampled CPU, await kinds and the remainder (ms)."""
+        parts = {"cpu": self.cpu_ms, **{kind: 0.0 for kind in SPAN_KINDS}}
+        for (kind, _), (_, ms) in self.span_totals.items():
+            parts[kind] = parts.get(kind, 0.0) + ms
+        parts["other"] = max(0.0, self.wall_ms - sum(parts.values()))
+        return {kind: round(ms, 1) for kind, ms in parts.items()}
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "trigger": self.trigger,
+            "started_at": self.started_at,
+            "wall_ms": round(self.wall_ms, 1),
+            "breakdown_ms": self.breakdown(),
+        }
+
+    def report(self, limit: int = 20) -> Dict[str, Any]:
+        """Summary plus the heaviest spans, self-time frames and the span timeline."""
+        with self._lock:
+            totals = sorted(self.span_totals.items(), key=lambda item: item[1][1], reverse=True)
+            self_ms: Counter = Counter()
+            for stack, ms in self.stacks.items():
+                if stack:
+                    self_ms[stack[-1]] += ms
+            spans = list(self.spans)
+        return {
+            **self.summary(),
+            "interval_ms": self.interval_ms,
+            "samples": self.samples,
+            "top_spans": [
+                {"kind": kind, "name": name[:300], "calls": int(calls), "ms": round(ms, 1)}
+                for (kind, name), (calls, ms) in totals[:limit]
+            ],
+            "top_frames": [{"frame": frame, "self_ms": round(ms, 1)} for frame, ms in self_ms.most_common(limit)],
+            "timeline": [
+                {"kind": kind, "name": name[:300], "start_ms": round(start, 1), "duration_ms": round(duration, 1)}
+                for kind, name, start, duration in spans
+            ],
+            "dropped_spans": self.dropped_spans,
+        }
+
+    def folded(self) -> str:
+        """Wall-time flame graph in folded-stack format (`frame;frame;leaf weight_us`)."""
+        root = f"{self.method} {self.route}"
+        weights: Counter = Counter()
+        with self._lock:
+            for stack, ms in self.stacks.items():
+                weights[";".join((root, "[cpu]", *stack))] += ms
+            for (kind, name), (_, ms) in self.span_totals.items():
+                weights[";".join((root, f"[{kind}]", " ".join(name.split())[:200].replace(";", ",")))] += ms
+        other = self.breakdown()["other"]
+        if other:
+            weights[f"{root};[other]"] += other
+        return "".join(f"{stack} {int(ms * 1000)}\n" for stack, ms in weights.most_common() if ms * 1000 >= 1)
+
+
+class RequestProfiler:
+    """Starts and stores request profiles; owns the stack sampling thread."""
+
+    def __init__(
+        self,
+        interval_ms: Optional[float] = None,
+        max_stored: Optional[int] = None,
+        sample_rate: Optional[float] = None,
+        sample_paths: Optional[str] = None,
+    ) -> None:
+        self.interval_ms = interval_ms if interval_ms is not None else settings.REQUEST_PROFILE_INTERVAL_MS
+        self.max_stored = max_stored if max_stored is not None else settings.REQUEST_PROFILE_MAX_STORED
+        self.sample_rate = sample_rate if sample_rate is not None else settings.REQUEST_PROFILE_SAMPLE_RATE
+        paths = sample_paths if sample_paths is not None else settings.REQUEST_PROFILE_SAMPLE_PATHS
+        self.sample_paths = tuple(p.strip() for p in paths.split(",") if p.strip())
+        self._lock = threading.Lock()
+        self._stored: "OrderedDict[str, RequestProfile]" = OrderedDict()
+        self._active: Dict[str, Tuple[RequestProfile, int, Any]] = {}  # id -> profile, thread id, loop
+        self._tasks: "weakref.WeakKeyDictionary[Any, RequestProfile]" = weakref.WeakKeyDictionary()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---- request scope ----
+
+    def should_sample(self, scope: Dict[str, Any]) -> bool:
+        """Random sampling decision for a request without the profile header."""
+        if self.sample_rate <= 0.0 or random.random() >= self.sample_rate:
+            return False
+        return not self.sample_paths or scope.get("path", "").startswith(self.sample_paths)
+
+    def start(self, scope: Dict[str, Any], trigger: str) -> Tuple[RequestProfile, contextvars.Token]:
+        """
+        Begin profiling the request running in the current task.
+
+        Args:
+            scope: ASGI scope (route template is read from it when the profile ends)
+            trigger: "header" or "sample"
+
+        Returns:
+            Tuple[RequestProfile, contextvars.Token]: The profile and the token for `finish`
+        """
+        profile = RequestProfile(scope, trigger, self.interval_ms)
+        loop = asyncio.get_running_loop()
+        self._install_task_factory(loop)
+        task = asyncio.current_task()
+        with self._lock:
+            if task is not None:
+                self._tasks[task] = profile
+            self._active[profile.id] = (profile, threading.get_ident(), loop)
+        token = _current_profile.set(profile)
+        self._ensure_sampler()
+        self._wake.set()
+        return profile, token
+
+    def finish(self, profile: RequestProfile, token: contextvars.Token, status: Optional[int]) -> None:
+        """Stop profiling and keep the profile for retrieval."""
+        _current_profile.reset(token)
+        profile.finish(status)
+        with self._lock:
+            self._active.pop(profile.id, None)
+            self._stored[profile.id] = profile
+            while len(self._stored) > self.max_stored:
+                self._stored.popitem(last=False)
+        logger.info(
+            "request_profiled",
+            profile_id=profile.id,
+            endpoint=f"{profile.method} {profile.route}",
+            trigger=profile.trigger,
+            **{f"{kind}_ms": ms for kind, ms in profile.breakdown().items()},
+            wall_ms=round(profile.wall_ms, 1),
+        )
+
+    # ---- retrieval ----
+
+    def get(self, profile_id: str) -> Optional[RequestProfile]:
+        with self._lock:
+            return self._stored.get(profile_id)
+
+    def list(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Summaries of stored profiles, newest first."""
+        with self._lock:
+            profiles = list(self._stored.values())
+        return [profile.summary() for profile in reversed(profiles[-max(0, limit):])] if limit else []
+
+    def clear(self) -> None:
+        with self._lock:
+            self._stored.clear()
+
+    # ---- sampling ----
+
+    def _install_task_factory(self, loop: Any) -> None:
+        previous = loop.get_task_factory()
+        if getattr(previous, "_request_profiler", None) is self:
+            return
+
+        def factory(loop: Any, coro: Any, **kwargs: Any) -> Any:
+            task = previous(loop, coro, **kwargs) if previous is not None else asyncio.Task(coro, loop=loop, **kwargs)
+            context = kwargs.get("context")
+            profile = context.get(_current_profile) if context is not None else _current_profile.get()
+            if profile is not None and not profile.finished:
+                with self._lock:
+                    self._tasks[task] = profile
+            return task
+
+        factory._request_profiler = self  # type: ignore[attr-defined]
+        loop.set_task_factory(factory)
+
+    def _ensure_sampler(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._sample_loop, name="request-profiler", daemon=True)
+            self._thread.start()
+
+    def _sample_loop(self) -> None:
+        interval = self.interval_ms / 1000.0
+        last = time.perf_counter()
+        while True:
+            if not self._active:
+                self._wake.wait()
+                self._wake.clear()
+                last = time.perf_counter()
+                continue
+            time.sleep(interval)
+            now = time.perf_counter()
+            elapsed_ms, last = (now - last) * 1000.0, now
+            try:
+                self.sample(elapsed_ms)
+            except Exception as e:  # noqa: BLE001
+                logger.debug("request_profiler_sample_failed", error=str(e))
+
+    def sample(self, elapsed_ms: float) -> None:
+        """Attribute `elapsed_ms` to the profiled request each event loop is running, if any."""
+        with self._lock:
+            loops = {thread_id: loop for _, thread_id, loop in self._active.values()}
+        if not loops:
+            return
+        frames = sys._current_frames()
+        for thread_id, loop in loops.items():
+            task = _current_tasks.get(loop)
+            if task is None:
+                continue
+            with self._lock:
+                profile = self._tasks.get(task)
+            if profile is None or profile.finished:
+                continue
+            profile.add_sample(_task_stack(frames.get(thread_id), task), elapsed_ms)
+
+
+class RequestProfilingMiddleware:
+    """ASGI middleware profiling admin-requested (`X-Profile`) and sampled requests.
+
+    `authorize` decides whether a request may ask for a profile (it receives
+    the ASGI scope); requests with the header that are not authorized run
+    unprofiled.
+    """
+
+    def __init__(self, app: Any, profiler: Optional[RequestProfiler] = None,
+                 authorize: Optional[Callable[[Dict[str, Any]], bool]] = None):
+        self.app = app
+        self.profiler = profiler or request_profiler
+        self.authorize = authorize or (lambda scope: False)
+
+    def _trigger(self, scope: Dict[str, Any]) -> Optional[str]:
+        for name, value in scope.get("headers") or ():
+            if name == PROFILE_HEADER and value not in (b"", b"0", b"false") and self.authorize(scope):
+                return "header"
+        return "sample" if self.profiler.should_sample(scope) else None
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        trigger = self._trigger(scope) if scope["type"] == "http" else None
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+        profile, token = self.profiler.start(scope, trigger)
+        status: Optional[int] = None
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers") or [])
+                headers.append((PROFILE_ID_HEADER, profile.id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.profiler.finish(profile, token, status)
+
+
+# Singleton instance
+request_profiler = RequestProfiler()
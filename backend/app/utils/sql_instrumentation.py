@@ -0,0 +1,291 @@
+"""
+Postgres statement timing and N+1 detection.
+
+`sql_stats.install(engine)` hooks SQLAlchemy's cursor events on the async
+engine; `SqlRequestStatsMiddleware` opens a per-request scope in a context
+variable (SQLAlchemy runs the events in a greenlet that shares the request's
+context). For every request the hooks count statements, add up DB time and
+count statements per *shape*: the SQL text with literals, numbers and IN-lists
+collapsed, so a loop issuing the same query with different values maps to one
+shape. When one request issues a shape more than `SQL_N_PLUS_ONE_THRESHOLD`
+times, a `sql_n_plus_one` warning names the endpoint and the statement (once
+per shape and request).
+
+At the end of each request the totals are folded into per-endpoint aggregates
+(keyed by method and route template), exposed through `sql_stats.top()`
+(`GET /admin/sql/endpoints`). Statements outside any request (background
+tasks, scripts) are counted separately. Tasks created during a request
+inherit its scope; statements they issue after the request has ended count
+as background too. Aggregates are per worker process.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import structlog
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.utils.request_profiler import record_span
+
+logger = structlog.get_logger()
+
+OTHER_ENDPOINTS = "(other)"
+SORT_KEYS = ("db_ms", "mean_db_ms", "statements", "mean_statements", "max_statements", "requests", "n_plus_one_requests")
+
+_START_KEY = "sql_instrumentation_start"
+_FINGERPRINT_CACHE_SIZE = 4096
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER_RE = re.compile(r"\$\d+|%\(\w+\)s|(?<!:):\w+|\?")
+_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+_current_request: contextvars.ContextVar[Optional["RequestSqlStats"]] = contextvars.ContextVar(
+    "sql_request_stats", default=None
+)
+
+
+def fingerprint(statement: str) -> str:
+    """
+    Shape of a statement: literals and placeholders become `?`, IN-lists `(?+)`.
+
+    Args:
+        statement: SQL text as sent to the driver
+
+    Returns:
+        str: Normalized statement (at most 1000 characters)
+    """
+    shape = _STRING_RE.sub("?", statement)
+    shape = _PLACEHOLDER_RE.sub("?", shape)
+    shape = _NUMBER_RE.sub("?", shape)
+    shape = _LIST_RE.sub("(?+)", shape)
+    return _SPACE_RE.sub(" ", shape).strip()[:1000]
+
+
+class RequestSqlStats:
+    """Statement counters of one request."""
+
+    __slots__ = ("scope", "statements", "db_ms", "shapes", "flagged", "finished")
+
+    def __init__(self, scope: Optional[Dict[str, Any]] = None):
+        self.scope = scope
+        # Set by `end_request`; tasks that outlive the request still see this object.
+        self.finished = False
+        self.statements = 0
+        self.db_ms = 0.0
+        self.shapes: Dict[str, int] = {}
+        self.flagged: Dict[str, int] = {}  # shape -> count when flagged
+
+    def endpoint(self) -> str:
+        """`METHOD /route/{template}` once routing has matched, else the raw path."""
+        scope = self.scope or {}
+        route = scope.get("route")
+        path = getattr(route, "path", None) or scope.get("path") or "?"
+        return f"{scope.get('method', '')} {path}".strip()
+
+    def record(self, shape: str, elapsed_ms: float) -> int:
+        self.statements += 1
+        self.db_ms += elapsed_ms
+        count = self.shapes.get(shape, 0) + 1
+        self.shapes[shape] = count
+        return count
+
+
+@dataclass
+class EndpointSqlStats:
+    """Per-endpoint aggregates over finished requests."""
+
+    endpoint: str
+    requests: int = 0
+    statements: int = 0
+    db_ms: float = 0.0
+    max_statements: int = 0
+    max_db_ms: float = 0.0
+    n_plus_one_requests: int = 0
+    last_repeated: Optional[str] = None
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "endpoint": self.endpoint,
+            "requests": self.requests,
+            "statements": self.statements,
+            "mean_statements": round(self.statements / self.requests, 1) if self.requests else 0.0,
+            "max_statements": self.max_statements,
+            "db_ms": round(self.db_ms, 1),
+            "mean_db_ms": round(self.db_ms / self.requests, 2) if self.requests else 0.0,
+            "max_db_ms": round(self.max_db_ms, 1),
+            "n_plus_one_requests": self.n_plus_one_requests,
+            "last_repeated": self.last_repeated,
+        }
+
+
+class SqlStatementStats:
+    """Engine event hooks plus per-endpoint aggregation."""
+
+    def __init__(self, threshold: Optional[int] = None, max_endpoints: Optional[int] = None) -> None:
+        self.threshold = threshold if threshold is not None else settings.SQL_N_PLUS_ONE_THRESHOLD
+        self.max_endpoints = max_endpoints if max_endpoints is not None else settings.SQL_STATS_MAX_ENDPOINTS
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, EndpointSqlStats] = {}
+        self._fingerprints: Dict[str, str] = {}
+        self.background_statements = 0
+        self.background_db_ms = 0.0
+        self.started_at = time.time()
+
+    # ---- engine hooks ----
+
+    def install(self, engine: Any) -> None:
+        """Attach the cursor event hooks to an (async) engine; safe to call twice."""
+        target = getattr(engine, "sync_engine", engine)
+        if event.contains(target, "before_cursor_execute", self._before):
+            return
+        event.listen(target, "before_cursor_execute", self._before)
+        event.listen(target, "after_cursor_execute", self._after)
+        event.listen(target, "handle_error", self._error)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault(_START_KEY, []).append(time.perf_counter())
+
+    def _error(self, exception_context) -> None:
+        conn = exception_context.connection
+        if conn is not None and conn.info.get(_START_KEY):
+            conn.info[_START_KEY].pop()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        starts = conn.info.get(_START_KEY)
+        if not starts:
+            return
+        elapsed_ms = (time.perf_counter() - starts.pop()) * 1000.0
+        request = _current_request.get()
+        if request is None or request.finished:
+            self.background_statements += 1
+            self.background_db_ms += elapsed_ms
+            return
+        shape = self._shape(statement)
+        count = request.record(shape, elapsed_ms)
+        record_span("db", shape, elapsed_ms)
+        if count == self.threshold + 1:
+            request.flagged[shape] = count
+            logger.warning(
+                "sql_n_plus_one",
+                endpoint=request.endpoint(),
+                threshold=self.threshold,
+                statement=shape[:300],
+            )
+
+    def _shape(self, statement: str) -> str:
+        shape = self._fingerprints.get(statement)
+        if shape is None:
+            if len(self._fingerprints) >= _FINGERPRINT_CACHE_SIZE:
+                self._fingerprints.clear()
+            shape = self._fingerprints[statement] = fingerprint(statement)
+        return shape
+
+    # ---- request scope ----
+
+    def begin_request(self, scope: Optional[Dict[str, Any]] = None) -> contextvars.Token:
+        """Open a request scope in the current context."""
+        return _current_request.set(RequestSqlStats(scope))
+
+    def current(self) -> Optional[RequestSqlStats]:
+        """Counters of the request running in this context, if any."""
+        return _current_request.get()
+
+    def end_request(self, token: contextvars.Token) -> Optional[RequestSqlStats]:
+        """Close the request scope and fold its counters into the endpoint aggregates."""
+        request = _current_request.get()
+        _current_request.reset(token)
+        if request is not None:
+            request.finished = True
+        if request is None or not request.statements:
+            return request
+        endpoint = request.endpoint()
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                if len(self._endpoints) >= self.max_endpoints:
+                    endpoint = OTHER_ENDPOINTS
+                    stats = self._endpoints.get(endpoint)
+                if stats is None:
+                    stats = self._endpoints[endpoint] = EndpointSqlStats(endpoint=endpoint)
+            stats.requests += 1
+            stats.statements += request.statements
+            stats.db_ms += request.db_ms
+            stats.max_statements = max(stats.max_statements, request.statements)
+            stats.max_db_ms = max(stats.max_db_ms, request.db_ms)
+            if request.flagged:
+                stats.n_plus_one_requests += 1
+                stats.last_repeated = max(request.flagged, key=lambda s: request.shapes[s])[:300]
+        return request
+
+    # ---- reporting ----
+
+    def top(self, limit: int = 20, order_by: str = "db_ms") -> Dict[str, Any]:
+        """
+        Endpoints ranked by an aggregate.
+
+        Args:
+            limit: Number of endpoints to return
+            order_by: One of `SORT_KEYS`
+
+        Returns:
+            Dict[str, Any]: Totals, background statement counters and the top endpoints
+        """
+        if order_by not in SORT_KEYS:
+            raise ValueError(f"order_by must be one of {', '.join(SORT_KEYS)}")
+        with self._lock:
+            reports = [stats.report() for stats in self._endpoints.values()]
+        reports.sort(key=lambda r: r[order_by], reverse=True)
+        return {
+            "since": self.started_at,
+            "n_plus_one_threshold": self.threshold,
+            "requests": sum(r["requests"] for r in reports),
+            "db_ms": round(sum(r["db_ms"] for r in reports), 1),
+            "background": {
+                "statements": self.background_statements,
+                "db_ms": round(self.background_db_ms, 1),
+            },
+            "endpoints": reports[: max(0, limit)],
+        }
+
+    def reset(self) -> None:
+        """Drop all aggregates."""
+        with self._lock:
+            self._endpoints.clear()
+            self.background_statements = 0
+            self.background_db_ms = 0.0
+            self.started_at = time.time()
+
+
+class SqlRequestStatsMiddleware:
+    """ASGI middleware opening a `sql_stats` request scope around each HTTP request.
+
+    The scope stays open until the response (including a streamed body) has
+    been sent, so statements issued while streaming count too.
+    """
+
+    def __init__(self, app: Any, stats: Optional[SqlStatementStats] = None):
+        self.app = app
+        self.stats = stats or sql_stats
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = self.stats.begin_request(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.stats.end_request(token)
+
+
+# Singleton instance
+sql_stats = SqlStatementStats()
@@ -0,0 +1,182 @@
+"""
+Server-Sent Events (SSE) streaming helpers.
+
+`guard_sse_stream` wraps an SSE generator and watches `request.is_disconnected()`.
+When the browser goes away the wrapped generator is cancelled (its `finally`
+blocks run, so it can cancel tasks it spawned), and a cancellation flag is
+raised for synchronous work running in `asyncio.to_thread` so LLM calls stop at
+their next call boundary instead of spending provider quota on nobody.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import threading
+import time
+from collections import Counter
+from typing import AsyncIterator, Awaitable, Callable, Dict, Literal, Optional
+
+import anyio
+import structlog
+from starlette.requests import Request
+
+
+logger = structlog.get_logger()
+
+StreamOutcome = Literal["completed", "aborted", "error"]
+
+# Reason: `asyncio.to_thread` and `create_task` copy contextvars, so every
+# worker thread and sub-task started by a guarded stream sees its flag.
+_stream_cancel_event: contextvars.ContextVar[Optional[threading.Event]] = contextvars.ContextVar(
+    "sse_stream_cancel_event", default=None
+)
+
+_outcome_counts: Counter = Counter()
+_in_flight: Counter = Counter()
+
+
+class StreamCancelledError(RuntimeError):
+    """Raised by `raise_if_stream_cancelled` once the SSE client has disconnected."""
+
+
+def stream_cancelled() -> bool:
+    """
+    Check whether the SSE stream owning the current context was abandoned.
+
+    Returns:
+        bool: True if the client disconnected; False otherwise (or outside a stream).
+    """
+    event = _stream_cancel_event.get()
+    return event is not None and event.is_set()
+
+
+def raise_if_stream_cancelled() -> None:
+    """
+    Abort the current unit of work if its SSE client has disconnected.
+
+    Safe to call from worker threads; a no-op outside guarded streams.
+
+    Raises:
+        StreamCancelledError: If the owning stream was aborted.
+    """
+    if stream_cancelled():
+        raise StreamCancelledError("sse_client_disconnected")
+
+
+def stream_outcome_counts() -> Dict[str, int]:
+    """
+    Snapshot of finished SSE streams by `<name>:<outcome>`.
+
+    Returns:
+        Dict[str, int]: Counts since process start.
+    """
+    return dict(_outcome_counts)
+
+
+def stream_in_flight_counts() -> Dict[str, int]:
+    """
+    Number of guarded SSE streams currently open, by name.
+
+    Returns:
+        Dict[str, int]: Open streams per stream name (names seen once stay at 0).
+    """
+    return dict(_in_flight)
+
+
+async def _wait_for_disconnect(request: Request, poll_interval: float) -> None:
+    """Return once the client has disconnected."""
+    while True:
+        try:
+            if await request.is_disconnected():
+                return
+        except Exception:
+            # Best-effort: a broken receive channel means the client is gone.
+            return
+        await asyncio.sleep(poll_interval)
+
+
+async def guard_sse_stream(
+    request: Request,
+    source: AsyncIterator[str],
+    *,
+    name: str,
+    poll_interval: float = 1.0,
+    on_finish: Optional[Callable[[StreamOutcome], Awaitable[None]]] = None,
+) -> AsyncIterator[str]:
+    """
+    Relay SSE chunks from `source` until it finishes or the client disconnects.
+
+    Args:
+        request: Incoming request (used for disconnect detection).
+        source: Async generator producing SSE-formatted strings.
+        name: Stable stream name for logs and outcome counters.
+        poll_interval: Seconds between disconnect checks.
+        on_finish: Optional coroutine called with the final outcome
+            ("completed", "aborted" or "error"), e.g. to persist a reply only
+            when it was fully delivered.
+
+    Yields:
+        str: Chunks from `source`, unchanged.
+    """
+    cancel_event = threading.Event()
+    ctx = contextvars.copy_context()
+    ctx.run(_stream_cancel_event.set, cancel_event)
+
+    started = time.perf_counter()
+    outcome: StreamOutcome = "completed"
+    chunks = 0
+    watcher = asyncio.create_task(_wait_for_disconnect(request, poll_interval))
+    next_item: Optional[asyncio.Task] = None
+    _in_flight[name] += 1
+
+    try:
+        while True:
+            # Each step runs in `ctx` so tasks/threads spawned by `source` inherit the flag.
+            next_item = asyncio.create_task(source.__anext__(), context=ctx)
+            await asyncio.wait({next_item, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            if not next_item.done():
+                outcome = "aborted"
+                break
+            try:
+                chunk = next_item.result()
+            except StopAsyncIteration:
+                break
+            chunks += 1
+            yield chunk
+    except (asyncio.CancelledError, GeneratorExit):
+        # The ASGI server stopped iterating us (disconnect seen at the transport layer).
+        outcome = "aborted"
+        raise
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        _in_flight[name] -= 1
+        if outcome != "completed":
+            cancel_event.set()
+        watcher.cancel()
+        if next_item is not None and not next_item.done():
+            next_item.cancel()
+        # Reason: cleanup must finish even though our own task may be cancelled.
+        with anyio.CancelScope(shield=True):
+            if next_item is not None:
+                await asyncio.gather(next_item, return_exceptions=True)
+            try:
+                await source.aclose()  # type: ignore[attr-defined]
+            except Exception:
+                pass
+
+            _outcome_counts[f"{name}:{outcome}"] += 1
+            logger.info(
+                "sse_stream_finished",
+                stream=name,
+                outcome=outcome,
+                chunks=chunks,
+                elapsed_ms=int((time.perf_counter() - started) * 1000),
+            )
+            if on_finish is not None:
+                try:
+                    await on_finish(outcome)
+                except Exception as e:  # noqa: BLE001
+                    logger.error("sse_stream_on_finish_failed", stream=name, error=str(e))
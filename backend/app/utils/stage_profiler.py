@@ -0,0 +1,143 @@
+"""
+Per-stage wall time, CPU time and database round-trip accounting.
+
+`StageProfiler` attributes work to named stages (`with profiler.stage(...)`
+or `profiler.wrap(...)`). Sessions wrapped with `profiler.pg()` /
+`profiler.neo()` count every database round trip against all stages active
+in the current context, so nested stages report inclusive totals. Used by
+the offline lesson-compile benchmark (scripts/benchmark_lesson_compile.py).
+
+CPU time is process-wide (`time.process_time`), so it includes worker
+threads started by a stage but also any concurrently running stage.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import functools
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, FrozenSet, Iterator, List, Tuple
+
+
+PG_ROUND_TRIP_METHODS: FrozenSet[str] = frozenset(
+    {"execute", "scalar", "scalars", "get", "commit", "flush", "refresh", "rollback"}
+)
+NEO4J_ROUND_TRIP_METHODS: FrozenSet[str] = frozenset(
+    {"run", "execute_read", "execute_write", "read_transaction", "write_transaction"}
+)
+
+_active_stages: contextvars.ContextVar[Tuple[str, ...]] = contextvars.ContextVar(
+    "profiler_active_stages", default=()
+)
+
+
+@dataclass
+class StageStats:
+    """Accumulated measurements for one named stage."""
+
+    name: str
+    calls: int = 0
+    wall_ms: float = 0.0
+    cpu_ms: float = 0.0
+    pg_round_trips: int = 0
+    neo4j_round_trips: int = 0
+
+
+class _CountingSession:
+    """Proxy that counts calls to a session's round-trip methods."""
+
+    def __init__(self, target: Any, profiler: "StageProfiler", kind: str, methods: FrozenSet[str]):
+        self._target = target
+        self._profiler = profiler
+        self._kind = kind
+        self._methods = methods
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._target, name)
+        if name not in self._methods or not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def counted(*args: Any, **kwargs: Any) -> Any:
+            self._profiler.count_round_trip(self._kind)
+            return attr(*args, **kwargs)
+
+        return counted
+
+
+class StageProfiler:
+    """Collects per-stage timings and round-trip counts."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stages: Dict[str, StageStats] = {}
+
+    def _get(self, name: str) -> StageStats:
+        stats = self._stages.get(name)
+        if stats is None:
+            stats = self._stages[name] = StageStats(name=name)
+        return stats
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Measure the enclosed block as stage `name` (usable around awaits)."""
+        token = _active_stages.set(_active_stages.get() + (name,))
+        wall0 = time.perf_counter()
+        cpu0 = time.process_time()
+        try:
+            yield
+        finally:
+            wall_ms = (time.perf_counter() - wall0) * 1000.0
+            cpu_ms = (time.process_time() - cpu0) * 1000.0
+            _active_stages.reset(token)
+            with self._lock:
+                stats = self._get(name)
+                stats.calls += 1
+                stats.wall_ms += wall_ms
+                stats.cpu_ms += cpu_ms
+
+    def wrap(self, name: str, fn: Callable[..., Any]) -> Callable[..., Any]:
+        """Return `fn` (sync or async) measured as stage `name`."""
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with self.stage(name):
+                    return await fn(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def sync_wrapper(*args: Any, **kwargs: Any) -> Any:
+            with self.stage(name):
+                return fn(*args, **kwargs)
+
+        return sync_wrapper
+
+    def count_round_trip(self, kind: str) -> None:
+        """Attribute one database round trip ("pg" or "neo4j") to the active stages."""
+        field = f"{kind}_round_trips"
+        with self._lock:
+            for name in _active_stages.get():
+                stats = self._get(name)
+                setattr(stats, field, getattr(stats, field) + 1)
+
+    def pg(self, session: Any) -> Any:
+        """Wrap an SQLAlchemy async session so its round trips are counted."""
+        return _CountingSession(session, self, "pg", PG_ROUND_TRIP_METHODS)
+
+    def neo(self, session: Any) -> Any:
+        """Wrap a Neo4j async session so its round trips are counted."""
+        return _CountingSession(session, self, "neo4j", NEO4J_ROUND_TRIP_METHODS)
+
+    def report(self) -> List[Dict[str, Any]]:
+        """Return one row per stage in first-seen order, times rounded to 0.1 ms."""
+        with self._lock:
+            rows = [asdict(s) for s in self._stages.values()]
+        for row in rows:
+            row["wall_ms"] = round(row["wall_ms"], 1)
+            row["cpu_ms"] = round(row["cpu_ms"], 1)
+        return rows
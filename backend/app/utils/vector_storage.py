@@ -0,0 +1,178 @@
+"""
+pgvector storage and ANN index layout for embedding columns.
+
+Embeddings (text-embedding-3-small, `EMBEDDING_DIMENSIONS`) live in
+`knowledge_embeddings.embedding`, `conversation_messages.content_embedding`
+and `lesson_chunks.embedding`. Two settings make them more compact:
+
+- `EMBEDDING_STORAGE_TYPE = "halfvec"` stores vectors in half precision,
+  halving table and TOAST size.
+- `EMBEDDING_INDEX_DIMENSIONS = d` (< `EMBEDDING_DIMENSIONS`) builds the HNSW
+  index on the first `d` dimensions as halfvec (`subvector(col, 1, d)::halfvec(d)`).
+  text-embedding-3 vectors are trained so that prefixes remain usable
+  embeddings, and the index shrinks roughly by `2 * EMBEDDING_DIMENSIONS / d`.
+
+Queries built with `nearest_sql` fetch `limit * EMBEDDING_RERANK_FACTOR`
+candidates through the compact index expression and re-rank them exactly on
+the stored vectors. With the default settings the candidate and exact
+orderings coincide and the query behaves like a plain `ORDER BY col <=> q`.
+
+`scripts/vector_storage.py` converts existing columns, rebuilds the indexes,
+and measures recall against index size.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from app.core.config import settings
+
+STORAGE_TYPES = ("vector", "halfvec")
+
+# table -> embedding column
+VECTOR_COLUMNS: Dict[str, str] = {
+    "knowledge_embeddings": "embedding",
+    "conversation_messages": "content_embedding",
+    "lesson_chunks": "embedding",
+}
+
+# table -> (index name, partial-index predicate or None)
+VECTOR_INDEXES: Dict[str, List[Tuple[str, Optional[str]]]] = {
+    "knowledge_embeddings": [("idx_knowledge_embeddings_embedding_hnsw", None)],
+    "conversation_messages": [("idx_conversation_messages_content_embedding_hnsw", None)],
+    "lesson_chunks": [
+        ("idx_lesson_chunks_embedding_hnsw", None),
+        ("idx_lesson_chunks_embedding_hnsw_jp", "lang = 'jp'"),
+        ("idx_lesson_chunks_embedding_hnsw_en", "lang = 'en'"),
+    ],
+}
+
+
+@dataclass(frozen=True)
+class VectorLayout:
+    """Resolved storage/index layout for embedding columns."""
+
+    storage_type: str
+    dimensions: int
+    index_dimensions: int
+    rerank_factor: int
+
+    @property
+    def compact_index(self) -> bool:
+        """Whether the ANN index is built on a reduced-dimension prefix."""
+        return self.index_dimensions < self.dimensions
+
+    def column_type(self) -> str:
+        """SQL type of the stored column, e.g. `halfvec(1536)`."""
+        return f"{self.storage_type}({self.dimensions})"
+
+    def query_vector(self, param: str) -> str:
+        """SQL for a bind parameter (vector literal text) cast to the storage type."""
+        return f"CAST(:{param} AS {self.storage_type})"
+
+    def index_expression(self, column: str) -> str:
+        """Expression the HNSW index is built on (and that queries must order by)."""
+        if not self.compact_index:
+            return column
+        return f"(subvector({column}, 1, {self.index_dimensions})::halfvec({self.index_dimensions}))"
+
+    def index_query(self, param: str) -> str:
+        """Query vector in the same form as `index_expression`."""
+        if not self.compact_index:
+            return self.query_vector(param)
+        return f"(subvector({self.query_vector(param)}, 1, {self.index_dimensions})::halfvec({self.index_dimensions}))"
+
+    def index_opclass(self) -> str:
+        """Operator class of the HNSW index (cosine distance)."""
+        if self.compact_index or self.storage_type == "halfvec":
+            return "halfvec_cosine_ops"
+        return "vector_cosine_ops"
+
+    def candidates(self, limit: int) -> int:
+        """Candidates fetched through the index before the exact re-rank."""
+        if not self.compact_index:
+            return limit
+        return limit * max(1, self.rerank_factor)
+
+    def create_index_sql(self, table: str, name: str, predicate: Optional[str] = None, concurrently: bool = True) -> str:
+        """CREATE INDEX statement for one embedding index of `table`."""
+        column = VECTOR_COLUMNS[table]
+        where = f" WHERE {predicate}" if predicate else ""
+        return (
+            f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {name} "
+            f"ON {table} USING hnsw ({self.index_expression(column)} {self.index_opclass()}){where}"
+        )
+
+
+def current_layout() -> VectorLayout:
+    """Layout from settings; invalid values fall back to full-precision, full-width."""
+    dimensions = int(getattr(settings, "EMBEDDING_DIMENSIONS", 1536))
+    storage_type = str(getattr(settings, "EMBEDDING_STORAGE_TYPE", "vector")).lower()
+    if storage_type not in STORAGE_TYPES:
+        storage_type = "vector"
+    index_dimensions = int(getattr(settings, "EMBEDDING_INDEX_DIMENSIONS", 0) or dimensions)
+    return VectorLayout(
+        storage_type=storage_type,
+        dimensions=dimensions,
+        index_dimensions=min(max(index_dimensions, 1), dimensions),
+        rerank_factor=int(getattr(settings, "EMBEDDING_RERANK_FACTOR", 4)),
+    )
+
+
+def vector_literal(values: Union[str, Sequence[float], None]) -> Optional[str]:
+    """
+    Format an embedding as pgvector text input (`[0.1,0.2,...]`).
+
+    Strings (vectors read back from Postgres) pass through unchanged.
+    """
+    if values is None or isinstance(values, str):
+        return values
+    return "[" + ",".join(repr(float(x)) for x in values) + "]"
+
+
+def nearest_sql(
+    *,
+    select: str,
+    from_where: str,
+    column: str,
+    param: str,
+    limit_param: str = "limit",
+    layout: Optional[VectorLayout] = None,
+) -> str:
+    """
+    Nearest-neighbour query with an exact re-rank over index candidates.
+
+    The inner query orders by the index expression and fetches
+    `:<limit_param>_candidates` rows; the outer query orders those by exact
+    cosine distance on the stored column. Callers bind `<param>` as a vector
+    literal and both limits (see `bind_limits`).
+
+    Args:
+        select: Select list of the inner query (without `SELECT`).
+        from_where: `FROM ... WHERE ...` of the inner query.
+        column: Embedding column expression, e.g. `m.content_embedding`.
+        param: Bind parameter name of the query vector.
+        limit_param: Bind parameter name of the final limit.
+        layout: Defaults to `current_layout()`.
+
+    Returns:
+        str: SQL whose rows carry the selected columns plus `distance` and
+        `similarity` (1 - cosine distance), ordered nearest first.
+    """
+    layout = layout or current_layout()
+    return (
+        f"SELECT *, 1 - distance AS similarity FROM ("
+        f"SELECT {select}, {column} <=> {layout.query_vector(param)} AS distance "
+        f"{from_where} "
+        f"ORDER BY {layout.index_expression(column)} <=> {layout.index_query(param)} "
+        f"LIMIT :{limit_param}_candidates"
+        f") nearest ORDER BY distance LIMIT :{limit_param}"
+    )
+
+
+def bind_limits(params: Dict[str, object], limit: int, limit_param: str = "limit", layout: Optional[VectorLayout] = None) -> None:
+    """Set `<limit_param>` and `<limit_param>_candidates` for `nearest_sql`."""
+    layout = layout or current_layout()
+    params[limit_param] = int(limit)
+    params[f"{limit_param}_candidates"] = layout.candidates(int(limit))
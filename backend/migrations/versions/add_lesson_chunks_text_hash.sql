@@ -0,0 +1,25 @@
+-- Content hash for lesson_chunks, so persisting a new lesson version reuses
+-- the embedding of any chunk text that was embedded before instead of
+-- calling the embedding API again (LessonPersistenceService).
+--
+-- lesson_chunks is created outside these migrations, so skip when missing.
+-- LessonPersistenceService adds the column on first use if the table appears
+-- after this migration was recorded.
+
+DO $$
+BEGIN
+    IF to_regclass('lesson_chunks') IS NULL THEN
+        RAISE NOTICE 'lesson_chunks not found; skipping text_hash column';
+        RETURN;
+    END IF;
+
+    ALTER TABLE lesson_chunks ADD COLUMN IF NOT EXISTS text_hash TEXT;
+
+    UPDATE lesson_chunks
+    SET text_hash = encode(sha256(convert_to(text, 'UTF8')), 'hex')
+    WHERE text_hash IS NULL;
+
+    CREATE INDEX IF NOT EXISTS idx_lesson_chunks_text_hash
+        ON lesson_chunks (text_hash)
+        WHERE embedding IS NOT NULL;
+END $$;
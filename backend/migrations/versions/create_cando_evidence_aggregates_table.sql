@@ -0,0 +1,77 @@
+-- Per-user, per-CanDo learner evidence aggregates.
+--
+-- Maintained incrementally on every `cando_lesson` evidence write so that
+-- recommendations read one row per studied CanDo instead of the whole
+-- conversation_interactions history of the user.
+
+CREATE TABLE IF NOT EXISTS cando_evidence_aggregates (
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    can_do_id TEXT NOT NULL,
+    total_attempts INTEGER NOT NULL DEFAULT 0,
+    correct_count INTEGER NOT NULL DEFAULT 0,
+    mastery_level INTEGER NOT NULL DEFAULT 1,
+    stage_counts JSONB NOT NULL DEFAULT '{}'::jsonb,
+    error_tag_counts JSONB NOT NULL DEFAULT '{}'::jsonb,
+    first_attempted_at TIMESTAMPTZ,
+    last_attempted_at TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (user_id, can_do_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_cando_evidence_aggregates_user_mastery
+    ON cando_evidence_aggregates (user_id, mastery_level);
+
+-- Backfill from existing evidence (idempotent).
+INSERT INTO cando_evidence_aggregates (
+    user_id,
+    can_do_id,
+    total_attempts,
+    correct_count,
+    mastery_level,
+    stage_counts,
+    error_tag_counts,
+    first_attempted_at,
+    last_attempted_at
+)
+SELECT
+    ci.user_id,
+    ci.concept_id,
+    COUNT(*),
+    COUNT(*) FILTER (WHERE ci.is_correct IS TRUE),
+    COALESCE((ARRAY_AGG(ci.mastery_level ORDER BY ci.created_at DESC))[1], 1),
+    COALESCE((
+        SELECT jsonb_object_agg(s.stage, s.n)
+        FROM (
+            SELECT ci2.metadata->>'stage' AS stage, COUNT(*) AS n
+            FROM conversation_interactions ci2
+            WHERE ci2.user_id = ci.user_id
+              AND ci2.concept_id = ci.concept_id
+              AND ci2.concept_type = 'cando_lesson'
+              AND ci2.metadata->>'stage' IS NOT NULL
+            GROUP BY 1
+        ) s
+    ), '{}'::jsonb),
+    COALESCE((
+        SELECT jsonb_object_agg(e.tag, e.n)
+        FROM (
+            SELECT t.tag, COUNT(*) AS n
+            FROM conversation_interactions ci3,
+                 LATERAL jsonb_array_elements_text(
+                     CASE WHEN jsonb_typeof(ci3.metadata->'error_tags') = 'array'
+                          THEN ci3.metadata->'error_tags'
+                          ELSE '[]'::jsonb
+                     END
+                 ) AS t(tag)
+            WHERE ci3.user_id = ci.user_id
+              AND ci3.concept_id = ci.concept_id
+              AND ci3.concept_type = 'cando_lesson'
+            GROUP BY 1
+        ) e
+    ), '{}'::jsonb),
+    MIN(ci.created_at),
+    MAX(ci.created_at)
+FROM conversation_interactions ci
+WHERE ci.concept_type = 'cando_lesson'
+  AND ci.concept_id IS NOT NULL
+GROUP BY ci.user_id, ci.concept_id
+ON CONFLICT (user_id, can_do_id) DO NOTHING;
@@ -0,0 +1,19 @@
+-- Validated lesson card outputs from the CanDo generation pipeline.
+--
+-- Keyed by a hash of (card type, prompt template version, model, system and
+-- user prompt), so a card whose inputs did not change is reused instead of
+-- calling the LLM again on recompiles and stage regenerations.
+
+CREATE TABLE IF NOT EXISTS lesson_card_cache (
+    cache_key TEXT PRIMARY KEY,
+    card_type TEXT NOT NULL,
+    template_version TEXT NOT NULL,
+    model TEXT NOT NULL,
+    card_json JSONB NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    last_used_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_lesson_card_cache_card_type
+    ON lesson_card_cache (card_type, template_version);
@@ -0,0 +1,72 @@
+-- Normalized per-card lesson storage.
+--
+-- The compile pipeline inserts one lesson_versions row per compile (the
+-- Content stage plus lesson meta). Later stages and stage regenerations upsert
+-- only their own cards into lesson_cards and their status into
+-- lesson_stage_status, instead of rewriting the whole lesson_plan JSONB.
+--
+-- lesson_versions_assembled overlays both onto lesson_versions.lesson_plan
+-- and returns the legacy LessonRoot shape ({lesson: {meta, cards}, ...}) for
+-- existing readers.
+
+CREATE TABLE IF NOT EXISTS lesson_cards (
+    lesson_id INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    card_key TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    card JSONB NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (lesson_id, version, card_key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_lesson_cards_stage
+    ON lesson_cards (lesson_id, version, stage);
+
+CREATE TABLE IF NOT EXISTS lesson_stage_status (
+    lesson_id INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    stage TEXT NOT NULL,
+    status TEXT NOT NULL,
+    error JSONB,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (lesson_id, version, stage)
+);
+
+CREATE OR REPLACE VIEW lesson_versions_assembled AS
+SELECT
+    lv.lesson_id,
+    lv.version,
+    lv.created_at,
+    CASE
+        WHEN c.cards IS NULL AND s.statuses IS NULL THEN lv.lesson_plan
+        ELSE COALESCE(lv.lesson_plan, '{}'::jsonb) || jsonb_build_object(
+            'lesson',
+            COALESCE(lv.lesson_plan->'lesson', '{}'::jsonb) || jsonb_build_object(
+                'cards',
+                COALESCE(lv.lesson_plan->'lesson'->'cards', '{}'::jsonb) || COALESCE(c.cards, '{}'::jsonb),
+                'meta',
+                COALESCE(lv.lesson_plan->'lesson'->'meta', '{}'::jsonb) || jsonb_build_object(
+                    'generation_status',
+                    COALESCE(lv.lesson_plan->'lesson'->'meta'->'generation_status', '{}'::jsonb)
+                        || COALESCE(s.statuses, '{}'::jsonb),
+                    'errors',
+                    (COALESCE(lv.lesson_plan->'lesson'->'meta'->'errors', '{}'::jsonb) - COALESCE(s.stages, ARRAY[]::text[]))
+                        || COALESCE(s.errors, '{}'::jsonb)
+                )
+            )
+        )
+    END AS lesson_plan
+FROM lesson_versions lv
+LEFT JOIN LATERAL (
+    SELECT jsonb_object_agg(card_key, card) AS cards
+    FROM lesson_cards
+    WHERE lesson_id = lv.lesson_id AND version = lv.version
+) c ON TRUE
+LEFT JOIN LATERAL (
+    SELECT
+        jsonb_object_agg(stage, status) AS statuses,
+        jsonb_object_agg(stage, error) FILTER (WHERE error IS NOT NULL) AS errors,
+        array_agg(stage) AS stages
+    FROM lesson_stage_status
+    WHERE lesson_id = lv.lesson_id AND version = lv.version
+) s ON TRUE;
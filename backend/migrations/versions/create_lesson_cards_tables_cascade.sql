@@ -0,0 +1,66 @@
+-- Tie lesson_cards and lesson_stage_status to their lesson_versions row.
+--
+-- Version numbers are reused (MAX(version)+1 after old versions are cleaned
+-- up), so overlay rows must go away with the version they belong to. Without
+-- this, leftover cards would be overlaid onto the next lesson stored under the
+-- same (lesson_id, version).
+--
+-- The foreign keys need a unique index on lesson_versions (lesson_id, version),
+-- it is created here when missing. If duplicate versions exist the keys are
+-- skipped with a notice and writers keep clearing the overlay explicitly
+-- (LessonCardStore.clear_overlay).
+
+DELETE FROM lesson_cards c
+WHERE NOT EXISTS (
+    SELECT 1 FROM lesson_versions lv
+    WHERE lv.lesson_id = c.lesson_id AND lv.version = c.version
+);
+
+DELETE FROM lesson_stage_status s
+WHERE NOT EXISTS (
+    SELECT 1 FROM lesson_versions lv
+    WHERE lv.lesson_id = s.lesson_id AND lv.version = s.version
+);
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1
+        FROM pg_index i
+        JOIN pg_attribute a1 ON a1.attrelid = i.indrelid AND a1.attnum = i.indkey[0]
+        JOIN pg_attribute a2 ON a2.attrelid = i.indrelid AND a2.attnum = i.indkey[1]
+        WHERE i.indrelid = 'lesson_versions'::regclass
+          AND i.indisunique
+          AND i.indpred IS NULL
+          AND i.indnatts = 2
+          AND a1.attname = 'lesson_id'
+          AND a2.attname = 'version'
+    ) THEN
+        IF EXISTS (
+            SELECT 1 FROM lesson_versions
+            GROUP BY lesson_id, version
+            HAVING COUNT(*) > 1
+        ) THEN
+            RAISE NOTICE 'duplicate lesson_versions (lesson_id, version); skipping overlay foreign keys';
+            RETURN;
+        END IF;
+        CREATE UNIQUE INDEX uq_lesson_versions_lesson_version
+            ON lesson_versions (lesson_id, version);
+    END IF;
+
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'fk_lesson_cards_version') THEN
+        ALTER TABLE lesson_cards
+            ADD CONSTRAINT fk_lesson_cards_version
+            FOREIGN KEY (lesson_id, version)
+            REFERENCES lesson_versions (lesson_id, version)
+            ON DELETE CASCADE;
+    END IF;
+
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'fk_lesson_stage_status_version') THEN
+        ALTER TABLE lesson_stage_status
+            ADD CONSTRAINT fk_lesson_stage_status_version
+            FOREIGN KEY (lesson_id, version)
+            REFERENCES lesson_versions (lesson_id, version)
+            ON DELETE CASCADE;
+    END IF;
+END $$;
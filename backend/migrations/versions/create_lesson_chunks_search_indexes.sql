@@ -0,0 +1,40 @@
+-- Indexes for hybrid lesson search (app/services/lesson_search_service.py).
+--
+-- lesson_chunks is created outside these migrations, so every statement is
+-- guarded on the table existing, and optional extensions/index types degrade
+-- to a NOTICE instead of failing startup.
+--
+-- - (can_do_id, lang): exact ranking of the chunks of one lesson.
+-- - pg_trgm GIN on text: ILIKE substring and word_similarity (<%) matches.
+-- - HNSW on embedding: one index for unfiltered queries plus one partial
+--   index per chunk language, used when the query filters on a lang literal.
+
+DO $$
+BEGIN
+    IF to_regclass('lesson_chunks') IS NULL THEN
+        RAISE NOTICE 'lesson_chunks not found; skipping lesson search indexes';
+        RETURN;
+    END IF;
+
+    CREATE INDEX IF NOT EXISTS idx_lesson_chunks_can_do_lang
+        ON lesson_chunks (can_do_id, lang);
+
+    BEGIN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX IF NOT EXISTS idx_lesson_chunks_text_trgm
+            ON lesson_chunks USING gin (text gin_trgm_ops);
+    EXCEPTION WHEN OTHERS THEN
+        RAISE NOTICE 'pg_trgm index not created (%); lexical search falls back to vector-only', SQLERRM;
+    END;
+
+    BEGIN
+        CREATE INDEX IF NOT EXISTS idx_lesson_chunks_embedding_hnsw
+            ON lesson_chunks USING hnsw (embedding vector_cosine_ops);
+        CREATE INDEX IF NOT EXISTS idx_lesson_chunks_embedding_hnsw_jp
+            ON lesson_chunks USING hnsw (embedding vector_cosine_ops) WHERE lang = 'jp';
+        CREATE INDEX IF NOT EXISTS idx_lesson_chunks_embedding_hnsw_en
+            ON lesson_chunks USING hnsw (embedding vector_cosine_ops) WHERE lang = 'en';
+    EXCEPTION WHEN OTHERS THEN
+        RAISE NOTICE 'HNSW indexes not created (%); vector search scans lesson_chunks', SQLERRM;
+    END;
+END $$;
@@ -0,0 +1,63 @@
+-- Per-user daily conversation activity rollups.
+--
+-- Maintained incrementally whenever a conversation session or message is
+-- written, so the analytics dashboard reads a handful of pre-aggregated
+-- rows instead of joining the full conversation_messages history.
+-- Days are UTC calendar days.
+
+CREATE TABLE IF NOT EXISTS user_daily_activity (
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    sessions_started INTEGER NOT NULL DEFAULT 0,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    user_message_count INTEGER NOT NULL DEFAULT 0,
+    ai_message_count INTEGER NOT NULL DEFAULT 0,
+    last_message_at TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (user_id, day)
+);
+
+-- Backfill from existing sessions and messages (idempotent).
+INSERT INTO user_daily_activity (
+    user_id,
+    day,
+    sessions_started,
+    message_count,
+    user_message_count,
+    ai_message_count,
+    last_message_at
+)
+SELECT
+    d.user_id,
+    d.day,
+    SUM(d.sessions_started),
+    SUM(d.message_count),
+    SUM(d.user_message_count),
+    SUM(d.ai_message_count),
+    MAX(d.last_message_at)
+FROM (
+    SELECT
+        s.user_id,
+        (m.created_at AT TIME ZONE 'UTC')::date AS day,
+        0 AS sessions_started,
+        COUNT(*) AS message_count,
+        COUNT(*) FILTER (WHERE m.role = 'user') AS user_message_count,
+        COUNT(*) FILTER (WHERE m.role = 'assistant') AS ai_message_count,
+        MAX(m.created_at) AS last_message_at
+    FROM conversation_messages m
+    JOIN conversation_sessions s ON s.id = m.session_id
+    WHERE m.created_at IS NOT NULL
+    GROUP BY 1, 2
+    UNION ALL
+    SELECT
+        s.user_id,
+        (s.created_at AT TIME ZONE 'UTC')::date AS day,
+        COUNT(*) AS sessions_started,
+        0, 0, 0,
+        NULL::timestamptz
+    FROM conversation_sessions s
+    WHERE s.created_at IS NOT NULL
+    GROUP BY 1, 2
+) d
+GROUP BY d.user_id, d.day
+ON CONFLICT (user_id, day) DO NOTHING;
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Backfill canonical Word keys.
+
+Creates the ``word_key`` uniqueness constraint and supporting indexes, then
+assigns ``word_key = coalesce(standard_orthography, kanji)`` to every :Word
+node that does not have one. Safe to re-run.
+
+Usage:
+    python scripts/backfill_word_keys.py [--batch-size 5000]
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+from neo4j import AsyncGraphDatabase
+
+# Add backend to path
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from app.core.config import settings
+from app.services.lexical_network.word_keys import (
+    backfill_word_keys,
+    ensure_word_key_schema,
+)
+
+
+async def run_backfill(batch_size: int) -> int:
+    """Ensure the word key schema and backfill missing keys."""
+    driver = AsyncGraphDatabase.driver(
+        settings.NEO4J_URI,
+        auth=(settings.NEO4J_USERNAME, settings.NEO4J_PASSWORD),
+    )
+
+    try:
+        await driver.verify_connectivity()
+        print("✓ Connected to Neo4j")
+
+        async with driver.session() as session:
+            await ensure_word_key_schema(session)
+            print("✓ word_key constraint and indexes ensured")
+
+            stats = await backfill_word_keys(session, batch_size=batch_size)
+            print(f"✓ Keyed {stats['keyed']} words in {stats['batches']} batches")
+            if stats["conflicts"]:
+                print(
+                    f"⚠ {stats['conflicts']} duplicate words flagged with word_key_conflict "
+                    "(MATCH (w:Word) WHERE w.word_key_conflict IS NOT NULL RETURN w)"
+                )
+    except Exception as e:
+        print(f"\n✗ Backfill failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+    finally:
+        await driver.close()
+
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=5000, help="Distinct keys per batch")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run_backfill(args.batch_size)))
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Batch-compile CanDo lessons in-process.
+
+Selects lessons by id and/or CEFR level and compiles them concurrently
+under global lesson and LLM concurrency limits (see
+app/services/lesson_batch_compile_service.py). Progress is checkpointed
+after every lesson; re-running with the same --checkpoint resumes.
+
+Usage:
+    cd backend
+    poetry run python scripts/batch_compile_lessons.py --level A1 --level A2 --level B1 \\
+        --concurrency 6 --llm-concurrency 12 --checkpoint nightly.json --report report.json
+    poetry run python scripts/batch_compile_lessons.py JF:105 JF:106
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import db  # noqa: E402
+from app.services.lesson_batch_compile_service import lesson_batch_compiler  # noqa: E402
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("can_do_ids", nargs="*", help="Explicit CanDo ids")
+    parser.add_argument("--level", action="append", default=[], help="CEFR level filter (repeatable)")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--metalanguage", default="en")
+    parser.add_argument("--model", default="gpt-4.1")
+    parser.add_argument("--fast-model", default=None)
+    parser.add_argument("--concurrency", type=int, default=None, help="Lessons compiled at once")
+    parser.add_argument("--llm-concurrency", type=int, default=None, help="In-flight LLM calls")
+    parser.add_argument("--max-attempts", type=int, default=None)
+    parser.add_argument("--bypass-card-cache", action="store_true")
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint file to resume from")
+    parser.add_argument("--report", default=None, help="Write the final report as JSON")
+    args = parser.parse_args()
+
+    if not args.can_do_ids and not args.level:
+        parser.error("give CanDo ids and/or --level")
+
+    await db.init_db_connections()
+    if db.AsyncSessionLocal is None or db.neo4j_driver is None:
+        print("Postgres and Neo4j must both be reachable", file=sys.stderr)
+        return 1
+    try:
+        async with db.neo4j_driver.session() as neo:
+            ids = await lesson_batch_compiler.resolve_can_do_ids(
+                neo, can_do_ids=args.can_do_ids, levels=args.level, limit=args.limit
+            )
+        print(f"Compiling {len(ids)} lessons")
+        job = lesson_batch_compiler.create_job(
+            ids,
+            metalanguage=args.metalanguage,
+            model=args.model,
+            fast_model=args.fast_model,
+            concurrency=args.concurrency,
+            llm_concurrency=args.llm_concurrency,
+            max_attempts=args.max_attempts,
+            bypass_card_cache=args.bypass_card_cache,
+            checkpoint_path=args.checkpoint,
+        )
+        report = await lesson_batch_compiler.run(job)
+    finally:
+        await db.close_db_connections()
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.report:
+        Path(args.report).write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    return 0 if not report["counts"].get("failed") else 2
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
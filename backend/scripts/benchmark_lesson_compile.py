@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Offline lesson-compile benchmark.
+
+Runs `compile_lessonroot` for one or more CanDo descriptors with LLM calls
+served from record/replay fixtures (see app/services/llm_replay.py), then
+runs `_deterministic_words` / `_deterministic_grammar` over the compiled
+lesson text. Reports wall time, CPU time and Postgres/Neo4j round trips for
+the whole compile and for each pipeline stage (plan, content, reading,
+comprehension, production, interaction, assembly).
+
+Record fixtures once with live models, then benchmark without network:
+
+    cd backend
+    poetry run python scripts/benchmark_lesson_compile.py --mode record JF:1 JF:2
+    poetry run python scripts/benchmark_lesson_compile.py JF:1 JF:2 --latency-scale 0 --json out.json
+
+Compiles write new lesson versions, so point the DATABASE_URL at a scratch
+database. Stage rows are inclusive of nested stages.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import db  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.services import cando_v2_compile_service as compile_service  # noqa: E402
+from app.services.cando_lesson_session_service import cando_lesson_sessions  # noqa: E402
+from app.services.llm_replay import llm_replay  # noqa: E402
+from app.utils.stage_profiler import StageProfiler  # noqa: E402
+
+PIPELINE_STAGES = {
+    "gen_domain_plan": "plan",
+    "gen_content_stage": "content",
+    "gen_reading_card": "reading",
+    "gen_comprehension_stage": "comprehension",
+    "gen_production_stage": "production",
+    "gen_interaction_stage": "interaction",
+    "assemble_lesson": "assemble",
+}
+
+
+def _profiled_pipeline_loader(profiler: StageProfiler, load=compile_service._load_pipeline_module):
+    def load_pipeline():
+        module = load()
+        for attr, stage in PIPELINE_STAGES.items():
+            if hasattr(module, attr):
+                setattr(module, attr, profiler.wrap(stage, getattr(module, attr)))
+        return module
+
+    return load_pipeline
+
+
+async def _run_once(can_do_id: str, args: argparse.Namespace) -> List[Dict[str, Any]]:
+    profiler = StageProfiler()
+    compile_service._load_pipeline_module = _profiled_pipeline_loader(profiler)
+    async with db.AsyncSessionLocal() as pg_session:
+        async with db.neo4j_driver.session() as neo_session:
+            pg = profiler.pg(pg_session)
+            neo = profiler.neo(neo_session)
+            with profiler.stage("compile_lessonroot"):
+                result = await compile_service.compile_lessonroot(
+                    neo=neo,
+                    pg=pg,
+                    can_do_id=can_do_id,
+                    metalanguage=args.metalanguage,
+                    model=args.model,
+                    fast_model_override=args.fast_model,
+                )
+            text_blob = compile_service._extract_text_from_lesson(result.get("lesson") or {})
+            with profiler.stage("deterministic_words"):
+                await cando_lesson_sessions._deterministic_words(neo, text_blob)
+            with profiler.stage("deterministic_grammar"):
+                await cando_lesson_sessions._deterministic_grammar(neo, text_blob)
+    return profiler.report()
+
+
+def _summarise(runs: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Collapse repeated runs into per-stage medians."""
+    by_stage: Dict[str, List[Dict[str, Any]]] = {}
+    for run in runs:
+        for row in run:
+            by_stage.setdefault(row["name"], []).append(row)
+    summary = []
+    for name, rows in by_stage.items():
+        summary.append({
+            "stage": name,
+            "runs": len(rows),
+            "wall_ms": round(statistics.median(r["wall_ms"] for r in rows), 1),
+            "cpu_ms": round(statistics.median(r["cpu_ms"] for r in rows), 1),
+            "pg_round_trips": statistics.median(r["pg_round_trips"] for r in rows),
+            "neo4j_round_trips": statistics.median(r["neo4j_round_trips"] for r in rows),
+        })
+    return summary
+
+
+def _print_table(can_do_id: str, summary: List[Dict[str, Any]]) -> None:
+    print(f"\n{can_do_id}")
+    print(f"{'stage':<24}{'wall ms':>12}{'cpu ms':>12}{'pg trips':>10}{'neo trips':>11}")
+    for row in summary:
+        print(
+            f"{row['stage']:<24}{row['wall_ms']:>12.1f}{row['cpu_ms']:>12.1f}"
+            f"{row['pg_round_trips']:>10}{row['neo4j_round_trips']:>11}"
+        )
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("can_do_ids", nargs="+", help="CanDo descriptor ids, e.g. JF:1")
+    parser.add_argument("--mode", choices=["record", "replay"], default="replay")
+    parser.add_argument("--fixtures", default=settings.LLM_REPLAY_DIR, help="Fixture directory")
+    parser.add_argument("--latency-ms", type=int, default=-1, help="Fixed replay latency per LLM call")
+    parser.add_argument("--latency-scale", type=float, default=settings.LLM_REPLAY_LATENCY_SCALE)
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per CanDo (median is reported)")
+    parser.add_argument("--model", default="gpt-4.1")
+    parser.add_argument("--fast-model", default=None)
+    parser.add_argument("--metalanguage", default="en")
+    parser.add_argument("--json", dest="json_path", default=None, help="Write results as JSON")
+    args = parser.parse_args()
+
+    llm_replay.configure(
+        mode=args.mode,
+        directory=args.fixtures,
+        latency_ms=args.latency_ms,
+        latency_scale=args.latency_scale,
+    )
+    await db.init_db_connections()
+    if db.AsyncSessionLocal is None or db.neo4j_driver is None:
+        print("Postgres and Neo4j must both be reachable", file=sys.stderr)
+        return 1
+
+    results: Dict[str, Any] = {}
+    try:
+        for can_do_id in args.can_do_ids:
+            runs = [await _run_once(can_do_id, args) for _ in range(max(1, args.repeat))]
+            summary = _summarise(runs)
+            results[can_do_id] = summary
+            _print_table(can_do_id, summary)
+    finally:
+        await db.close_db_connections()
+
+    print(f"\nLLM replay: {llm_replay.stats()}")
+    if args.json_path:
+        Path(args.json_path).write_text(
+            json.dumps({"llm_replay": llm_replay.stats(), "results": results}, indent=2),
+            encoding="utf-8",
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Lesson search benchmark over the stored lesson_chunks.
+
+Samples chunks, derives a query from each (a window of characters for
+Japanese chunks, of words for English ones) and treats the source chunk as
+the known relevant item. Every query runs through `lesson_search_service` in
+each mode and for each pool / ef_search setting, and the script reports
+recall@k, MRR and p50/p95 query latency. Query embeddings are computed once
+per query and shared across runs, so latency is the database time only.
+
+    cd backend
+    poetry run python scripts/benchmark_lesson_search.py --samples 200 --k 10
+    poetry run python scripts/benchmark_lesson_search.py --lang jp --pool 20 50 100 --ef-search 40 100 --json out.json
+
+Needs Postgres with lesson_chunks populated and an OpenAI key for the query
+embeddings.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+from sqlalchemy import text
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import db  # noqa: E402
+from app.services.embedding_service import EmbeddingService  # noqa: E402
+from app.services.lesson_search_service import SEARCH_MODES, LessonSearchService  # noqa: E402
+
+
+def _query_for(chunk_text: str, lang: str, jp_chars: int, en_words: int) -> str:
+    """Take a window from the middle of a chunk as its query."""
+    if lang == "jp":
+        compact = "".join(chunk_text.split())
+        start = max(0, (len(compact) - jp_chars) // 2)
+        return compact[start : start + jp_chars]
+    words = chunk_text.split()
+    start = max(0, (len(words) - en_words) // 2)
+    return " ".join(words[start : start + en_words])
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def _sample(pg, args: argparse.Namespace) -> List[Dict[str, Any]]:
+    where = "embedding IS NOT NULL AND length(text) >= 8"
+    params: Dict[str, Any] = {"n": args.samples}
+    if args.lang:
+        where += " AND lang = :lang"
+        params["lang"] = args.lang
+    res = await pg.execute(
+        text(f"SELECT can_do_id, lang, text FROM lesson_chunks WHERE {where} ORDER BY md5(text) LIMIT :n"),
+        params,
+    )
+    queries = []
+    for row in res.fetchall():
+        q = _query_for(row.text, row.lang, args.jp_chars, args.en_words)
+        if q:
+            queries.append({"q": q, "lang": row.lang, "can_do_id": row.can_do_id, "target": row.text})
+    return queries
+
+
+async def _run(pg, service: LessonSearchService, queries, mode: str, pool: int, ef: int, args) -> Dict[str, Any]:
+    latencies: List[float] = []
+    hits = 0
+    reciprocal_ranks = 0.0
+    for query in queries:
+        result = await service.search(
+            pg,
+            query["q"],
+            k=args.k,
+            lang=query["lang"] if args.filter_lang else None,
+            can_do_id=query["can_do_id"] if args.filter_can_do else None,
+            mode=mode,
+            pool=pool,
+            ef_search=ef,
+            embedding=query.get("embedding"),
+        )
+        await pg.rollback()  # drop the transaction-local ef_search
+        latencies.append(result["timings_ms"]["query"])
+        for rank, item in enumerate(result["items"], start=1):
+            if item["text"] == query["target"]:
+                hits += 1
+                reciprocal_ranks += 1.0 / rank
+                break
+    n = max(1, len(queries))
+    return {
+        "mode": mode,
+        "pool": pool,
+        "ef_search": ef,
+        "queries": len(queries),
+        f"recall@{args.k}": round(hits / n, 3),
+        "mrr": round(reciprocal_ranks / n, 3),
+        "p50_ms": round(statistics.median(latencies), 2) if latencies else 0.0,
+        "p95_ms": round(_percentile(latencies, 95), 2),
+    }
+
+
+def _print_table(rows: List[Dict[str, Any]], k: int) -> None:
+    print(f"{'mode':<10}{'pool':>6}{'ef':>6}{'recall@' + str(k):>12}{'mrr':>8}{'p50 ms':>10}{'p95 ms':>10}")
+    for row in rows:
+        print(
+            f"{row['mode']:<10}{row['pool']:>6}{row['ef_search']:>6}{row[f'recall@{k}']:>12.3f}"
+            f"{row['mrr']:>8.3f}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}"
+        )
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=100, help="Chunks sampled as known-item queries")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--modes", nargs="+", choices=SEARCH_MODES, default=list(SEARCH_MODES))
+    parser.add_argument("--pool", type=int, nargs="+", default=[50], help="Candidate pool sizes to compare")
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[64], help="hnsw.ef_search values to compare")
+    parser.add_argument("--lang", choices=["jp", "en"], default=None, help="Only sample chunks in this language")
+    parser.add_argument("--filter-lang", action="store_true", help="Pass each query's language as a filter")
+    parser.add_argument("--filter-can-do", action="store_true", help="Pass each query's can_do_id as a filter")
+    parser.add_argument("--jp-chars", type=int, default=6, help="Characters per Japanese query")
+    parser.add_argument("--en-words", type=int, default=4, help="Words per English query")
+    parser.add_argument("--json", dest="json_path", default=None, help="Write results as JSON")
+    args = parser.parse_args()
+
+    await db.init_db_connections()
+    if db.AsyncSessionLocal is None:
+        print("Postgres must be reachable", file=sys.stderr)
+        return 1
+
+    rows: List[Dict[str, Any]] = []
+    try:
+        async with db.AsyncSessionLocal() as pg:
+            queries = await _sample(pg, args)
+            if not queries:
+                print("No embedded lesson_chunks to sample", file=sys.stderr)
+                return 1
+            if any(mode != "lexical" for mode in args.modes):
+                embedder = EmbeddingService()
+                for query in queries:
+                    query["embedding"] = await embedder.generate_content_embedding(query["q"], provider="openai")
+            service = LessonSearchService()
+            for mode in args.modes:
+                for pool in args.pool:
+                    for ef in args.ef_search if mode != "lexical" else args.ef_search[:1]:
+                        rows.append(await _run(pg, service, queries, mode, pool, ef, args))
+    finally:
+        await db.close_db_connections()
+
+    _print_table(rows, args.k)
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps({"k": args.k, "results": rows}, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -90,8 +90,15 @@ __all__ = [
     "build_interaction_activities_prompt",
     "build_interactive_dialogue_prompt",
     # Generators
+    "PARTIAL_STREAM_CARD_TYPES",
+    "PROMPT_TEMPLATE_VERSION",
+    "CardCache",
+    "CardListener",
     "LLMFn",
     "_literal_choices",
+    "attach_card_cache",
+    "attach_card_listener",
+    "card_cache_key",
     "extract_first_json_block",
     "model_schema",
     "validate_or_repair",
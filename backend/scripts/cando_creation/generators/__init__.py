@@ -1,5 +1,18 @@
 # Generators package - re-exports all generator functions
-from .utils import LLMFn, _literal_choices, extract_first_json_block, model_schema, validate_or_repair
+from .utils import (
+    PARTIAL_STREAM_CARD_TYPES,
+    PROMPT_TEMPLATE_VERSION,
+    CardCache,
+    CardListener,
+    LLMFn,
+    _literal_choices,
+    attach_card_cache,
+    attach_card_listener,
+    card_cache_key,
+    extract_first_json_block,
+    model_schema,
+    validate_or_repair,
+)
 from .cards import (
     gen_ai_comprehension_tutor_card,
     gen_ai_production_evaluator_card,
@@ -31,8 +44,15 @@ from .stages import (
 
 __all__ = [
     # Utils
+    "PARTIAL_STREAM_CARD_TYPES",
+    "PROMPT_TEMPLATE_VERSION",
+    "CardCache",
+    "CardListener",
     "LLMFn",
     "_literal_choices",
+    "attach_card_cache",
+    "attach_card_listener",
+    "card_cache_key",
     "extract_first_json_block",
     "model_schema",
     "validate_or_repair",
@@ -1,6 +1,7 @@
 # Generator utilities
 from __future__ import annotations
 
+import hashlib
 import json
 from typing import Any, Callable, Dict, List, Literal, Optional, Protocol, Tuple, Type, TypeVar, Union, get_args
 
@@ -32,6 +33,72 @@ def extract_first_json_block(text: str) -> str:
 
 T = TypeVar("T", bound=BaseModel)
 
+# Part of every card cache key. Bump when card schemas or validation change in
+# ways the prompt text itself does not reflect, so stale cards are not reused.
+PROMPT_TEMPLATE_VERSION = "1"
+
+
+class CardCache(Protocol):
+    """Persistent store for validated card JSON (see attach_card_cache)."""
+
+    def get(self, key: str) -> Optional[str]: ...
+
+    def put(self, key: str, card_type: str, template_version: str, model: str, card_json: str) -> None: ...
+
+
+def card_cache_key(
+    card_type: str,
+    model: str,
+    system_prompt: str,
+    user_prompt: str,
+    template_version: str = PROMPT_TEMPLATE_VERSION,
+) -> str:
+    """Cache key for one card: (card type, template version, model, prompt hash)."""
+    prompt_hash = hashlib.sha256(f"{system_prompt}\x00{user_prompt}".encode("utf-8")).hexdigest()
+    return f"{card_type}:{template_version}:{model}:{prompt_hash}"
+
+
+def attach_card_cache(llm_call: LLMFn, cache: Optional[CardCache], model: str) -> LLMFn:
+    """
+    Tag an LLM function with the card cache validate_or_repair should use.
+
+    The model name becomes part of the cache key, so it should name the model
+    the function calls. Passing cache=None disables memoization for this function.
+    A function that may switch models (e.g. a fast model with a fallback) can
+    also expose `produced_by()`, returning the model that answered the calling
+    thread's last request; fresh cards are then stored under that model.
+    """
+    llm_call.card_cache = cache  # type: ignore[attr-defined]
+    llm_call.model = model  # type: ignore[attr-defined]
+    return llm_call
+
+
+# Long cards whose raw JSON is forwarded while it is still being generated.
+PARTIAL_STREAM_CARD_TYPES = frozenset({"DialogueCard", "ReadingCard"})
+# New characters of streamed output between two on_partial notifications.
+PARTIAL_EMIT_CHARS = 400
+
+
+class CardListener(Protocol):
+    """Receives cards as the pipeline produces them (see attach_card_listener)."""
+
+    def on_card(self, card_type: str, card: BaseModel) -> None: ...
+
+    def on_partial(self, card_type: str, raw_json: str) -> None: ...
+
+
+def attach_card_listener(llm_call: LLMFn, listener: Optional[CardListener]) -> LLMFn:
+    """
+    Tag an LLM function with a listener notified by validate_or_repair.
+
+    Every validated card (fresh or cached) is passed to `listener.on_card`. For
+    PARTIAL_STREAM_CARD_TYPES, if the function also exposes a `stream(system, user)`
+    generator of text deltas, the growing raw output is passed to
+    `listener.on_partial` while the card is generated.
+    """
+    llm_call.card_listener = listener  # type: ignore[attr-defined]
+    return llm_call
+
 
 def validate_or_repair(
     llm_call: Callable[[str, str], str],
@@ -40,12 +107,19 @@ def validate_or_repair(
     user_prompt: str,
     max_repair: int = 2,
     fallback_data: Optional[Dict[str, Any]] = None,
+    use_cache: bool = True,
 ) -> T:
     """
     Call LLM, extract JSON, validate against Pydantic model, repair if needed.
     
     Core logic only - no model-specific hacks, no debug logging bloat.
     If LLM generates bad JSON, fix the prompts instead of patching here.
+
+    When `llm_call` carries a card cache (see attach_card_cache), a validated
+    card for the same type, template version, model and prompts is returned
+    without calling the LLM, and fresh validated cards are stored. Results
+    built from `fallback_data` are never stored. When it carries a card
+    listener (see attach_card_listener), the listener sees every returned card.
     
     Args:
         llm_call: Function to call the LLM
@@ -54,6 +128,7 @@ def validate_or_repair(
         user_prompt: User prompt for LLM
         max_repair: Maximum number of repair attempts
         fallback_data: Optional fallback data dict to use if all repairs fail
+        use_cache: Set False to skip the card cache for this call
         
     Returns:
         Validated model instance
@@ -61,8 +136,61 @@ def validate_or_repair(
     Raises:
         ValidationError: If validation fails and no fallback provided
     """
+    card = _validate_or_repair_cached(
+        llm_call, target_model, system_prompt, user_prompt, max_repair, fallback_data, use_cache
+    )
+    listener: Optional[CardListener] = getattr(llm_call, "card_listener", None)
+    if listener is not None:
+        listener.on_card(target_model.__name__, card)
+    return card
+
+
+def _validate_or_repair_cached(
+    llm_call: Callable[[str, str], str],
+    target_model: Type[T],
+    system_prompt: str,
+    user_prompt: str,
+    max_repair: int,
+    fallback_data: Optional[Dict[str, Any]],
+    use_cache: bool,
+) -> T:
+    cache: Optional[CardCache] = getattr(llm_call, "card_cache", None) if use_cache else None
+    if cache is None:
+        return _validate_or_repair_uncached(
+            llm_call, target_model, system_prompt, user_prompt, max_repair, fallback_data
+        )
+
+    model = str(getattr(llm_call, "model", None) or "unknown")
+    key = card_cache_key(target_model.__name__, model, system_prompt, user_prompt)
+    cached = cache.get(key)
+    if cached is not None:
+        try:
+            return target_model.model_validate_json(cached)
+        except ValidationError:
+            pass  # Schema moved on without a version bump; regenerate and overwrite
+
+    card = _validate_or_repair_uncached(
+        llm_call, target_model, system_prompt, user_prompt, max_repair, fallback_data
+    )
+    if fallback_data is None:
+        produced_by = getattr(llm_call, "produced_by", None)
+        answered = str((produced_by() if produced_by is not None else None) or model)
+        if answered != model:
+            key = card_cache_key(target_model.__name__, answered, system_prompt, user_prompt)
+        cache.put(key, target_model.__name__, PROMPT_TEMPLATE_VERSION, answered, card.model_dump_json())
+    return card
+
+
+def _validate_or_repair_uncached(
+    llm_call: Callable[[str, str], str],
+    target_model: Type[T],
+    system_prompt: str,
+    user_prompt: str,
+    max_repair: int,
+    fallback_data: Optional[Dict[str, Any]],
+) -> T:
     try:
-        raw = llm_call(system_prompt, user_prompt)
+        raw = _first_completion(llm_call, target_model.__name__, system_prompt, user_prompt)
     except Exception as e:
         # If LLM call fails and we have fallback, use it
         if fallback_data:
@@ -114,6 +242,28 @@ def validate_or_repair(
     return target_model.model_validate_json(raw)
 
 
+def _first_completion(llm_call: Callable[[str, str], str], card_type: str, system_prompt: str, user_prompt: str) -> str:
+    """First LLM call for a card; streamed to the listener for long card types."""
+    listener: Optional[CardListener] = getattr(llm_call, "card_listener", None)
+    stream = getattr(llm_call, "stream", None)
+    if listener is None or stream is None or card_type not in PARTIAL_STREAM_CARD_TYPES:
+        return llm_call(system_prompt, user_prompt)
+
+    parts: List[str] = []
+    size = emitted = 0
+    try:
+        for delta in stream(system_prompt, user_prompt):
+            parts.append(delta)
+            size += len(delta)
+            if size - emitted >= PARTIAL_EMIT_CHARS:
+                listener.on_partial(card_type, "".join(parts))
+                emitted = size
+    except Exception:
+        # Streaming is best-effort; the blocking call has its own retries
+        return llm_call(system_prompt, user_prompt)
+    return "".join(parts)
+
+
 class LLMFn(Protocol):
     def __call__(self, system: str, user: str) -> str: ...
 
@@ -32,6 +32,7 @@ from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sess
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
 from app.core.config import settings
+from app.services.lesson_card_store import lesson_card_store
 
 load_dotenv()
 
@@ -201,6 +202,9 @@ async def delete_old_lesson_version(
             WHERE lesson_id = :lesson_id AND version = :version
         """), {"lesson_id": lesson_id, "version": version})
     
+    # Delete stored stage cards/statuses so a later version with the same number starts clean
+    await lesson_card_store.clear_overlay(pg, lesson_id, version)
+    
     # Delete lesson version
     await pg.execute(text("""
         DELETE FROM lesson_versions
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Embedding storage maintenance: status, migration and accuracy evaluation.
+
+Works on the pgvector columns listed in app/utils/vector_storage.py and the
+layout configured by EMBEDDING_STORAGE_TYPE / EMBEDDING_INDEX_DIMENSIONS /
+EMBEDDING_RERANK_FACTOR.
+
+    cd backend
+    # Column types, table and ANN index sizes
+    poetry run python scripts/vector_storage.py status
+
+    # Convert columns to the configured type and rebuild the HNSW indexes
+    EMBEDDING_STORAGE_TYPE=halfvec EMBEDDING_INDEX_DIMENSIONS=512 \\
+        poetry run python scripts/vector_storage.py migrate --dry-run
+    EMBEDDING_STORAGE_TYPE=halfvec EMBEDDING_INDEX_DIMENSIONS=512 \\
+        poetry run python scripts/vector_storage.py migrate --tables conversation_messages
+
+    # Recall@k of compact index orderings (with and without re-rank) against
+    # an exact scan, plus latency and index size
+    poetry run python scripts/vector_storage.py evaluate --table conversation_messages \\
+        --index-dimensions 256 512 1536 --rerank-factor 1 4
+
+`migrate` drops the existing HNSW/IVFFlat indexes on each column, rewrites the
+column when its type changes (ALTER COLUMN TYPE takes an exclusive lock for
+the rewrite, so run it in a maintenance window), then creates the indexes
+CONCURRENTLY and analyzes the table. Set the same settings on the API before
+it serves queries against the new layout.
+
+`evaluate` uses stored vectors as queries. Configurations without a matching
+index are ranked by a sequential scan, which gives the best recall that
+layout can reach, and their index size is an estimate.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import db  # noqa: E402
+from app.utils.vector_storage import (  # noqa: E402
+    VECTOR_COLUMNS,
+    VECTOR_INDEXES,
+    VectorLayout,
+    bind_limits,
+    current_layout,
+    nearest_sql,
+)
+
+# Rough HNSW per-row overhead beyond the vector (tuple header, neighbour lists at m=16).
+_HNSW_ROW_OVERHEAD_BYTES = 2 * 16 * 6 + 24
+
+
+async def _table_exists(conn, table: str) -> bool:
+    res = await conn.execute(text("SELECT to_regclass(:t) IS NOT NULL"), {"t": table})
+    return bool(res.scalar())
+
+
+async def _column_type(conn, table: str, column: str) -> Optional[str]:
+    res = await conn.execute(
+        text(
+            "SELECT format_type(a.atttypid, a.atttypmod) FROM pg_attribute a "
+            "WHERE a.attrelid = to_regclass(:t) AND a.attname = :c AND NOT a.attisdropped"
+        ),
+        {"t": table, "c": column},
+    )
+    return res.scalar()
+
+
+async def _ann_indexes(conn, table: str, column: str) -> List[Dict[str, Any]]:
+    res = await conn.execute(
+        text(
+            "SELECT i.indexname, i.indexdef, pg_relation_size(to_regclass(i.indexname)) AS bytes "
+            "FROM pg_indexes i WHERE i.tablename = :t AND i.indexdef ~* 'USING (hnsw|ivfflat)' "
+            "AND position(:c IN i.indexdef) > 0 ORDER BY i.indexname"
+        ),
+        {"t": table, "c": column},
+    )
+    return [{"name": r.indexname, "definition": r.indexdef, "bytes": int(r.bytes or 0)} for r in res.fetchall()]
+
+
+async def status(args: argparse.Namespace) -> Dict[str, Any]:
+    out: Dict[str, Any] = {"layout": current_layout().__dict__, "tables": {}}
+    async with db.postgresql_engine.connect() as conn:
+        for table, column in VECTOR_COLUMNS.items():
+            if not await _table_exists(conn, table):
+                continue
+            res = await conn.execute(
+                text(f"SELECT count(*) FILTER (WHERE {column} IS NOT NULL), pg_total_relation_size(:t) FROM {table}"),
+                {"t": table},
+            )
+            rows, total_bytes = res.fetchone()
+            indexes = await _ann_indexes(conn, table, column)
+            out["tables"][table] = {
+                "column": column,
+                "type": await _column_type(conn, table, column),
+                "vectors": int(rows),
+                "total_mb": round(total_bytes / 1048576, 1),
+                "ann_indexes": [{**i, "mb": round(i["bytes"] / 1048576, 1)} for i in indexes],
+            }
+    for table, info in out["tables"].items():
+        print(f"{table}.{info['column']}: {info['type']}, {info['vectors']} vectors, {info['total_mb']} MB total")
+        for index in info["ann_indexes"]:
+            print(f"  {index['name']}: {index['mb']} MB")
+    return out
+
+
+async def migrate(args: argparse.Namespace) -> Dict[str, Any]:
+    layout = current_layout()
+    done: Dict[str, List[str]] = {}
+    async with db.postgresql_engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for table in args.tables or list(VECTOR_COLUMNS):
+            column = VECTOR_COLUMNS[table]
+            if not await _table_exists(conn, table):
+                print(f"{table}: not found, skipped")
+                continue
+            statements = [f"DROP INDEX CONCURRENTLY IF EXISTS {i['name']}" for i in await _ann_indexes(conn, table, column)]
+            if await _column_type(conn, table, column) != layout.column_type():
+                statements.append(
+                    f"ALTER TABLE {table} ALTER COLUMN {column} TYPE {layout.column_type()} "
+                    f"USING {column}::{layout.column_type()}"
+                )
+            statements += [layout.create_index_sql(table, name, predicate) for name, predicate in VECTOR_INDEXES[table]]
+            statements.append(f"ANALYZE {table}")
+            for sql in statements:
+                print(f"{table}: {sql}")
+                if not args.dry_run:
+                    started = time.perf_counter()
+                    await conn.execute(text(sql))
+                    print(f"  done in {time.perf_counter() - started:.1f}s")
+            done[table] = statements
+    return {"layout": layout.__dict__, "dry_run": args.dry_run, "statements": done}
+
+
+async def evaluate(args: argparse.Namespace) -> Dict[str, Any]:
+    table, column = args.table, VECTOR_COLUMNS[args.table]
+    configured = current_layout()
+    results: List[Dict[str, Any]] = []
+    async with db.postgresql_engine.connect() as conn:
+        res = await conn.execute(
+            text(f"SELECT {column}::text FROM {table} WHERE {column} IS NOT NULL ORDER BY random() LIMIT :n"),
+            {"n": args.samples},
+        )
+        queries = [r[0] for r in res.fetchall()]
+        res = await conn.execute(text(f"SELECT count(*) FROM {table} WHERE {column} IS NOT NULL"))
+        rows = int(res.scalar() or 0)
+        if not queries:
+            print(f"{table}: no vectors to evaluate", file=sys.stderr)
+            return {"table": table, "results": []}
+        existing = {i["definition"].split(" USING ", 1)[1]: i["bytes"] for i in await _ann_indexes(conn, table, column)}
+
+        # Ground truth: exact ranking on the stored vectors; "+ 0" keeps the
+        # planner off any index so the scan is exhaustive.
+        truth = []
+        for q in queries:
+            res = await conn.execute(
+                text(
+                    f"SELECT ctid::text FROM {table} WHERE {column} IS NOT NULL "
+                    f"ORDER BY ({column} <=> CAST(:q AS {configured.storage_type})) + 0 LIMIT :k"
+                ),
+                {"q": q, "k": args.k},
+            )
+            truth.append({r[0] for r in res.fetchall()})
+
+        for dims in args.index_dimensions or [configured.index_dimensions]:
+            for factor in args.rerank_factor or [configured.rerank_factor]:
+                layout = VectorLayout(configured.storage_type, configured.dimensions, min(dims, configured.dimensions), factor)
+                sql = nearest_sql(
+                    select="ctid::text AS rid",
+                    from_where=f"FROM {table} WHERE {column} IS NOT NULL",
+                    column=column,
+                    param="q",
+                    layout=layout,
+                )
+                await conn.execute(text("SELECT set_config('hnsw.ef_search', :ef, false)"), {"ef": str(max(40, layout.candidates(args.k)))})
+                latencies, recalls = [], []
+                for q, expected in zip(queries, truth):
+                    params: Dict[str, Any] = {"q": q}
+                    bind_limits(params, args.k, layout=layout)
+                    started = time.perf_counter()
+                    res = await conn.execute(text(sql), params)
+                    found = {r.rid for r in res.fetchall()}
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    recalls.append(len(found & expected) / max(1, len(expected)))
+                index_def = f"hnsw ({layout.index_expression(column)} {layout.index_opclass()})"
+                vector_bytes = layout.index_dimensions * (2 if layout.index_opclass().startswith("halfvec") else 4)
+                index_bytes = existing.get(index_def)
+                results.append({
+                    "index_dimensions": layout.index_dimensions,
+                    "rerank_factor": factor if layout.compact_index else None,
+                    "indexed": index_bytes is not None,
+                    f"recall@{args.k}": round(statistics.mean(recalls), 3),
+                    "p50_ms": round(statistics.median(latencies), 2),
+                    "p95_ms": round(sorted(latencies)[max(0, int(len(latencies) * 0.95) - 1)], 2),
+                    "index_mb": round((index_bytes or rows * (vector_bytes + _HNSW_ROW_OVERHEAD_BYTES)) / 1048576, 1),
+                    "index_mb_estimated": index_bytes is None,
+                })
+
+    print(f"{table}.{column}: {rows} vectors, {len(queries)} queries, storage {configured.storage_type}")
+    print(f"{'dims':>6}{'rerank':>8}{'recall@' + str(args.k):>11}{'p50 ms':>9}{'p95 ms':>9}{'index MB':>10}")
+    for r in results:
+        size = f"{r['index_mb']}{'~' if r['index_mb_estimated'] else ''}"
+        print(
+            f"{r['index_dimensions']:>6}{str(r['rerank_factor'] or '-'):>8}{r[f'recall@{args.k}']:>11.3f}"
+            f"{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{size:>10}"
+        )
+    return {"table": table, "rows": rows, "queries": len(queries), "results": results}
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="Show column types and index sizes")
+    p_migrate = sub.add_parser("migrate", help="Convert columns and rebuild HNSW indexes for the configured layout")
+    p_migrate.add_argument("--tables", nargs="+", choices=list(VECTOR_COLUMNS), default=None)
+    p_migrate.add_argument("--dry-run", action="store_true", help="Print the statements without running them")
+    p_eval = sub.add_parser("evaluate", help="Measure recall, latency and index size of compact layouts")
+    p_eval.add_argument("--table", choices=list(VECTOR_COLUMNS), default="conversation_messages")
+    p_eval.add_argument("--samples", type=int, default=50, help="Stored vectors used as queries")
+    p_eval.add_argument("--k", type=int, default=10)
+    p_eval.add_argument("--index-dimensions", type=int, nargs="+", default=None)
+    p_eval.add_argument("--rerank-factor", type=int, nargs="+", default=None)
+    for p in (p_migrate, p_eval):
+        p.add_argument("--json", dest="json_path", default=None, help="Write results as JSON")
+    args = parser.parse_args()
+
+    db.init_postgresql()
+    try:
+        result = await {"status": status, "migrate": migrate, "evaluate": evaluate}[args.command](args)
+    finally:
+        await db.close_db_connections()
+    if getattr(args, "json_path", None):
+        Path(args.json_path).write_text(json.dumps(result, indent=2, default=str), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
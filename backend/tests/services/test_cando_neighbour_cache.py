@@ -0,0 +1,94 @@
+"""
+Tests for the CanDo neighbour cache.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.services.cando_neighbour_cache import CanDoNeighbourCache
+
+
+class _Result:
+    """Minimal async-iterable stand-in for a Neo4j result."""
+
+    def __init__(self, records):
+        self._records = records
+
+    def __aiter__(self):
+        async def gen():
+            for record in self._records:
+                yield record
+        return gen()
+
+
+def _session_with_edges(edges):
+    session = MagicMock()
+    session.run = AsyncMock(return_value=_Result([
+        {"source": s, "target": t, "score": score} for s, t, score in edges
+    ]))
+    return session
+
+
+@pytest.fixture
+def cache():
+    """Create an isolated cache instance."""
+    return CanDoNeighbourCache(top_k=3, ttl_seconds=0, min_similarity=0.5)
+
+
+@pytest.mark.asyncio
+async def test_load_sorts_and_truncates_neighbours(cache):
+    """Neighbour lists are ordered by score and capped at top_k."""
+    session = _session_with_edges([
+        ("A", "B", 0.6),
+        ("A", "C", 0.9),
+        ("A", "D", 0.7),
+        ("A", "E", 0.55),
+    ])
+
+    neighbours = await cache.get_neighbours(session, "A", limit=3, similarity_threshold=0.5)
+
+    assert [n["uid"] for n in neighbours] == ["C", "D", "B"]
+    assert neighbours[0]["similarity"] == pytest.approx(0.9)
+
+
+@pytest.mark.asyncio
+async def test_threshold_and_limit_filtering(cache):
+    """Queries filter by threshold and limit without another round trip."""
+    session = _session_with_edges([("A", "B", 0.6), ("A", "C", 0.9), ("A", "D", 0.7)])
+
+    assert [n["uid"] for n in await cache.get_neighbours(session, "A", limit=3, similarity_threshold=0.7)] == ["C", "D"]
+    assert [n["uid"] for n in await cache.get_neighbours(session, "A", limit=1, similarity_threshold=0.5)] == ["C"]
+    assert session.run.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_missing_descriptor_is_filled_once(cache):
+    """Descriptors without stored relationships are fetched lazily and memoized."""
+    session = _session_with_edges([])
+    fetch = AsyncMock(return_value=[{"uid": "B", "similarity": 0.8}])
+
+    first = await cache.get_neighbours(session, "A", limit=3, similarity_threshold=0.5, fetch_similar=fetch)
+    second = await cache.get_neighbours(session, "A", limit=3, similarity_threshold=0.5, fetch_similar=fetch)
+
+    assert first == second == [{"uid": "B", "similarity": pytest.approx(0.8)}]
+    fetch.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_invalidate_forces_reload(cache):
+    """Invalidation drops the adjacency so the next query reloads it."""
+    session = _session_with_edges([("A", "B", 0.8)])
+
+    await cache.get_neighbours(session, "A", limit=1)
+    cache.invalidate()
+    assert cache.is_loaded is False
+
+    await cache.get_neighbours(session, "A", limit=1)
+    assert session.run.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_out_of_bounds_query_rejected(cache):
+    """Thresholds below the stored floor cannot be served from the cache."""
+    with pytest.raises(ValueError):
+        await cache.get_neighbours(MagicMock(), "A", limit=3, similarity_threshold=0.1)
@@ -0,0 +1,173 @@
+"""
+Tests for the streaming content ingestion pipeline.
+"""
+
+import pytest
+
+from app.services.content_ingestion_service import (
+    ContentIngestionService,
+    ContentTooLargeError,
+    iter_text_segments,
+)
+
+
+async def _chunks(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+class _Upload:
+    """Minimal UploadFile stand-in that records read sizes."""
+
+    def __init__(self, data: bytes):
+        self._data = data
+        self._pos = 0
+        self.reads = []
+
+    async def read(self, size: int = -1) -> bytes:
+        self.reads.append(size)
+        chunk = self._data[self._pos:self._pos + size]
+        self._pos += len(chunk)
+        return chunk
+
+
+class _Result:
+    def __init__(self, record):
+        self._record = record
+
+    async def single(self):
+        return self._record
+
+
+class _FakeSession:
+    def __init__(self):
+        self.calls = []
+
+    async def run(self, query, params):
+        self.calls.append((query, params))
+        return _Result({"persisted": len(params["terms"]), "linked": 1})
+
+
+@pytest.mark.asyncio
+async def test_segments_survive_multibyte_chunk_splits():
+    """Characters split across 1-byte chunks decode intact and cut at sentence breaks."""
+    text = "今日は晴れです。明日は雨でしょう！最後"
+    segments = [s async for s in iter_text_segments(_chunks(text.encode("utf-8"), 1))]
+
+    assert "".join(segments) == text
+    assert segments[0].endswith("。")
+    assert segments[-1] == "最後"
+
+
+@pytest.mark.asyncio
+async def test_long_segments_are_cut_without_breaks():
+    segments = [s async for s in iter_text_segments(_chunks(b"a" * 25, 4), max_segment_chars=10)]
+
+    assert "".join(segments) == "a" * 25
+    assert max(len(s) for s in segments) <= 10
+
+
+@pytest.mark.asyncio
+async def test_upload_is_read_in_chunks_and_counted():
+    service = ContentIngestionService(use_unidic=False)
+    upload = _Upload(("猫 犬 猫\n" * 100).encode("utf-8"))
+
+    result = await service.ingest_upload(upload, chunk_size=64, max_bytes=10_000)
+
+    assert set(upload.reads) == {64}
+    assert result.tokenizer == "regex"
+    assert [(t["value"], t["count"]) for t in result.terms] == [("猫", 200), ("犬", 100)]
+    stats = result.stats()
+    assert stats["tokens"] == 300
+    assert stats["bytes_read"] == len(("猫 犬 猫\n" * 100).encode("utf-8"))
+
+
+@pytest.mark.asyncio
+async def test_upload_over_limit_is_rejected():
+    service = ContentIngestionService(use_unidic=False)
+
+    with pytest.raises(ContentTooLargeError):
+        await service.ingest_upload(_Upload(b"x" * 100), chunk_size=16, max_bytes=50)
+
+
+@pytest.mark.asyncio
+async def test_term_table_is_pruned_when_over_budget():
+    service = ContentIngestionService(use_unidic=False, max_terms=4)
+    text = "common " * 10 + " ".join(f"w{i}" for i in range(20))
+
+    result = await service.ingest_text(text)
+
+    assert result.truncated is True
+    assert result.terms[0] == {"value": "common", "count": 10, "pos": None, "confidence": 0.9}
+
+
+@pytest.mark.asyncio
+async def test_persist_terms_uses_batched_unwind():
+    service = ContentIngestionService(use_unidic=False)
+    session = _FakeSession()
+    terms = [{"value": f"t{i}", "count": i, "pos": "名詞"} for i in range(5)]
+
+    stats = await service.persist_terms(session, {"title": "Doc", "language": "ja"}, terms, batch_size=2)
+
+    assert stats == {"persisted": 5, "linked": 3, "batches": 3}
+    query, params = session.calls[0]
+    assert "UNWIND $terms AS term" in query
+    assert "word_key: term.value" in query
+    assert params["title"] == "Doc"
+    assert [t["value"] for t in params["terms"]] == ["t0", "t1"]
+
+
+@pytest.mark.asyncio
+async def test_analyze_returns_empty_items_when_no_terms_found(monkeypatch):
+    from app.api.v1.endpoints import content
+    from app.services.content_ingestion_service import IngestionResult
+
+    async def ingest_text(text):
+        return IngestionResult(processed_chars=len(text))
+
+    monkeypatch.setattr(content.content_ingestion_service, "ingest_text", ingest_text)
+    submission = content.ContentSubmission(text="。。。", source=content.SourceMetadata(title="Doc"))
+
+    response = await content.analyze_content(submission, max_items=5)
+
+    assert response.status == "ok"
+    assert response.processed_chars == 3 and response.items == []
+
+
+class _FakeDriver:
+    def __init__(self, session):
+        self._session = session
+
+    def session(self):
+        driver = self
+
+        class _Ctx:
+            async def __aenter__(self):
+                return driver._session
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return _Ctx()
+
+
+@pytest.mark.asyncio
+async def test_analyze_persists_with_driver_initialized_after_import(monkeypatch):
+    from app import db
+    from app.api.v1.endpoints import content
+    from app.services.content_ingestion_service import IngestionResult
+
+    async def ingest_text(text):
+        terms = [{"value": "猫", "count": 2, "pos": "名詞", "confidence": 0.9}]
+        return IngestionResult(terms=terms, processed_chars=len(text))
+
+    session = _FakeSession()
+    monkeypatch.setattr(content.content_ingestion_service, "ingest_text", ingest_text)
+    monkeypatch.setattr(db, "neo4j_driver", _FakeDriver(session))
+    submission = content.ContentSubmission(text="猫と猫", source=content.SourceMetadata(title="Doc"))
+
+    response = await content.analyze_and_persist(submission, min_confidence=0.7, max_items=5)
+
+    assert response.persisted is True
+    assert response.persisted_count == 1 and response.linked_count == 1
+    assert session.calls
@@ -0,0 +1,101 @@
+"""
+Tests for the cached graph statistics service.
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.graph_statistics_service import GraphStatisticsService
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    async def data(self):
+        return self._rows
+
+
+class _Neo4jSession:
+    """Answers the count-store queries; counts Word nodes from a mutable value."""
+
+    def __init__(self):
+        self.queries = []
+        self.words = 3
+
+    async def run(self, query, **params):
+        q = " ".join(query.split())
+        self.queries.append(q)
+        if q.startswith("CALL db.labels()"):
+            return _Result([{"label": "Word"}, {"label": "Empty"}])
+        if q.startswith("CALL db.relationshipTypes()"):
+            return _Result([{"relationshipType": "SYNONYM_OF"}])
+        if q == "MATCH (n:`Word`) RETURN count(n) AS count":
+            return _Result([{"count": self.words}])
+        if q == "MATCH ()-[r:`SYNONYM_OF`]->() RETURN count(r) AS count":
+            return _Result([{"count": 5}])
+        if q == "MATCH (n) RETURN count(n) AS count":
+            return _Result([{"count": self.words}])
+        if q == "MATCH ()-[r]->() RETURN count(r) AS count":
+            return _Result([{"count": 5}])
+        return _Result([{"count": 0}])
+
+
+@pytest.mark.asyncio
+async def test_counts_come_from_single_label_queries_and_are_cached():
+    service = GraphStatisticsService(ttl_seconds=900, counts_ttl_seconds=60)
+    session = _Neo4jSession()
+
+    first = await service.get("counts", session)
+    queries = len(session.queries)
+    second = await service.get("counts", session)
+
+    assert first["data"] == {
+        "labels": {"Word": 3},
+        "relationship_types": {"SYNONYM_OF": 5},
+        "total_nodes": 3,
+        "total_relationships": 5,
+    }
+    # No full-graph aggregation by label: only count-store shaped queries.
+    assert not any("labels(n)" in q or "type(r)" in q for q in session.queries)
+    assert len(session.queries) == queries
+    assert second["stale"] is False and second["computed_at"] == first["computed_at"]
+    assert service.stats()["hits"] == 1 and service.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_report_is_served_while_refreshing(monkeypatch):
+    service = GraphStatisticsService(ttl_seconds=900, counts_ttl_seconds=0.01)
+    session = _Neo4jSession()
+    await service.get("counts", session)
+    await asyncio.sleep(0.02)
+
+    session.words = 4
+    refreshed = asyncio.Event()
+
+    async def _refresh(name):
+        await service._compute(name, session)
+        refreshed.set()
+
+    monkeypatch.setattr(service, "_refresh_in_background", _refresh)
+    stale = await service.get("counts", session)
+    await asyncio.wait_for(refreshed.wait(), 1)
+    fresh = await service.get("counts", session)
+
+    assert stale["stale"] is True and stale["refreshing"] is True
+    assert stale["data"]["labels"]["Word"] == 3
+    assert fresh["data"]["labels"]["Word"] == 4
+    assert fresh["stale"] is False
+
+
+@pytest.mark.asyncio
+async def test_fresh_forces_recompute():
+    service = GraphStatisticsService(ttl_seconds=900, counts_ttl_seconds=900)
+    session = _Neo4jSession()
+    await service.get("counts", session)
+    session.words = 7
+
+    result = await service.get("counts", session, fresh=True)
+
+    assert result["data"]["total_nodes"] == 7
@@ -0,0 +1,169 @@
+"""
+Tests for the guided dialogue session working set.
+"""
+
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+
+from app.services import guided_session_working_set as working_set_module
+from app.services.guided_session_working_set import GuidedSessionWorkingSetService
+
+T0 = datetime(2026, 1, 1, 12, 0, 0)
+T1 = datetime(2026, 1, 1, 12, 0, 5)
+
+LESSON = {"cards": {"guided_dialogue": {"stages": [{"goal_en": "greet"}, {"goal_en": "order"}]}}}
+
+
+class _Result:
+    def __init__(self, row):
+        self._row = row
+
+    def fetchone(self):
+        return self._row
+
+
+class _Session:
+    """Records statements; answers reads from canned rows keyed by SQL prefix."""
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.executed = []
+        self.commits = 0
+
+    async def execute(self, statement, params=None):
+        sql = " ".join(str(statement).split())
+        self.executed.append((sql, params))
+        for prefix, row in self.answers.items():
+            if sql.startswith(prefix):
+                return _Result(row)
+        return _Result(None)
+
+    async def commit(self):
+        self.commits += 1
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def _session(previous=T0):
+    return _Session(
+        {
+            "SELECT can_do_id, guided_stage_idx": (
+                "JF:1",
+                0,
+                {"history": [{"learner_input": "old"}], "notes": "kept"},
+                json.dumps({"lesson": LESSON}),
+                T0,
+            ),
+            "WITH prev AS": (previous, T1),
+        }
+    )
+
+
+def _updates(pg):
+    return [params for sql, params in pg.executed if sql.startswith("WITH prev AS")]
+
+
+@pytest.mark.asyncio
+async def test_turns_reuse_working_set_and_write_only_the_delta():
+    service = GuidedSessionWorkingSetService()
+    service._write_behind_seconds = 0
+    pg = _session()
+
+    entry = await service.load(pg, "s1")
+    await service.record_turn(pg, entry, {"learner_input": "こんにちは"}, 1)
+    again = await service.load(pg, "s1")
+
+    assert again is entry
+    assert len([sql for sql, _ in pg.executed if sql.startswith("SELECT")]) == 1
+    assert entry.lesson == LESSON
+    assert [turn["learner_input"] for turn in entry.guided_state["history"]] == ["old", "こんにちは"]
+    # Only the new turn travels to Postgres; history is appended server-side.
+    assert _updates(pg) == [{"session_id": "s1", "stage_idx": 1, "turns": '[{"learner_input": "こんにちは"}]'}]
+    assert entry.synced_at == T1
+    assert service.stats()["flushed_turns"] == 1
+
+
+@pytest.mark.asyncio
+async def test_write_behind_coalesces_turns(monkeypatch):
+    background = _session()
+    monkeypatch.setattr(working_set_module.db, "AsyncSessionLocal", lambda: background)
+    service = GuidedSessionWorkingSetService()
+    service._write_behind_seconds = 0.01
+    pg = _session()
+
+    entry = await service.load(pg, "s1")
+    await service.record_turn(pg, entry, {"learner_input": "a"}, 0)
+    await service.record_turn(pg, entry, {"learner_input": "b"}, 1)
+    assert _updates(pg) == []
+
+    await asyncio.sleep(0.05)
+
+    updates = _updates(background)
+    assert len(updates) == 1
+    assert [turn["learner_input"] for turn in json.loads(updates[0]["turns"])] == ["a", "b"]
+    assert updates[0]["stage_idx"] == 1
+    assert entry.pending_turns == []
+
+
+@pytest.mark.asyncio
+async def test_foreign_write_evicts_and_invalidate_drops_pending(monkeypatch):
+    service = GuidedSessionWorkingSetService()
+    service._write_behind_seconds = 0
+    pg = _session(previous=datetime(2026, 1, 1, 12, 0, 3))
+
+    entry = await service.load(pg, "s1")
+    await service.record_turn(pg, entry, {"learner_input": "a"}, 0)
+
+    assert service.stats()["conflicts"] == 1
+    assert await service.load(pg, "s1") is not entry
+
+    monkeypatch.setattr(working_set_module.db, "AsyncSessionLocal", lambda: _session())
+    service._write_behind_seconds = 60
+    fresh = await service.load(pg, "s1")
+    await service.record_turn(pg, fresh, {"learner_input": "b"}, 1)
+    service.invalidate("s1")
+
+    assert fresh.pending_turns == []
+    assert await service.flush_all() == 0
+
+
+@pytest.mark.asyncio
+async def test_lesson_without_package_is_cached_only_with_guided_dialogue_and_while_current():
+    service = GuidedSessionWorkingSetService()
+    row = ("JF:1", 0, {}, None, T0)
+
+    pending = _Session(
+        {
+            "SELECT can_do_id, guided_stage_idx": row,
+            "SELECT lv.lesson_plan": ({"lesson": {"cards": {"objective": {}}}}, 7, 1),
+        }
+    )
+    assert (await service.load(pending, "s1")).lesson_version == 1
+    assert service.stats()["entries"] == 0
+
+    pg = _Session(
+        {
+            "SELECT can_do_id, guided_stage_idx": row,
+            "SELECT lv.lesson_plan": ({"lesson": LESSON}, 7, 1),
+            "SELECT MAX(lv.version)": (1,),
+        }
+    )
+    entry = await service.load(pg, "s1")
+    assert await service.load(pg, "s1") is entry
+
+    # A recompiled lesson (new version) replaces the cached one.
+    pg.answers["SELECT MAX(lv.version)"] = (2,)
+    pg.answers["SELECT lv.lesson_plan"] = ({"lesson": LESSON}, 7, 2)
+    newer = await service.load(pg, "s1")
+    assert newer is not entry and newer.lesson_version == 2
+
+    assert service.invalidate_lesson(8) == 0
+    assert service.invalidate_lesson(7) == 1
+    assert await service.load(pg, "s1") is not newer
@@ -0,0 +1,97 @@
+"""
+Tests for the in-process batch lesson compiler.
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from app.services import lesson_batch_compile_service as batch_module
+from app.services.lesson_batch_compile_service import LessonBatchCompiler
+
+
+class _Session:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _Driver:
+    def session(self):
+        return _Session()
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    monkeypatch.setattr(batch_module.db, "AsyncSessionLocal", _Session)
+    monkeypatch.setattr(batch_module.db, "neo4j_driver", _Driver())
+    monkeypatch.setattr(batch_module, "RETRY_BACKOFF_SECONDS", 0.0)
+
+
+@pytest.mark.asyncio
+async def test_batch_respects_concurrency_and_reports(fake_db, monkeypatch, tmp_path):
+    running = {"now": 0, "peak": 0}
+    limiters = []
+
+    async def fake_compile(*, can_do_id, **kwargs):
+        limiters.append(batch_module.compile_service.llm_call_limiter.get())
+        running["now"] += 1
+        running["peak"] = max(running["peak"], running["now"])
+        await _yield()
+        running["now"] -= 1
+        if can_do_id == "JF:bad":
+            raise ValueError("invalid descriptor")
+        return {"lesson_id": 1, "version": 2}
+
+    monkeypatch.setattr(batch_module.compile_service, "compile_lessonroot", fake_compile)
+    compiler = LessonBatchCompiler()
+    job = compiler.create_job(
+        ["JF:1", "JF:2", "JF:3", "JF:bad", "JF:5"],
+        concurrency=2,
+        llm_concurrency=3,
+        checkpoint_path=str(tmp_path / "cp.json"),
+    )
+
+    report = await compiler.run(job)
+
+    assert running["peak"] == 2
+    # Every compile sees the same job-wide LLM semaphore.
+    assert limiters[0] is not None
+    assert all(limiter is limiters[0] for limiter in limiters)
+    assert batch_module.compile_service.llm_call_limiter.get() is None
+    assert report["counts"] == {"completed": 4, "failed": 1}
+    # Permanent errors are not retried.
+    assert report["failures"][0]["attempts"] == 1
+    saved = json.loads((tmp_path / "cp.json").read_text(encoding="utf-8"))
+    assert saved["items"]["JF:1"]["status"] == "completed"
+
+
+@pytest.mark.asyncio
+async def test_resume_skips_completed_and_retries_transient_errors(fake_db, monkeypatch, tmp_path):
+    checkpoint = tmp_path / "cp.json"
+    checkpoint.write_text(json.dumps({"items": {"JF:1": {"can_do_id": "JF:1", "status": "completed", "attempts": 1}}}))
+    calls = []
+
+    async def fake_compile(*, can_do_id, **kwargs):
+        calls.append(can_do_id)
+        if calls.count(can_do_id) == 1:
+            raise TimeoutError("upstream timed out")
+        return {"lesson_id": 7, "version": 1}
+
+    monkeypatch.setattr(batch_module.compile_service, "compile_lessonroot", fake_compile)
+    compiler = LessonBatchCompiler()
+    job = compiler.create_job(["JF:1", "JF:2"], concurrency=1, max_attempts=2, checkpoint_path=str(checkpoint))
+
+    report = await compiler.run(job)
+
+    assert calls == ["JF:2", "JF:2"]
+    assert report["counts"] == {"skipped": 1, "completed": 1}
+    assert job.items["JF:2"].attempts == 2
+
+
+async def _yield():
+    for _ in range(3):
+        await asyncio.sleep(0)
@@ -0,0 +1,122 @@
+"""
+Tests for per-card lesson storage (lesson_cards / lesson_stage_status).
+"""
+
+import json
+
+import pytest
+from pydantic import BaseModel
+
+from app.services.lesson_card_store import LessonCardStore
+
+
+class _Card(BaseModel):
+    title: str
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def first(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return self._rows
+
+
+class _Session:
+    """Records statements; answers reads from canned rows keyed by SQL prefix."""
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.executed = []
+        self.commits = 0
+
+    async def execute(self, statement, params=None):
+        sql = " ".join(str(statement).split())
+        self.executed.append((sql, params))
+        for prefix, rows in self.answers.items():
+            if sql.startswith(prefix):
+                return _Result(rows)
+        return _Result([])
+
+    async def commit(self):
+        self.commits += 1
+
+
+@pytest.mark.asyncio
+async def test_upsert_stage_writes_only_its_own_cards():
+    pg = _Session({"SELECT 1 FROM lesson_versions": [(1,)]})
+
+    written = await LessonCardStore().upsert_stage(
+        pg,
+        7,
+        2,
+        "comprehension",
+        {
+            "reading_comprehension": _Card(title="駅"),
+            "comprehension_exercises": {"items": [_Card(title="q1")]},
+            "ai_comprehension_tutor": None,
+            "guided_dialogue": {"title": "belongs to production"},
+        },
+    )
+
+    assert written == 2
+    inserts = [(sql, params) for sql, params in pg.executed if sql.startswith("INSERT INTO lesson_cards")]
+    assert len(inserts) == 1
+    rows = inserts[0][1]
+    assert [row["key"] for row in rows] == ["reading_comprehension", "comprehension_exercises"]
+    assert json.loads(rows[1]["card"]) == {"items": [{"title": "q1"}]}
+    # No statement touches lesson_plan; one status row clears the stage error.
+    assert not any("UPDATE lesson_versions" in sql for sql, _ in pg.executed)
+    status = [params for sql, params in pg.executed if sql.startswith("INSERT INTO lesson_stage_status")]
+    assert status == [{"lid": 7, "ver": 2, "stage": "comprehension", "status": "complete", "error": None}]
+    assert pg.commits == 1
+
+
+@pytest.mark.asyncio
+async def test_upsert_stage_requires_existing_version():
+    pg = _Session({})
+    with pytest.raises(ValueError, match="not found"):
+        await LessonCardStore().upsert_stage(pg, 7, 9, "production", {"guided_dialogue": {"x": 1}})
+    with pytest.raises(ValueError, match="Unknown stage"):
+        await LessonCardStore().upsert_stage(pg, 7, 9, "warmup", {})
+
+
+@pytest.mark.asyncio
+async def test_generation_status_overlays_stage_rows_on_document_meta():
+    pg = _Session(
+        {
+            "SELECT version, lesson_plan->'lesson'->'meta'->'generation_status'": [
+                (
+                    3,
+                    {"content": "complete", "comprehension": "generating", "production": "pending"},
+                    {"comprehension": {"message": "old failure"}},
+                )
+            ],
+            "SELECT stage, status, error FROM lesson_stage_status": [
+                ("comprehension", "complete", None),
+                ("production", "failed: timeout", '{"message": "timeout"}'),
+            ],
+        }
+    )
+
+    version, statuses, errors = await LessonCardStore().get_generation_status(pg, 7)
+
+    assert version == 3
+    assert statuses == {"content": "complete", "comprehension": "complete", "production": "failed: timeout"}
+    assert errors == {"production": {"message": "timeout"}}
+
+
+@pytest.mark.asyncio
+async def test_clear_overlay_deletes_version_rows_without_committing():
+    pg = _Session({})
+
+    await LessonCardStore().clear_overlay(pg, 7, 2)
+
+    assert pg.executed == [
+        ("DELETE FROM lesson_cards WHERE lesson_id = :lid AND version = :ver", {"lid": 7, "ver": 2}),
+        ("DELETE FROM lesson_stage_status WHERE lesson_id = :lid AND version = :ver", {"lid": 7, "ver": 2}),
+    ]
+    assert pg.commits == 0
@@ -0,0 +1,117 @@
+"""
+Tests for batched, hash-deduplicated lesson chunk embedding.
+"""
+
+import json
+
+import pytest
+
+from app.services.lesson_persistence_service import LessonPersistenceService, _text_hash
+
+MASTER = {
+    "ui": {
+        "sections": [
+            {
+                "type": "dialogue",
+                "cards": [
+                    {
+                        "id": "d1",
+                        "body": {"jp": "駅はどこですか", "en": "Where is the station?"},
+                        "turns": [{"jp": "駅はどこですか", "en": "Over there."}],
+                    }
+                ],
+            }
+        ]
+    }
+}
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def fetchall(self):
+        return self._rows
+
+
+class _Session:
+    def __init__(self, known_hashes):
+        self.known_hashes = known_hashes
+        self.executed = []
+        self.commits = 0
+
+    async def execute(self, statement, params=None):
+        sql = " ".join(str(statement).split())
+        self.executed.append((sql, params))
+        if sql.startswith("SELECT DISTINCT text_hash"):
+            return _Result([(h,) for h in params["hashes"] if h in self.known_hashes])
+        return _Result([])
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        pass
+
+
+class _Embeddings:
+    def __init__(self):
+        self.calls = []
+
+    async def generate_content_embeddings(self, texts, provider="openai"):
+        self.calls.append(list(texts))
+        return [[0.5, float(i)] for i in range(len(texts))]
+
+
+@pytest.mark.asyncio
+async def test_chunks_embed_once_per_new_text_and_insert_in_one_statement(monkeypatch):
+    service = LessonPersistenceService()
+    service._embedding = _Embeddings()
+    pg = _Session(known_hashes={_text_hash("Where is the station?")})
+
+    count = await service.index_chunks(lesson_id=4, version=2, can_do_id="JF:1", master=MASTER, pg=pg)
+
+    assert count == 4
+    # The duplicated Japanese line is embedded once, the known English line not at all.
+    assert service._embedding.calls == [["駅はどこですか", "Over there."]]
+    inserts = [(sql, params) for sql, params in pg.executed if sql.startswith("WITH incoming AS")]
+    assert len(inserts) == 1
+    sql, params = inserts[0]
+    assert "DELETE FROM lesson_chunks" in sql and "INSERT INTO lesson_chunks" in sql
+    rows = json.loads(params["rows"])
+    by_text = {row["text"]: row["embedding"] for row in rows}
+    assert by_text["駅はどこですか"] == "[0.5,0.0]"
+    assert by_text["Where is the station?"] is None  # reused server-side by hash
+    assert [row["lang"] for row in rows] == ["jp", "en", "jp", "en"]
+    assert pg.commits == 1
+
+
+@pytest.mark.asyncio
+async def test_embedding_batches_respect_batch_size(monkeypatch):
+    from app.services import lesson_persistence_service as module
+
+    monkeypatch.setattr(module.settings, "LESSON_CHUNK_EMBED_BATCH_SIZE", 1)
+    service = LessonPersistenceService()
+    service._embedding = _Embeddings()
+    pg = _Session(known_hashes=set())
+
+    await service.index_chunks(lesson_id=4, version=3, can_do_id="JF:1", master=MASTER, pg=pg)
+
+    assert len(service._embedding.calls) == 3
+    assert all(len(batch) == 1 for batch in service._embedding.calls)
+
+
+@pytest.mark.asyncio
+async def test_missing_text_hash_column_is_added_until_present():
+    service = LessonPersistenceService()
+    service._embedding = _Embeddings()
+    pg = _Session(known_hashes=set())
+
+    await service.index_chunks(lesson_id=4, version=2, can_do_id="JF:1", master=MASTER, pg=pg)
+    assert any(sql.startswith("ALTER TABLE lesson_chunks ADD COLUMN IF NOT EXISTS text_hash") for sql, _ in pg.executed)
+    assert not service._text_hash_ready
+
+    service._text_hash_ready = True
+    pg.executed.clear()
+    await service.index_chunks(lesson_id=4, version=3, can_do_id="JF:1", master=MASTER, pg=pg)
+    assert not any("information_schema" in sql or sql.startswith("ALTER") for sql, _ in pg.executed)
@@ -0,0 +1,91 @@
+"""
+Tests for vector / lexical / hybrid lesson chunk search.
+"""
+
+from collections import namedtuple
+
+import pytest
+
+from app.services.lesson_search_service import LessonSearchService
+
+Row = namedtuple(
+    "Row",
+    "lesson_id version can_do_id section card_id position lang text similarity lexical_score v_rank t_rank score",
+)
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def fetchall(self):
+        return self._rows
+
+
+class _Session:
+    def __init__(self, rows=(), fail_lexical=False):
+        self.rows = list(rows)
+        self.fail_lexical = fail_lexical
+        self.executed = []
+        self.rollbacks = 0
+
+    async def execute(self, statement, params=None):
+        sql = " ".join(str(statement).split())
+        self.executed.append((sql, params))
+        if self.fail_lexical and "word_similarity" in sql:
+            raise RuntimeError("function word_similarity(unknown, text) does not exist")
+        return _Result(self.rows if sql.startswith("WITH") else [])
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+
+def _queries(pg):
+    return [(sql, params) for sql, params in pg.executed if sql.startswith("WITH")]
+
+
+@pytest.mark.asyncio
+async def test_hybrid_fuses_both_retrievers_with_filtered_ann():
+    row = Row(3, 1, "JF:1", "reading", "r1", 0, "jp", "駅はどこですか", 0.81, 0.9, 2, 1, 0.0325)
+    pg = _Session([row])
+
+    result = await LessonSearchService().search(
+        pg, "駅", k=5, lang="jp", mode="hybrid", pool=100, ef_search=40, embedding=[0.1, 0.2]
+    )
+
+    (sql, params), = _queries(pg)
+    assert "vector_search AS" in sql and "text_search AS" in sql and "FULL OUTER JOIN" in sql
+    # The language filter is a literal so the partial HNSW index applies.
+    assert "lang = 'jp'" in sql and "lang" not in params
+    assert params["pattern"] == "%駅%" and params["pool"] == 100
+    ef_calls = [params for sql, params in pg.executed if "hnsw.ef_search" in sql]
+    assert ef_calls == [{"ef": "100"}]
+    assert result["mode"] == "hybrid"
+    assert result["items"][0]["vector_rank"] == 2 and result["items"][0]["lexical_rank"] == 1
+
+
+@pytest.mark.asyncio
+async def test_lexical_mode_scopes_can_do_and_skips_embedding():
+    service = LessonSearchService()
+    pg = _Session()
+
+    result = await service.search(pg, "50%_off", mode="lexical", can_do_id="JF:9")
+
+    (sql, params), = _queries(pg)
+    assert sql.startswith("WITH scoped AS MATERIALIZED")
+    assert "vector_search" not in sql and params["can"] == "JF:9"
+    assert params["pattern"] == "%50\\%\\_off%"
+    assert service._embedding is None and "embed" not in result["timings_ms"]
+
+
+@pytest.mark.asyncio
+async def test_hybrid_falls_back_to_vector_without_pg_trgm():
+    pg = _Session(fail_lexical=True)
+
+    result = await LessonSearchService().search(pg, "station", mode="hybrid", embedding=[0.3])
+
+    assert result["mode"] == "vector"
+    assert pg.rollbacks == 1
+    assert "text_search" not in _queries(pg)[-1][0]
+    with pytest.raises(ValueError, match="Unknown search mode"):
+        await LessonSearchService().search(pg, "x", mode="bm25")
@@ -0,0 +1,110 @@
+"""
+Tests for the in-memory lexical graph snapshot.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.services.lexical_graph_snapshot import LexicalGraphSnapshotService
+
+
+class _Result:
+    """Minimal async-iterable stand-in for a Neo4j result."""
+
+    def __init__(self, records):
+        self._records = records
+
+    def __aiter__(self):
+        async def gen():
+            for record in self._records:
+                yield record
+        return gen()
+
+
+NODES = [
+    {"key": "美しい", "hiragana": "うつくしい", "translation": "beautiful", "level": 2,
+     "pos_norm": "形容詞", "etymology": "和語", "domain": "aesthetics", "pos": "adjective"},
+    {"key": "綺麗", "hiragana": "きれい", "translation": "pretty", "level": 1,
+     "pos_norm": "形状詞", "etymology": "漢語", "domain": "aesthetics", "pos": "na-adjective"},
+    {"key": "可愛い", "hiragana": "かわいい", "translation": "cute", "level": 1,
+     "pos_norm": "形容詞", "etymology": "和語", "domain": None, "pos": "adjective"},
+    {"key": "素敵", "hiragana": "すてき", "translation": "lovely", "level": 3,
+     "pos_norm": "形状詞", "etymology": None, "domain": None, "pos": None},
+    {"key": "孤立", "hiragana": "こりつ", "translation": "isolation", "level": 4,
+     "pos_norm": "名詞", "etymology": None, "domain": None, "pos": None},
+]
+
+EDGES = [
+    {"source": "美しい", "target": "綺麗", "weight": 0.9, "relation_type": None, "mutual_sense": "appearance"},
+    {"source": "可愛い", "target": "美しい", "weight": 0.6, "relation_type": "near_synonym", "mutual_sense": None},
+    {"source": "綺麗", "target": "素敵", "weight": None, "relation_type": None, "mutual_sense": None},
+]
+
+
+@pytest.fixture
+async def snapshot():
+    """Create a loaded snapshot service (no TTL)."""
+    service = LexicalGraphSnapshotService(enabled=True, ttl_seconds=0)
+    session = MagicMock()
+    session.run = AsyncMock(side_effect=[_Result(NODES), _Result(EDGES)])
+    counts = await service.load(session)
+    assert counts == {"nodes": 5, "edges": 3}
+    return service
+
+
+@pytest.mark.asyncio
+async def test_depth_one_ego_graph(snapshot):
+    """Depth 1 returns the center, its neighbours (strongest first) and their edges."""
+    ego = snapshot.ego_graph("美しい", depth=1)
+
+    assert [n["id"] for n in ego["nodes"]] == ["美しい", "綺麗", "可愛い"]
+    assert ego["nodes"][1]["domain"] == "aesthetics"
+    pairs = {(e["source"], e["target"]) for e in ego["edges"]}
+    assert pairs == {("美しい", "綺麗"), ("綺麗", "美しい"), ("美しい", "可愛い"), ("可愛い", "美しい")}
+
+
+@pytest.mark.asyncio
+async def test_depth_two_and_limits(snapshot):
+    """Depth 2 adds neighbours of neighbours; limit1 caps the first layer."""
+    ego = snapshot.ego_graph("美しい", depth=2)
+    assert [n["id"] for n in ego["nodes"]] == ["美しい", "綺麗", "可愛い", "素敵"]
+    missing_weight = [e for e in ego["edges"] if e["source"] == "素敵"]
+    assert missing_weight[0]["weight"] == 1.0
+
+    ego_limited = snapshot.ego_graph("美しい", depth=2, limit1=1)
+    assert [n["id"] for n in ego_limited["nodes"]] == ["美しい", "綺麗", "素敵"]
+
+
+@pytest.mark.asyncio
+async def test_isolated_and_unknown_words(snapshot):
+    """Isolated words yield an empty graph; unknown words fall back (None)."""
+    assert snapshot.ego_graph("孤立") == {"nodes": [], "edges": []}
+    assert snapshot.ego_graph("未知") is None
+    assert snapshot.node_details("未知") is None
+
+
+@pytest.mark.asyncio
+async def test_node_details_and_center(snapshot):
+    """Node details mirror the Cypher record shape."""
+    details = snapshot.node_details("美しい")
+
+    assert details["center_pos"] == "形容詞"
+    assert details["connection_count"] == 2
+    assert [n["kanji"] for n in details["neighbors"]] == ["綺麗", "可愛い"]
+    assert details["neighbors"][0]["relation_type"] == "synonym"
+    assert details["neighbors"][0]["mutual_sense"] == "appearance"
+    assert details["neighbors"][1]["relation_type"] == "near_synonym"
+
+    center = snapshot.center("綺麗")
+    assert center == {"kanji": "綺麗", "hiragana": "きれい", "translation": "pretty",
+                      "level": 1, "domain": "aesthetics", "pos": "na-adjective"}
+
+
+@pytest.mark.asyncio
+async def test_disabled_or_unloaded_snapshot_falls_back():
+    """Without a loaded snapshot every lookup returns None."""
+    assert LexicalGraphSnapshotService(enabled=False).ego_graph("美しい") is None
+
+    service = LexicalGraphSnapshotService(enabled=True, ttl_seconds=0)
+    assert service.ego_graph("美しい") is None
+    assert service.stats()["loaded"] is False
@@ -0,0 +1,82 @@
+"""
+Tests for the LLM record/replay store and its provider hooks.
+"""
+
+import time
+
+import pytest
+
+from app.services.lexical_network.ai_providers import AIProviderManager, ReplayingProvider
+from app.services.llm_replay import LLMReplayMissError, LLMReplayStore, llm_replay
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LLMReplayStore(mode="record", directory=str(tmp_path), latency_scale=0)
+
+
+def test_record_then_replay_returns_fixture_without_live_call(store):
+    payload = {"system": "s", "user": "u"}
+    assert store.call_sync("cando_compile", "gpt-4.1", payload, lambda: '{"ok": 1}') == '{"ok": 1}'
+    assert store.fixture_path("cando_compile", "gpt-4.1", payload).exists()
+
+    store.configure(mode="replay")
+
+    def live():
+        raise AssertionError("live provider called in replay mode")
+
+    assert store.call_sync("cando_compile", "gpt-4.1", payload, live) == '{"ok": 1}'
+    assert store.stats()["hits"] == 1
+    with pytest.raises(LLMReplayMissError):
+        store.call_sync("cando_compile", "gpt-4.1", {"system": "s", "user": "other"}, live)
+
+
+def test_fixed_synthetic_latency_overrides_recorded_latency(store):
+    store.record("ai_chat", "openai:m", {"q": 1}, {"content": "hi"}, latency_ms=5000)
+    store.configure(mode="replay", latency_ms=30)
+
+    started = time.perf_counter()
+    assert store.call_sync("ai_chat", "openai:m", {"q": 1}, lambda: None) == {"content": "hi"}
+    elapsed = time.perf_counter() - started
+
+    assert 0.025 <= elapsed < 1.0
+
+
+@pytest.mark.asyncio
+async def test_stream_records_only_completed_streams(store):
+    async def deltas(*parts):
+        for part in parts:
+            yield part
+
+    stream = store.stream("ai_chat_stream", "openai:m", {"q": "cut"}, deltas("a", "b", "c"))
+    assert await stream.__anext__() == "a"
+    await stream.aclose()
+    assert not store.fixture_path("ai_chat_stream", "openai:m", {"q": "cut"}).exists()
+
+    chunks = [c async for c in store.stream("ai_chat_stream", "openai:m", {"q": 1}, deltas("こん", "にちは"))]
+    assert chunks == ["こん", "にちは"]
+
+    store.configure(mode="replay")
+    replayed = [c async for c in store.stream("ai_chat_stream", "openai:m", {"q": 1}, deltas("x"))]
+    assert replayed == ["こん", "にちは"]
+
+
+@pytest.mark.asyncio
+async def test_provider_manager_replays_lexical_relations(tmp_path):
+    result = {
+        "content": "[]", "provider": "openai", "model": "gpt-4o-mini", "model_version": None,
+        "temperature": 0.0, "tokens_input": 10, "tokens_output": 2, "cost_usd": 0.0,
+        "latency_ms": 100, "request_id": "r1", "raw_response": None,
+    }
+    with llm_replay.override(mode="replay", directory=str(tmp_path), latency_scale=0):
+        llm_replay.record(
+            "lexical_relations", "openai:gpt-4o-mini",
+            {"prompt": "p", "system_prompt": "s", "max_tokens": 4096}, result, latency_ms=100,
+        )
+        provider = AIProviderManager().get_provider("gpt-4o-mini")
+        assert isinstance(provider, ReplayingProvider)
+        generated = await provider.generate_relations("p", "s")
+
+    assert generated.content == "[]"
+    assert generated.request_id == "r1"
+    assert llm_replay.mode == "off"
@@ -0,0 +1,81 @@
+"""
+Tests for off-loop password hashing.
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from app.services.password_hashing import PasswordHasher, build_crypt_context
+
+
+@pytest.fixture
+def hasher():
+    # Low cost keeps the test fast; parameters are what the settings control.
+    context = build_crypt_context(scheme="pbkdf2_sha256", pbkdf2_rounds=1000)
+    h = PasswordHasher(context, max_workers=2)
+    yield h
+    h.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_run_on_pool_threads(hasher):
+    seen = []
+    original = hasher.context.hash
+
+    def spy(password):
+        seen.append(threading.current_thread().name)
+        return original(password)
+
+    hasher.context.hash = spy
+    hashed = await hasher.hash("s3cret")
+
+    assert seen and seen[0].startswith("password-hash")
+    assert hashed.startswith("$pbkdf2-sha256$1000$")
+    assert await hasher.verify("s3cret", hashed) is True
+    assert await hasher.verify("wrong", hashed) is False
+
+
+@pytest.mark.asyncio
+async def test_bounded_pool_reports_queue_depth(hasher):
+    release = threading.Event()
+
+    def slow_verify(password, hashed):
+        release.wait(timeout=5)
+        return True
+
+    hasher.context.verify = slow_verify
+    tasks = [asyncio.create_task(hasher.verify("p", "h")) for _ in range(5)]
+    for _ in range(100):
+        if hasher.stats()["running"] == 2:
+            break
+        await asyncio.sleep(0.01)
+
+    stats = hasher.stats()
+    assert stats["running"] == 2
+    assert stats["queued"] == 3
+    assert stats["peak_queued"] >= 3
+
+    release.set()
+    assert all(await asyncio.gather(*tasks))
+    stats = hasher.stats()
+    assert (stats["queued"], stats["running"], stats["completed"]) == (0, 0, 5)
+
+
+@pytest.mark.asyncio
+async def test_changed_parameters_trigger_rehash():
+    old_hash = build_crypt_context(pbkdf2_rounds=1000).hash("pw")
+    stronger = PasswordHasher(build_crypt_context(scheme="pbkdf2_sha256", pbkdf2_rounds=2000), max_workers=1)
+    try:
+        valid, new_hash = await stronger.verify_and_update("pw", old_hash)
+    finally:
+        stronger.shutdown()
+
+    assert valid is True
+    assert new_hash.startswith("$pbkdf2-sha256$2000$")
+
+
+def test_unknown_scheme_is_rejected():
+    with pytest.raises(ValueError):
+        build_crypt_context(scheme="md5_crypt")
@@ -7,13 +7,14 @@ Tests the semantic path building algorithm.
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 
+from app.services.cando_neighbour_cache import CanDoNeighbourCache
 from app.services.path_builder import PathBuilder
 
 
 @pytest.fixture
 def path_builder():
-    """Create PathBuilder instance."""
-    return PathBuilder()
+    """Create PathBuilder instance with an isolated neighbour cache."""
+    return PathBuilder(neighbour_cache=CanDoNeighbourCache(ttl_seconds=0))
 
 
 @pytest.fixture
@@ -218,3 +219,26 @@ async def test_ensure_continuity_poor(path_builder):
         # Should be False due to poor continuity
         assert result is False
 
+
+
+@pytest.mark.asyncio
+async def test_ensure_continuity_reuses_cached_neighbours(path_builder):
+    """Repeated continuity checks should not re-query the vector index."""
+    path_sequence = [{"uid": "JF:1"}, {"uid": "JF:2"}, {"uid": "JF:3"}]
+    mock_neo4j = AsyncMock()
+
+    with patch.object(path_builder.embedding_service, 'find_similar_candos') as mock_similar:
+        async def similar_side_effect(*, neo4j_session, can_do_uid, **kwargs):
+            if can_do_uid == "JF:1":
+                return [{"uid": "JF:2", "similarity": 0.8}]
+            if can_do_uid == "JF:2":
+                return [{"uid": "JF:3", "similarity": 0.8}]
+            return []
+
+        mock_similar.side_effect = similar_side_effect
+
+        assert await path_builder.ensure_continuity(path_sequence, mock_neo4j) is True
+        assert await path_builder.ensure_continuity(path_sequence, mock_neo4j) is True
+
+        # One lazy fill per source descriptor, then served from memory
+        assert mock_similar.call_count == 2
@@ -0,0 +1,185 @@
+"""
+Tests for AIChatService.stream_reply provider streaming.
+
+Covers:
+- Expected use: Gemini yields incremental deltas from the async streaming API
+- Edge case: chunks without text are skipped
+- Failure case: closing the consumer early closes the provider stream
+- Failure case: a stalled stream times out and is closed
+"""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.services.ai_chat_service import AIChatService
+
+
+class _FakeGeminiStream:
+    """Async iterator over canned chunks that records aclose()."""
+
+    def __init__(self, texts):
+        self._texts = list(texts)
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._texts:
+            raise StopAsyncIteration
+        return SimpleNamespace(text=self._texts.pop(0))
+
+    async def aclose(self):
+        self.closed = True
+
+
+def _service_with_stream(stream):
+    service = AIChatService()
+    client = MagicMock()
+
+    async def generate_content_stream(**kwargs):
+        return stream
+
+    client.aio.models.generate_content_stream = MagicMock(side_effect=generate_content_stream)
+    service._genai_client = client
+    return service, client
+
+
+@pytest.mark.asyncio
+async def test_gemini_stream_yields_incremental_deltas():
+    """Gemini replies are streamed chunk by chunk instead of as one blob."""
+    stream = _FakeGeminiStream(["こん", "", "にちは"])
+    service, client = _service_with_stream(stream)
+
+    chunks = [
+        c async for c in service.stream_reply(
+            provider="gemini",
+            model="gemini-2.5-flash",
+            messages=[{"role": "user", "content": "hi"}],
+        )
+    ]
+
+    assert chunks == ["こん", "にちは"]
+    client.aio.models.generate_content_stream.assert_called_once()
+    client.models.generate_content.assert_not_called()
+    assert stream.closed is True
+
+
+@pytest.mark.asyncio
+async def test_gemini_stream_closed_when_consumer_stops():
+    """Abandoning the generator (client disconnect) closes the Gemini stream."""
+    stream = _FakeGeminiStream(["a", "b", "c"])
+    service, _ = _service_with_stream(stream)
+
+    gen = service.stream_reply(provider="gemini", model="gemini-2.5-flash", messages=[])
+    assert await gen.__anext__() == "a"
+    await gen.aclose()
+
+    assert stream.closed is True
+
+
+@pytest.mark.asyncio
+async def test_gemini_stream_times_out_between_chunks(monkeypatch):
+    """A stream that stops sending chunks fails instead of hanging."""
+    from app.services import ai_chat_service as module
+
+    class _StalledStream(_FakeGeminiStream):
+        async def __anext__(self):
+            if self._texts:
+                return SimpleNamespace(text=self._texts.pop(0))
+            await asyncio.sleep(10)
+
+    monkeypatch.setattr(module.settings, "AI_REQUEST_TIMEOUT_SECONDS", 0.05)
+    stream = _StalledStream(["a"])
+    service, _ = _service_with_stream(stream)
+
+    gen = service.stream_reply(provider="gemini", model="gemini-2.5-flash", messages=[])
+    assert await gen.__anext__() == "a"
+    with pytest.raises(TimeoutError, match="timed out"):
+        await gen.__anext__()
+
+    assert stream.closed is True
+
+
+
+def _record_llm_calls(monkeypatch):
+    from app.services import ai_chat_service as module
+
+    calls = []
+    monkeypatch.setattr(module, "observe_llm_call", lambda *args, **kwargs: calls.append((args, kwargs)))
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_gemini_stream_records_llm_call_with_usage(monkeypatch):
+    """A finished Gemini stream is observed once with the final token counts."""
+    calls = _record_llm_calls(monkeypatch)
+    usage = SimpleNamespace(prompt_token_count=12, candidates_token_count=5)
+    chunks = [SimpleNamespace(text="a"), SimpleNamespace(text="b", usage_metadata=usage)]
+
+    class _UsageStream(_FakeGeminiStream):
+        async def __anext__(self):
+            if not chunks:
+                raise StopAsyncIteration
+            return chunks.pop(0)
+
+    stream = _UsageStream([])
+    service, _ = _service_with_stream(stream)
+
+    result = [c async for c in service.stream_reply(provider="gemini", model="gemini-2.5-flash", messages=[])]
+
+    assert result == ["a", "b"]
+    assert len(calls) == 1
+    args, kwargs = calls[0]
+    assert args[:2] == ("gemini", "gemini-2.5-flash")
+    assert args[3:5] == (12, 5)
+    assert kwargs["outcome"] == "ok"
+
+
+@pytest.mark.asyncio
+async def test_openai_stream_requests_usage_and_records_abort(monkeypatch):
+    """OpenAI streams ask for usage, and a consumer that stops early is recorded as aborted."""
+    calls = _record_llm_calls(monkeypatch)
+
+    class _FakeOpenAIStream:
+        def __init__(self):
+            self._events = [
+                SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="a"))], usage=None),
+                SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="b"))], usage=None),
+            ]
+            self.closed = False
+
+        def __aiter__(self):
+            return self
+
+        async def __anext__(self):
+            if not self._events:
+                raise StopAsyncIteration
+            return self._events.pop(0)
+
+        async def close(self):
+            self.closed = True
+
+    stream = _FakeOpenAIStream()
+    service = AIChatService()
+    openai = MagicMock()
+
+    async def create(**kwargs):
+        return stream
+
+    openai.with_options.return_value.chat.completions.create = MagicMock(side_effect=create)
+    service._openai = openai
+
+    gen = service.stream_reply(provider="openai", model="gpt-4o-mini", messages=[])
+    assert await gen.__anext__() == "a"
+    await gen.aclose()
+
+    params = openai.with_options.return_value.chat.completions.create.call_args.kwargs
+    assert params["stream_options"] == {"include_usage": True}
+    assert stream.closed is True
+    assert len(calls) == 1
+    assert calls[0][0][:2] == ("openai", "gpt-4o-mini")
+    assert calls[0][1]["outcome"] == "aborted"
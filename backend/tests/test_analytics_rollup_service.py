@@ -0,0 +1,87 @@
+"""
+Tests for per-user daily analytics rollups.
+
+Covers:
+- Expected use: session/message writes issue one upsert into the UTC day row
+- Expected use: the summary is read with a single query
+- Edge case: refreshing no days is a no-op
+"""
+
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock
+import uuid
+
+import pytest
+
+from app.services.analytics_rollup_service import AnalyticsRollupService, activity_day
+
+
+def test_activity_day_uses_utc():
+    """Aware timestamps are converted to UTC; naive ones are taken as UTC."""
+    tokyo = timezone(timedelta(hours=9))
+    assert activity_day(datetime(2025, 3, 2, 8, 0, tzinfo=tokyo)) == date(2025, 3, 1)
+    assert activity_day(datetime(2025, 3, 2, 23, 30)) == date(2025, 3, 2)
+
+
+@pytest.mark.asyncio
+async def test_record_message_increments_role_counters():
+    """An assistant message bumps the total and AI counters and stamps last_message_at."""
+    service = AnalyticsRollupService()
+    db = AsyncMock()
+    user_id = uuid.uuid4()
+    ts = datetime(2025, 1, 5, 12, 0)
+
+    await service.record_message(db, str(user_id), "assistant", ts)
+
+    db.execute.assert_awaited_once()
+    stmt, params = db.execute.await_args.args
+    assert "ON CONFLICT (user_id, day)" in str(stmt)
+    assert params["user_id"] == user_id
+    assert params["day"] == date(2025, 1, 5)
+    assert (params["messages_inc"], params["user_inc"], params["ai_inc"]) == (1, 0, 1)
+    assert params["sessions_inc"] == 0
+    assert params["last_message_at"] == ts
+
+
+@pytest.mark.asyncio
+async def test_record_session_does_not_touch_last_message():
+    service = AnalyticsRollupService()
+    db = AsyncMock()
+
+    await service.record_session(db, uuid.uuid4(), datetime(2025, 1, 5))
+
+    _, params = db.execute.await_args.args
+    assert params["sessions_inc"] == 1
+    assert params["messages_inc"] == 0
+    assert params["last_message_at"] is None
+
+
+@pytest.mark.asyncio
+async def test_summary_is_a_single_query():
+    service = AnalyticsRollupService()
+    db = AsyncMock()
+    last = datetime(2025, 1, 5, tzinfo=timezone.utc)
+    result = MagicMock()
+    result.one.return_value = (4, 37, last)
+    db.execute.return_value = result
+
+    summary = await service.get_summary(db, uuid.uuid4())
+
+    assert db.execute.await_count == 1
+    assert summary == {"total_sessions": 4, "total_messages": 37, "last_message_at": last}
+
+
+@pytest.mark.asyncio
+async def test_refresh_days_rebuilds_only_requested_days():
+    service = AnalyticsRollupService()
+    db = AsyncMock()
+
+    await service.refresh_days(db, uuid.uuid4(), [])
+    db.execute.assert_not_awaited()
+
+    days = {date(2025, 1, 6), date(2025, 1, 5)}
+    await service.refresh_days(db, uuid.uuid4(), days)
+    assert db.execute.await_count == 2
+    delete_stmt, params = db.execute.await_args_list[0].args
+    assert str(delete_stmt).startswith("DELETE FROM user_daily_activity")
+    assert params["days"] == [date(2025, 1, 5), date(2025, 1, 6)]
@@ -0,0 +1,91 @@
+"""
+Tests for the authenticated-principal cache in AuthService.get_current_user.
+
+Covers:
+- Expected use: repeated requests with a valid token skip the users SELECT
+- Expected use: invalidation (e.g. deactivation) forces a fresh read
+- Edge case: each request gets its own copy of the cached user
+"""
+
+from unittest.mock import AsyncMock, MagicMock
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+from app.models.database_models import User
+from app.services import auth_service
+from app.services.auth_service import AuthService, invalidate_principal, principal_cache
+
+
+def _db_returning(user):
+    db = AsyncMock()
+    result = MagicMock()
+    result.scalar_one_or_none.return_value = user
+    db.execute.return_value = result
+    db.merge.side_effect = lambda obj, load=True: obj
+    return db
+
+
+@pytest.fixture
+def user():
+    principal_cache.clear()
+    yield User(
+        id=uuid.uuid4(),
+        email="learner@example.com",
+        username="learner",
+        hashed_password="x",
+        is_active=True,
+        target_languages=["ja"],
+    )
+    principal_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_second_request_is_served_from_cache(user, monkeypatch):
+    monkeypatch.setattr(auth_service, "PRINCIPAL_CACHE_ENABLED", True)
+    token = AuthService.create_access_token({"sub": str(user.id), "username": user.username})
+    db = _db_returning(user)
+
+    first = await AuthService.get_current_user(db, token)
+    second = await AuthService.get_current_user(db, token)
+
+    assert db.execute.await_count == 1
+    assert first is user
+    assert second is not user
+    assert (second.id, second.username) == (user.id, user.username)
+    db.merge.assert_awaited_once()
+    assert db.merge.await_args.kwargs == {"load": False}
+
+    second.target_languages.append("ko")
+    third = await AuthService.get_current_user(db, token)
+    assert third.target_languages == ["ja"]
+
+
+@pytest.mark.asyncio
+async def test_invalidation_forces_fresh_read(user, monkeypatch):
+    monkeypatch.setattr(auth_service, "PRINCIPAL_CACHE_ENABLED", True)
+    token = AuthService.create_access_token({"sub": str(user.id), "username": user.username})
+    db = _db_returning(user)
+    await AuthService.get_current_user(db, token)
+
+    user.is_active = False
+    invalidate_principal(user.id)
+
+    with pytest.raises(HTTPException) as exc:
+        await AuthService.get_current_user(db, token)
+    assert exc.value.status_code == 401
+    assert db.execute.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_disabled_cache_always_reads(user, monkeypatch):
+    monkeypatch.setattr(auth_service, "PRINCIPAL_CACHE_ENABLED", False)
+    token = AuthService.create_access_token({"sub": str(user.id), "username": user.username})
+    db = _db_returning(user)
+
+    await AuthService.get_current_user(db, token)
+    await AuthService.get_current_user(db, token)
+
+    assert db.execute.await_count == 2
+    assert len(principal_cache) == 0
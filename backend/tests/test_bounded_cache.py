@@ -0,0 +1,73 @@
+"""
+Tests for the bounded LRU/TTL cache primitive (app.utils.bounded_cache).
+"""
+
+import time
+
+import pytest
+
+from app.utils.bounded_cache import BoundedCache, all_cache_stats, json_size
+
+
+def test_lru_eviction_respects_max_entries():
+    cache = BoundedCache(name="t_lru", max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" becomes most recently used
+    cache.set("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expiry_counts_as_miss_and_is_swept_on_set(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = BoundedCache(name="t_ttl", max_entries=10, ttl_seconds=5)
+    cache.set("old", "x")
+    cache.set("other", "y")
+
+    now[0] += 10
+    assert cache.get("old") is None
+    # "other" was never read again but is dropped by the next write.
+    cache.set("new", "z")
+    assert len(cache) == 1
+
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["expirations"] == 2
+
+
+def test_byte_budget_evicts_and_rejects_oversized_values():
+    payload = {"text": "あ" * 100}
+    size = json_size(payload)
+    cache = BoundedCache(name="t_bytes", max_entries=100, max_bytes=size * 2)
+
+    cache.set(1, payload)
+    cache.set(2, payload)
+    cache.set(3, payload)
+    assert list(cache.keys()) == [2, 3]
+    assert cache.stats()["bytes"] == size * 2
+
+    cache.set(4, {"text": "x" * (size * 3)})
+    assert 4 not in cache
+    assert cache.stats()["bytes"] == size * 2
+
+
+def test_hit_rate_and_registry():
+    cache = BoundedCache(name="t_stats", max_entries=4)
+    cache.set("k", "v")
+    cache.get("k")
+    cache.get("missing")
+
+    stats = all_cache_stats()["t_stats"]
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_invalid_max_entries():
+    with pytest.raises(ValueError):
+        BoundedCache(name="t_invalid", max_entries=0)
@@ -0,0 +1,153 @@
+"""
+Tests for CanDo recommendation service aggregate reads/writes.
+
+Covers:
+- Expected use: recommendations are derived from aggregate rows
+- Expected use: evidence writes issue a single aggregate upsert with merged counters
+- Edge case: next lesson falls back to low-mastery review when the catalogue is exhausted
+- Edge case: the consolidation fallback keeps its CanDo metadata
+"""
+
+import json
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+import uuid
+
+import pytest
+
+from app.services.cando_recommendation_service import CanDoRecommendationService
+
+
+class _Neo4jResult:
+    def __init__(self, records=None, single=None):
+        self._records = records or []
+        self._single = single
+
+    def __aiter__(self):
+        async def gen():
+            for record in self._records:
+                yield record
+        return gen()
+
+    async def single(self):
+        return self._single
+
+
+def _aggregate(can_do_id, mastery, stages, errors, attempts=3):
+    return SimpleNamespace(
+        can_do_id=can_do_id,
+        total_attempts=attempts,
+        correct_count=1,
+        mastery_level=mastery,
+        stage_counts=stages,
+        error_tag_counts=errors,
+        last_attempted_at=datetime(2025, 1, 1, tzinfo=timezone.utc),
+    )
+
+
+def _pg_returning(rows):
+    pg = AsyncMock()
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = rows
+    pg.execute.return_value = result
+    return pg
+
+
+@pytest.mark.asyncio
+async def test_recommendations_from_aggregates():
+    """Stats, focus areas and common errors come from aggregate rows."""
+    service = CanDoRecommendationService()
+    pg = _pg_returning([
+        _aggregate("JF:1", 2, {"content": 3}, {"particle": 2, "tense": 1}),
+        _aggregate("JF:2", 4, {"content": 1, "production": 2}, {"particle": 1}),
+    ])
+    neo = MagicMock()
+    neo.run = AsyncMock(return_value=_Neo4jResult(records=[
+        {"uid": "JF:3", "title_en": "Order food", "title_ja": None, "level": "A1", "topic": "food"}
+    ]))
+
+    recs = await service.get_recommendations(pg, neo, str(uuid.uuid4()), limit=5)
+
+    assert pg.execute.await_count == 1
+    assert recs["total_lessons_studied"] == 2
+    assert recs["total_attempts"] == 6
+    assert recs["common_errors"][0] == "particle"
+    assert recs["review_items"] == [
+        {"can_do_id": "JF:1", "mastery_level": 2, "last_attempted": "2025-01-01T00:00:00+00:00"}
+    ]
+    assert {f["stage"] for f in recs["focus_areas"]} == {"comprehension", "interaction"}
+    assert recs["next_lesson"]["can_do_id"] == "JF:3"
+    # Studied CanDos are excluded in the catalogue query itself
+    assert neo.run.await_args.kwargs["studied_ids"] == ["JF:1", "JF:2"]
+
+
+@pytest.mark.asyncio
+async def test_next_lesson_review_when_catalogue_exhausted():
+    """When every CanDo is studied, the lowest-mastery one is recommended."""
+    service = CanDoRecommendationService()
+    neo = MagicMock()
+    neo.run = AsyncMock(side_effect=[
+        _Neo4jResult(records=[]),
+        _Neo4jResult(records=[
+            {"uid": "JF:2", "title_en": "Greet", "title_ja": None, "level": "A1", "topic": "greetings"},
+        ]),
+    ])
+    stats = {
+        "JF:1": {"mastery_level": 4, "stages": {"content"}, "total_attempts": 5},
+        "JF:2": {"mastery_level": 1, "stages": {"content"}, "total_attempts": 1},
+    }
+
+    nxt = await service._find_next_lesson(neo, AsyncMock(), "u", stats)
+
+    assert nxt["can_do_id"] == "JF:2"
+    assert nxt["reason"] == "needs_review"
+    assert nxt["title"] == "Greet"
+    # Review and fallback candidates share one metadata query
+    assert neo.run.await_args.kwargs["can_do_ids"] == ["JF:2", "JF:1"]
+
+
+@pytest.mark.asyncio
+async def test_next_lesson_default_fallback_keeps_metadata():
+    """The consolidation fallback is returned with its title, level and topic."""
+    service = CanDoRecommendationService()
+    neo = MagicMock()
+    neo.run = AsyncMock(side_effect=[
+        _Neo4jResult(records=[]),
+        _Neo4jResult(records=[
+            {"uid": "JF:1", "title_en": None, "title_ja": "自己紹介", "level": "A2", "topic": "self"},
+        ]),
+    ])
+    stats = {
+        "JF:1": {"mastery_level": 4, "stages": {"content", "comprehension", "production", "interaction"}, "total_attempts": 5},
+        "JF:2": {"mastery_level": 2, "stages": {"content"}, "total_attempts": 1},
+    }
+
+    nxt = await service._find_next_lesson(neo, AsyncMock(), "u", stats)
+
+    assert nxt == {"can_do_id": "JF:1", "title": "自己紹介", "level": "A2", "topic": "self", "reason": "default"}
+
+
+@pytest.mark.asyncio
+async def test_record_evidence_upserts_merged_counters():
+    """Evidence writes send stage and error-tag increments as JSON objects."""
+    service = CanDoRecommendationService()
+    pg = AsyncMock()
+    user_id = uuid.uuid4()
+
+    await service.record_evidence(
+        pg,
+        user_id=user_id,
+        can_do_id="JF:1",
+        stage="production",
+        is_correct=True,
+        mastery_level=3,
+        error_tags=["particle", "particle", "tense"],
+    )
+
+    pg.execute.assert_awaited_once()
+    params = pg.execute.await_args.args[1]
+    assert params["user_id"] == user_id
+    assert params["correct_inc"] == 1
+    assert json.loads(params["stage_inc"]) == {"production": 1}
+    assert json.loads(params["error_inc"]) == {"particle": 2, "tense": 1}
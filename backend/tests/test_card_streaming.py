@@ -0,0 +1,103 @@
+"""
+Tests for streaming validated and partial cards out of the lesson compile pipeline.
+"""
+
+import asyncio
+import sys
+
+import pytest
+from pydantic import BaseModel
+
+from scripts.canDo_creation_new import attach_card_listener, validate_or_repair
+from app.services.cando_v2_compile_service import _CardEventSink
+from app.utils.json_helpers import parse_partial_json
+
+pipeline_utils = sys.modules[validate_or_repair.__module__]
+
+
+class DialogueCard(BaseModel):
+    title: str
+    turns: list
+
+
+class _Listener:
+    def __init__(self):
+        self.cards = []
+        self.partials = []
+
+    def on_card(self, card_type, card):
+        self.cards.append((card_type, card))
+
+    def on_partial(self, card_type, raw_json):
+        self.partials.append((card_type, raw_json))
+
+
+def test_parse_partial_json_closes_open_containers():
+    assert parse_partial_json('{"title": "駅", "turns": [{"ja": "すみま') == {
+        "title": "駅",
+        "turns": [{"ja": "すみま"}],
+    }
+    # Incomplete key/value pairs are dropped rather than guessed.
+    assert parse_partial_json('{"title": "駅", "tur') == {"title": "駅"}
+    assert parse_partial_json('{"a": {"b": tr') == {"a": {}}
+    assert parse_partial_json('{"a": 1} trailing prose') == {"a": 1}
+    assert parse_partial_json("no json yet") is None
+
+
+def test_long_cards_stream_partials_then_validated_card(monkeypatch):
+    monkeypatch.setattr(pipeline_utils, "PARTIAL_EMIT_CHARS", 10)
+    full = '{"title": "駅で", "turns": [{"ja": "すみません"}, {"ja": "はい"}]}'
+    blocking_calls = []
+
+    def llm(system, user):
+        blocking_calls.append(user)
+        return full
+
+    llm.stream = lambda system, user: iter([full[i : i + 8] for i in range(0, len(full), 8)])
+    listener = _Listener()
+    attach_card_listener(llm, listener)
+
+    card = validate_or_repair(llm, DialogueCard, "sys", "usr")
+
+    assert blocking_calls == []
+    assert len(listener.partials) >= 2
+    assert all(kind == "DialogueCard" for kind, _ in listener.partials)
+    assert listener.cards == [("DialogueCard", card)]
+
+
+def test_stream_failure_falls_back_to_blocking_call():
+    def llm(system, user):
+        return '{"title": "t", "turns": []}'
+
+    def broken_stream(system, user):
+        yield '{"title": '
+        raise ConnectionError("stream dropped")
+
+    llm.stream = broken_stream
+    listener = _Listener()
+    attach_card_listener(llm, listener)
+
+    assert validate_or_repair(llm, DialogueCard, "sys", "usr").title == "t"
+    assert len(listener.cards) == 1
+
+
+@pytest.mark.asyncio
+async def test_card_event_sink_numbers_events_on_the_loop():
+    events = []
+    sink = _CardEventSink(asyncio.get_running_loop(), events.append)
+
+    def produce():
+        sink.on_partial("ReadingCard", '{"title": "x", "sections": [')
+        sink.on_partial("ReadingCard", '{"title": "x", "sections": [')  # unchanged, not re-sent
+        sink.on_card("DomainPlan", DialogueCard(title="plan", turns=[]))  # not a lesson card
+        sink.on_card("DialogueCard", DialogueCard(title="駅", turns=[]))
+
+    await asyncio.to_thread(produce)
+    await asyncio.sleep(0)
+
+    assert [(e["seq"], e["event"], e["card_key"]) for e in events] == [
+        (1, "card_partial", "reading_comprehension"),
+        (2, "card", "lesson_dialogue"),
+    ]
+    assert events[0]["partial"] == {"title": "x", "sections": []}
+    assert events[1]["card"] == {"title": "駅", "turns": []}
@@ -0,0 +1,143 @@
+"""
+Tests for card-level memoization in validate_or_repair and the Postgres-backed card cache.
+"""
+
+import asyncio
+
+import pytest
+from pydantic import BaseModel
+
+from scripts.canDo_creation_new import attach_card_cache, card_cache_key, validate_or_repair
+from app.services import lesson_card_cache_service
+from app.services.lesson_card_cache_service import LessonCardCache
+
+
+class _Card(BaseModel):
+    title: str
+
+
+class _DictCache:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def put(self, key, card_type, template_version, model, card_json):
+        self.data[key] = card_json
+
+
+def _counting_llm(response='{"title": "猫"}'):
+    calls = []
+
+    def llm(system, user):
+        calls.append((system, user))
+        return response
+
+    return llm, calls
+
+
+def test_validated_card_is_reused_for_identical_prompts():
+    cache = _DictCache()
+    llm, calls = _counting_llm()
+    attach_card_cache(llm, cache, "gpt-4.1")
+
+    first = validate_or_repair(llm, _Card, "sys", "usr")
+    second = validate_or_repair(llm, _Card, "sys", "usr")
+
+    assert first == second == _Card(title="猫")
+    assert len(calls) == 1
+    assert list(cache.data) == [card_cache_key("_Card", "gpt-4.1", "sys", "usr")]
+
+    validate_or_repair(llm, _Card, "sys", "other user prompt")
+    assert len(calls) == 2
+
+
+def test_bypass_and_model_change_call_the_llm():
+    cache = _DictCache()
+    llm, calls = _counting_llm()
+    attach_card_cache(llm, cache, "gpt-4.1")
+    validate_or_repair(llm, _Card, "sys", "usr")
+
+    validate_or_repair(llm, _Card, "sys", "usr", use_cache=False)
+    attach_card_cache(llm, cache, "gpt-4.1-mini")
+    validate_or_repair(llm, _Card, "sys", "usr")
+
+    assert len(calls) == 3
+
+
+def test_card_is_stored_under_the_model_that_answered():
+    cache = _DictCache()
+    llm, calls = _counting_llm()
+    answered = {"model": "gpt-4.1-mini"}
+    llm.produced_by = lambda: answered["model"]
+    attach_card_cache(llm, cache, "gpt-4.1-mini")
+
+    # The fast model failed over to another model while answering.
+    answered["model"] = "gpt-4.1"
+    validate_or_repair(llm, _Card, "sys", "usr")
+
+    assert list(cache.data) == [card_cache_key("_Card", "gpt-4.1", "sys", "usr")]
+    assert validate_or_repair(llm, _Card, "sys", "usr") == _Card(title="猫")
+    assert len(calls) == 2
+
+
+def test_stale_cached_card_is_regenerated():
+    cache = _DictCache()
+    llm, calls = _counting_llm()
+    attach_card_cache(llm, cache, "m")
+    key = card_cache_key("_Card", "m", "sys", "usr")
+    cache.data[key] = '{"heading": "old schema"}'
+
+    assert validate_or_repair(llm, _Card, "sys", "usr").title == "猫"
+    assert len(calls) == 1
+    assert cache.data[key] == '{"title":"猫"}'
+
+
+class _Result:
+    def __init__(self, row):
+        self._row = row
+
+    def first(self):
+        return self._row
+
+
+class _Session:
+    def __init__(self, store):
+        self.store = store
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement, params):
+        sql = str(statement)
+        if sql.strip().startswith("UPDATE"):
+            card = self.store.get(params["key"])
+            return _Result((card,) if card is not None else None)
+        self.store[params["key"]] = params["card_json"]
+        return _Result(None)
+
+    async def commit(self):
+        return None
+
+
+@pytest.mark.asyncio
+async def test_lesson_card_cache_bridges_worker_threads(monkeypatch):
+    store = {}
+    monkeypatch.setattr(lesson_card_cache_service.db, "AsyncSessionLocal", lambda: _Session(store))
+    cache = LessonCardCache(asyncio.get_running_loop())
+
+    assert await asyncio.to_thread(cache.get, "k") is None
+    await asyncio.to_thread(cache.put, "k", "_Card", "1", "m", '{"title": "x"}')
+    assert await asyncio.to_thread(cache.get, "k") == '{"title": "x"}'
+    assert cache.stats() == {"hits": 1, "misses": 1, "stores": 1, "errors": 0}
+
+    # On the loop thread itself the cache steps aside instead of deadlocking.
+    assert cache.get("k") is None
+    assert cache.stats()["errors"] == 1
+
+    bypass = LessonCardCache(asyncio.get_running_loop(), read=False)
+    assert await asyncio.to_thread(bypass.get, "k") is None
@@ -0,0 +1,112 @@
+"""
+Tests for the Prometheus-style metrics registry (app.utils.metrics).
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.utils import metrics as metrics_module
+from app.utils.metrics import MetricsMiddleware, MetricsRegistry, observe_llm_call
+
+
+def test_render_uses_text_exposition_format():
+    registry = MetricsRegistry()
+    latency = registry.histogram("op_seconds", "Op latency", ("op",), buckets=(0.1, 1.0))
+    calls = registry.counter("op_total", "Ops", ("op",))
+    latency.observe(0.05, op="read")
+    latency.observe(0.5, op="read")
+    latency.observe(5, op="read")
+    calls.inc(op='say "hi"')
+    registry.add_collector("a", lambda: [("component_stat", "gauge", "Stats", [("", {"component": "a"}, 1)])])
+    registry.add_collector("b", lambda: [("component_stat", "gauge", "Stats", [("", {"component": "b"}, 2.5)])])
+    registry.add_collector("broken", lambda: 1 / 0)
+
+    lines = registry.render().splitlines()
+
+    assert lines[:2] == ["# HELP op_seconds Op latency", "# TYPE op_seconds histogram"]
+    assert 'op_seconds_bucket{op="read",le="0.1"} 1' in lines
+    assert 'op_seconds_bucket{op="read",le="1"} 2' in lines
+    assert 'op_seconds_bucket{op="read",le="+Inf"} 3' in lines
+    assert 'op_seconds_sum{op="read"} 5.55' in lines
+    assert 'op_seconds_count{op="read"} 3' in lines
+    assert 'op_total{op="say \\"hi\\""} 1' in lines
+    # Families contributed by several collectors are emitted once.
+    assert lines.count("# TYPE component_stat gauge") == 1
+    assert 'component_stat{component="a"} 1' in lines and 'component_stat{component="b"} 2.5' in lines
+
+
+@pytest.mark.asyncio
+async def test_middleware_times_requests_by_route_template():
+    histogram = metrics_module.http_request_duration
+    histogram.clear()
+
+    async def app(scope, receive, send):
+        if scope["path"] != "/nowhere":
+            scope["route"] = SimpleNamespace(path="/items/{id}")
+        await send({"type": "http.response.start", "status": 404 if scope["path"] == "/nowhere" else 200})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def send(message):
+        pass
+
+    middleware = MetricsMiddleware(app)
+    for path in ("/items/1", "/items/2", "/nowhere"):
+        await middleware({"type": "http", "method": "GET", "path": path}, None, send)
+
+    counts = {
+        (labels["route"], labels["status"]): value
+        for suffix, labels, value in histogram.samples()
+        if suffix == "_count"
+    }
+    assert counts == {("/items/{id}", "200"): 2, ("(unmatched)", "404"): 1}
+    assert metrics_module.http_requests_in_flight.samples() == [("", {}, 0.0)]
+
+
+def test_llm_calls_record_latency_tokens_and_cost(monkeypatch):
+    monkeypatch.setattr(metrics_module.metrics, "enabled", True)
+    for metric in (metrics_module.llm_request_duration, metrics_module.llm_tokens, metrics_module.llm_cost):
+        metric.clear()
+
+    observe_llm_call("openai", "gpt-4o-mini", 1200, tokens_input=100, tokens_output=40, cost_usd=0.002)
+    observe_llm_call("openai", "gpt-4o-mini", 300, outcome="error")
+
+    text = metrics_module.metrics.render()
+
+    assert 'llm_request_duration_seconds_count{provider="openai",model="gpt-4o-mini",outcome="ok"} 1' in text
+    assert 'llm_request_duration_seconds_count{provider="openai",model="gpt-4o-mini",outcome="error"} 1' in text
+    assert 'llm_tokens_total{provider="openai",model="gpt-4o-mini",direction="input"} 100' in text
+    assert 'llm_tokens_total{provider="openai",model="gpt-4o-mini",direction="output"} 40' in text
+    assert 'llm_cost_usd_total{provider="openai",model="gpt-4o-mini"} 0.002' in text
+
+    monkeypatch.setattr(metrics_module.metrics, "enabled", False)
+    observe_llm_call("openai", "gpt-4o-mini", 1200, tokens_input=100)
+    assert 'direction="input"} 100' in metrics_module.metrics.render()
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_requires_token_outside_development(monkeypatch):
+    from fastapi import HTTPException
+    from starlette.requests import Request
+
+    from app import main
+
+    def request(authorization=None):
+        headers = [(b"authorization", authorization.encode())] if authorization else []
+        return Request({"type": "http", "method": "GET", "path": "/metrics", "headers": headers})
+
+    monkeypatch.setattr(main.metrics, "enabled", True)
+    monkeypatch.setattr(main.settings, "METRICS_AUTH_TOKEN", None)
+    monkeypatch.setattr(main.settings, "ENVIRONMENT", "development")
+    assert (await main.prometheus_metrics(request())).status_code == 200
+
+    monkeypatch.setattr(main.settings, "ENVIRONMENT", "production")
+    with pytest.raises(HTTPException) as exc:
+        await main.prometheus_metrics(request())
+    assert exc.value.status_code == 404
+
+    monkeypatch.setattr(main.settings, "METRICS_AUTH_TOKEN", "s3cret")
+    with pytest.raises(HTTPException) as exc:
+        await main.prometheus_metrics(request("Bearer wrong"))
+    assert exc.value.status_code == 401
+    assert (await main.prometheus_metrics(request("Bearer s3cret"))).status_code == 200
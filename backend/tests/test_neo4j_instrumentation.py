@@ -0,0 +1,129 @@
+"""
+Tests for Neo4j query instrumentation (app.utils.neo4j_instrumentation).
+"""
+
+import pytest
+
+from app.utils import neo4j_instrumentation as instrumentation
+from app.utils.neo4j_instrumentation import Neo4jQueryStats, instrument_driver, query_name
+
+
+class _Summary:
+    result_available_after = 2
+    result_consumed_after = 1
+    plan = {"operatorType": "ProduceResults", "args": {"EstimatedRows": 3.0}, "children": []}
+    profile = {
+        "operatorType": "ProduceResults",
+        "dbHits": 1,
+        "rows": 3,
+        "args": {},
+        "children": [{"operatorType": "NodeByLabelScan", "dbHits": 4, "rows": 3, "args": {}, "children": []}],
+    }
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = list(rows)
+
+    async def data(self):
+        return self._rows
+
+    async def single(self):
+        return self._rows[0] if self._rows else None
+
+    async def consume(self):
+        return _Summary()
+
+    async def __aiter__(self):
+        for row in self._rows:
+            yield row
+
+
+class _Session:
+    def __init__(self):
+        self.queries = []
+        self.closed = False
+
+    async def run(self, query, parameters=None, **kwargs):
+        self.queries.append(query)
+        if "boom" in query:
+            raise RuntimeError("syntax error")
+        return _Result([{"n": 1}, {"n": 2}, {"n": 3}])
+
+    async def close(self):
+        self.closed = True
+
+
+class _Driver:
+    def __init__(self):
+        self.sessions = []
+
+    def session(self, **kwargs):
+        self.sessions.append(_Session())
+        return self.sessions[-1]
+
+
+async def _lookup_words(session):
+    result = await session.run("MATCH (w:Word)\n RETURN w")
+    return await result.data()
+
+
+@pytest.mark.asyncio
+async def test_queries_are_named_timed_and_counted(monkeypatch):
+    monkeypatch.setattr(instrumentation.settings, "NEO4J_QUERY_PROFILE_SAMPLE_RATE", 0.0)
+    stats = Neo4jQueryStats(max_names=10)
+    session = instrument_driver(_Driver(), stats).session()
+
+    assert await _lookup_words(session) == [{"n": 1}, {"n": 2}, {"n": 3}]
+    await _lookup_words(session)
+    result = await session.run("// name: words.iterate\nMATCH (w:Word) RETURN w")
+    assert [row async for row in result] == [{"n": 1}, {"n": 2}, {"n": 3}]
+    with pytest.raises(RuntimeError):
+        await session.run("boom")
+
+    report = {q["name"]: q for q in stats.top(order_by="calls")["queries"]}
+    digest = query_name("MATCH (w:Word) RETURN w", None).split("#")[1]
+    (name,) = [n for n in report if n.endswith(f"test_neo4j_instrumentation:_lookup_words#{digest}")]
+    lookup = report[name]
+    assert lookup["calls"] == 2 and lookup["rows"] == 6
+    assert lookup["server_ms"] == 6.0
+    assert lookup["query"] == "MATCH (w:Word) RETURN w"
+    assert sum(lookup["histogram"].values()) == 2
+    assert report["words.iterate"]["rows"] == 3
+    boom_digest = query_name("boom", None).split("#")[1]
+    assert [q["errors"] for n, q in report.items() if n.endswith(boom_digest)] == [1]
+
+
+@pytest.mark.asyncio
+async def test_profile_sampling_collects_db_hits(monkeypatch):
+    monkeypatch.setattr(instrumentation.settings, "NEO4J_QUERY_PROFILE_SAMPLE_RATE", 1.0)
+    stats = Neo4jQueryStats(max_names=10)
+    driver = _Driver()
+    session = instrument_driver(driver, stats).session()
+
+    result = await session.run("MATCH (w:Word) RETURN w")
+    await result.single()
+
+    assert driver.sessions[0].queries == ["PROFILE MATCH (w:Word) RETURN w"]
+    (entry,) = stats.top()["queries"]
+    assert entry["profiled"] == 1 and entry["db_hits"] == 5
+
+
+@pytest.mark.asyncio
+async def test_slow_query_logs_plan_and_unconsumed_results_record_on_close(monkeypatch):
+    monkeypatch.setattr(instrumentation.settings, "NEO4J_QUERY_PROFILE_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(instrumentation.settings, "NEO4J_SLOW_QUERY_MS", 0.0)
+    logged = []
+    monkeypatch.setattr(instrumentation.logger, "warning", lambda event, **kw: logged.append((event, kw)))
+    stats = Neo4jQueryStats(max_names=1)
+    session = instrument_driver(_Driver(), stats).session()
+
+    await session.run("// name: first\nMATCH (n) RETURN n", {"secret": "x"})
+    await session.run("// name: second\nMATCH (m) RETURN m")
+    await session.close()
+
+    assert {q["name"] for q in stats.top()["queries"]} == {"first", "(other)"}
+    event, fields = logged[0]
+    assert event == "neo4j_slow_query"
+    assert fields["params"] == ["secret"]
+    assert fields["plan"].splitlines() == ["ProduceResults rows=3 hits=1", "  NodeByLabelScan rows=3 hits=4"]
@@ -0,0 +1,124 @@
+"""
+Tests for per-request profiling (app.utils.request_profiler).
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from app.utils.request_profiler import RequestProfiler, RequestProfilingMiddleware, record_span
+
+
+async def _call(middleware, headers):
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    await middleware({"type": "http", "method": "GET", "path": "/lexical/graph", "headers": headers}, None, send)
+    return dict(sent[0]["headers"])
+
+
+@pytest.mark.asyncio
+async def test_header_profiles_only_authorized_requests_and_collects_spans():
+    profiler = RequestProfiler(interval_ms=50, max_stored=10, sample_rate=0.0, sample_paths="")
+
+    async def app(scope, receive, send):
+        record_span("db", "SELECT ?", 12.0)
+
+        async def child():
+            record_span("neo4j", "graph.neighbours", 30.0)
+
+        await asyncio.gather(child(), child())
+        await asyncio.to_thread(record_span, "llm", "openai:gpt-4o-mini", 200.0)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    middleware = RequestProfilingMiddleware(app, profiler, authorize=lambda scope: (b"authorization", b"admin") in scope["headers"])
+
+    assert b"x-profile-id" not in await _call(middleware, [(b"x-profile", b"1")])
+    headers = await _call(middleware, [(b"x-profile", b"1"), (b"authorization", b"admin")])
+
+    (summary,) = profiler.list()
+    assert headers[b"x-profile-id"].decode() == summary["id"]
+    assert summary["trigger"] == "header" and summary["status"] == 200
+    report = profiler.get(summary["id"]).report()
+    assert report["breakdown_ms"]["db"] == 12.0
+    assert report["breakdown_ms"]["neo4j"] == 60.0
+    assert report["breakdown_ms"]["llm"] == 200.0
+    assert {(s["kind"], s["name"], s["calls"]) for s in report["top_spans"]} == {
+        ("db", "SELECT ?", 1),
+        ("neo4j", "graph.neighbours", 2),
+        ("llm", "openai:gpt-4o-mini", 1),
+    }
+    # Spans outside a profiled request are ignored.
+    record_span("db", "SELECT ?", 5.0)
+    assert profiler.get(summary["id"]).report()["breakdown_ms"]["db"] == 12.0
+
+
+@pytest.mark.asyncio
+async def test_spans_of_tasks_outliving_the_request_are_ignored():
+    profiler = RequestProfiler(interval_ms=50, max_stored=10, sample_rate=0.0, sample_paths="")
+    profile, token = profiler.start({"type": "http", "method": "POST", "path": "/compile"}, "header")
+    release = asyncio.Event()
+
+    async def spawned():
+        await release.wait()
+        record_span("llm", "openai:gpt-4o", 900.0)
+
+    task = asyncio.create_task(spawned())
+    profiler.finish(profile, token, 202)
+    release.set()
+    await task
+
+    assert profile.span_totals == {}
+
+
+@pytest.mark.asyncio
+async def test_sampler_attributes_loop_time_to_profiled_tasks():
+    profiler = RequestProfiler(interval_ms=1000, max_stored=10, sample_rate=0.0, sample_paths="")
+    profile, token = profiler.start({"type": "http", "method": "GET", "path": "/x"}, "header")
+
+    def blocking_handler():
+        # Blocks the loop while another thread samples it, as a CPU-bound handler would.
+        sampler = threading.Thread(target=profiler.sample, args=(7.0,))
+        sampler.start()
+        sampler.join()
+
+    async def sub_task():
+        blocking_handler()
+
+    blocking_handler()
+    await asyncio.create_task(sub_task())
+    profiler.finish(profile, token, 200)
+    unrelated = asyncio.create_task(sub_task())
+    await unrelated
+
+    assert profile.samples == 2 and profile.cpu_ms == 14.0
+    stacks = list(profile.stacks)
+    assert len(stacks) == 2
+    assert all(any(frame.startswith("blocking_handler ") for frame in stack) for stack in stacks)
+    # The sub-task's stack starts at its own coroutine.
+    assert sum(stack[0].startswith("sub_task ") for stack in stacks) == 1
+
+
+def test_sampling_rate_paths_and_retention():
+    profiler = RequestProfiler(interval_ms=5, max_stored=2, sample_rate=1.0, sample_paths="/api/v1/lexical, /api/v1/lessons/guided")
+
+    assert profiler.should_sample({"path": "/api/v1/lexical/graph"})
+    assert not profiler.should_sample({"path": "/api/v1/auth/me"})
+    assert not RequestProfiler(sample_rate=0.0, sample_paths="").should_sample({"path": "/api/v1/lexical/graph"})
+
+    async def run():
+        for path in ("/a", "/b", "/c"):
+            profile, token = profiler.start({"type": "http", "method": "GET", "path": path}, "sample")
+            record_span("db", "SELECT ?", 1.5)
+            profiler.finish(profile, token, 200)
+        return profile
+
+    last = asyncio.run(run())
+
+    assert [p["path"] for p in profiler.list()] == ["/c", "/b"]
+    lines = last.folded().splitlines()
+    assert lines[0] == "GET /c;[db];SELECT ? 1500"
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
@@ -116,3 +116,30 @@ async def test_session_create_final_fallback():
         assert result["session_id"] is not None
         assert len(result["session_id"]) > 0
 
+
+
+@pytest.mark.asyncio
+async def test_session_create_reuses_in_memory_session():
+    """Test that a session stored in memory is found again when Postgres is down."""
+    from app.api.v1.endpoints.cando import create_lesson_session, CreateLessonSessionRequest, cando_lesson_sessions
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    request = CreateLessonSessionRequest(can_do_id="JF:memory-fallback")
+
+    mock_pg = AsyncMock(spec=AsyncSession)
+    mock_pg.execute.side_effect = Exception("Database completely unavailable")
+
+    with patch("app.api.v1.endpoints.cando.cando_lesson_sessions._store_session", new_callable=AsyncMock) as mock_store:
+        mock_store.side_effect = Exception("Storage failed")
+
+        first = await create_lesson_session(request, pg=mock_pg)
+        try:
+            stored = cando_lesson_sessions._mem_sessions.get(first["session_id"], record=False)
+            assert stored is not None
+            assert stored["can_do_id"] == "JF:memory-fallback"
+
+            second = await create_lesson_session(request, pg=mock_pg)
+            assert second["session_id"] == first["session_id"]
+            mock_store.assert_called_once()
+        finally:
+            cando_lesson_sessions._mem_sessions.pop(first["session_id"])
@@ -0,0 +1,94 @@
+"""
+Tests for Postgres statement timing and N+1 detection (app.utils.sql_instrumentation).
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.utils import sql_instrumentation as instrumentation
+from app.utils.sql_instrumentation import SqlRequestStatsMiddleware, SqlStatementStats, fingerprint
+
+
+def test_fingerprint_collapses_values_and_in_lists():
+    a = fingerprint("SELECT id FROM words WHERE kanji = 'abc' AND level = 3 AND id IN ($1, $2, $3)")
+    b = fingerprint("SELECT  id FROM words\n WHERE kanji = 'x''y' AND level = 10 AND id IN ($4, $5)")
+
+    assert a == b == "SELECT id FROM words WHERE kanji = ? AND level = ? AND id IN (?+)"
+    assert fingerprint("SELECT CAST(:emb AS vector), x::jsonb FROM t") == "SELECT CAST(? AS vector), x::jsonb FROM t"
+
+
+def test_request_counts_statements_and_flags_repeated_shapes(monkeypatch):
+    logged = []
+    monkeypatch.setattr(instrumentation.logger, "warning", lambda event, **kw: logged.append((event, kw)))
+    stats = SqlStatementStats(threshold=2, max_endpoints=10)
+    engine = create_engine("sqlite://")
+    stats.install(engine)
+    stats.install(engine)  # idempotent
+
+    scope = {"type": "http", "method": "POST", "path": "/api/v1/words/7", "route": SimpleNamespace(path="/api/v1/words/{id}")}
+    token = stats.begin_request(scope)
+    with engine.connect() as conn:
+        for i in range(4):
+            conn.execute(text("SELECT :i"), {"i": i})
+        conn.execute(text("SELECT 1 + 1"))
+    request = stats.end_request(token)
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 2"))
+
+    assert request.statements == 5
+    assert request.shapes == {"SELECT ?": 4, "SELECT ? + ?": 1}
+    assert [(event, kw["endpoint"]) for event, kw in logged] == [("sql_n_plus_one", "POST /api/v1/words/{id}")]
+    report = stats.top()
+    (endpoint,) = report["endpoints"]
+    assert endpoint["endpoint"] == "POST /api/v1/words/{id}"
+    assert endpoint["requests"] == 1 and endpoint["statements"] == 5
+    assert endpoint["n_plus_one_requests"] == 1 and endpoint["last_repeated"] == "SELECT ?"
+    assert report["background"]["statements"] == 1
+
+
+@pytest.mark.asyncio
+async def test_middleware_scopes_each_http_request():
+    stats = SqlStatementStats(threshold=10, max_endpoints=10)
+    engine = create_engine("sqlite://")
+    stats.install(engine)
+
+    async def app(scope, receive, send):
+        scope["route"] = SimpleNamespace(path="/items/{id}")
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+    middleware = SqlRequestStatsMiddleware(app, stats)
+    for path in ("/items/1", "/items/2"):
+        await middleware({"type": "http", "method": "GET", "path": path}, None, None)
+
+    (endpoint,) = stats.top()["endpoints"]
+    assert endpoint["endpoint"] == "GET /items/{id}"
+    assert endpoint["requests"] == 2 and endpoint["statements"] == 2
+    assert stats.current() is None
+
+
+@pytest.mark.asyncio
+async def test_statements_of_tasks_outliving_the_request_count_as_background():
+    stats = SqlStatementStats(threshold=1, max_endpoints=10)
+    engine = create_engine("sqlite://")
+    stats.install(engine)
+    release = asyncio.Event()
+
+    async def spawned():
+        await release.wait()
+        with engine.connect() as conn:
+            for _ in range(3):
+                conn.execute(text("SELECT 1"))
+
+    token = stats.begin_request({"type": "http", "method": "POST", "path": "/compile"})
+    task = asyncio.create_task(spawned())
+    request = stats.end_request(token)
+    release.set()
+    await task
+
+    assert request.statements == 0 and not request.flagged
+    assert stats.top()["background"]["statements"] == 3
@@ -0,0 +1,89 @@
+"""
+Tests for SSE disconnect handling (app.utils.sse).
+"""
+
+import asyncio
+
+import pytest
+
+from app.utils.sse import (
+    StreamCancelledError,
+    guard_sse_stream,
+    raise_if_stream_cancelled,
+    stream_outcome_counts,
+)
+
+
+class _FakeRequest:
+    """Minimal request exposing is_disconnected()."""
+
+    def __init__(self):
+        self.disconnected = False
+
+    async def is_disconnected(self) -> bool:
+        return self.disconnected
+
+
+@pytest.mark.asyncio
+async def test_guard_relays_all_chunks_when_client_stays():
+    request = _FakeRequest()
+    outcomes = []
+
+    async def source():
+        for i in range(3):
+            yield f"data: {i}\n\n"
+
+    async def on_finish(outcome):
+        outcomes.append(outcome)
+
+    chunks = [c async for c in guard_sse_stream(request, source(), name="t_ok", poll_interval=0.01, on_finish=on_finish)]
+
+    assert chunks == ["data: 0\n\n", "data: 1\n\n", "data: 2\n\n"]
+    assert outcomes == ["completed"]
+    assert stream_outcome_counts().get("t_ok:completed", 0) >= 1
+
+
+@pytest.mark.asyncio
+async def test_guard_cancels_source_and_worker_threads_on_disconnect():
+    request = _FakeRequest()
+    outcomes = []
+    source_closed = asyncio.Event()
+    thread_saw_cancel = []
+
+    def blocking_llm_calls():
+        # Simulates compilation work in asyncio.to_thread checking between LLM calls.
+        import time
+        for _ in range(200):
+            try:
+                raise_if_stream_cancelled()
+            except StreamCancelledError:
+                thread_saw_cancel.append(True)
+                return
+            time.sleep(0.01)
+
+    async def source():
+        try:
+            yield "data: start\n\n"
+            worker = asyncio.create_task(asyncio.to_thread(blocking_llm_calls))
+            await asyncio.sleep(10)
+            yield "data: never\n\n"
+        finally:
+            source_closed.set()
+            await asyncio.wait_for(asyncio.shield(worker), timeout=2)
+
+    async def on_finish(outcome):
+        outcomes.append(outcome)
+
+    received = []
+    async for chunk in guard_sse_stream(request, source(), name="t_abort", poll_interval=0.01, on_finish=on_finish):
+        received.append(chunk)
+        request.disconnected = True
+
+    assert received == ["data: start\n\n"]
+    assert source_closed.is_set()
+    assert thread_saw_cancel == [True]
+    assert outcomes == ["aborted"]
+
+
+def test_raise_if_stream_cancelled_is_noop_outside_streams():
+    raise_if_stream_cancelled()
@@ -0,0 +1,53 @@
+"""
+Tests for per-stage timing and round-trip accounting used by the compile benchmark.
+"""
+
+import asyncio
+
+import pytest
+
+from app.utils.stage_profiler import StageProfiler
+
+
+class _Session:
+    async def execute(self, *args, **kwargs):
+        return None
+
+    async def run(self, *args, **kwargs):
+        return None
+
+    def in_transaction(self):
+        return False
+
+
+@pytest.mark.asyncio
+async def test_round_trips_are_attributed_to_nested_stages():
+    profiler = StageProfiler()
+    pg = profiler.pg(_Session())
+    neo = profiler.neo(_Session())
+
+    async def content_stage():
+        await pg.execute("SELECT 1")
+        await asyncio.to_thread(lambda: None)
+        await neo.run("MATCH (n) RETURN n")
+
+    with profiler.stage("compile"):
+        await pg.execute("SELECT 0")
+        await profiler.wrap("content", content_stage)()
+    await pg.execute("outside any stage")
+
+    rows = {row["name"]: row for row in profiler.report()}
+    assert (rows["compile"]["pg_round_trips"], rows["compile"]["neo4j_round_trips"]) == (2, 1)
+    assert (rows["content"]["pg_round_trips"], rows["content"]["neo4j_round_trips"]) == (1, 1)
+    assert rows["content"]["calls"] == 1
+    assert rows["compile"]["wall_ms"] >= rows["content"]["wall_ms"]
+
+
+def test_non_round_trip_attributes_pass_through():
+    profiler = StageProfiler()
+    pg = profiler.pg(_Session())
+
+    with profiler.stage("s"):
+        assert pg.in_transaction() is False
+
+    assert profiler.report()[0]["pg_round_trips"] == 0
@@ -0,0 +1,51 @@
+"""
+Tests for the embedding storage layout helpers (app.utils.vector_storage).
+"""
+
+from app.utils.vector_storage import VectorLayout, bind_limits, nearest_sql, vector_literal
+
+
+def _squash(sql: str) -> str:
+    return " ".join(sql.split())
+
+
+def test_default_layout_orders_by_the_stored_column():
+    layout = VectorLayout("vector", 1536, 1536, 4)
+
+    sql = _squash(nearest_sql(select="id", from_where="FROM t", column="embedding", param="q", layout=layout))
+    params = {}
+    bind_limits(params, 5, layout=layout)
+
+    assert not layout.compact_index
+    assert "ORDER BY embedding <=> CAST(:q AS vector) LIMIT :limit_candidates" in sql
+    assert params == {"limit": 5, "limit_candidates": 5}
+    assert layout.create_index_sql("knowledge_embeddings", "idx") == (
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx ON knowledge_embeddings USING hnsw (embedding vector_cosine_ops)"
+    )
+
+
+def test_compact_layout_searches_the_prefix_and_reranks_exactly():
+    layout = VectorLayout("halfvec", 1536, 512, 4)
+
+    sql = _squash(nearest_sql(select="id", from_where="FROM t", column="embedding", param="q", layout=layout))
+    params = {}
+    bind_limits(params, 5, layout=layout)
+
+    assert layout.column_type() == "halfvec(1536)"
+    assert "embedding <=> CAST(:q AS halfvec) AS distance" in sql
+    assert (
+        "ORDER BY (subvector(embedding, 1, 512)::halfvec(512)) <=> "
+        "(subvector(CAST(:q AS halfvec), 1, 512)::halfvec(512)) LIMIT :limit_candidates"
+    ) in sql
+    assert sql.endswith(") nearest ORDER BY distance LIMIT :limit")
+    assert params == {"limit": 5, "limit_candidates": 20}
+    assert layout.create_index_sql("lesson_chunks", "idx_jp", "lang = 'jp'", concurrently=False) == (
+        "CREATE INDEX IF NOT EXISTS idx_jp ON lesson_chunks USING hnsw "
+        "((subvector(embedding, 1, 512)::halfvec(512)) halfvec_cosine_ops) WHERE lang = 'jp'"
+    )
+
+
+def test_vector_literal():
+    assert vector_literal([0.5, 1, -2.25]) == "[0.5,1.0,-2.25]"
+    assert vector_literal("[0.1,0.2]") == "[0.1,0.2]"
+    assert vector_literal(None) is None
@@ -0,0 +1,112 @@
+"""
+Tests for canonical Word keys (schema statements and batched backfill).
+"""
+
+import pytest
+
+from app.services.lexical_network.word_keys import (
+    WORD_KEY_SCHEMA_STATEMENTS,
+    backfill_word_keys,
+    ensure_word_key_schema,
+    ensure_word_keys,
+    word_key,
+)
+
+
+class _Result:
+    def __init__(self, record=None):
+        self._record = record
+
+    async def single(self):
+        return self._record
+
+    async def consume(self):
+        return None
+
+
+class _FakeSession:
+    """Records queries and replays queued backfill batch results."""
+
+    def __init__(self, batches=None):
+        self.queries = []
+        self._batches = list(batches or [])
+
+    async def run(self, query, **params):
+        self.queries.append((query, params))
+        if "word_key_conflict" in query and self._batches:
+            return _Result(self._batches.pop(0))
+        return _Result({"keyed": 0, "conflicts": 0})
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _FakeDriver:
+    def __init__(self, session):
+        self._session = session
+
+    def session(self):
+        return self._session
+
+
+def test_word_key_prefers_standard_orthography():
+    assert word_key("綺麗", "奇麗") == "綺麗"
+    assert word_key(None, "奇麗") == "奇麗"
+    assert word_key("", "奇麗") == "奇麗"
+    assert word_key(None, None) is None
+
+
+@pytest.mark.asyncio
+async def test_ensure_schema_creates_unique_constraint():
+    session = _FakeSession()
+    await ensure_word_key_schema(session)
+
+    statements = [q for q, _ in session.queries]
+    assert statements == WORD_KEY_SCHEMA_STATEMENTS
+    assert any("REQUIRE w.word_key IS UNIQUE" in s for s in statements)
+
+
+@pytest.mark.asyncio
+async def test_backfill_runs_batches_until_nothing_left():
+    session = _FakeSession(batches=[
+        {"keyed": 5000, "conflicts": 2},
+        {"keyed": 120, "conflicts": 0},
+    ])
+
+    stats = await backfill_word_keys(session, batch_size=5000)
+
+    assert stats == {"keyed": 5120, "conflicts": 2, "batches": 2}
+    assert len(session.queries) == 3
+    assert all(params == {"batch_size": 5000} for _, params in session.queries)
+
+
+@pytest.mark.asyncio
+async def test_backfill_respects_max_batches():
+    session = _FakeSession(batches=[{"keyed": 10, "conflicts": 0}] * 5)
+
+    stats = await backfill_word_keys(session, batch_size=10, max_batches=2)
+
+    assert stats["batches"] == 2
+    assert stats["keyed"] == 20
+
+
+@pytest.mark.asyncio
+async def test_ensure_word_keys_creates_schema_then_backfills():
+    session = _FakeSession(batches=[{"keyed": 3, "conflicts": 0}])
+
+    stats = await ensure_word_keys(_FakeDriver(session))
+
+    assert stats == {"keyed": 3, "conflicts": 0, "batches": 1}
+    assert [q for q, _ in session.queries][: len(WORD_KEY_SCHEMA_STATEMENTS)] == WORD_KEY_SCHEMA_STATEMENTS
+
+
+@pytest.mark.asyncio
+async def test_ensure_word_keys_logs_instead_of_raising():
+    class _Broken:
+        def session(self):
+            raise RuntimeError("neo4j down")
+
+    assert await ensure_word_keys(_Broken()) is None
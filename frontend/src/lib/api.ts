@@ -128,6 +128,8 @@ export async function regenerateLessonStage(
 }
 
 type CompileStatusHandler = (payload: any) => void
+// Receives `card` / `card_partial` events ({ event, seq, card_key, stage, card | partial })
+type CompileCardHandler = (payload: any) => void
 
 export async function compileLessonV2Stream(
   canDoId: string,
@@ -137,7 +139,8 @@ export async function compileLessonV2Stream(
   userId?: string | null,
   fastModel?: string | null,
   incremental: boolean = true,
-  signal?: AbortSignal
+  signal?: AbortSignal,
+  onCard?: CompileCardHandler
 ): Promise<any> {
   const params = new URLSearchParams({
     can_do_id: canDoId,
@@ -176,6 +179,7 @@ export async function compileLessonV2Stream(
       const chunk = buffer.slice(0, idx)
       buffer = buffer.slice(idx + 2)
       const lines = chunk.split("\n")
+      const isCardEvent = lines.some((l) => l === "event: card" || l === "event: card_partial")
       for (let i = 0; i < lines.length; i++) {
         const line = lines[i]
         // Handle error events
@@ -199,6 +203,14 @@ export async function compileLessonV2Stream(
         if (line.startsWith("data: ")) {
           const data = line.slice(6)
           if (!data || data === "[DONE]") continue
+          if (isCardEvent) {
+            try {
+              if (onCard) onCard(JSON.parse(data))
+            } catch {
+              // ignore malformed card frames; the final result carries every card
+            }
+            continue
+          }
           try {
             const payload = JSON.parse(data)
             // Check if payload indicates an error